@@ -1,9 +1,6 @@
 """Flask application factory."""
-import os
 from flask import Flask
-from dotenv import load_dotenv
-
-load_dotenv()
+from app.config import Config
 
 
 def create_app():
@@ -11,8 +8,8 @@ def create_app():
     app = Flask(__name__, template_folder='templates', static_folder='static')
     
     # Configuration
-    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
-    app.config['DATABASE_URL'] = os.getenv('DATABASE_URL')
+    app.config['SECRET_KEY'] = Config.SECRET_KEY
+    app.config['DATABASE_URL'] = Config.DATABASE_URL
     
     # Register blueprints
     from app.views.auth import auth_bp
@@ -20,12 +17,23 @@ def create_app():
     from app.views.alerts import alerts_bp
     from app.views.cron import cron_bp
     from app.views.health import health_bp
+    from app.views.analytics import analytics_bp
+    from app.views.prices import prices_bp
+    from app.views.metrics import metrics_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(dashboard_bp)
     app.register_blueprint(alerts_bp)
     app.register_blueprint(cron_bp)
     app.register_blueprint(health_bp)
+    app.register_blueprint(analytics_bp)
+    app.register_blueprint(prices_bp)
+    app.register_blueprint(metrics_bp)
+    
+    # Profiling hook, only installed when some request could be profiled
+    from app.services import profiler
+    if profiler.requests_enabled():
+        app.wsgi_app = profiler.ProfilingMiddleware(app.wsgi_app)
     
     return app
 
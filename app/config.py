@@ -8,12 +8,92 @@ load_dotenv()
 class Config:
     """Base configuration."""
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
+    # Cache the logged-in user's email in the signed session cookie (0 disables)
+    USER_SESSION_CACHE_SECONDS = int(os.getenv('USER_SESSION_CACHE_SECONDS', '0'))
     DATABASE_URL = os.getenv('DATABASE_URL')
+    # Connection pool per process (0 connects per use): size, seconds to wait for
+    # a free connection, and seconds an idle connection is kept
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '5'))
+    DB_POOL_MAX_IDLE_SECONDS = float(os.getenv('DB_POOL_MAX_IDLE_SECONDS', '300'))
+    # Comma-separated read replica URLs for read-only model queries (needs pooling);
+    # a replica lagging more than the max is skipped until re-checked
+    DATABASE_REPLICA_URLS = os.getenv('DATABASE_REPLICA_URLS', '')
+    DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv('DB_REPLICA_MAX_LAG_SECONDS', '5'))
+    DB_REPLICA_CHECK_SECONDS = float(os.getenv('DB_REPLICA_CHECK_SECONDS', '5'))
+    # Reads stay on the primary this long after a session changes its rules;
+    # keep it above the max lag plus the check interval
+    DB_READ_YOUR_WRITES_SECONDS = float(os.getenv('DB_READ_YOUR_WRITES_SECONDS', '15'))
+    # /health caches its database checks this long; prices older than the max
+    # age are reported stale (collection runs daily by default)
+    HEALTH_CACHE_SECONDS = float(os.getenv('HEALTH_CACHE_SECONDS', '5'))
+    HEALTH_MAX_PRICE_AGE_SECONDS = int(os.getenv('HEALTH_MAX_PRICE_AGE_SECONDS', '90000'))
+    # Query tracing: statements slower than this are logged (0 disables), and one
+    # repeated this many times within a request or job is reported as a likely N+1
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '500'))
+    QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', '5'))
+    # Add an X-Query-Summary header to every response (debugging only)
+    QUERY_TRACE_HEADER = os.getenv('QUERY_TRACE_HEADER', 'false').lower() == 'true'
+    # On-demand profiling, off unless paths, jobs or a header secret are set:
+    # comma-separated URL path prefixes and script names ('*' for all scripts)
+    PROFILE_PATHS = os.getenv('PROFILE_PATHS', '')
+    PROFILE_JOBS = os.getenv('PROFILE_JOBS', '')
+    # Key for X-Profile request headers signed with app.services.profiler.sign
+    PROFILE_SECRET = os.getenv('PROFILE_SECRET')
+    # 'cprofile' writes .pstats; 'sample' samples stacks into .collapsed files
+    PROFILE_MODE = os.getenv('PROFILE_MODE', 'cprofile')
+    PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '50'))
     COINGECKO_API_KEY = os.getenv('COINGECKO_API_KEY')
+    COINGECKO_BASE_URL = os.getenv('COINGECKO_BASE_URL', 'https://api.coingecko.com/api/v3')
+    COINGECKO_TIMEOUT = float(os.getenv('COINGECKO_TIMEOUT', '10'))
+    COINGECKO_BREAKER_FAILURES = int(os.getenv('COINGECKO_BREAKER_FAILURES', '3'))
+    COINGECKO_BREAKER_RECOVERY_SECONDS = float(os.getenv('COINGECKO_BREAKER_RECOVERY_SECONDS', '60'))
+    # Successful calls slower than this count as breaker failures (0 disables)
+    COINGECKO_SLOW_CALL_SECONDS = float(os.getenv('COINGECKO_SLOW_CALL_SECONDS', '0'))
+    # Shared per-minute call budget; the reserve is only spent by scheduled collection
+    COINGECKO_CALLS_PER_MINUTE = int(os.getenv('COINGECKO_CALLS_PER_MINUTE', '30'))
+    COINGECKO_SCHEDULED_RESERVE = int(os.getenv('COINGECKO_SCHEDULED_RESERVE', '5'))
+    # Historical backfill: one-day windows keep CoinGecko's 5-minute granularity
+    BACKFILL_WINDOW_SECONDS = int(os.getenv('BACKFILL_WINDOW_SECONDS', '86400'))
+    BACKFILL_CONCURRENCY = int(os.getenv('BACKFILL_CONCURRENCY', '4'))
+    # Write-behind price ticks: flush by count or age (0 seconds writes through)
+    TICK_FLUSH_SIZE = int(os.getenv('TICK_FLUSH_SIZE', '500'))
+    TICK_FLUSH_SECONDS = float(os.getenv('TICK_FLUSH_SECONDS', '0'))
+    TICK_BUFFER_MAX = int(os.getenv('TICK_BUFFER_MAX', '10000'))
+    # Server-Sent Events price stream: idle heartbeat, events a client may fall
+    # behind before it is dropped, and concurrent client limit
+    PRICE_STREAM_HEARTBEAT_SECONDS = float(os.getenv('PRICE_STREAM_HEARTBEAT_SECONDS', '15'))
+    PRICE_STREAM_QUEUE_SIZE = int(os.getenv('PRICE_STREAM_QUEUE_SIZE', '8'))
+    PRICE_STREAM_MAX_CLIENTS = int(os.getenv('PRICE_STREAM_MAX_CLIENTS', '1000'))
+    # Local memory-mapped tick store for historical reads (unset disables)
+    TICK_STORE_DIR = os.getenv('TICK_STORE_DIR')
+    
+    # Hedged price fetching against a secondary CoinGecko-compatible endpoint
+    PRICE_SECONDARY_BASE_URL = os.getenv('PRICE_SECONDARY_BASE_URL')
+    PRICE_HEDGE_PERCENTILE = float(os.getenv('PRICE_HEDGE_PERCENTILE', '95'))
+    # Fractional price difference between providers that gets logged (0 disables)
+    PRICE_MAX_DIVERGENCE = float(os.getenv('PRICE_MAX_DIVERGENCE', '0.02'))
     MAIL_USERNAME = os.getenv('MAIL_USERNAME')
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
     ADMIN_EMAIL = os.getenv('ADMIN_EMAIL')
     
+    # Outbound email dispatch
+    SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.163.com')
+    SMTP_PORT = int(os.getenv('SMTP_PORT', '465'))
+    SMTP_USE_SSL = os.getenv('SMTP_USE_SSL', 'true').lower() == 'true'
+    MAIL_MAX_WORKERS = int(os.getenv('MAIL_MAX_WORKERS', '4'))
+    MAIL_SENDS_PER_MINUTE = float(os.getenv('MAIL_SENDS_PER_MINUTE', '60'))
+    MAIL_MAX_PENDING = int(os.getenv('MAIL_MAX_PENDING', '100'))
+    MAIL_HTML_ALERTS = os.getenv('MAIL_HTML_ALERTS', 'false').lower() == 'true'
+    ADMIN_ALERT_WINDOW_SECONDS = int(os.getenv('ADMIN_ALERT_WINDOW_SECONDS', '3600'))
+    
+    # Form defaults for re-arming rules: minutes before re-arming, and how far
+    # (percent of the threshold) the value must move back across it
+    ALERT_COOLDOWN_MINUTES = int(os.getenv('ALERT_COOLDOWN_MINUTES', '60'))
+    ALERT_REARM_BAND_PCT = float(os.getenv('ALERT_REARM_BAND_PCT', '1.0'))
+    
     # Supported cryptocurrencies
     SUPPORTED_CURRENCIES = {
         'bitcoin': 'BTC',
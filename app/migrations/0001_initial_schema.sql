@@ -0,0 +1,29 @@
+-- Users, alert rules and collected prices, as first deployed.
+-- IF NOT EXISTS lets databases created before migrations adopt this history.
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    email VARCHAR(255) UNIQUE NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS alert_rules (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    currency_symbol VARCHAR(10) NOT NULL,
+    condition CHAR(1) NOT NULL,
+    threshold_price NUMERIC(20, 8) NOT NULL,
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS price_history (
+    id SERIAL PRIMARY KEY,
+    currency_symbol VARCHAR(10) NOT NULL,
+    price_usd NUMERIC(20, 8) NOT NULL,
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- Latest price per currency and range reads
+CREATE INDEX IF NOT EXISTS idx_price_history_symbol_timestamp
+ON price_history (currency_symbol, timestamp DESC);
@@ -0,0 +1,14 @@
+-- Throttling state for cron failure notifications
+CREATE TABLE IF NOT EXISTS admin_alert_log (
+    id SERIAL PRIMARY KEY,
+    task_name VARCHAR(255) NOT NULL,
+    fingerprint VARCHAR(64) NOT NULL,
+    error_message TEXT NOT NULL,
+    occurrences INTEGER NOT NULL DEFAULT 0,
+    pending INTEGER NOT NULL DEFAULT 0,
+    first_seen TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_seen TIMESTAMP WITH TIME ZONE NOT NULL,
+    pending_since TIMESTAMP WITH TIME ZONE,
+    last_sent_at TIMESTAMP WITH TIME ZONE,
+    UNIQUE (task_name, fingerprint)
+);
@@ -0,0 +1,6 @@
+-- API call budgets shared across processes
+CREATE TABLE IF NOT EXISTS api_quota (
+    name VARCHAR(50) PRIMARY KEY,
+    window_start BIGINT NOT NULL,
+    used INTEGER NOT NULL DEFAULT 0
+);
@@ -0,0 +1,9 @@
+-- Progress of resumable historical imports
+CREATE TABLE IF NOT EXISTS backfill_checkpoint (
+    coin_id VARCHAR(50) PRIMARY KEY,
+    currency_symbol VARCHAR(10) NOT NULL,
+    range_start BIGINT NOT NULL,
+    range_end BIGINT NOT NULL,
+    completed_until BIGINT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
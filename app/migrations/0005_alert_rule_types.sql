@@ -0,0 +1,4 @@
+-- Rule types beyond price thresholds
+ALTER TABLE alert_rules
+    ADD COLUMN IF NOT EXISTS rule_type VARCHAR(20) NOT NULL DEFAULT 'price',
+    ADD COLUMN IF NOT EXISTS window_size INTEGER;
@@ -0,0 +1,5 @@
+-- Re-arming rules: rearm_pct NULL means one-shot; fired_at NULL means armed
+ALTER TABLE alert_rules
+    ADD COLUMN IF NOT EXISTS rearm_pct NUMERIC(6, 2),
+    ADD COLUMN IF NOT EXISTS cooldown_minutes INTEGER,
+    ADD COLUMN IF NOT EXISTS fired_at TIMESTAMP WITH TIME ZONE;
@@ -0,0 +1,2 @@
+-- Bumped on every change to the user's rules, for dashboard ETags
+ALTER TABLE users ADD COLUMN IF NOT EXISTS rules_version INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,8 @@
+-- migrate: no-transaction
+-- Per-user listing in keyset order, and the active rules each alert run scans.
+-- Built concurrently so writes to a large alert_rules table are not blocked.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alert_rules_user_created
+ON alert_rules (user_id, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alert_rules_active
+ON alert_rules (currency_symbol) WHERE is_active = TRUE;
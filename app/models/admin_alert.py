@@ -0,0 +1,134 @@
+"""Admin alert log model."""
+from datetime import datetime, timedelta
+from typing import List, Optional
+from app.services.db import get_db_connection
+
+
+class AdminAlertLog:
+    """Occurrences of one failure (task name + error fingerprint).
+    
+    ``pending`` counts occurrences not yet reported to the admin, starting at
+    ``pending_since``. Claiming an entry resets ``pending`` and stamps
+    ``last_sent_at``, which is what the throttle window is measured from;
+    releasing the claim undoes both when the email could not be sent.
+    """
+    
+    COLUMNS = """id, task_name, fingerprint, error_message, occurrences, pending,
+                 first_seen, last_seen, pending_since, last_sent_at"""
+    
+    def __init__(self, id=None, task_name=None, fingerprint=None, error_message=None,
+                 occurrences=0, pending=0, first_seen=None, last_seen=None,
+                 pending_since=None, last_sent_at=None):
+        self.id = id
+        self.task_name = task_name
+        self.fingerprint = fingerprint
+        self.error_message = error_message
+        self.occurrences = occurrences
+        self.pending = pending
+        self.first_seen = first_seen
+        self.last_seen = last_seen
+        self.pending_since = pending_since
+        self.last_sent_at = last_sent_at
+    
+    @staticmethod
+    def _from_row(row) -> 'AdminAlertLog':
+        return AdminAlertLog(id=row[0], task_name=row[1], fingerprint=row[2],
+                             error_message=row[3], occurrences=row[4], pending=row[5],
+                             first_seen=row[6], last_seen=row[7], pending_since=row[8],
+                             last_sent_at=row[9])
+    
+    @staticmethod
+    def record(task_name: str, fingerprint: str, error_message: str,
+               now: datetime) -> 'AdminAlertLog':
+        """Count one occurrence of a failure, creating its entry if needed."""
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                f"""INSERT INTO admin_alert_log
+                       (task_name, fingerprint, error_message, occurrences, pending,
+                        first_seen, last_seen, pending_since)
+                   VALUES (%s, %s, %s, 1, 1, %s, %s, %s)
+                   ON CONFLICT (task_name, fingerprint) DO UPDATE SET
+                       error_message = EXCLUDED.error_message,
+                       occurrences = admin_alert_log.occurrences + 1,
+                       pending = admin_alert_log.pending + 1,
+                       last_seen = EXCLUDED.last_seen,
+                       pending_since = CASE WHEN admin_alert_log.pending = 0
+                                            THEN EXCLUDED.last_seen
+                                            ELSE admin_alert_log.pending_since END
+                   RETURNING {AdminAlertLog.COLUMNS}""",
+                (task_name, fingerprint, error_message, now, now, now)
+            )
+            row = cur.fetchone()
+            conn.commit()
+            return AdminAlertLog._from_row(row)
+        finally:
+            cur.close()
+            conn.close()
+    
+    @staticmethod
+    def _claim(where: str, params: tuple, now: datetime) -> List['AdminAlertLog']:
+        """Reset pending counts for matching entries and return their prior state."""
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                f"""UPDATE admin_alert_log a SET pending = 0, last_sent_at = %s
+                   FROM (SELECT id, pending, pending_since, last_sent_at FROM admin_alert_log
+                         WHERE pending > 0 AND {where}
+                         FOR UPDATE SKIP LOCKED) old
+                   WHERE a.id = old.id
+                   RETURNING a.id, a.task_name, a.fingerprint, a.error_message, a.occurrences,
+                             old.pending, a.first_seen, a.last_seen, old.pending_since,
+                             old.last_sent_at""",
+                (now,) + params
+            )
+            rows = cur.fetchall()
+            conn.commit()
+            return [AdminAlertLog._from_row(r) for r in rows]
+        finally:
+            cur.close()
+            conn.close()
+    
+    @staticmethod
+    def claim(entry_id: int, now: datetime, window: timedelta) -> Optional['AdminAlertLog']:
+        """Claim one entry for sending if its throttle window has elapsed."""
+        claimed = AdminAlertLog._claim(
+            "id = %s AND (last_sent_at IS NULL OR last_sent_at <= %s)",
+            (entry_id, now - window), now
+        )
+        return claimed[0] if claimed else None
+    
+    @staticmethod
+    def claim_due(now: datetime, window: timedelta) -> List['AdminAlertLog']:
+        """Claim every entry with unreported occurrences whose window has elapsed."""
+        return AdminAlertLog._claim(
+            "(last_sent_at IS NULL OR last_sent_at <= %s)", (now - window,), now
+        )
+    
+    @staticmethod
+    def release(claimed: List['AdminAlertLog'], claimed_at: datetime):
+        """Undo claims whose email failed, adding their occurrences back to ``pending``.
+        
+        ``last_sent_at`` is restored unless another claim has stamped it since.
+        """
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """UPDATE admin_alert_log a SET
+                       pending = a.pending + old.pending,
+                       pending_since = old.pending_since,
+                       last_sent_at = CASE WHEN a.last_sent_at = %s THEN old.last_sent_at
+                                           ELSE a.last_sent_at END
+                   FROM unnest(%s::integer[], %s::integer[], %s::timestamptz[],
+                               %s::timestamptz[]) AS old(id, pending, pending_since, last_sent_at)
+                   WHERE a.id = old.id""",
+                (claimed_at, [e.id for e in claimed], [e.pending for e in claimed],
+                 [e.pending_since for e in claimed], [e.last_sent_at for e in claimed])
+            )
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
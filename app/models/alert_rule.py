@@ -1,60 +1,311 @@
 """Alert rule model."""
-from typing import List, Optional
-from app.services.db import get_db_connection
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.services.db import get_db_connection, get_read_connection, stick_to_primary
+
+# Rule types
+PRICE = 'price'            # price above/below threshold_price
+PCT_CHANGE = 'pct_change'  # price moved threshold_price percent within window_size minutes
+SMA_CROSS = 'sma_cross'    # price crossed its window_size-period simple moving average
+RULE_TYPES = (PRICE, PCT_CHANGE, SMA_CROSS)
+MAX_WINDOW = 1440          # longest window_size, in minutes or SMA periods
+
+
+# Default for update() arguments where None is a meaningful value
+_UNCHANGED = object()
+
+
+def _number_changed(old, new) -> bool:
+    """Compare NUMERIC column values (Decimal from the database) with form floats."""
+    if old is None or new is None:
+        return old is not new
+    return float(old) != float(new)
+
+
+def _bump_rules_version(cur, user_id: int):
+    """Mark the user's rules as changed, in the caller's transaction."""
+    cur.execute("UPDATE users SET rules_version = rules_version + 1 WHERE id = %s", (user_id,))
+    # Replicas may not have the change yet; read it back from the primary
+    stick_to_primary()
+
+
+def _selection(user_id: int, ids: Iterable[int] = None, currency_symbol: str = None,
+               rule_type: str = None, is_active: bool = None) -> Tuple[str, list]:
+    """WHERE clause and parameters selecting a user's rules by id list and/or filters."""
+    clauses = ["user_id = %s"]
+    params = [user_id]
+    if ids is not None:
+        clauses.append("id = ANY(%s)")
+        params.append(list(ids))
+    if currency_symbol is not None:
+        clauses.append("currency_symbol = %s")
+        params.append(currency_symbol.upper())
+    if rule_type is not None:
+        clauses.append("rule_type = %s")
+        params.append(rule_type)
+    if is_active is not None:
+        clauses.append("is_active = %s")
+        params.append(is_active)
+    return " AND ".join(clauses), params
 
 
 class AlertRule:
     """Alert rule model for price monitoring."""
     
+    COLUMNS = """id, user_id, currency_symbol, condition, threshold_price, is_active, created_at,
+                 rule_type, window_size, rearm_pct, cooldown_minutes, fired_at"""
+    
     def __init__(self, id=None, user_id=None, currency_symbol=None, 
-                 condition=None, threshold_price=None, is_active=True, created_at=None):
+                 condition=None, threshold_price=None, is_active=True, created_at=None,
+                 rule_type=PRICE, window_size=None, rearm_pct=None, cooldown_minutes=None,
+                 fired_at=None):
         self.id = id
         self.user_id = user_id
         self.currency_symbol = currency_symbol
-        self.condition = condition  # '>' or '<'
-        self.threshold_price = threshold_price
+        self.condition = condition  # '>' or '<' ('~' for either direction on pct_change)
+        self.threshold_price = threshold_price  # USD price, or percent for pct_change
         self.is_active = is_active
         self.created_at = created_at
+        self.rule_type = rule_type
+        self.window_size = window_size  # minutes for pct_change, periods for sma_cross
+        self.rearm_pct = rearm_pct  # hysteresis band in percent; None means one-shot
+        self.cooldown_minutes = cooldown_minutes
+        self.fired_at = fired_at  # set while a re-arming rule waits to re-arm
     
     @staticmethod
-    def create(user_id: int, currency_symbol: str, condition: str, threshold_price: float) -> 'AlertRule':
+    def _from_row(row) -> 'AlertRule':
+        return AlertRule(id=row[0], user_id=row[1], currency_symbol=row[2], condition=row[3],
+                         threshold_price=float(row[4]), is_active=row[5], created_at=row[6],
+                         rule_type=row[7], window_size=row[8],
+                         rearm_pct=float(row[9]) if row[9] is not None else None,
+                         cooldown_minutes=row[10], fired_at=row[11])
+    
+    @property
+    def description(self) -> str:
+        """Human-readable trigger condition."""
+        direction = 'above' if self.condition == '>' else 'below'
+        if self.rule_type == PCT_CHANGE:
+            verb, sign = {'>': ('Rises', '+'), '<': ('Falls', '-')}.get(self.condition,
+                                                                     ('Moves', '±'))
+            return f"{verb} {sign}{self.threshold_price:g}% within {self.window_size} min"
+        if self.rule_type == SMA_CROSS:
+            return f"Crosses {direction} {self.window_size}-period SMA"
+        return f"Price {direction} ${self.threshold_price:,.2f}"
+    
+    @property
+    def rearms(self) -> bool:
+        """Whether the rule re-arms after firing instead of deactivating."""
+        return self.rearm_pct is not None
+    
+    def cooled_down(self, now: datetime) -> bool:
+        """Whether a fired rule's cooldown has elapsed."""
+        if self.fired_at is None:
+            return True
+        return now >= self.fired_at + timedelta(minutes=self.cooldown_minutes or 0)
+    
+    @staticmethod
+    def create(user_id: int, currency_symbol: str, condition: str, threshold_price: float,
+               rule_type: str = PRICE, window_size: int = None, rearm_pct: float = None,
+               cooldown_minutes: int = None) -> 'AlertRule':
         """Create a new alert rule."""
         conn = get_db_connection()
         cur = conn.cursor()
         try:
             cur.execute(
-                """INSERT INTO alert_rules (user_id, currency_symbol, condition, threshold_price) 
-                   VALUES (%s, %s, %s, %s) RETURNING id, is_active, created_at""",
-                (user_id, currency_symbol.upper(), condition, threshold_price)
+                """INSERT INTO alert_rules (user_id, currency_symbol, condition, threshold_price,
+                                            rule_type, window_size, rearm_pct, cooldown_minutes) 
+                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s) RETURNING id, is_active, created_at""",
+                (user_id, currency_symbol.upper(), condition, threshold_price,
+                 rule_type, window_size, rearm_pct, cooldown_minutes)
             )
             result = cur.fetchone()
+            _bump_rules_version(cur, user_id)
             conn.commit()
             return AlertRule(
                 id=result[0], user_id=user_id, currency_symbol=currency_symbol.upper(),
                 condition=condition, threshold_price=threshold_price,
-                is_active=result[1], created_at=result[2]
+                is_active=result[1], created_at=result[2],
+                rule_type=rule_type, window_size=window_size,
+                rearm_pct=rearm_pct, cooldown_minutes=cooldown_minutes
             )
         finally:
             cur.close()
             conn.close()
     
+    @staticmethod
+    def bulk_create(user_id: int, rules: List[Dict]) -> List[int]:
+        """Insert many rules for a user in one transaction with multi-row INSERTs.
+        
+        Args:
+            rules: Dicts of create() keyword arguments, optionally with
+                ``is_active``; values are assumed validated.
+        
+        Returns:
+            Ids of the new rules, in input order.
+        """
+        if not rules:
+            return []
+        from psycopg2.extras import execute_values
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            rows = execute_values(
+                cur,
+                """INSERT INTO alert_rules (user_id, currency_symbol, condition, threshold_price,
+                                            rule_type, window_size, rearm_pct, cooldown_minutes,
+                                            is_active) 
+                   VALUES %s RETURNING id""",
+                [(user_id, r['currency_symbol'].upper(), r['condition'], r['threshold_price'],
+                  r.get('rule_type', PRICE), r.get('window_size'), r.get('rearm_pct'),
+                  r.get('cooldown_minutes'), r.get('is_active', True)) for r in rules],
+                page_size=1000,
+                fetch=True
+            )
+            _bump_rules_version(cur, user_id)
+            conn.commit()
+            return [row[0] for row in rows]
+        finally:
+            cur.close()
+            conn.close()
+    
+    @staticmethod
+    def bulk_set_active(user_id: int, is_active: Optional[bool], ids: Iterable[int] = None,
+                        **filters) -> List[Tuple[int, bool]]:
+        """Enable, disable or flip (``is_active`` None) a user's selected rules.
+        
+        One set-based UPDATE that also bumps the user's rules_version, sent
+        as a single statement whatever the selection size. Rules are
+        selected by ``ids`` and/or ``currency_symbol``, ``rule_type`` and
+        ``is_active`` filters, always within the user's own rules.
+        
+        Returns:
+            (id, is_active) of every rule selected.
+        """
+        where, params = _selection(user_id, ids, **filters)
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                f"""WITH changed AS (
+                        UPDATE alert_rules SET is_active = COALESCE(%s, NOT is_active)
+                        WHERE {where} RETURNING id, is_active
+                    ), bumped AS (
+                        UPDATE users SET rules_version = rules_version + 1
+                        WHERE id = %s AND EXISTS (SELECT 1 FROM changed)
+                    )
+                    SELECT id, is_active FROM changed""",
+                [is_active] + params + [user_id]
+            )
+            rows = cur.fetchall()
+            conn.commit()
+            if rows:
+                stick_to_primary()
+            return rows
+        finally:
+            cur.close()
+            conn.close()
+    
+    @staticmethod
+    def bulk_delete(user_id: int, ids: Iterable[int] = None, **filters) -> List[int]:
+        """Delete a user's selected rules in one statement, as bulk_set_active selects them.
+        
+        Returns:
+            Ids of the deleted rules.
+        """
+        where, params = _selection(user_id, ids, **filters)
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                f"""WITH deleted AS (
+                        DELETE FROM alert_rules WHERE {where} RETURNING id
+                    ), bumped AS (
+                        UPDATE users SET rules_version = rules_version + 1
+                        WHERE id = %s AND EXISTS (SELECT 1 FROM deleted)
+                    )
+                    SELECT id FROM deleted""",
+                params + [user_id]
+            )
+            rows = cur.fetchall()
+            conn.commit()
+            if rows:
+                stick_to_primary()
+            return [row[0] for row in rows]
+        finally:
+            cur.close()
+            conn.close()
+    
     @staticmethod
     def find_by_user(user_id: int) -> List['AlertRule']:
         """Find all alert rules for a user."""
-        conn = get_db_connection()
+        conn = get_read_connection()
         cur = conn.cursor()
         try:
             cur.execute(
-                """SELECT id, user_id, currency_symbol, condition, threshold_price, is_active, created_at 
+                f"""SELECT {AlertRule.COLUMNS} 
                    FROM alert_rules WHERE user_id = %s ORDER BY created_at DESC""",
                 (user_id,)
             )
             rows = cur.fetchall()
-            return [
-                AlertRule(id=r[0], user_id=r[1], currency_symbol=r[2], condition=r[3],
-                         threshold_price=float(r[4]), is_active=r[5], created_at=r[6])
-                for r in rows
-            ]
+            return [AlertRule._from_row(r) for r in rows]
+        finally:
+            cur.close()
+            conn.close()
+    
+    @staticmethod
+    def find_page(user_id: int, limit: int,
+                  after: Tuple[datetime, int] = None) -> Tuple[List['AlertRule'], Optional[Tuple[datetime, int]]]:
+        """One page of a user's rules, newest first, by keyset pagination.
+        
+        Pages are ordered by (created_at, id) descending and continue strictly
+        after the ``after`` key, so each page is a range scan on
+        idx_alert_rules_user_created however deep it is.
+        
+        Returns:
+            Tuple of (rules, key of the last rule to pass as ``after`` for the
+            next page, or None on the last page).
+        """
+        conn = get_read_connection()
+        cur = conn.cursor()
+        try:
+            if after is None:
+                cur.execute(
+                    f"""SELECT {AlertRule.COLUMNS} 
+                       FROM alert_rules WHERE user_id = %s
+                       ORDER BY created_at DESC, id DESC LIMIT %s""",
+                    (user_id, limit + 1)
+                )
+            else:
+                cur.execute(
+                    f"""SELECT {AlertRule.COLUMNS} 
+                       FROM alert_rules WHERE user_id = %s AND (created_at, id) < (%s, %s)
+                       ORDER BY created_at DESC, id DESC LIMIT %s""",
+                    (user_id, after[0], after[1], limit + 1)
+                )
+            rules = [AlertRule._from_row(r) for r in cur.fetchall()]
+            if len(rules) <= limit:
+                return rules, None
+            rules = rules[:limit]
+            return rules, (rules[-1].created_at, rules[-1].id)
+        finally:
+            cur.close()
+            conn.close()
+    
+    @staticmethod
+    def count_by_user(user_id: int) -> Dict[str, int]:
+        """Counts of a user's rules (total, active, re-arming) in one aggregate query."""
+        conn = get_read_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """SELECT COUNT(*),
+                          COUNT(*) FILTER (WHERE is_active),
+                          COUNT(*) FILTER (WHERE is_active AND fired_at IS NOT NULL)
+                   FROM alert_rules WHERE user_id = %s""",
+                (user_id,)
+            )
+            total, active, rearming = cur.fetchone()
+            return {'total': total, 'active': active, 'rearming': rearming}
         finally:
             cur.close()
             conn.close()
@@ -66,15 +317,13 @@ class AlertRule:
         cur = conn.cursor()
         try:
             cur.execute(
-                """SELECT id, user_id, currency_symbol, condition, threshold_price, is_active, created_at 
+                f"""SELECT {AlertRule.COLUMNS} 
                    FROM alert_rules WHERE id = %s""",
                 (rule_id,)
             )
             row = cur.fetchone()
             if row:
-                return AlertRule(id=row[0], user_id=row[1], currency_symbol=row[2], 
-                               condition=row[3], threshold_price=float(row[4]),
-                               is_active=row[5], created_at=row[6])
+                return AlertRule._from_row(row)
             return None
         finally:
             cur.close()
@@ -82,32 +331,40 @@ class AlertRule:
     
     @staticmethod
     def find_all_active() -> List['AlertRule']:
-        """Find all active alert rules."""
+        """Find all active alert rules.
+        
+        Read from the primary: the alert job updates these rules based on
+        what it reads, so a lagging replica could re-fire or re-arm them.
+        """
         conn = get_db_connection()
         cur = conn.cursor()
         try:
             cur.execute(
-                """SELECT id, user_id, currency_symbol, condition, threshold_price, is_active, created_at 
+                f"""SELECT {AlertRule.COLUMNS} 
                    FROM alert_rules WHERE is_active = TRUE"""
             )
             rows = cur.fetchall()
-            return [
-                AlertRule(id=r[0], user_id=r[1], currency_symbol=r[2], condition=r[3],
-                         threshold_price=float(r[4]), is_active=r[5], created_at=r[6])
-                for r in rows
-            ]
+            return [AlertRule._from_row(r) for r in rows]
         finally:
             cur.close()
             conn.close()
     
     def update(self, currency_symbol: str = None, condition: str = None, 
-               threshold_price: float = None, is_active: bool = None) -> bool:
-        """Update alert rule."""
+               threshold_price: float = None, is_active: bool = None,
+               rule_type: str = None, window_size: int = None,
+               rearm_pct=_UNCHANGED, cooldown_minutes=_UNCHANGED) -> bool:
+        """Update alert rule.
+        
+        ``rearm_pct``/``cooldown_minutes`` are only written when passed; a
+        ``rearm_pct`` of None makes the rule one-shot. A rule waiting to
+        re-arm is armed again if its trigger or re-arm settings change.
+        """
         conn = get_db_connection()
         cur = conn.cursor()
         try:
             updates = []
             values = []
+            rearm = False
             if currency_symbol is not None:
                 updates.append("currency_symbol = %s")
                 values.append(currency_symbol.upper())
@@ -115,15 +372,40 @@ class AlertRule:
             if condition is not None:
                 updates.append("condition = %s")
                 values.append(condition)
+                rearm |= condition != self.condition
                 self.condition = condition
             if threshold_price is not None:
                 updates.append("threshold_price = %s")
                 values.append(threshold_price)
+                rearm |= _number_changed(self.threshold_price, threshold_price)
                 self.threshold_price = threshold_price
             if is_active is not None:
                 updates.append("is_active = %s")
                 values.append(is_active)
                 self.is_active = is_active
+            if rule_type is not None:
+                updates.append("rule_type = %s")
+                values.append(rule_type)
+                rearm |= rule_type != self.rule_type
+                self.rule_type = rule_type
+            if window_size is not None:
+                updates.append("window_size = %s")
+                values.append(window_size)
+                rearm |= window_size != self.window_size
+                self.window_size = window_size
+            if rearm_pct is not _UNCHANGED:
+                updates.append("rearm_pct = %s")
+                values.append(rearm_pct)
+                rearm |= _number_changed(self.rearm_pct, rearm_pct)
+                self.rearm_pct = rearm_pct
+            if cooldown_minutes is not _UNCHANGED:
+                updates.append("cooldown_minutes = %s")
+                values.append(cooldown_minutes)
+                rearm |= cooldown_minutes != self.cooldown_minutes
+                self.cooldown_minutes = cooldown_minutes
+            if rearm and self.fired_at is not None:
+                updates.append("fired_at = NULL")
+                self.fired_at = None
             
             if updates:
                 values.append(self.id)
@@ -131,18 +413,55 @@ class AlertRule:
                     f"UPDATE alert_rules SET {', '.join(updates)} WHERE id = %s",
                     values
                 )
+                _bump_rules_version(cur, self.user_id)
                 conn.commit()
             return True
         finally:
             cur.close()
             conn.close()
     
+    @staticmethod
+    def record_run(deactivated: Iterable[int] = (), fired: Iterable[int] = (),
+                   rearmed: Iterable[int] = (), fired_at: datetime = None):
+        """Apply one alert run's state changes in a single transaction.
+        
+        Args:
+            deactivated: One-shot rules that triggered.
+            fired: Re-arming rules that triggered and now wait to re-arm.
+            rearmed: Re-arming rules armed again.
+            fired_at: Trigger time recorded for ``fired``.
+        """
+        deactivated, fired, rearmed = list(deactivated), list(fired), list(rearmed)
+        if not (deactivated or fired or rearmed):
+            return
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            if deactivated:
+                cur.execute("UPDATE alert_rules SET is_active = FALSE WHERE id = ANY(%s)",
+                            (deactivated,))
+            if fired:
+                cur.execute("UPDATE alert_rules SET fired_at = %s WHERE id = ANY(%s)",
+                            (fired_at or datetime.now(timezone.utc), fired))
+            if rearmed:
+                cur.execute("UPDATE alert_rules SET fired_at = NULL WHERE id = ANY(%s)",
+                            (rearmed,))
+            cur.execute("""UPDATE users SET rules_version = rules_version + 1
+                           WHERE id IN (SELECT user_id FROM alert_rules WHERE id = ANY(%s))""",
+                        (deactivated + fired + rearmed,))
+            conn.commit()
+            stick_to_primary()
+        finally:
+            cur.close()
+            conn.close()
+    
     def delete(self) -> bool:
         """Delete alert rule."""
         conn = get_db_connection()
         cur = conn.cursor()
         try:
             cur.execute("DELETE FROM alert_rules WHERE id = %s", (self.id,))
+            _bump_rules_version(cur, self.user_id)
             conn.commit()
             return True
         finally:
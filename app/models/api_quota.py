@@ -0,0 +1,90 @@
+"""API quota model."""
+from typing import Optional, Tuple
+from app.services.db import get_db_connection
+
+
+class ApiQuota:
+    """Calls spent against an external API's per-window budget.
+    
+    One row per API; ``window_start`` is the epoch second the current
+    window began, so a new window simply resets ``used``.
+    """
+    
+    @staticmethod
+    def consume(name: str, window_start: int, allowed: int, cost: int = 1) -> Optional[int]:
+        """Spend ``cost`` calls if the window stays within ``allowed``.
+        
+        Returns:
+            Calls used in the window after spending, or None if denied.
+        """
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """INSERT INTO api_quota (name, window_start, used) VALUES (%s, %s, 0)
+                   ON CONFLICT (name) DO UPDATE SET window_start = EXCLUDED.window_start, used = 0
+                   WHERE api_quota.window_start < EXCLUDED.window_start""",
+                (name, window_start)
+            )
+            cur.execute(
+                """UPDATE api_quota SET used = used + %s
+                   WHERE name = %s AND window_start = %s AND used + %s <= %s
+                   RETURNING used""",
+                (cost, name, window_start, cost, allowed)
+            )
+            row = cur.fetchone()
+            conn.commit()
+            return row[0] if row else None
+        finally:
+            cur.close()
+            conn.close()
+    
+    @staticmethod
+    def refund(name: str, window_start: int, cost: int = 1):
+        """Give back ``cost`` calls that were never made, if the window is still current."""
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """UPDATE api_quota SET used = GREATEST(used - %s, 0)
+                   WHERE name = %s AND window_start = %s""",
+                (cost, name, window_start)
+            )
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+    
+    @staticmethod
+    def exhaust(name: str, window_start: int, limit: int):
+        """Mark the window as fully spent (e.g. after the API answered 429)."""
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """INSERT INTO api_quota (name, window_start, used) VALUES (%s, %s, %s)
+                   ON CONFLICT (name) DO UPDATE SET
+                       used = CASE WHEN api_quota.window_start = EXCLUDED.window_start
+                                   THEN GREATEST(api_quota.used, EXCLUDED.used)
+                                   ELSE EXCLUDED.used END,
+                       window_start = EXCLUDED.window_start
+                   WHERE api_quota.window_start <= EXCLUDED.window_start""",
+                (name, window_start, limit)
+            )
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+    
+    @staticmethod
+    def usage(name: str) -> Tuple[int, int]:
+        """Get (window_start, used) for an API; (0, 0) if never used."""
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT window_start, used FROM api_quota WHERE name = %s", (name,))
+            row = cur.fetchone()
+            return (row[0], row[1]) if row else (0, 0)
+        finally:
+            cur.close()
+            conn.close()
@@ -0,0 +1,164 @@
+"""Backfill checkpoint model."""
+import io
+from datetime import datetime, timezone
+from typing import Iterable, Optional, Tuple
+from app.services.db import get_db_connection
+
+
+class BackfillCheckpoint:
+    """Progress of one coin's historical backfill.
+    
+    ``range_start``/``range_end`` (UNIX seconds) are set when the backfill
+    is planned and only ever widen; ``completed_until`` only advances in the
+    same transaction that writes the rows before it, so a resumed run never
+    duplicates rows.
+    """
+    
+    COLUMNS = "coin_id, currency_symbol, range_start, range_end, completed_until, updated_at"
+    
+    def __init__(self, coin_id=None, currency_symbol=None, range_start=None, range_end=None,
+                 completed_until=None, updated_at=None):
+        self.coin_id = coin_id
+        self.currency_symbol = currency_symbol
+        self.range_start = range_start
+        self.range_end = range_end
+        self.completed_until = completed_until
+        self.updated_at = updated_at
+    
+    @property
+    def is_complete(self) -> bool:
+        return self.completed_until >= self.range_end
+    
+    @staticmethod
+    def _from_row(row) -> 'BackfillCheckpoint':
+        return BackfillCheckpoint(coin_id=row[0], currency_symbol=row[1], range_start=row[2],
+                                  range_end=row[3], completed_until=row[4], updated_at=row[5])
+    
+    @staticmethod
+    def get(coin_id: str) -> Optional['BackfillCheckpoint']:
+        """Get the checkpoint for a coin, if a backfill was ever planned."""
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                f"SELECT {BackfillCheckpoint.COLUMNS} FROM backfill_checkpoint WHERE coin_id = %s",
+                (coin_id,)
+            )
+            row = cur.fetchone()
+            return BackfillCheckpoint._from_row(row) if row else None
+        finally:
+            cur.close()
+            conn.close()
+    
+    @staticmethod
+    def plan(coin_id: str, currency_symbol: str, range_start: int,
+             range_end: int) -> 'BackfillCheckpoint':
+        """Record a new backfill range, or widen the one already planned.
+        
+        A later ``range_end`` extends the range past ``completed_until``. An
+        earlier ``range_start`` moves ``completed_until`` back to it, since
+        the rows before the old start are missing; windows committed after
+        it are fetched again and :meth:`commit_window` only adds the rows
+        not already stored.
+        """
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """INSERT INTO backfill_checkpoint
+                       (coin_id, currency_symbol, range_start, range_end, completed_until)
+                   VALUES (%s, %s, %s, %s, %s)
+                   ON CONFLICT (coin_id) DO UPDATE SET
+                       range_start = LEAST(backfill_checkpoint.range_start, EXCLUDED.range_start),
+                       range_end = GREATEST(backfill_checkpoint.range_end, EXCLUDED.range_end),
+                       completed_until = CASE
+                           WHEN EXCLUDED.range_start < backfill_checkpoint.range_start
+                           THEN EXCLUDED.range_start
+                           ELSE backfill_checkpoint.completed_until END,
+                       updated_at = CURRENT_TIMESTAMP
+                   WHERE EXCLUDED.range_start < backfill_checkpoint.range_start
+                      OR EXCLUDED.range_end > backfill_checkpoint.range_end""",
+                (coin_id, currency_symbol.upper(), range_start, range_end, range_start)
+            )
+            cur.execute(
+                f"SELECT {BackfillCheckpoint.COLUMNS} FROM backfill_checkpoint WHERE coin_id = %s",
+                (coin_id,)
+            )
+            row = cur.fetchone()
+            conn.commit()
+            return BackfillCheckpoint._from_row(row)
+        finally:
+            cur.close()
+            conn.close()
+    
+    @staticmethod
+    def commit_window(coin_id: str, currency_symbol: str, rows: Iterable[Tuple[int, float]],
+                      window_start: int, window_end: int) -> int:
+        """Stream one window of (ms timestamp, price) rows into price_history via COPY.
+        
+        The checkpoint advances to ``window_end`` in the same transaction, and
+        only if it still stands at ``window_start``; a window another run has
+        already committed is skipped. In a window that already holds rows
+        (fetched again after the range was widened earlier) only timestamps
+        not yet stored are inserted; stored rows are never deleted, so the
+        append-only tick store exported from price_history stays in step.
+        
+        Returns:
+            Number of rows written (0 if the window was already committed).
+        """
+        symbol = currency_symbol.upper()
+        buffer = io.StringIO()
+        count = 0
+        for ts, price in rows:
+            stamp = datetime.fromtimestamp(ts / 1000, tz=timezone.utc).isoformat()
+            buffer.write(f"{symbol}\t{price!r}\t{stamp}\n")
+            count += 1
+        buffer.seek(0)
+        
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """UPDATE backfill_checkpoint
+                   SET completed_until = %s, updated_at = CURRENT_TIMESTAMP
+                   WHERE coin_id = %s AND completed_until = %s""",
+                (window_end, coin_id, window_start)
+            )
+            if cur.rowcount == 0:
+                conn.rollback()
+                return 0
+            cur.execute(
+                """SELECT EXISTS (SELECT 1 FROM price_history
+                                  WHERE currency_symbol = %s AND timestamp >= to_timestamp(%s)
+                                    AND timestamp < to_timestamp(%s))""",
+                (symbol, window_start, window_end)
+            )
+            if not cur.fetchone()[0]:
+                cur.copy_expert(
+                    "COPY price_history (currency_symbol, price_usd, timestamp) FROM STDIN",
+                    buffer
+                )
+                conn.commit()
+                return count
+            
+            cur.execute(
+                """CREATE TEMP TABLE backfill_rows
+                       (currency_symbol VARCHAR(10), price_usd NUMERIC(20, 8),
+                        timestamp TIMESTAMP WITH TIME ZONE)
+                   ON COMMIT DROP"""
+            )
+            cur.copy_expert("COPY backfill_rows FROM STDIN", buffer)
+            cur.execute(
+                """INSERT INTO price_history (currency_symbol, price_usd, timestamp)
+                   SELECT b.currency_symbol, b.price_usd, b.timestamp FROM backfill_rows b
+                   WHERE NOT EXISTS (SELECT 1 FROM price_history p
+                                     WHERE p.currency_symbol = b.currency_symbol
+                                       AND p.timestamp = b.timestamp)
+                   ORDER BY b.timestamp"""
+            )
+            count = cur.rowcount
+            conn.commit()
+            return count
+        finally:
+            cur.close()
+            conn.close()
@@ -1,7 +1,10 @@
 """Price history model."""
-from typing import List, Optional, Dict
+from typing import Iterator, List, Optional, Dict, Tuple
 from datetime import datetime
-from app.services.db import get_db_connection
+from app.services.db import get_db_connection, get_read_connection
+
+# Notified in the same transaction as live price writes, for the price stream
+PRICES_CHANNEL = 'price_updates'
 
 
 class PriceHistory:
@@ -28,6 +31,7 @@ class PriceHistory:
                 (currency_symbol.upper(), price_usd, timestamp)
             )
             result = cur.fetchone()
+            cur.execute(f"NOTIFY {PRICES_CHANNEL}")
             conn.commit()
             return PriceHistory(id=result[0], currency_symbol=currency_symbol.upper(),
                                price_usd=price_usd, timestamp=timestamp)
@@ -38,7 +42,7 @@ class PriceHistory:
     @staticmethod
     def get_latest_prices() -> Dict[str, float]:
         """Get latest price for each currency."""
-        conn = get_db_connection()
+        conn = get_read_connection()
         cur = conn.cursor()
         try:
             cur.execute(
@@ -52,10 +56,95 @@ class PriceHistory:
             cur.close()
             conn.close()
     
+    @staticmethod
+    def get_latest_prices_with_timestamps() -> Dict[str, Tuple[float, datetime]]:
+        """Get latest price and its timestamp for each currency."""
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """SELECT DISTINCT ON (currency_symbol) currency_symbol, price_usd, timestamp 
+                   FROM price_history 
+                   ORDER BY currency_symbol, timestamp DESC"""
+            )
+            rows = cur.fetchall()
+            return {row[0]: (float(row[1]), row[2]) for row in rows}
+        finally:
+            cur.close()
+            conn.close()
+    
+    @staticmethod
+    def get_latest_snapshot() -> Tuple[int, Dict[str, Tuple[float, datetime]]]:
+        """Latest price and timestamp per currency with the version they were read at.
+        
+        One statement on a read connection, so the version (as from
+        :meth:`get_version`) always matches the prices, even on a replica
+        that is still catching up.
+        
+        Returns:
+            Tuple of (newest price_history id, {symbol: (price, timestamp)}).
+        """
+        conn = get_read_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """WITH latest AS (
+                       SELECT DISTINCT ON (currency_symbol) currency_symbol, price_usd, timestamp
+                       FROM price_history
+                       ORDER BY currency_symbol, timestamp DESC)
+                   SELECT (SELECT COALESCE(MAX(id), 0) FROM price_history),
+                          latest.currency_symbol, latest.price_usd, latest.timestamp
+                   FROM (SELECT 1) AS one LEFT JOIN latest ON TRUE"""
+            )
+            rows = cur.fetchall()
+            return rows[0][0], {row[1]: (float(row[2]), row[3]) for row in rows if row[1]}
+        finally:
+            cur.close()
+            conn.close()
+    
+    @staticmethod
+    def get_latest_timestamps(currency_symbols: List[str]) -> Dict[str, datetime]:
+        """Newest timestamp per currency, one index probe each; missing ones are left out."""
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """SELECT symbol, (SELECT MAX(timestamp) FROM price_history
+                                   WHERE currency_symbol = symbol)
+                   FROM unnest(%s::varchar[]) AS symbol""",
+                (list(currency_symbols),)
+            )
+            return {symbol: ts for symbol, ts in cur.fetchall() if ts is not None}
+        finally:
+            cur.close()
+            conn.close()
+    
+    @staticmethod
+    def get_version(user_id: int = None) -> Tuple[int, Optional[int]]:
+        """Cheap change markers for pages built from prices (and a user's rules).
+        
+        Returns:
+            Tuple of (newest price_history id, the user's rules_version or
+            None). The id is a primary-key lookup and changes whenever a
+            price is written.
+        """
+        conn = get_read_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """SELECT (SELECT COALESCE(MAX(id), 0) FROM price_history),
+                          (SELECT rules_version FROM users WHERE id = %s)""",
+                (user_id,)
+            )
+            return cur.fetchone()
+        finally:
+            cur.close()
+            conn.close()
+    
     @staticmethod
     def get_latest_price(currency_symbol: str) -> Optional[float]:
         """Get latest price for a specific currency."""
-        conn = get_db_connection()
+        conn = get_read_connection()
         cur = conn.cursor()
         try:
             cur.execute(
@@ -70,6 +159,123 @@ class PriceHistory:
             cur.close()
             conn.close()
     
+    @staticmethod
+    def get_earliest_timestamp(currency_symbol: str) -> Optional[datetime]:
+        """Get the timestamp of the oldest stored price for a currency."""
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """SELECT MIN(timestamp) FROM price_history 
+                   WHERE currency_symbol = %s""",
+                (currency_symbol.upper(),)
+            )
+            row = cur.fetchone()
+            return row[0] if row else None
+        finally:
+            cur.close()
+            conn.close()
+    
+    @staticmethod
+    def iter_ticks_after(currency_symbol: str, after_id: int,
+                         batch_size: int = 50000) -> Iterator[List[Tuple[int, int, float]]]:
+        """Stream (id, epoch microseconds, price) rows with id > ``after_id`` in batches."""
+        conn = get_db_connection()
+        cur = conn.cursor(name='price_history_ticks')
+        cur.itersize = batch_size
+        try:
+            cur.execute(
+                """SELECT id, (EXTRACT(EPOCH FROM timestamp) * 1000000)::bigint, price_usd::float8
+                   FROM price_history 
+                   WHERE currency_symbol = %s AND id > %s 
+                   ORDER BY id""",
+                (currency_symbol.upper(), after_id)
+            )
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cur.close()
+            conn.close()
+    
+    @staticmethod
+    def get_range(currency_symbol: str, start: datetime, end: datetime):
+        """Get prices with ``start <= timestamp <= end`` as NumPy arrays.
+        
+        Reads from the local tick store when one is configured (zero-copy
+        views of the mapped file) and only queries the database for rows
+        not yet exported to it (``id`` above the store's ``last_id``), which
+        includes backfilled rows older than the store's last tick.
+        
+        Returns:
+            Tuple of (epoch microseconds int64 array, USD price float64 array).
+        """
+        import numpy as np
+        from app.services.tick_store import from_micros, get_tick_store, to_micros
+        
+        start_us, end_us = to_micros(start), to_micros(end)
+        store = get_tick_store()
+        last = store.last_timestamp(currency_symbol) if store else None
+        last_id = store.meta(currency_symbol)['last_id'] if last is not None else 0
+        
+        conn = get_read_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """SELECT (EXTRACT(EPOCH FROM timestamp) * 1000000)::bigint, price_usd::float8
+                   FROM price_history 
+                   WHERE currency_symbol = %s AND timestamp >= %s AND timestamp <= %s 
+                     AND id > %s
+                   ORDER BY timestamp""",
+                (currency_symbol.upper(), from_micros(start_us), from_micros(end_us), last_id)
+            )
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+            conn.close()
+        tail_ts = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        tail_prices = np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows))
+        if last is None:
+            return tail_ts, tail_prices
+        timestamps, prices = store.range(currency_symbol, start_us, end_us)
+        if not rows:
+            return timestamps, prices
+        timestamps = np.concatenate([timestamps, tail_ts])
+        prices = np.concatenate([prices, tail_prices])
+        if tail_ts[0] < last:
+            # Unexported rows older than the store's newest tick (a backfill)
+            order = np.argsort(timestamps, kind='stable')
+            timestamps, prices = timestamps[order], prices[order]
+        return timestamps, prices
+    
+    @staticmethod
+    def get_recent(currency_symbol: str, limit: int):
+        """Get the newest ``limit`` prices, oldest first, as NumPy arrays.
+        
+        Returns:
+            Tuple of (epoch microseconds int64 array, USD price float64 array).
+        """
+        import numpy as np
+        
+        conn = get_read_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """SELECT (EXTRACT(EPOCH FROM timestamp) * 1000000)::bigint, price_usd::float8
+                   FROM price_history 
+                   WHERE currency_symbol = %s 
+                   ORDER BY timestamp DESC LIMIT %s""",
+                (currency_symbol.upper(), limit)
+            )
+            rows = cur.fetchall()[::-1]
+        finally:
+            cur.close()
+            conn.close()
+        return (np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows)),
+                np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows)))
+    
     @staticmethod
     def bulk_create(prices: Dict[str, float], timestamp: datetime = None) -> List['PriceHistory']:
         """Bulk create price records."""
@@ -91,9 +297,32 @@ class PriceHistory:
                     id=result[0], currency_symbol=symbol.upper(),
                     price_usd=price, timestamp=timestamp
                 ))
+            cur.execute(f"NOTIFY {PRICES_CHANNEL}")
             conn.commit()
             return created
         finally:
             cur.close()
             conn.close()
-
+    
+    @staticmethod
+    def bulk_insert(rows: List[Tuple[str, float, datetime]]) -> int:
+        """Insert (symbol, price, timestamp) rows in one statement and transaction."""
+        if not rows:
+            return 0
+        from psycopg2.extras import execute_values
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            execute_values(
+                cur,
+                """INSERT INTO price_history (currency_symbol, price_usd, timestamp) 
+                   VALUES %s""",
+                [(symbol.upper(), price, timestamp) for symbol, price, timestamp in rows],
+                page_size=1000
+            )
+            cur.execute(f"NOTIFY {PRICES_CHANNEL}")
+            conn.commit()
+            return len(rows)
+        finally:
+            cur.close()
+            conn.close()
@@ -1,4 +1,5 @@
 """User model."""
+from typing import Dict
 from werkzeug.security import generate_password_hash, check_password_hash
 from app.services.db import get_db_connection
 
@@ -66,6 +67,21 @@ class User:
             cur.close()
             conn.close()
 
+    @staticmethod
+    def find_emails(user_ids) -> Dict[int, str]:
+        """Map user IDs to email addresses in one query (missing users are left out)."""
+        user_ids = list(set(user_ids))
+        if not user_ids:
+            return {}
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT id, email FROM users WHERE id = ANY(%s)", (user_ids,))
+            return dict(cur.fetchall())
+        finally:
+            cur.close()
+            conn.close()
+
     def check_password(self, password: str) -> bool:
         """Verify password against hash."""
         return check_password_hash(self.password_hash, password)
@@ -0,0 +1,165 @@
+"""Throttled admin notifications for failing background tasks."""
+import hashlib
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from app.config import Config
+from app.models.admin_alert import AdminAlertLog
+
+
+_VOLATILE_PATTERNS = [
+    (re.compile(r'0x[0-9a-fA-F]+'), '0x?'),
+    (re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'), '<uuid>'),
+    (re.compile(r'\d+(\.\d+)?'), '#'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def fingerprint_error(error_message: str) -> str:
+    """Fingerprint an error so repeats with varying numbers/ids group together."""
+    normalized = error_message or ''
+    for pattern, replacement in _VOLATILE_PATTERNS:
+        normalized = pattern.sub(replacement, normalized)
+    return hashlib.sha1(normalized.strip().encode('utf-8')).hexdigest()[:16]
+
+
+class MemoryAlertStore:
+    """In-process stand-in for ``AdminAlertLog`` used when the database is down.
+    
+    Failures are often caused by the database itself, so the throttle must
+    still hold within one process when the persisted log is unreachable.
+    """
+    
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def record(self, task_name: str, fingerprint: str, error_message: str,
+               now: datetime) -> AdminAlertLog:
+        with self._lock:
+            key = (task_name, fingerprint)
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = AdminAlertLog(id=key, task_name=task_name, fingerprint=fingerprint,
+                                      first_seen=now)
+                self._entries[key] = entry
+            if entry.pending == 0:
+                entry.pending_since = now
+            entry.error_message = error_message
+            entry.occurrences += 1
+            entry.pending += 1
+            entry.last_seen = now
+            return entry
+    
+    def _claim_entry(self, entry: AdminAlertLog, now: datetime) -> AdminAlertLog:
+        claimed = AdminAlertLog(**vars(entry))
+        entry.pending = 0
+        entry.last_sent_at = now
+        return claimed
+    
+    @staticmethod
+    def _is_due(entry: AdminAlertLog, now: datetime, window: timedelta) -> bool:
+        return entry.pending > 0 and (entry.last_sent_at is None
+                                      or entry.last_sent_at <= now - window)
+    
+    def claim(self, entry_id, now: datetime, window: timedelta) -> Optional[AdminAlertLog]:
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None or not self._is_due(entry, now, window):
+                return None
+            return self._claim_entry(entry, now)
+    
+    def claim_due(self, now: datetime, window: timedelta) -> List[AdminAlertLog]:
+        with self._lock:
+            return [self._claim_entry(e, now) for e in self._entries.values()
+                    if self._is_due(e, now, window)]
+    
+    def release(self, claimed: List[AdminAlertLog], claimed_at: datetime):
+        with self._lock:
+            for old in claimed:
+                entry = self._entries.get(old.id)
+                if entry is None:
+                    continue
+                entry.pending += old.pending
+                entry.pending_since = old.pending_since
+                if entry.last_sent_at == claimed_at:
+                    entry.last_sent_at = old.last_sent_at
+
+
+_memory_store = MemoryAlertStore()
+
+
+class AdminAlertThrottle:
+    """Deduplicates admin failure alerts by task name and error fingerprint.
+    
+    The first occurrence of a failure is mailed immediately. Repeats within
+    ``ADMIN_ALERT_WINDOW_SECONDS`` are only counted; once the window has
+    passed, the next occurrence (or ``flush_digest``) sends a single digest
+    with occurrence counts and first/last timestamps. Occurrences are only
+    marked reported once their email went out; a failed send releases the
+    claim so they are reported next time.
+    """
+    
+    def __init__(self, email_service=None, window_seconds: float = None, store=None):
+        self._email_service = email_service
+        self.window = timedelta(seconds=window_seconds if window_seconds is not None
+                                else Config.ADMIN_ALERT_WINDOW_SECONDS)
+        self.store = store
+    
+    @property
+    def email_service(self):
+        if self._email_service is None:
+            from app.services.email import EmailService
+            self._email_service = EmailService()
+        return self._email_service
+    
+    def _with_store(self, action):
+        """Run ``action(store)`` on the persisted log, falling back to memory."""
+        if self.store is not None:
+            return action(self.store)
+        try:
+            return action(AdminAlertLog)
+        except Exception as e:
+            print(f"Admin alert log unavailable, throttling in-process: {e}")
+            return action(_memory_store)
+    
+    def notify(self, error_message: str, task_name: str = "Background Task",
+               now: datetime = None) -> bool:
+        """Record a failure and email the admin unless it is being throttled.
+        
+        Returns:
+            True if an email was sent.
+        """
+        now = now or datetime.now(timezone.utc)
+        fingerprint = fingerprint_error(error_message)
+        
+        def record_and_claim(store):
+            entry = store.record(task_name, fingerprint, error_message, now)
+            return store.claim(entry.id, now, self.window)
+        
+        claimed = self._with_store(record_and_claim)
+        if claimed is None:
+            return False
+        if claimed.last_sent_at is None and claimed.pending == 1:
+            sent = self.email_service.send_admin_alert(error_message, task_name)
+        else:
+            sent = self.email_service.send_admin_digest([claimed])
+        if not sent:
+            self._with_store(lambda store: store.release([claimed], now))
+        return sent
+    
+    def flush_digest(self, now: datetime = None) -> int:
+        """Send one digest covering all throttled failures whose window elapsed.
+        
+        Returns:
+            Number of failure entries summarized (0 if the digest failed to send).
+        """
+        now = now or datetime.now(timezone.utc)
+        claimed = self._with_store(lambda store: store.claim_due(now, self.window))
+        if not claimed:
+            return 0
+        if not self.email_service.send_admin_digest(claimed):
+            self._with_store(lambda store: store.release(claimed, now))
+            return 0
+        return len(claimed)
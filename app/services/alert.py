@@ -1,76 +1,200 @@
 """Alert service for checking and triggering price alerts."""
-from typing import List, Tuple
-from app.models.alert_rule import AlertRule
+import time
+from concurrent.futures import wait
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from app.models.alert_rule import PCT_CHANGE, PRICE, SMA_CROSS, AlertRule
 from app.models.price_history import PriceHistory
 from app.models.user import User
-from app.services.email import EmailService
+from app.services.metrics import ALERT_STAGE_DURATION, ALERTS_CHECKED, ALERTS_TRIGGERED
+from app.services.rule_engine import CurrencySignals, get_price_windows
+from app.services.tick_buffer import get_tick_buffer
 
 
 class AlertService:
     """Service for managing and triggering price alerts."""
     
-    def __init__(self):
-        self.email_service = EmailService()
+    def __init__(self, price_windows=None):
+        self._email_service = None
+        self.price_windows = price_windows or get_price_windows()
+    
+    @property
+    def email_service(self):
+        # smtplib and the MIME packages load only once an email is due
+        if self._email_service is None:
+            from app.services.email import EmailService
+            self._email_service = EmailService()
+        return self._email_service
+    
+    @email_service.setter
+    def email_service(self, service):
+        self._email_service = service
     
     @staticmethod
-    def check_rule_triggered(rule: AlertRule, current_price: float) -> bool:
+    def check_rule_triggered(rule: AlertRule, current_price: float,
+                             signals: Optional[CurrencySignals] = None) -> bool:
         """Check if an alert rule is triggered by the current price.
         
         Args:
             rule: The alert rule to check.
             current_price: Current price of the cryptocurrency.
-            
+            signals: Rolling indicators for the rule's currency, needed by
+                percent-change and SMA-cross rules.
+        
         Returns:
             True if the rule condition is met.
         """
+        rule_type = getattr(rule, 'rule_type', PRICE)
+        if rule_type == PCT_CHANGE:
+            change = signals.pct_change(rule.window_size) if signals else None
+            if change is None:
+                return False
+            if rule.condition == '>':
+                return change > rule.threshold_price
+            elif rule.condition == '<':
+                return change < -rule.threshold_price
+            return abs(change) > rule.threshold_price
+        if rule_type == SMA_CROSS:
+            gap = signals.sma_gap(rule.window_size) if signals else None
+            if gap is None:
+                return False
+            previous, current = gap
+            if rule.condition == '>':
+                return previous <= 0 < current
+            elif rule.condition == '<':
+                return previous >= 0 > current
+            return False
         if rule.condition == '>':
             return current_price > rule.threshold_price
         elif rule.condition == '<':
             return current_price < rule.threshold_price
         return False
     
+    @staticmethod
+    def check_rule_rearmed(rule: AlertRule, current_price: float,
+                           signals: Optional[CurrencySignals] = None) -> bool:
+        """Check if a fired rule has moved back across its hysteresis band.
+        
+        The band is ``rearm_pct`` percent of the threshold (of the price for
+        SMA crossings) on the far side of the trigger condition, so values
+        oscillating around the threshold do not re-arm the rule.
+        """
+        band = (rule.rearm_pct or 0) / 100
+        rule_type = getattr(rule, 'rule_type', PRICE)
+        if rule_type == PCT_CHANGE:
+            change = signals.pct_change(rule.window_size) if signals else None
+            if change is None:
+                return False
+            limit = rule.threshold_price * (1 - band)
+            if rule.condition == '>':
+                return change <= limit
+            elif rule.condition == '<':
+                return change >= -limit
+            return abs(change) <= limit
+        if rule_type == SMA_CROSS:
+            gap = signals.sma_gap(rule.window_size) if signals else None
+            if gap is None:
+                return False
+            current = gap[1]
+            if rule.condition == '>':
+                return current <= -band * current_price
+            elif rule.condition == '<':
+                return current >= band * current_price
+            return False
+        if rule.condition == '>':
+            return current_price <= rule.threshold_price * (1 - band)
+        elif rule.condition == '<':
+            return current_price >= rule.threshold_price * (1 + band)
+        return False
+    
     def process_alerts(self) -> Tuple[int, int]:
         """Process all active alerts and send notifications.
         
+        Each stage's duration is recorded in alert_run_stage_duration_seconds:
+        load_rules, load_prices, evaluate (including queueing emails),
+        record (rule state changes) and notify (waiting for queued emails).
+        
         Returns:
             Tuple of (alerts_checked, alerts_triggered).
         """
         # Get all active rules
-        active_rules = AlertRule.find_all_active()
+        with ALERT_STAGE_DURATION.time('load_rules'):
+            active_rules = AlertRule.find_all_active()
         
-        # Get latest prices
-        latest_prices = PriceHistory.get_latest_prices()
+        with ALERT_STAGE_DURATION.time('load_prices'):
+            # Get latest prices, including collected ticks not yet written
+            latest_prices = get_tick_buffer().overlay(
+                PriceHistory.get_latest_prices_with_timestamps())
+            
+            # Rolling indicators, computed once per currency for all rules using them
+            signals = self.price_windows.signals_for(active_rules)
         
         alerts_checked = 0
         alerts_triggered = 0
+        pending_emails = []
+        triggered = []
+        now = datetime.now(timezone.utc)
+        # Rule state changes, written in bulk once the run is over
+        deactivated, fired, rearmed = [], [], []
         
-        for rule in active_rules:
-            alerts_checked += 1
-            
-            # Get current price for this currency
-            current_price = latest_prices.get(rule.currency_symbol)
-            
-            if current_price is None:
-                continue
-            
-            # Check if rule is triggered
-            if self.check_rule_triggered(rule, current_price):
-                alerts_triggered += 1
+        started = time.perf_counter()
+        try:
+            for rule in active_rules:
+                alerts_checked += 1
+                
+                # Get current price for this currency
+                current_price = latest_prices.get(rule.currency_symbol)
+                
+                if current_price is None:
+                    continue
                 
-                # Get user email
-                user = User.find_by_id(rule.user_id)
-                if user:
-                    # Send notification
-                    self.email_service.send_alert_email(
-                        to_email=user.email,
+                currency_signals = signals.get(rule.currency_symbol)
+                
+                # Fired re-arming rules only wait to re-arm
+                if rule.fired_at is not None:
+                    if rule.cooled_down(now) and self.check_rule_rearmed(rule, current_price,
+                                                                         currency_signals):
+                        rearmed.append(rule.id)
+                    continue
+                
+                # Check if rule is triggered
+                if self.check_rule_triggered(rule, current_price, currency_signals):
+                    alerts_triggered += 1
+                    triggered.append((rule, current_price))
+            
+            # Look up recipients once for the run rather than per triggered rule
+            emails = User.find_emails(rule.user_id for rule, _ in triggered)
+            for rule, current_price in triggered:
+                email = emails.get(rule.user_id)
+                if email:
+                    # Queue notification on the email worker pool
+                    pending_emails.append(self.email_service.dispatch_alert_email(
+                        to_email=email,
                         currency=rule.currency_symbol,
                         condition=rule.condition,
                         threshold=rule.threshold_price,
-                        current_price=current_price
-                    )
+                        current_price=current_price,
+                        description=(rule.description
+                                     if getattr(rule, 'rule_type', PRICE) != PRICE else None)
+                    ))
                     
-                    # Deactivate the rule after triggering
-                    rule.update(is_active=False)
+                    # Deactivate one-shot rules; re-arming ones wait out the band
+                    if rule.rearms:
+                        fired.append(rule.id)
+                    else:
+                        deactivated.append(rule.id)
+        finally:
+            ALERT_STAGE_DURATION.observe(time.perf_counter() - started, 'evaluate')
+            ALERTS_CHECKED.inc(amount=alerts_checked)
+            ALERTS_TRIGGERED.inc(amount=alerts_triggered)
+            
+            with ALERT_STAGE_DURATION.time('record'):
+                AlertRule.record_run(deactivated, fired, rearmed, now)
+            
+            # Wait for queued notifications and release SMTP sessions
+            with ALERT_STAGE_DURATION.time('notify'):
+                wait(pending_emails)
+                if self._email_service is not None:
+                    self._email_service.close()
         
         return alerts_checked, alerts_triggered
-
@@ -0,0 +1,237 @@
+"""Rolling price statistics: SMA, EMA, volatility and percent change."""
+import math
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from app.models.alert_rule import MAX_WINDOW
+
+_EMA_BLOCK = 256
+
+
+def sma(prices, window: int) -> np.ndarray:
+    """Simple moving average; the first ``window - 1`` values are NaN."""
+    x = np.asarray(prices, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1:] = sliding_window_view(x, window).mean(axis=1)
+    return out
+
+
+def rolling_std(prices, window: int) -> np.ndarray:
+    """Rolling population standard deviation; the first ``window - 1`` values are NaN."""
+    x = np.asarray(prices, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1:] = sliding_window_view(x, window).std(axis=1)
+    return out
+
+
+def ema(prices, span: int) -> np.ndarray:
+    """Exponential moving average with ``alpha = 2 / (span + 1)``, seeded at the first price.
+    
+    Computed block by block as a lower-triangular matrix product, carrying
+    the last value of each block into the next.
+    """
+    x = np.asarray(prices, dtype=np.float64)
+    out = np.empty_like(x)
+    if not len(x):
+        return out
+    alpha = 2.0 / (span + 1)
+    idx = np.arange(_EMA_BLOCK)
+    lag = idx[:, None] - idx[None, :]
+    weights = np.where(lag >= 0, alpha * (1 - alpha) ** np.maximum(lag, 0), 0.0)
+    carry = (1 - alpha) ** (idx + 1)
+    previous = x[0]
+    for start in range(0, len(x), _EMA_BLOCK):
+        block = x[start:start + _EMA_BLOCK]
+        n = len(block)
+        out[start:start + n] = weights[:n, :n] @ block + carry[:n] * previous
+        previous = out[start + n - 1]
+    return out
+
+
+def pct_change(prices, periods: int) -> np.ndarray:
+    """Percent change over ``periods`` ticks; the first ``periods`` values are NaN."""
+    x = np.asarray(prices, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if len(x) > periods:
+        out[periods:] = (x[periods:] - x[:-periods]) / x[:-periods] * 100
+    return out
+
+
+def _finite(value) -> Optional[float]:
+    return None if value is None or not math.isfinite(value) else float(value)
+
+
+class RollingStats:
+    """Rolling statistics over the last ``window`` ticks, updated in O(1) per tick.
+    
+    ``seed`` initialises the state from history with the vectorized
+    functions above; ``update`` then folds in one price at a time. Sums are
+    kept relative to a reference price to avoid cancellation in the
+    variance, and recomputed from the buffer every ``window`` updates to
+    stop drift.
+    """
+    
+    def __init__(self, window: int, ema_span: Optional[int] = None):
+        self.window = window
+        self.alpha = 2.0 / ((ema_span or window) + 1)
+        self.count = 0
+        self.ema = None
+        self._prices = deque(maxlen=window + 1)
+        self._reference = 0.0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._since_resync = 0
+    
+    def _resync(self):
+        """Recompute running sums over the current window from the buffer."""
+        current = np.fromiter(self._prices, dtype=np.float64)[-self.window:]
+        self._reference = float(current[0]) if len(current) else 0.0
+        shifted = current - self._reference
+        self._sum = float(shifted.sum())
+        self._sum_sq = float((shifted * shifted).sum())
+        self._since_resync = 0
+    
+    def seed(self, prices):
+        """Replace the state with one computed from a price history (oldest first)."""
+        x = np.asarray(prices, dtype=np.float64)
+        self._prices.clear()
+        self._prices.extend(x[-(self.window + 1):].tolist())
+        self.count = len(x)
+        span = 2.0 / self.alpha - 1
+        self.ema = float(ema(x, span)[-1]) if len(x) else None
+        self._resync()
+    
+    def update(self, price: float):
+        """Fold in one new price."""
+        price = float(price)
+        in_window = min(len(self._prices), self.window)
+        if in_window == self.window:
+            evicted = self._prices[-self.window] - self._reference
+            self._sum -= evicted
+            self._sum_sq -= evicted * evicted
+        self._prices.append(price)
+        shifted = price - self._reference
+        self._sum += shifted
+        self._sum_sq += shifted * shifted
+        self.count += 1
+        self.ema = price if self.ema is None else self.alpha * price + (1 - self.alpha) * self.ema
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            self._resync()
+    
+    @property
+    def ready(self) -> bool:
+        return len(self._prices) >= self.window
+    
+    def sma(self) -> Optional[float]:
+        if not self.ready:
+            return None
+        return self._reference + self._sum / self.window
+    
+    def std(self) -> Optional[float]:
+        if not self.ready:
+            return None
+        mean = self._sum / self.window
+        return math.sqrt(max(0.0, self._sum_sq / self.window - mean * mean))
+    
+    def pct_change(self) -> Optional[float]:
+        """Percent change over the last ``window`` ticks."""
+        if len(self._prices) <= self.window or self._prices[0] == 0:
+            return None
+        return (self._prices[-1] - self._prices[0]) / self._prices[0] * 100
+    
+    def snapshot(self) -> Dict:
+        return {
+            'window': self.window,
+            'count': self.count,
+            'price': self._prices[-1] if self._prices else None,
+            'sma': _finite(self.sma()),
+            'ema': _finite(self.ema),
+            'std': _finite(self.std()),
+            'pct_change': _finite(self.pct_change()),
+        }
+
+
+class _CacheEntry:
+    """Rolling statistics for one (symbol, window) and the newest tick folded in."""
+    
+    def __init__(self, window: int):
+        self.stats = RollingStats(window)
+        self.last_ts = None
+        self.lock = threading.Lock()
+
+
+class AnalyticsService:
+    """Cached rolling statistics per (symbol, window).
+    
+    The first request for a key seeds it from the most recent history;
+    later requests only fold in the ticks stored since. Least recently used
+    keys are evicted beyond ``max_entries``. The cache lock only guards the
+    key lookup; history is loaded under the key's own lock, so requests for
+    other keys never wait on a database query.
+    """
+    
+    def __init__(self, max_entries: int = 256, warmup_factor: int = 3):
+        self.max_entries = max_entries
+        self.warmup_factor = warmup_factor
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _entry(self, key) -> _CacheEntry:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                entry = self._cache[key] = _CacheEntry(key[1])
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            return entry
+    
+    def get_stats(self, symbol: str, window: int) -> Dict:
+        """Latest rolling statistics for a symbol.
+        
+        Raises:
+            ValueError: If ``window`` is outside 2..MAX_WINDOW.
+        """
+        from app.models.price_history import PriceHistory
+        from app.services.tick_store import from_micros
+        
+        if not 2 <= window <= MAX_WINDOW:
+            raise ValueError(f"window must be between 2 and {MAX_WINDOW}")
+        key = (symbol.upper(), window)
+        entry = self._entry(key)
+        with entry.lock:
+            if entry.last_ts is None:
+                timestamps, prices = PriceHistory.get_recent(
+                    symbol, self.warmup_factor * window + 1)
+                entry.stats.seed(prices)
+            else:
+                timestamps, prices = PriceHistory.get_range(
+                    symbol, from_micros(entry.last_ts + 1), datetime.now(timezone.utc))
+                for price in prices:
+                    entry.stats.update(price)
+            if len(timestamps):
+                entry.last_ts = int(timestamps[-1])
+            result = entry.stats.snapshot()
+            result['as_of'] = (from_micros(entry.last_ts).isoformat()
+                               if entry.last_ts is not None else None)
+        result['symbol'] = key[0]
+        return result
+
+
+_service: Optional[AnalyticsService] = None
+_service_lock = threading.Lock()
+
+
+def get_analytics_service() -> AnalyticsService:
+    """Get the process-wide analytics service and its cache."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = AnalyticsService()
+        return _service
@@ -0,0 +1,109 @@
+"""Historical price backfill from CoinGecko's market_chart/range endpoint."""
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from app.config import Config
+from app.models.backfill_checkpoint import BackfillCheckpoint
+from app.models.price_history import PriceHistory
+from app.services.coingecko import RateLimitedError
+from app.services.quota import ADHOC, QuotaExceededError, get_quota_scheduler
+
+
+class BackfillService:
+    """Fills price_history with history for coins that have little or none.
+    
+    Each coin's range is split into ``window_seconds`` windows that are
+    fetched ``concurrency`` at a time through the API quota scheduler (as
+    ad-hoc calls, so the cron job's reserve is untouched) and committed in
+    order, each together with its checkpoint. An interrupted run picks up
+    at the first uncommitted window.
+    """
+    
+    def __init__(self, scheduler=None, service=None, store=BackfillCheckpoint,
+                 window_seconds: int = None, concurrency: int = None, sleep=time.sleep):
+        self.scheduler = scheduler or get_quota_scheduler()
+        self.service = service or self.scheduler.service
+        self.store = store
+        self.window_seconds = window_seconds or Config.BACKFILL_WINDOW_SECONDS
+        self.concurrency = concurrency or Config.BACKFILL_CONCURRENCY
+        self._sleep = sleep
+    
+    def _fetch(self, coin_id: str, start: int, end: int) -> List[Tuple[int, float]]:
+        """Fetch one window, waiting out the quota as often as needed."""
+        while True:
+            try:
+                return self.scheduler.call(self.service.get_market_chart_range,
+                                           coin_id, start, end, priority=ADHOC)
+            except QuotaExceededError as e:
+                self._sleep(e.retry_in)
+            except RateLimitedError:
+                # The scheduler has marked the window spent; the next attempt waits it out
+                continue
+    
+    def windows(self, checkpoint: BackfillCheckpoint) -> List[Tuple[int, int]]:
+        """Uncommitted (start, end) windows of a checkpoint's range."""
+        return [(start, min(start + self.window_seconds, checkpoint.range_end))
+                for start in range(checkpoint.completed_until, checkpoint.range_end,
+                                   self.window_seconds)]
+    
+    def backfill_coin(self, coin_id: str, range_start: int,
+                      range_end: Optional[int] = None) -> int:
+        """Backfill one coin, resuming its checkpoint if one exists.
+        
+        Args:
+            coin_id: CoinGecko coin ID (e.g., 'bitcoin').
+            range_start: UNIX timestamp (seconds) to backfill from.
+            range_end: UNIX timestamp to backfill up to; defaults to the
+                oldest stored price so live data is not duplicated.
+        
+        Returns:
+            Number of rows written.
+        """
+        symbol = Config.SUPPORTED_CURRENCIES[coin_id]
+        if range_end is None:
+            earliest = PriceHistory.get_earliest_timestamp(symbol)
+            range_end = int(earliest.timestamp()) if earliest else int(time.time())
+        checkpoint = self.store.plan(coin_id, symbol, range_start, max(range_start, range_end))
+        
+        written = 0
+        remaining = iter(self.windows(checkpoint))
+        pending = deque()
+        
+        with ThreadPoolExecutor(max_workers=self.concurrency,
+                                thread_name_prefix='backfill') as executor:
+            def submit_next():
+                window = next(remaining, None)
+                if window is not None:
+                    pending.append((window, executor.submit(self._fetch, coin_id, *window)))
+            
+            # Keep a bounded number of windows in flight so memory stays flat
+            for _ in range(2 * self.concurrency):
+                submit_next()
+            try:
+                while pending:
+                    (start, end), future = pending.popleft()
+                    rows = [(ts, price) for ts, price in future.result()
+                            if start * 1000 <= ts < end * 1000]
+                    written += self.store.commit_window(coin_id, symbol, rows, start, end)
+                    submit_next()
+            finally:
+                for _, future in pending:
+                    future.cancel()
+        return written
+    
+    def run(self, days: int, coin_ids: Optional[List[str]] = None,
+            now: Optional[datetime] = None) -> Dict[str, int]:
+        """Backfill the last ``days`` days for each coin (default: all supported).
+        
+        Returns:
+            Dict mapping coin ID to rows written.
+        """
+        now = now or datetime.now(timezone.utc)
+        range_start = int(now.timestamp()) - days * 86400
+        results = {}
+        for coin_id in coin_ids or list(Config.SUPPORTED_CURRENCIES):
+            results[coin_id] = self.backfill_coin(coin_id, range_start)
+            print(f"Backfilled {results[coin_id]} prices for {coin_id}")
+        return results
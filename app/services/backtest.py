@@ -0,0 +1,270 @@
+"""Vectorized replay of alert rules over stored price history."""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from app.models.alert_rule import PCT_CHANGE, PRICE, SMA_CROSS
+from app.services.analytics import sma
+from app.services.tick_store import from_micros, to_micros
+
+MINUTE_US = 60_000_000
+
+
+def crossings(values: np.ndarray, previous: np.ndarray, thresholds: np.ndarray, condition: str):
+    """Every (tick, threshold) pair where a series enters its triggered state.
+    
+    A '>' threshold T is entered at tick i when ``previous[i] <= T < values[i]``
+    and a '<' threshold when ``values[i] < T <= previous[i]``: each tick
+    enters a contiguous run of the sorted thresholds, found with two binary
+    searches, so the cost is O((ticks + thresholds) log ticks + crossings).
+    NaN values count as not triggered.
+    
+    Args:
+        values: Series value at each tick.
+        previous: Series value at the tick before each tick.
+        thresholds: Thresholds sorted ascending.
+        condition: '>' or '<'.
+    
+    Returns:
+        Tuple of (tick indices, threshold indices), ordered by tick.
+    """
+    if condition == '>':
+        values = np.where(np.isnan(values), -np.inf, values)
+        previous = np.where(np.isnan(previous), -np.inf, previous)
+        lo = np.searchsorted(thresholds, previous, side='left')
+        hi = np.searchsorted(thresholds, values, side='left')
+    else:
+        values = np.where(np.isnan(values), np.inf, values)
+        previous = np.where(np.isnan(previous), np.inf, previous)
+        lo = np.searchsorted(thresholds, values, side='right')
+        hi = np.searchsorted(thresholds, previous, side='right')
+    counts = np.maximum(hi - lo, 0)
+    total = int(counts.sum())
+    ticks = np.repeat(np.arange(len(values)), counts)
+    # Offset of each pair within its tick's run, added to the run's first threshold
+    run_start = np.repeat(np.cumsum(counts) - counts, counts)
+    indices = np.arange(total) - run_start + np.repeat(lo, counts)
+    return ticks, indices
+
+
+def _entries_by_threshold(series: '_Series', condition: str,
+                          thresholds: np.ndarray) -> List[np.ndarray]:
+    """Ticks at which the series enters each threshold's triggered state."""
+    order = np.argsort(thresholds, kind='stable')
+    ticks, indices = crossings(series.values, series.previous, thresholds[order], condition)
+    # Group the pairs by threshold, ticks ascending; small integer keys let
+    # the stable sort run as a radix sort
+    if len(thresholds) <= np.iinfo(np.uint16).max:
+        indices = indices.astype(np.uint16)
+    by_threshold = np.argsort(indices, kind='stable')
+    ticks, indices = ticks[by_threshold], indices[by_threshold]
+    bounds = np.searchsorted(indices, np.arange(len(thresholds) + 1))
+    entries = [None] * len(thresholds)
+    for rank, position in enumerate(order.tolist()):
+        entries[position] = ticks[bounds[rank]:bounds[rank + 1]]
+    return entries
+
+
+class _Series:
+    """One signal series for a currency over the replayed range.
+    
+    ``values`` and ``previous`` cover ticks from the range start on. Level
+    series (price, percent change) start untriggered so a condition that
+    already holds fires on the first tick, like a newly created rule;
+    crossing series (price minus SMA) carry the real previous value and
+    are undefined until it is.
+    """
+    
+    def __init__(self, values: np.ndarray, first: int, crossing: bool):
+        self.values = values[first:]
+        if crossing:
+            self.previous = values[first - 1:-1] if first > 0 else np.concatenate(
+                [[np.nan], values[:-1]])
+            # A crossing needs both sides, as sma_gap does
+            self.values = np.where(np.isnan(self.previous), np.nan, self.values)
+        else:
+            self.previous = np.concatenate([[np.nan], self.values[:-1]])
+
+
+def _series_for(rule, timestamps: np.ndarray, prices: np.ndarray, first: int,
+                cache: Dict) -> _Series:
+    """The series a rule thresholds on, memoized per (kind, window)."""
+    rule_type = getattr(rule, 'rule_type', PRICE)
+    if rule_type == PCT_CHANGE:
+        key = (PCT_CHANGE, rule.window_size, rule.condition == '~')
+    elif rule_type == SMA_CROSS:
+        key = (SMA_CROSS, rule.window_size)
+    else:
+        key = (PRICE,)
+    if key not in cache:
+        if rule_type == PCT_CHANGE:
+            since = np.searchsorted(timestamps, timestamps - rule.window_size * MINUTE_US,
+                                    side='right') - 1
+            reference = np.where(since >= 0, prices[np.maximum(since, 0)], np.nan)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values = (prices - reference) / reference * 100
+            values[~np.isfinite(values)] = np.nan
+            if key[2]:
+                values = np.abs(values)
+            cache[key] = _Series(values, first, crossing=False)
+        elif rule_type == SMA_CROSS:
+            # Relative gap, so the re-arm band is a fraction of the price
+            cache[key] = _Series((prices - sma(prices, rule.window_size)) / prices, first,
+                                 crossing=True)
+        else:
+            cache[key] = _Series(prices, first, crossing=False)
+    return cache[key]
+
+
+def _threshold(rule):
+    """(condition, threshold, band unit) on the rule's series, as check_rule_triggered."""
+    rule_type = getattr(rule, 'rule_type', PRICE)
+    if rule_type == SMA_CROSS:
+        return rule.condition, 0.0, 1.0
+    if rule_type == PCT_CHANGE and rule.condition == '<':
+        return '<', -rule.threshold_price, rule.threshold_price
+    if rule_type == PCT_CHANGE and rule.condition == '~':
+        return '>', rule.threshold_price, rule.threshold_price
+    return rule.condition, rule.threshold_price, abs(rule.threshold_price)
+
+
+def _rearm_filter(candidates: np.ndarray, entries: np.ndarray, series: '_Series',
+                  condition: str, level: float, timestamps: np.ndarray,
+                  cooldown_minutes: int) -> np.ndarray:
+    """Keep the trigger candidates a re-arming rule actually fires on.
+    
+    After a trigger the rule re-arms at the first tick that is both past the
+    cooldown and beyond its hysteresis band: the tick the cooldown ends if
+    the value is already there, otherwise the next entry into the band. Its
+    next trigger is the first candidate after that. Every candidate's
+    successor is found with vectorized searches, leaving only a walk along
+    the chain from the first.
+    
+    Args:
+        candidates: Ticks entering the trigger condition.
+        entries: Ticks entering the re-arm band.
+        series: Series the rule triggers on.
+        condition: Trigger condition, '>' or '<'.
+        level: Far edge of the band.
+        timestamps: Tick timestamps.
+        cooldown_minutes: Minimum time between a trigger and re-arming.
+    """
+    n = len(timestamps)
+    cooldown = (cooldown_minutes or 0) * MINUTE_US
+    earliest = np.maximum(candidates + 1,
+                          np.searchsorted(timestamps, timestamps[candidates] + cooldown))
+    next_entry = np.searchsorted(entries, earliest)
+    rearm = np.where(next_entry < len(entries),
+                     entries[np.minimum(next_entry, len(entries) - 1)] if len(entries) else n, n)
+    already = earliest < n
+    values = series.values[earliest[already]]
+    already[already] = values <= level if condition == '>' else values >= level
+    rearm = np.where(already, earliest, rearm)
+    successor = np.searchsorted(candidates, rearm, side='right').tolist()
+    
+    chain = []
+    position = 0
+    while position < len(successor):
+        chain.append(position)
+        position = successor[position]
+    return candidates[chain]
+
+
+class Backtester:
+    """Replays alert rules over a price_history range.
+    
+    Rules trigger with the semantics of ``AlertService.check_rule_triggered``
+    evaluated at every stored tick. Re-arming rules honour their cooldown
+    and hysteresis band; one-shot rules are replayed as if re-enabled as
+    soon as their condition stops holding, so their counts show how often
+    they would have fired and their first trigger is when they would have.
+    """
+    
+    def __init__(self, loader=None):
+        if loader is None:
+            from app.models.price_history import PriceHistory
+            loader = PriceHistory
+        self._loader = loader
+    
+    def run(self, rules: Sequence, start: datetime, end: datetime) -> List[np.ndarray]:
+        """Trigger times for each rule.
+        
+        History from ``window_size`` minutes before ``start`` is loaded to
+        warm up percent-change and SMA series (enough for SMA periods when
+        ticks are at most a minute apart); only ticks from ``start`` on can
+        trigger.
+        
+        Returns:
+            One array of epoch-microsecond trigger timestamps per rule, in
+            the order given.
+        """
+        results = [np.empty(0, dtype=np.int64)] * len(rules)
+        by_symbol = defaultdict(list)
+        for position, rule in enumerate(rules):
+            by_symbol[rule.currency_symbol.upper()].append(position)
+        
+        for symbol, positions in by_symbol.items():
+            lookback = max((rules[p].window_size or 0) for p in positions)
+            timestamps, prices = self._loader.get_range(
+                symbol, from_micros(to_micros(start) - (lookback + 1) * MINUTE_US), end)
+            timestamps = np.asarray(timestamps, dtype=np.int64)
+            prices = np.asarray(prices, dtype=np.float64)
+            first = int(np.searchsorted(timestamps, to_micros(start)))
+            if first == len(timestamps):
+                continue
+            in_range = timestamps[first:]
+            
+            # Group rules sharing a series and condition so each group is one sweep
+            cache = {}
+            groups = defaultdict(list)
+            for p in positions:
+                series = _series_for(rules[p], timestamps, prices, first, cache)
+                condition, threshold, unit = _threshold(rules[p])
+                if condition in ('>', '<'):
+                    groups[(id(series), condition)].append((p, series, threshold, unit))
+            
+            for (_, condition), members in groups.items():
+                series = members[0][1]
+                thresholds = np.array([m[2] for m in members], dtype=np.float64)
+                triggers = _entries_by_threshold(series, condition, thresholds)
+                
+                # Re-arm bands, entered the opposite way: x <= level for '>' rules
+                # is x < nextafter(level, +inf), and x >= level for '<' rules
+                # is x > nextafter(level, -inf)
+                rearming = [k for k, m in enumerate(members)
+                            if getattr(rules[m[0]], 'rearm_pct', None) is not None]
+                if rearming:
+                    levels = np.array([
+                        members[k][2] - rules[members[k][0]].rearm_pct / 100 * members[k][3]
+                        if condition == '>' else
+                        members[k][2] + rules[members[k][0]].rearm_pct / 100 * members[k][3]
+                        for k in rearming])
+                    opposite = '<' if condition == '>' else '>'
+                    bounds = np.nextafter(levels, np.inf if condition == '>' else -np.inf)
+                    entries = _entries_by_threshold(series, opposite, bounds)
+                    for k, level, rule_entries in zip(rearming, levels.tolist(), entries):
+                        if len(triggers[k]):
+                            triggers[k] = _rearm_filter(
+                                triggers[k], rule_entries, series, condition, level,
+                                in_range, rules[members[k][0]].cooldown_minutes)
+                
+                for (p, _, _, _), fired in zip(members, triggers):
+                    results[p] = in_range[fired]
+        return results
+
+
+def summarize(rules: Sequence, triggers: List[np.ndarray],
+              limit: Optional[int] = 100) -> List[Dict]:
+    """JSON-ready backtest results, listing at most ``limit`` trigger times per rule."""
+    summary = []
+    for rule, fired in zip(rules, triggers):
+        shown = fired if limit is None else fired[:limit]
+        summary.append({
+            'rule_id': getattr(rule, 'id', None),
+            'currency': rule.currency_symbol,
+            'description': rule.description,
+            'count': int(len(fired)),
+            'first_trigger': from_micros(fired[0]).isoformat() if len(fired) else None,
+            'triggers': [from_micros(ts).isoformat() for ts in shown.tolist()],
+        })
+    return summary
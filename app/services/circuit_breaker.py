@@ -0,0 +1,139 @@
+"""Circuit breaker for calls to external services."""
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit is open."""
+    
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} circuit is open; retry in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker.
+    
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail fast with ``CircuitOpenError``. Once ``recovery_timeout``
+    seconds have passed it goes half-open and lets ``half_open_max_calls``
+    trial calls through: a success closes it again, a failure re-opens it.
+    Successful calls slower than ``slow_call_threshold`` count as failures.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 60,
+                 half_open_max_calls: int = 1, slow_call_threshold: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.slow_call_threshold = slow_call_threshold
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._half_open_calls = 0
+        self._last_error = None
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+    
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+    
+    def _before_call(self):
+        with self._lock:
+            state = self._current_state()
+            if state == self.OPEN:
+                raise CircuitOpenError(self.name,
+                                       self.recovery_timeout - (self._clock() - self._opened_at))
+            if state == self.HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    raise CircuitOpenError(self.name, 0)
+                self._half_open_calls += 1
+    
+    def _on_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = None
+    
+    def _on_failure(self, error: str):
+        with self._lock:
+            self._failures += 1
+            self._last_error = error
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+    
+    def call(self, func: Callable, *args, **kwargs):
+        """Call ``func`` through the breaker.
+        
+        Raises:
+            CircuitOpenError: If the circuit is open.
+        """
+        self._before_call()
+        start = self._clock()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._on_failure(str(e))
+            raise
+        elapsed = self._clock() - start
+        if self.slow_call_threshold is not None and elapsed > self.slow_call_threshold:
+            self._on_failure(f"slow call ({elapsed:.1f}s)")
+        else:
+            self._on_success()
+        return result
+    
+    def reset(self):
+        """Force the circuit closed."""
+        self._on_success()
+    
+    def snapshot(self) -> Dict:
+        """Breaker state for health reporting."""
+        with self._lock:
+            state = self._current_state()
+            info = {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'last_error': self._last_error,
+            }
+            if state == self.OPEN:
+                info['retry_in_seconds'] = round(
+                    self.recovery_timeout - (self._clock() - self._opened_at), 1)
+            return info
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """Get the process-wide breaker for a service, creating it on first use."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, **kwargs)
+            _breakers[name] = breaker
+        return breaker
+
+
+def breaker_states() -> Dict[str, Dict]:
+    """Snapshots of every registered breaker."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.snapshot() for b in breakers}
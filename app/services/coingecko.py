@@ -1,16 +1,40 @@
 """CoinGecko API service for fetching cryptocurrency prices."""
-import os
-import requests
-from typing import Dict, Optional
-from dotenv import load_dotenv
+import time
+from typing import Dict, List, Optional, Tuple
+from app.config import Config
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, get_breaker
+from app.services.metrics import COINGECKO_ERRORS, COINGECKO_REQUEST_DURATION
+from app.services.price_provider import PriceProvider
 
-load_dotenv()
 
+class RateLimitedError(Exception):
+    """Raised when CoinGecko answers 429 Too Many Requests."""
+    
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__("CoinGecko rate limit exceeded (429 Too Many Requests)")
+        self.retry_after = retry_after
+
+
+def coingecko_breaker() -> CircuitBreaker:
+    """The process-wide ``coingecko`` circuit breaker, registered on first use."""
+    return get_breaker(
+        'coingecko',
+        failure_threshold=Config.COINGECKO_BREAKER_FAILURES,
+        recovery_timeout=Config.COINGECKO_BREAKER_RECOVERY_SECONDS,
+        slow_call_threshold=Config.COINGECKO_SLOW_CALL_SECONDS or None,
+    )
 
-class CoinGeckoService:
-    """Service for interacting with CoinGecko API."""
+
+class CoinGeckoService(PriceProvider):
+    """Service for interacting with CoinGecko API.
+    
+    All requests go through the process-wide ``coingecko`` circuit breaker,
+    so during an outage calls fail fast with ``CircuitOpenError`` instead of
+    each waiting for the request timeout.
+    """
     
-    BASE_URL = "https://api.coingecko.com/api/v3"
+    name = 'coingecko'
+    BASE_URL = Config.COINGECKO_BASE_URL
     
     # Mapping from CoinGecko ID to symbol
     COIN_IDS = {
@@ -23,8 +47,11 @@ class CoinGeckoService:
         'dogecoin': 'DOGE'
     }
     
-    def __init__(self):
-        self.api_key = os.getenv('COINGECKO_API_KEY')
+    def __init__(self, base_url: str = None, timeout: float = None, breaker=None):
+        self.api_key = Config.COINGECKO_API_KEY
+        self.base_url = base_url or self.BASE_URL
+        self.timeout = timeout or Config.COINGECKO_TIMEOUT
+        self.breaker = breaker or coingecko_breaker()
     
     def _get_headers(self) -> Dict[str, str]:
         """Get request headers with API key."""
@@ -33,61 +60,123 @@ class CoinGeckoService:
             headers['x-cg-demo-api-key'] = self.api_key
         return headers
     
+    def _get_json(self, path: str, params: Dict, what: str) -> Dict:
+        """GET an API path through the circuit breaker.
+        
+        Raises:
+            Exception: ``Failed to fetch <what> from CoinGecko`` if the
+                request fails (timeout, connection or HTTP error).
+        """
+        # requests is slow to import, so it loads on the first API call rather than at startup
+        import requests
+        
+        def fetch():
+            response = requests.get(f"{self.base_url}{path}", params=params,
+                                    headers=self._get_headers(), timeout=self.timeout)
+            if response.status_code == 429:
+                retry_after = response.headers.get('Retry-After')
+                raise RateLimitedError(float(retry_after) if retry_after and retry_after.isdigit() else None)
+            response.raise_for_status()
+            return response.json()
+        
+        start = time.perf_counter()
+        outcome = 'ok'
+        try:
+            return self.breaker.call(fetch)
+        except CircuitOpenError:
+            outcome = 'circuit_open'
+            raise
+        except RateLimitedError:
+            outcome = 'rate_limited'
+            raise
+        except requests.RequestException as e:
+            if isinstance(e, requests.Timeout):
+                outcome = 'timeout'
+            elif isinstance(e, requests.ConnectionError):
+                outcome = 'connection'
+            elif isinstance(e, requests.HTTPError):
+                outcome = 'http'
+            else:
+                outcome = 'error'
+            raise Exception(f"Failed to fetch {what} from CoinGecko: {e}")
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            # A call refused by the open breaker never reached the API
+            if outcome != 'circuit_open':
+                COINGECKO_REQUEST_DURATION.observe(time.perf_counter() - start, path, outcome)
+            if outcome != 'ok':
+                COINGECKO_ERRORS.inc(outcome)
+    
     def get_prices(self) -> Dict[str, float]:
         """Fetch current prices for all supported cryptocurrencies.
         
         Returns:
             Dict mapping currency symbol (e.g., 'BTC') to USD price.
+        
+        Raises:
+            CircuitOpenError: If CoinGecko has been failing and the circuit is open.
         """
-        try:
-            coin_ids = ','.join(self.COIN_IDS.keys())
-            url = f"{self.BASE_URL}/simple/price"
-            params = {
-                'ids': coin_ids,
-                'vs_currencies': 'usd'
-            }
-            
-            response = requests.get(url, params=params, headers=self._get_headers(), timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # Convert to symbol-based dict
-            prices = {}
-            for coin_id, symbol in self.COIN_IDS.items():
-                if coin_id in data and 'usd' in data[coin_id]:
-                    prices[symbol] = data[coin_id]['usd']
-            
-            return prices
-        except requests.RequestException as e:
-            raise Exception(f"Failed to fetch prices from CoinGecko: {e}")
+        coin_ids = ','.join(self.COIN_IDS.keys())
+        params = {
+            'ids': coin_ids,
+            'vs_currencies': 'usd'
+        }
+        
+        data = self._get_json("/simple/price", params, 'prices')
+        
+        # Convert to symbol-based dict
+        prices = {}
+        for coin_id, symbol in self.COIN_IDS.items():
+            if coin_id in data and 'usd' in data[coin_id]:
+                prices[symbol] = data[coin_id]['usd']
+        
+        return prices
     
     def get_price(self, coin_id: str) -> Optional[float]:
         """Fetch current price for a specific cryptocurrency.
         
         Args:
             coin_id: CoinGecko coin ID (e.g., 'bitcoin').
-            
+        
         Returns:
             USD price or None if not found.
         """
-        try:
-            url = f"{self.BASE_URL}/simple/price"
-            params = {
-                'ids': coin_id,
-                'vs_currencies': 'usd'
-            }
-            
-            response = requests.get(url, params=params, headers=self._get_headers(), timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if coin_id in data and 'usd' in data[coin_id]:
-                return data[coin_id]['usd']
-            return None
-        except requests.RequestException as e:
-            raise Exception(f"Failed to fetch price from CoinGecko: {e}")
+        params = {
+            'ids': coin_id,
+            'vs_currencies': 'usd'
+        }
+        
+        data = self._get_json("/simple/price", params, 'price')
+        
+        if coin_id in data and 'usd' in data[coin_id]:
+            return data[coin_id]['usd']
+        return None
+    
+    def get_market_chart_range(self, coin_id: str, start: int, end: int) -> List[Tuple[int, float]]:
+        """Fetch historical USD prices for a coin.
+        
+        CoinGecko picks the granularity from the range length: 5-minutely
+        up to a day, hourly up to 90 days, daily beyond that.
+        
+        Args:
+            coin_id: CoinGecko coin ID (e.g., 'bitcoin').
+            start: Range start as a UNIX timestamp in seconds.
+            end: Range end as a UNIX timestamp in seconds.
+        
+        Returns:
+            List of (timestamp in milliseconds, USD price) pairs, oldest first.
+        """
+        params = {
+            'vs_currency': 'usd',
+            'from': start,
+            'to': end
+        }
+        
+        data = self._get_json(f"/coins/{coin_id}/market_chart/range", params, 'price history')
+        
+        return [(int(ts), float(price)) for ts, price in data.get('prices', [])]
     
     @classmethod
     def get_symbol_for_coin(cls, coin_id: str) -> Optional[str]:
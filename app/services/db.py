@@ -1,74 +1,436 @@
-"""Database connection and initialization."""
-import os
+"""Database connections, pooling and initialization."""
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
 import psycopg2
-from dotenv import load_dotenv
+import psycopg2.extensions
+from app.config import Config
+from app.services import query_trace
+from app.services.metrics import (DB_CONNECTIONS_OPEN, DB_CONNECTIONS_OPENED, DB_POOL_TIMEOUTS,
+                                  DB_POOL_WAIT, DB_QUERY_DURATION, DB_QUERY_ERRORS, DB_READS)
 
-load_dotenv()
+# SQL commands reported as metric labels; anything else is OTHER
+_OPERATIONS = frozenset(('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'COPY', 'CREATE',
+                         'ALTER', 'DROP', 'LISTEN', 'NOTIFY', 'ANALYZE', 'BEGIN', 'COMMIT'))
 
 
-def get_db_connection():
-    """Get a database connection."""
-    database_url = os.getenv('DATABASE_URL')
+def _operation(query) -> str:
+    """Leading SQL command of a statement, for metric labels."""
+    if isinstance(query, bytes):
+        query = query[:32].decode('ascii', 'replace')
+    elif not isinstance(query, str):
+        return 'OTHER'
+    words = query[:32].split(None, 1)
+    command = words[0].upper() if words else ''
+    return command if command in _OPERATIONS else 'OTHER'
+
+
+# Commands that leave no session state behind; after any other (SET, LISTEN,
+# temporary tables, ...) a pooled connection is cleaned with DISCARD ALL
+_STATELESS = frozenset(('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'COPY', 'NOTIFY',
+                        'BEGIN', 'COMMIT'))
+
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """Cursor recording each statement's duration by SQL command, and tracing it."""
+    
+    def _timed(self, query, run):
+        operation = _operation(query)
+        if operation not in _STATELESS:
+            self.connection._dirty = True
+        start = time.perf_counter()
+        try:
+            return run()
+        except Exception:
+            DB_QUERY_ERRORS.inc(operation)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            DB_QUERY_DURATION.observe(elapsed, operation)
+            query_trace.record(query, elapsed, self.rowcount)
+    
+    def execute(self, query, vars=None):
+        return self._timed(query, lambda: super(TimedCursor, self).execute(query, vars))
+    
+    def executemany(self, query, vars_list):
+        return self._timed(query, lambda: super(TimedCursor, self).executemany(query, vars_list))
+    
+    def copy_expert(self, sql, file, size=8192):
+        return self._timed(sql, lambda: super(TimedCursor, self).copy_expert(sql, file, size))
+
+
+class TimedConnection(psycopg2.extensions.connection):
+    """Connection handing out TimedCursors and counted while open.
+    
+    A connection checked out of a ConnectionPool goes back to it on
+    ``close()`` instead of closing.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = TimedCursor
+        self._counted = True
+        self._dirty = False
+        self._pool: Optional['ConnectionPool'] = None
+        DB_CONNECTIONS_OPENED.inc()
+        DB_CONNECTIONS_OPEN.inc()
+    
+    def close(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.putconn(self)
+            return
+        if self._counted:
+            self._counted = False
+            DB_CONNECTIONS_OPEN.dec()
+        super().close()
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no pooled connection frees up within the pool timeout."""
+    pass
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of connections to one database.
+    
+    ``getconn`` reuses the most recently returned idle connection, opens a
+    new one while fewer than ``max_size`` exist, and otherwise waits up to
+    ``timeout`` seconds for one to be returned. Returned connections are
+    rolled back and, if a statement changed session state, cleaned with
+    DISCARD ALL; broken ones are dropped, as are connections left idle
+    longer than ``max_idle_seconds`` (servers and proxies close those).
+    """
+    
+    def __init__(self, dsn: str, name: str = 'primary', max_size: int = None,
+                 timeout: float = None, max_idle_seconds: float = None):
+        self.dsn = dsn
+        self.name = name
+        self.max_size = max_size or Config.DB_POOL_SIZE
+        self.timeout = timeout if timeout is not None else Config.DB_POOL_TIMEOUT
+        self.max_idle_seconds = (max_idle_seconds if max_idle_seconds is not None
+                                 else Config.DB_POOL_MAX_IDLE_SECONDS)
+        self._cond = threading.Condition()
+        # (connection, returned at), most recently returned last
+        self._idle: List[Tuple[TimedConnection, float]] = []
+        # Connections open or being opened, idle or in use
+        self._size = 0
+        self.counters = {'created': 0, 'reused': 0, 'discarded': 0, 'waits': 0, 'timeouts': 0}
+    
+    def _discard(self, conn: TimedConnection):
+        """Close a connection the pool no longer tracks; caller holds the lock."""
+        self._size -= 1
+        self.counters['discarded'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+    
+    def getconn(self) -> TimedConnection:
+        """Check out a connection; ``close()`` on it returns it to the pool.
+        
+        Raises:
+            PoolExhaustedError: If every connection stays in use for ``timeout`` seconds.
+        """
+        waited_since = None
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._idle:
+                    conn, returned_at = self._idle.pop()
+                    if conn.closed or now - returned_at > self.max_idle_seconds:
+                        self._discard(conn)
+                        continue
+                    self.counters['reused'] += 1
+                    conn._pool = self
+                    if waited_since is not None:
+                        DB_POOL_WAIT.observe(now - waited_since, self.name)
+                    return conn
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                if waited_since is None:
+                    waited_since = now
+                    self.counters['waits'] += 1
+                remaining = waited_since + self.timeout - now
+                if remaining <= 0:
+                    self.counters['timeouts'] += 1
+                    DB_POOL_TIMEOUTS.inc(self.name)
+                    raise PoolExhaustedError(
+                        f"No {self.name} database connection free after {self.timeout:g}s "
+                        f"({self.max_size} in use)")
+                self._cond.wait(remaining)
+        
+        # Connect outside the lock so slow connects do not block returns
+        try:
+            conn = psycopg2.connect(self.dsn, connection_factory=TimedConnection)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.counters['created'] += 1
+        if waited_since is not None:
+            DB_POOL_WAIT.observe(time.monotonic() - waited_since, self.name)
+        conn._pool = self
+        return conn
+    
+    def _reset(self, conn: TimedConnection):
+        if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+        if conn._dirty:
+            conn.autocommit = True
+            # A plain cursor: the cleanup is not the caller's query
+            cur = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+            cur.execute("DISCARD ALL")
+            cur.close()
+            conn._dirty = False
+        conn.set_session(isolation_level='DEFAULT', readonly='DEFAULT', deferrable='DEFAULT',
+                         autocommit=False)
+    
+    def putconn(self, conn: TimedConnection):
+        """Return a checked-out connection, dropping it if it is broken."""
+        conn._pool = None
+        if not conn.closed:
+            try:
+                self._reset(conn)
+            except Exception:
+                conn.close()
+        with self._cond:
+            if conn.closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+    
+    def closeall(self):
+        """Close idle connections; ones in use close when returned."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            for conn, _ in idle:
+                self._discard(conn)
+    
+    def stats(self) -> Dict:
+        """Pool size, current use and lifetime counters."""
+        with self._cond:
+            stats = dict(self.counters)
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+        stats['max_size'] = self.max_size
+        return stats
+
+
+# Replay delay of a standby; 0 on a primary or a standby that has replayed all it received
+_LAG_QUERY = """
+    SELECT CASE WHEN NOT pg_is_in_recovery()
+                  OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END
+"""
+
+
+class ReplicaSet:
+    """Read replicas, one pool each, taken in turn while their lag is acceptable.
+    
+    A replica's replication lag is measured on the connection being checked
+    out at most every ``check_seconds``; one lagging more than
+    ``max_lag_seconds``, or failing to connect, is skipped until its next
+    check. ``getconn`` returns None when no replica qualifies, so the caller
+    falls back to the primary.
+    """
+    
+    def __init__(self, urls: List[str], max_lag_seconds: float = None,
+                 check_seconds: float = None):
+        self.pools = [ConnectionPool(url, f'replica{i}') for i, url in enumerate(urls, 1)]
+        self.max_lag_seconds = (max_lag_seconds if max_lag_seconds is not None
+                                else Config.DB_REPLICA_MAX_LAG_SECONDS)
+        self.check_seconds = (check_seconds if check_seconds is not None
+                              else Config.DB_REPLICA_CHECK_SECONDS)
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+        # Per pool name: last measured lag (None if unreachable), when, and any error
+        self._state = {pool.name: {'lag_seconds': None, 'checked_at': None, 'error': None}
+                       for pool in self.pools}
+    
+    def _measure(self, conn: TimedConnection) -> float:
+        # A plain cursor: the check is not the caller's query
+        cur = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+        try:
+            cur.execute(_LAG_QUERY)
+            lag = cur.fetchone()[0]
+        finally:
+            cur.close()
+            conn.rollback()
+        return float('inf') if lag is None else float(lag)
+    
+    def _record(self, pool: ConnectionPool, lag: Optional[float], error: str = None):
+        with self._lock:
+            self._state[pool.name].update(lag_seconds=lag, error=error)
+    
+    def _claim_check(self, pool: ConnectionPool, now: float) -> Optional[bool]:
+        """True if this caller should measure the pool's lag now, False if it
+        need not, and None if the pool is known to be unusable until its next check."""
+        with self._lock:
+            state = self._state[pool.name]
+            if state['checked_at'] is None or now - state['checked_at'] >= self.check_seconds:
+                state['checked_at'] = now
+                return True
+            lag = state['lag_seconds']
+            if lag is None or lag > self.max_lag_seconds:
+                return None
+            return False
+    
+    def getconn(self) -> Optional[TimedConnection]:
+        """A connection to the next usable replica, or None if none is."""
+        first = next(self._turn)
+        for offset in range(len(self.pools)):
+            pool = self.pools[(first + offset) % len(self.pools)]
+            check = self._claim_check(pool, time.monotonic())
+            if check is None:
+                continue
+            try:
+                conn = pool.getconn()
+            except Exception as e:
+                self._record(pool, None, str(e))
+                continue
+            if check:
+                try:
+                    lag = self._measure(conn)
+                except Exception as e:
+                    conn.close()
+                    self._record(pool, None, str(e))
+                    continue
+                self._record(pool, lag)
+                if lag > self.max_lag_seconds:
+                    conn.close()
+                    continue
+            return conn
+        return None
+    
+    def status(self) -> Dict[str, Dict]:
+        """Last measured lag and error per replica."""
+        with self._lock:
+            return {name: {'lag_seconds': state['lag_seconds'], 'error': state['error'],
+                           'usable': (state['lag_seconds'] is not None
+                                      and state['lag_seconds'] <= self.max_lag_seconds)}
+                    for name, state in self._state.items()}
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+_replicas: Optional[ReplicaSet] = None
+# Until when (epoch seconds) reads in this context must see its own writes
+_primary_until: ContextVar[float] = ContextVar('primary_until', default=0.0)
+
+
+def get_pool() -> ConnectionPool:
+    """The process-wide pool for DATABASE_URL."""
+    pool = _pools.get('primary')
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get('primary')
+            if pool is None:
+                pool = _pools['primary'] = ConnectionPool(_database_url(), 'primary')
+    return pool
+
+
+def get_replicas() -> Optional[ReplicaSet]:
+    """The process-wide ReplicaSet for DATABASE_REPLICA_URLS; None if none are set."""
+    global _replicas
+    if _replicas is None:
+        urls = [url.strip() for url in Config.DATABASE_REPLICA_URLS.split(',') if url.strip()]
+        if not urls:
+            return None
+        with _pools_lock:
+            if _replicas is None:
+                replicas = ReplicaSet(urls)
+                for pool in replicas.pools:
+                    _pools[pool.name] = pool
+                _replicas = replicas
+    return _replicas
+
+
+def pool_stats() -> Dict[str, Dict]:
+    """Stats of every pool opened in this process, by pool name."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.name: pool.stats() for pool in pools}
+
+
+def _database_url() -> str:
+    database_url = Config.DATABASE_URL
     if not database_url:
         raise ValueError("DATABASE_URL environment variable is not set")
-    return psycopg2.connect(database_url)
+    return database_url
+
+
+def get_db_connection(pooled: bool = True):
+    """Get a database connection.
+    
+    Connections come from the process-wide pool (see ConnectionPool) unless
+    DB_POOL_SIZE is 0 or ``pooled`` is False, as for connections held for
+    the life of the process; either way, ``close()`` releases it.
+    """
+    if pooled and Config.DB_POOL_SIZE > 0:
+        return get_pool().getconn()
+    return psycopg2.connect(_database_url(), connection_factory=TimedConnection)
+
+
+def stick_to_primary(seconds: float = None):
+    """Send this context's reads to the primary for ``seconds`` (default
+    DB_READ_YOUR_WRITES_SECONDS), so they see a write it just made."""
+    seconds = Config.DB_READ_YOUR_WRITES_SECONDS if seconds is None else seconds
+    _primary_until.set(max(_primary_until.get(), time.time() + seconds))
+
+
+def primary_until() -> float:
+    """Until when (epoch seconds) this context reads from the primary."""
+    return _primary_until.get()
+
+
+def set_primary_until(until: float):
+    """Restore stickiness carried over from an earlier request, e.g. in the session."""
+    _primary_until.set(until or 0.0)
+
+
+def get_read_connection():
+    """Get a connection for read-only queries that may lag slightly behind writes.
+    
+    With DATABASE_REPLICA_URLS set (and pooling on), this is a replica whose
+    replication lag is within DB_REPLICA_MAX_LAG_SECONDS. It is the primary
+    otherwise: when no replica qualifies, and while ``stick_to_primary``
+    is in effect for this context.
+    """
+    if not Config.DATABASE_REPLICA_URLS or Config.DB_POOL_SIZE <= 0:
+        return get_db_connection()
+    if _primary_until.get() > time.time():
+        DB_READS.inc('sticky')
+        return get_db_connection()
+    replicas = get_replicas()
+    conn = replicas.getconn() if replicas is not None else None
+    if conn is None:
+        DB_READS.inc('fallback')
+        return get_db_connection()
+    DB_READS.inc('replica')
+    return conn
 
 
 def init_db():
-    """Initialize database tables."""
-    conn = get_db_connection()
-    cur = conn.cursor()
+    """Bring the database schema up to date (see app.services.migrations).
     
+    Returns immediately, after one query, when no migration is pending.
+    """
+    from app.services.migrations import migrate
     try:
-        # Create users table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                password_hash VARCHAR(255) NOT NULL,
-                created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create alert_rules table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS alert_rules (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                currency_symbol VARCHAR(10) NOT NULL,
-                condition CHAR(1) NOT NULL,
-                threshold_price NUMERIC(20, 8) NOT NULL,
-                is_active BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create price_history table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS price_history (
-                id SERIAL PRIMARY KEY,
-                currency_symbol VARCHAR(10) NOT NULL,
-                price_usd NUMERIC(20, 8) NOT NULL,
-                timestamp TIMESTAMP WITH TIME ZONE NOT NULL
-            )
-        """)
-        
-        # Create index for faster price lookups
-        cur.execute("""
-            CREATE INDEX IF NOT EXISTS idx_price_history_symbol_timestamp 
-            ON price_history (currency_symbol, timestamp DESC)
-        """)
-        
-        conn.commit()
-        print("Database tables initialized successfully.")
-        return True
+        applied = migrate(get_db_connection)
     except Exception as e:
-        conn.rollback()
         print(f"Error initializing database: {e}")
         raise
-    finally:
-        cur.close()
-        conn.close()
+    if applied:
+        print(f"Database migrated to version {applied[-1]}.")
+    return True
 
 
 if __name__ == "__main__":
@@ -1,32 +1,84 @@
 """Email service for sending notifications."""
-import os
 import smtplib
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from dotenv import load_dotenv
-
-load_dotenv()
+from typing import Optional
+from app.config import Config
+from app.services.email_templates import get_alert_template
+from app.services.metrics import SMTP_QUEUE_DEPTH, SMTP_SEND_DURATION, SMTP_WORKERS_BUSY
+from app.services.rate_limit import TokenBucket
 
 
 class EmailService:
-    """Service for sending email notifications via 163 Mail SMTP."""
+    """Service for sending email notifications via 163 Mail SMTP.
+    
+    Single messages go out over a fresh connection. Bulk notifications
+    should use ``dispatch_alert_email``, which sends through a bounded pool
+    of workers that each keep their own SMTP session open, paced by a token
+    bucket sized to the provider's sends-per-minute limit.
+    """
     
-    SMTP_SERVER = "smtp.163.com"
-    SMTP_PORT = 465  # SSL port
+    SMTP_SERVER = Config.SMTP_SERVER
+    SMTP_PORT = Config.SMTP_PORT  # SSL port
+    SMTP_TIMEOUT = 30
     
-    def __init__(self):
-        self.username = os.getenv('MAIL_USERNAME')
-        self.password = os.getenv('MAIL_PASSWORD')
-        self.admin_email = os.getenv('ADMIN_EMAIL')
+    def __init__(self, smtp_server: str = None, smtp_port: int = None, use_ssl: bool = None,
+                 max_workers: int = None, sends_per_minute: float = None,
+                 max_pending: int = None):
+        self.username = Config.MAIL_USERNAME
+        self.password = Config.MAIL_PASSWORD
+        self.admin_email = Config.ADMIN_EMAIL
+        self.smtp_server = smtp_server or self.SMTP_SERVER
+        self.smtp_port = smtp_port or self.SMTP_PORT
+        self.use_ssl = Config.SMTP_USE_SSL if use_ssl is None else use_ssl
+        self.html_alerts = Config.MAIL_HTML_ALERTS
+        self.max_workers = max_workers or Config.MAIL_MAX_WORKERS
+        self.max_pending = max_pending or Config.MAIL_MAX_PENDING
+        self.limiter = TokenBucket(sends_per_minute or Config.MAIL_SENDS_PER_MINUTE)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
     
     def _create_connection(self):
         """Create SMTP connection."""
-        server = smtplib.SMTP_SSL(self.SMTP_SERVER, self.SMTP_PORT)
-        server.login(self.username, self.password)
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, timeout=self.SMTP_TIMEOUT)
+        else:
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.SMTP_TIMEOUT)
+        if self.username:
+            server.login(self.username, self.password)
         return server
     
-    def send_alert_email(self, to_email: str, currency: str, condition: str, 
-                         threshold: float, current_price: float) -> bool:
+    @staticmethod
+    def _sendmail(server, from_addr: str, to_addr: str, message, kind: str):
+        """sendmail on ``server``, recording its latency and outcome."""
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            server.sendmail(from_addr, to_addr, message)
+            outcome = 'ok'
+        finally:
+            SMTP_SEND_DURATION.observe(time.perf_counter() - start, kind, outcome)
+    
+    def _build_alert_message(self, to_email: str, currency: str, condition: str,
+                             threshold: float, current_price: float,
+                             description: Optional[str] = None) -> bytes:
+        """Build the serialized alert notification message."""
+        template = get_alert_template(currency, condition, description)
+        return template.render(self.username, to_email, threshold, current_price,
+                               html=self.html_alerts)
+    
+    def send_alert_email(self, to_email: str, currency: str, condition: str,
+                         threshold: float, current_price: float,
+                         description: Optional[str] = None) -> bool:
         """Send price alert notification email.
         
         Args:
@@ -35,38 +87,17 @@ class EmailService:
             condition: Alert condition ('>' or '<').
             threshold: Price threshold that was set.
             current_price: Current price that triggered the alert.
-            
+            description: Condition text for non-threshold rules.
+        
         Returns:
             True if email was sent successfully.
         """
         try:
-            condition_text = "above" if condition == '>' else "below"
-            
-            subject = f"[CryptoAlert] {currency} Price Alert"
-            
-            body = f"""
-Hello!
-
-Your cryptocurrency price alert has been triggered:
-
-Currency: {currency}
-Condition: Price {condition_text} ${threshold:,.2f}
-Current Price: ${current_price:,.2f}
-
-This is an automated notification. Please do not reply directly.
-
----
-CryptoAlert Price Monitoring System
-            """.strip()
-            
-            msg = MIMEMultipart()
-            msg['From'] = self.username
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            msg.attach(MIMEText(body, 'plain', 'utf-8'))
+            message = self._build_alert_message(to_email, currency, condition,
+                                                threshold, current_price, description)
             
             server = self._create_connection()
-            server.sendmail(self.username, to_email, msg.as_string())
+            self._sendmail(server, self.username, to_email, message, 'alert')
             server.quit()
             
             return True
@@ -74,13 +105,131 @@ CryptoAlert Price Monitoring System
             print(f"Failed to send alert email: {e}")
             return False
     
+    def dispatch_alert_email(self, to_email: str, currency: str, condition: str,
+                             threshold: float, current_price: float,
+                             timeout: Optional[float] = None,
+                             description: Optional[str] = None) -> Future:
+        """Queue a price alert email on the worker pool.
+        
+        Blocks while ``max_pending`` messages are already queued, so callers
+        cannot build an unbounded backlog.
+        
+        Args:
+            timeout: Seconds to wait for a free queue slot (None waits forever).
+            description: Condition text for non-threshold rules.
+        
+        Returns:
+            Future resolving to True if the email was sent successfully.
+        
+        Raises:
+            RuntimeError: If no queue slot became free within ``timeout``.
+        """
+        message = self._build_alert_message(to_email, currency, condition,
+                                            threshold, current_price, description)
+        return self._submit(to_email, message, timeout)
+    
+    def _submit(self, to_email: str, message: bytes, timeout: Optional[float]) -> Future:
+        if not self._slots.acquire(timeout=timeout):
+            raise RuntimeError("Email dispatch queue is full")
+        try:
+            future = self._get_executor().submit(self._deliver_pooled, to_email, message)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._sessions_lock:
+            self._pending += 1
+        SMTP_QUEUE_DEPTH.inc()
+        future.add_done_callback(self._release_slot)
+        return future
+    
+    def _release_slot(self, _future):
+        with self._sessions_lock:
+            self._pending -= 1
+        SMTP_QUEUE_DEPTH.dec()
+        self._slots.release()
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='email')
+            return self._executor
+    
+    def _get_session(self):
+        """Get this worker thread's SMTP session, connecting if needed."""
+        server = getattr(self._local, 'server', None)
+        if server is None:
+            server = self._create_connection()
+            self._local.server = server
+            with self._sessions_lock:
+                self._sessions.append(server)
+        return server
+    
+    def _drop_session(self):
+        server = getattr(self._local, 'server', None)
+        self._local.server = None
+        if server is not None:
+            with self._sessions_lock:
+                if server in self._sessions:
+                    self._sessions.remove(server)
+            try:
+                server.close()
+            except Exception:
+                pass
+    
+    def _deliver_pooled(self, to_email: str, message: bytes) -> bool:
+        """Send over the worker's reused session, reconnecting once if it dropped.
+        
+        A message the server rejects is not retried, and the session is kept.
+        """
+        self.limiter.acquire()
+        SMTP_WORKERS_BUSY.inc()
+        try:
+            for attempt in range(2):
+                try:
+                    self._sendmail(self._get_session(), self.username, to_email, message, 'alert')
+                    return True
+                except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as e:
+                    # SMTP errors subclass OSError; a rejection is not a dropped connection
+                    print(f"Alert email to {to_email} rejected: {e}")
+                    return False
+                except (smtplib.SMTPServerDisconnected, ConnectionError, socket.timeout) as e:
+                    self._drop_session()
+                    if attempt:
+                        print(f"Failed to send alert email: {e}")
+                except Exception as e:
+                    print(f"Failed to send alert email: {e}")
+                    return False
+            return False
+        finally:
+            SMTP_WORKERS_BUSY.dec()
+    
+    @property
+    def pending_count(self) -> int:
+        """Number of messages queued or in flight on the worker pool."""
+        return self._pending
+    
+    def close(self):
+        """Wait for queued messages, then close all pooled SMTP sessions."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for server in sessions:
+            try:
+                server.quit()
+            except Exception:
+                pass
+    
     def send_admin_alert(self, error_message: str, task_name: str = "Background Task") -> bool:
         """Send error alert to admin.
         
         Args:
             error_message: Error message to include.
             task_name: Name of the failed task.
-            
+        
         Returns:
             True if email was sent successfully.
         """
@@ -110,10 +259,61 @@ CryptoAlert System Alert
             msg.attach(MIMEText(body, 'plain', 'utf-8'))
             
             server = self._create_connection()
-            server.sendmail(self.username, self.admin_email, msg.as_string())
+            self._sendmail(server, self.username, self.admin_email, msg.as_string(), 'admin')
             server.quit()
             
             return True
         except Exception as e:
             print(f"Failed to send admin alert: {e}")
             return False
+    
+    def send_admin_digest(self, entries) -> bool:
+        """Send one summary email for repeated background task failures.
+        
+        Args:
+            entries: Claimed ``AdminAlertLog`` entries; ``pending`` is the number
+                of occurrences since the previous notification.
+        
+        Returns:
+            True if email was sent successfully.
+        """
+        if not self.admin_email:
+            print("Admin email not configured")
+            return False
+        
+        try:
+            total = sum(entry.pending for entry in entries)
+            subject = f"[CryptoAlert Alert] {total} Repeated Task Failures"
+            
+            sections = []
+            for entry in entries:
+                first = entry.pending_since or entry.first_seen
+                sections.append(
+                    f"Task Name: {entry.task_name}\n"
+                    f"Error Message: {entry.error_message}\n"
+                    f"Occurrences: {entry.pending} (total {entry.occurrences})\n"
+                    f"First Seen: {first:%Y-%m-%d %H:%M:%S %Z}\n"
+                    f"Last Seen: {entry.last_seen:%Y-%m-%d %H:%M:%S %Z}"
+                )
+            
+            body = (
+                "Administrator,\n\n"
+                "The following background task failures repeated since the last notification:\n\n"
+                + "\n\n".join(sections)
+                + "\n\n---\nCryptoAlert System Alert"
+            )
+            
+            msg = MIMEMultipart()
+            msg['From'] = self.username
+            msg['To'] = self.admin_email
+            msg['Subject'] = subject
+            msg.attach(MIMEText(body, 'plain', 'utf-8'))
+            
+            server = self._create_connection()
+            self._sendmail(server, self.username, self.admin_email, msg.as_string(), 'admin')
+            server.quit()
+            
+            return True
+        except Exception as e:
+            print(f"Failed to send admin digest: {e}")
+            return False
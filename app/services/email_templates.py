@@ -0,0 +1,154 @@
+"""Precompiled alert email templates.
+
+Everything that only depends on the (currency, condition) pair -- subject
+header, body text around the numbers, MIME headers -- is built once and
+cached. Rendering a message for a recipient then only formats the two
+prices and the addresses into raw message text; the ``email`` package is
+only used for the rare recipient address that needs header encoding.
+"""
+import os
+import uuid
+from functools import lru_cache
+from email.header import Header
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'templates', 'email')
+
+
+def _encode_header(value: str) -> str:
+    """RFC 2047-encode a header value when it is not plain ASCII."""
+    if value.isascii():
+        return value
+    return Header(value, 'utf-8').encode()
+
+
+class AlertEmailTemplate:
+    """Alert email compiled for a single (currency, condition) pair.
+    
+    Rules other than plain price thresholds pass their full ``description``
+    (e.g. "Moves ±5% within 60 min"), which replaces the threshold line.
+    """
+    
+    def __init__(self, currency: str, condition: str, description: str = None):
+        self.currency = currency
+        self.condition = condition
+        self.description = description
+        self.condition_text = "above" if condition == '>' else "below"
+        self.subject = f"[CryptoAlert] {currency} Price Alert"
+        
+        self._body_head = (
+            "Hello!\n"
+            "\n"
+            "Your cryptocurrency price alert has been triggered:\n"
+            "\n"
+            f"Currency: {currency}\n"
+            + (f"Condition: {description}" if description
+               else f"Condition: Price {self.condition_text} $")
+        )
+        self._body_mid = "\nCurrent Price: $"
+        self._body_tail = (
+            "\n"
+            "\n"
+            "This is an automated notification. Please do not reply directly.\n"
+            "\n"
+            "---\n"
+            "CryptoAlert Price Monitoring System"
+        )
+        
+        encoding = '7bit' if (self._body_head + self._body_tail).isascii() else '8bit'
+        text_headers = (
+            'Content-Type: text/plain; charset="utf-8"\r\n'
+            f"Content-Transfer-Encoding: {encoding}\r\n"
+        )
+        subject_headers = (
+            f"Subject: {_encode_header(self.subject)}\r\n"
+            "MIME-Version: 1.0\r\n"
+        )
+        self._headers_tail = f"{subject_headers}{text_headers}\r\n"
+        
+        boundary = f"=_alert_{uuid.uuid4().hex}"
+        self._alt_headers_tail = (
+            f"{subject_headers}"
+            f'Content-Type: multipart/alternative; boundary="{boundary}"\r\n'
+            "\r\n"
+            f"--{boundary}\r\n{text_headers}\r\n"
+        )
+        self._alt_html_part = (
+            f"\r\n--{boundary}\r\n"
+            'Content-Type: text/html; charset="utf-8"\r\n'
+            "Content-Transfer-Encoding: 8bit\r\n"
+            "\r\n"
+        )
+        self._alt_end = f"\r\n--{boundary}--\r\n"
+    
+    def render_text(self, threshold: float, current_price: float) -> str:
+        """Render the plain-text body for one alert."""
+        threshold_text = '' if self.description else f"{threshold:,.2f}"
+        return (f"{self._body_head}{threshold_text}"
+                f"{self._body_mid}{current_price:,.2f}{self._body_tail}")
+    
+    def render_html(self, threshold: float, current_price: float) -> str:
+        """Render the HTML body for one alert from the cached Jinja template."""
+        return _html_template().render(
+            currency=self.currency,
+            condition=self.description or f"Price {self.condition_text} ${threshold:,.2f}",
+            current_price=f"{current_price:,.2f}",
+        )
+    
+    def render(self, sender: str, to_email: str, threshold: float,
+               current_price: float, html: bool = False) -> bytes:
+        """Render a complete message ready for ``smtplib.sendmail``.
+        
+        Args:
+            sender: From address.
+            to_email: Recipient address.
+            threshold: Price threshold of the triggered rule.
+            current_price: Price that triggered the rule.
+            html: Also include an HTML alternative part.
+        
+        Returns:
+            The serialized message.
+        """
+        text = self.render_text(threshold, current_price)
+        html_body = self.render_html(threshold, current_price) if html else None
+        if not to_email.isascii() or not (sender or '').isascii():
+            return self._render_mime(sender, to_email, text, html_body)
+        
+        text = text.replace("\n", "\r\n")
+        if html_body is None:
+            return f"From: {sender}\r\nTo: {to_email}\r\n{self._headers_tail}{text}".encode('utf-8')
+        html_body = html_body.replace("\r\n", "\n").replace("\n", "\r\n")
+        return (f"From: {sender}\r\nTo: {to_email}\r\n{self._alt_headers_tail}{text}"
+                f"{self._alt_html_part}{html_body}{self._alt_end}").encode('utf-8')
+    
+    def _render_mime(self, sender, to_email, text, html_body) -> bytes:
+        """Full ``email`` package path for messages with non-ASCII addresses."""
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+        
+        text_part = MIMEText(text, 'plain', 'utf-8')
+        if html_body is None:
+            msg = text_part
+        else:
+            msg = MIMEMultipart('alternative')
+            msg.attach(text_part)
+            msg.attach(MIMEText(html_body, 'html', 'utf-8'))
+        msg['From'] = sender
+        msg['To'] = to_email
+        msg['Subject'] = self.subject
+        return msg.as_bytes()
+
+
+@lru_cache(maxsize=256)
+def get_alert_template(currency: str, condition: str, description: str = None) -> AlertEmailTemplate:
+    """Get the compiled template for a (currency, condition) pair."""
+    return AlertEmailTemplate(currency, condition, description)
+
+
+@lru_cache(maxsize=1)
+def _html_template():
+    """Load and compile the HTML alert template once per process."""
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+    env = Environment(loader=FileSystemLoader(TEMPLATE_DIR),
+                      autoescape=select_autoescape(['html']))
+    return env.get_template('alert.html')
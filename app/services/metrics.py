@@ -0,0 +1,320 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Recording is lock-free: every thread writes to its own shard of each
+metric, found through a ``threading.local``, and shards are only summed
+when the metrics are collected. A lock is taken once per thread per metric
+(to register the shard) and at collection, when shards of finished threads
+are folded into a retired total so per-request threads do not accumulate.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; covers sub-millisecond queries up to slow external calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Shards registered before finished threads are folded in without waiting for a scrape
+_MAX_SHARDS = 256
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric(ABC):
+    """Per-thread sharded values keyed by label tuple."""
+    
+    kind = 'untyped'
+    
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[Tuple[threading.Thread, Dict]] = []
+        self._retired: Dict = {}
+    
+    def _shard(self) -> Dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = {}
+            with self._lock:
+                if len(self._shards) >= _MAX_SHARDS:
+                    self._retire()
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+            return shard
+    
+    @abstractmethod
+    def _merge(self, into: Dict, shard: Dict):
+        """Add a shard's values into ``into``, in place."""
+    
+    def _retire(self):
+        """Fold shards of finished threads into the retired total; caller holds the lock."""
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                self._merge(self._retired, shard)
+        self._shards = live
+    
+    def collect(self) -> Dict:
+        """Values summed over every thread, keyed by label tuple."""
+        with self._lock:
+            self._retire()
+            total = {}
+            self._merge(total, self._retired)
+            for _, shard in self._shards:
+                # Copy first: the owning thread may add keys meanwhile
+                self._merge(total, dict(shard))
+        return total
+    
+    def clear(self):
+        """Reset every value (tests only; not safe while other threads record)."""
+        with self._lock:
+            self._shards = []
+            self._retired = {}
+            self._local = threading.local()
+
+
+class Counter(_Metric):
+    """Monotonic count per label set."""
+    
+    kind = 'counter'
+    
+    def inc(self, *labels, amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+    
+    def _merge(self, into: Dict, shard: Dict):
+        for key, value in shard.items():
+            into[key] = into.get(key, 0) + value
+    
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self.collect().items())]
+
+
+class Gauge(Counter):
+    """Level per label set, moved up and down by any thread (e.g. items in use)."""
+    
+    kind = 'gauge'
+    
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class CallbackGauge:
+    """Gauge read from a callback at collection time.
+    
+    The callback returns a number, or (label tuple, value) pairs when the
+    gauge has labels; None means nothing to report.
+    """
+    
+    kind = 'gauge'
+    
+    def __init__(self, name: str, help: str, callback: Callable,
+                 labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._callback = callback
+    
+    def render(self) -> List[str]:
+        try:
+            value = self._callback()
+        except Exception as e:
+            print(f"Failed to collect metric {self.name}: {e}")
+            return []
+        if value is None:
+            return []
+        pairs = [((), value)] if not self.labelnames else value
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+                for key, v in pairs]
+
+
+class Histogram(_Metric):
+    """Distribution of observations per label set, in fixed buckets."""
+    
+    kind = 'histogram'
+    
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per bucket counts, then +Inf, sum and count
+        self._width = len(self.buckets) + 3
+    
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        values = shard.get(labels)
+        if values is None:
+            values = shard[labels] = [0] * self._width
+        values[bisect_left(self.buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+    
+    @contextmanager
+    def time(self, *labels):
+        """Observe the duration of the ``with`` block, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+    
+    def _merge(self, into: Dict, shard: Dict):
+        for key, values in shard.items():
+            current = into.get(key)
+            if current is None:
+                into[key] = list(values)
+            else:
+                for i, value in enumerate(values):
+                    current[i] += value
+    
+    def render(self) -> List[str]:
+        lines = []
+        bounds = self.buckets + (float('inf'),)
+        for key, values in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, values):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} "
+                             f"{cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{labels} {values[-1]}")
+        return lines
+
+
+class Registry:
+    """Named metrics rendered together."""
+    
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+    
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+    
+    def get(self, name: str):
+        return self._metrics.get(name)
+    
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+    
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+    
+    def callback_gauge(self, name, help, callback, labelnames=()) -> CallbackGauge:
+        return self.register(CallbackGauge(name, help, callback, labelnames))
+    
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+    
+    def render(self) -> str:
+        """Every metric in the Prometheus text format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by blueprint and route.',
+    ('blueprint', 'endpoint', 'method', 'status'))
+DB_QUERY_DURATION = REGISTRY.histogram(
+    'db_query_duration_seconds', 'Database statement latency by SQL command.', ('operation',))
+DB_QUERY_ERRORS = REGISTRY.counter(
+    'db_query_errors_total', 'Database statements that raised, by SQL command.', ('operation',))
+DB_CONNECTIONS_OPENED = REGISTRY.counter(
+    'db_connections_opened_total', 'Database connections opened.')
+DB_CONNECTIONS_OPEN = REGISTRY.gauge(
+    'db_connections_open', 'Database connections currently open in this process.')
+DB_POOL_WAIT = REGISTRY.histogram(
+    'db_pool_wait_seconds', 'Time spent waiting for a free pooled connection, by pool.',
+    ('pool',))
+DB_POOL_TIMEOUTS = REGISTRY.counter(
+    'db_pool_timeouts_total', 'Connection checkouts that gave up waiting, by pool.', ('pool',))
+DB_READS = REGISTRY.counter(
+    'db_reads_total', 'Read-only checkouts with replicas configured, by where they went.',
+    ('route',))
+COINGECKO_REQUEST_DURATION = REGISTRY.histogram(
+    'coingecko_request_duration_seconds', 'CoinGecko API request latency by path and outcome.',
+    ('path', 'outcome'))
+COINGECKO_ERRORS = REGISTRY.counter(
+    'coingecko_errors_total', 'Failed CoinGecko API calls by reason.', ('reason',))
+SMTP_SEND_DURATION = REGISTRY.histogram(
+    'smtp_send_duration_seconds', 'SMTP send latency by message kind and outcome.',
+    ('kind', 'outcome'))
+SMTP_QUEUE_DEPTH = REGISTRY.gauge(
+    'smtp_queue_depth', 'Alert emails queued or in flight on the worker pool.')
+SMTP_WORKERS_BUSY = REGISTRY.gauge(
+    'smtp_workers_busy', 'Email worker threads currently sending.')
+ALERT_STAGE_DURATION = REGISTRY.histogram(
+    'alert_run_stage_duration_seconds', 'process_alerts time per stage.', ('stage',))
+ALERTS_CHECKED = REGISTRY.counter('alerts_checked_total', 'Alert rules evaluated.')
+ALERTS_TRIGGERED = REGISTRY.counter('alerts_triggered_total', 'Alert rules triggered.')
+
+
+def _tick_buffer_pending() -> Optional[int]:
+    from app.services import tick_buffer
+    return tick_buffer._buffer.pending() if tick_buffer._buffer is not None else None
+
+
+def _db_pool_connections() -> List[Tuple[Tuple[str, str], int]]:
+    from app.services.db import pool_stats
+    return [((name, state), stats[state]) for name, stats in sorted(pool_stats().items())
+            for state in ('in_use', 'idle', 'max_size')]
+
+
+def _db_replica_lag() -> Optional[List[Tuple[Tuple[str], float]]]:
+    from app.services import db
+    if db._replicas is None:
+        return None
+    return [((name,), state['lag_seconds']) for name, state in db._replicas.status().items()
+            if state['lag_seconds'] is not None]
+
+
+def _price_stream_clients() -> Optional[int]:
+    from app.services import price_stream
+    return price_stream._stream.metrics()['clients'] if price_stream._stream is not None else None
+
+
+REGISTRY.callback_gauge('tick_buffer_pending', 'Collected ticks not yet written to the database.',
+                        _tick_buffer_pending)
+REGISTRY.callback_gauge('db_pool_connections', 'Pooled database connections by pool and state.',
+                        _db_pool_connections, ('pool', 'state'))
+REGISTRY.callback_gauge('db_replica_lag_seconds', 'Last measured replication lag by replica.',
+                        _db_replica_lag, ('pool',))
+REGISTRY.callback_gauge('price_stream_clients', 'Connected price stream clients.',
+                        _price_stream_clients)
@@ -0,0 +1,173 @@
+"""Versioned schema migrations.
+
+Migrations are SQL files in app/migrations named ``NNNN_description.sql``
+and applied in version order; each applied version is recorded in the
+schema_version table. When the database is already current, ``migrate``
+costs a single SELECT and takes no locks beyond reading that table.
+
+A migration runs in one transaction together with its schema_version
+row, unless its first line is ``-- migrate: no-transaction``: those run
+statement by statement in autocommit mode, as CREATE INDEX CONCURRENTLY
+requires, and are recorded once every statement has succeeded.
+"""
+import os
+import re
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'migrations')
+NO_TRANSACTION = '-- migrate: no-transaction'
+# Serializes runners across processes (e.g. several cold starts at once)
+LOCK_KEY = 7_301_845_112
+_FILENAME = re.compile(r'^(\d+)_(\w+)\.sql$')
+_STATEMENT_END = re.compile(r';\s*$', re.MULTILINE)
+_CONCURRENT_INDEX = re.compile(r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+'
+                               r'(?:IF\s+NOT\s+EXISTS\s+)?(\w+)', re.IGNORECASE)
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    sql: str
+    
+    @property
+    def transactional(self) -> bool:
+        return not self.sql.lstrip().startswith(NO_TRANSACTION)
+    
+    def statements(self) -> List[str]:
+        """The migration's statements, skipping comment-only chunks."""
+        statements = []
+        for chunk in _STATEMENT_END.split(self.sql):
+            code = '\n'.join(line for line in chunk.splitlines()
+                             if not line.strip().startswith('--'))
+            if code.strip():
+                statements.append(chunk.strip())
+        return statements
+
+
+def load_migrations(directory: str = None) -> List[Migration]:
+    """Migrations in ``directory`` (default app/migrations), oldest first.
+    
+    Raises:
+        ValueError: If two files share a version number.
+    """
+    directory = directory or MIGRATIONS_DIR
+    migrations = {}
+    for filename in os.listdir(directory):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Duplicate migration version {version}: {filename}")
+        with open(os.path.join(directory, filename)) as f:
+            migrations[version] = Migration(version, match.group(2), f.read())
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def current_version(conn) -> int:
+    """Highest applied version, 0 for a database never migrated."""
+    from psycopg2.errors import UndefinedTable
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        return cur.fetchone()[0]
+    except UndefinedTable:
+        return 0
+    finally:
+        cur.close()
+        # Do not hold the read open while waiting for the migration lock
+        conn.rollback()
+
+
+def _drop_invalid_indexes(cur, migration: Migration):
+    """Drop indexes a failed concurrent build left INVALID, so the retry rebuilds them."""
+    names = _CONCURRENT_INDEX.findall(migration.sql)
+    if not names:
+        return
+    cur.execute("""SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                   WHERE NOT i.indisvalid AND c.relname = ANY(%s)
+                     AND pg_table_is_visible(c.oid)""", (names,))
+    for (name,) in cur.fetchall():
+        cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+def _apply(conn, migration: Migration):
+    started = time.perf_counter()
+    cur = conn.cursor()
+    try:
+        if migration.transactional:
+            for statement in migration.statements():
+                cur.execute(statement)
+        else:
+            conn.autocommit = True
+            try:
+                _drop_invalid_indexes(cur, migration)
+                for statement in migration.statements():
+                    cur.execute(statement)
+            finally:
+                conn.autocommit = False
+        cur.execute("INSERT INTO schema_version (version, name, duration_ms) VALUES (%s, %s, %s)",
+                    (migration.version, migration.name,
+                     int((time.perf_counter() - started) * 1000)))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def migrate(connect: Callable = None, directory: str = None,
+            target: Optional[int] = None) -> List[int]:
+    """Apply pending migrations up to ``target`` (default: all).
+    
+    Args:
+        connect: Returns a new connection (default get_db_connection).
+        directory: Where the migration files are (default app/migrations).
+        target: Highest version to apply.
+    
+    Returns:
+        Versions applied, oldest first; empty when the database was current.
+    """
+    if connect is None:
+        from app.services.db import get_db_connection
+        connect = get_db_connection
+    migrations = [m for m in load_migrations(directory) if target is None or m.version <= target]
+    if not migrations:
+        return []
+    
+    conn = connect()
+    try:
+        # Fast path: one read, no DDL and no catalog locks
+        if current_version(conn) >= migrations[-1].version:
+            return []
+        
+        cur = conn.cursor()
+        cur.execute("SELECT pg_advisory_lock(%s)", (LOCK_KEY,))
+        try:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR(255) NOT NULL,
+                    applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                    duration_ms INTEGER
+                )
+            """)
+            conn.commit()
+            # Another process may have migrated while this one waited for the lock
+            current = current_version(conn)
+            applied = []
+            for migration in migrations:
+                if migration.version > current:
+                    _apply(conn, migration)
+                    applied.append(migration.version)
+                    print(f"Applied migration {migration.version:04d}_{migration.name}")
+            return applied
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+            conn.commit()
+            cur.close()
+    finally:
+        conn.close()
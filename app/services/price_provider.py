@@ -0,0 +1,187 @@
+"""Price provider interface and hedged multi-provider composition."""
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+from app.config import Config
+
+
+class PriceProvider(ABC):
+    """Source of current USD prices keyed by currency symbol."""
+    
+    name = 'provider'
+    
+    @abstractmethod
+    def get_prices(self) -> Dict[str, float]:
+        """Fetch current prices for all supported cryptocurrencies.
+        
+        Returns:
+            Dict mapping currency symbol (e.g., 'BTC') to USD price.
+        """
+    
+    def get_price(self, coin_id: str) -> Optional[float]:
+        """Fetch current price for a specific CoinGecko coin ID."""
+        symbol = Config.SUPPORTED_CURRENCIES.get(coin_id)
+        return self.get_prices().get(symbol) if symbol else None
+
+
+def _is_valid(prices) -> bool:
+    return bool(prices) and all(
+        isinstance(p, (int, float)) and p > 0 and math.isfinite(p) for p in prices.values()
+    )
+
+
+class CompositePriceProvider(PriceProvider):
+    """Hedged price fetching across a primary and secondary providers.
+    
+    The primary is asked first. If it has not answered within the hedge
+    deadline -- the ``hedge_percentile`` of its recent latencies -- or it
+    fails, the next secondary is asked too, and the first valid answer wins.
+    Late answers from the losing providers are cross-checked against the
+    winner and divergences above ``max_divergence`` (a fraction) are recorded.
+    """
+    
+    name = 'composite'
+    
+    def __init__(self, primary: PriceProvider, secondaries: List[PriceProvider],
+                 hedge_percentile: float = 95, initial_hedge_delay: float = 1.0,
+                 min_hedge_delay: float = 0.01, max_divergence: Optional[float] = None,
+                 history_size: int = 200):
+        self.primary = primary
+        self.secondaries = list(secondaries)
+        self.hedge_percentile = hedge_percentile
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_divergence = max_divergence
+        self._latencies = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2 * (1 + len(self.secondaries)),
+                                            thread_name_prefix='price')
+        self.divergences = deque(maxlen=100)
+        self.counters = {'requests': 0, 'hedges': 0, 'hedge_wins': 0, 'failures': 0}
+    
+    def hedge_delay(self) -> float:
+        """Seconds to wait on the primary before hedging."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < 10:
+            return self.initial_hedge_delay
+        rank = min(len(samples) - 1, int(math.ceil(self.hedge_percentile / 100 * len(samples))) - 1)
+        return max(self.min_hedge_delay, samples[rank])
+    
+    def _timed(self, provider: PriceProvider, record: bool):
+        start = time.perf_counter()
+        result = provider.get_prices()
+        if record:
+            with self._lock:
+                self._latencies.append(time.perf_counter() - start)
+        return result
+    
+    def _bump(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+    
+    def _cross_check(self, winner: PriceProvider, winning: Dict[str, float], future):
+        """Compare a late answer with the winning one."""
+        if self.max_divergence is None or future.cancelled() or future.exception():
+            return
+        provider, other = future.provider, future.result()
+        for symbol, price in winning.items():
+            other_price = other.get(symbol)
+            if other_price and abs(other_price - price) / price > self.max_divergence:
+                entry = {'symbol': symbol, winner.name: price, provider.name: other_price}
+                self.divergences.append(entry)
+                print(f"Price divergence between providers: {entry}")
+    
+    def get_prices(self) -> Dict[str, float]:
+        """Fetch prices from the fastest valid provider.
+        
+        Raises:
+            CircuitOpenError: If every provider's circuit is open.
+            Exception: If no provider returned valid prices.
+        """
+        from app.services.circuit_breaker import CircuitOpenError
+        
+        self._bump('requests')
+        remaining = list(self.secondaries)
+        in_flight = set()
+        errors = []
+        
+        def launch(provider, record=False):
+            future = self._executor.submit(self._timed, provider, record)
+            future.provider = provider
+            in_flight.add(future)
+        
+        launch(self.primary, record=True)
+        deadline = time.perf_counter() + self.hedge_delay()
+        
+        while in_flight:
+            timeout = max(0.0, deadline - time.perf_counter()) if remaining else None
+            done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                in_flight.discard(future)
+                error = future.exception()
+                if error is None and _is_valid(future.result()):
+                    prices = future.result()
+                    if future.provider is not self.primary:
+                        self._bump('hedge_wins')
+                    for other in in_flight:
+                        other.add_done_callback(
+                            lambda f, p=future.provider: self._cross_check(p, prices, f))
+                    return prices
+                errors.append(error or ValueError(f"{future.provider.name} returned no valid prices"))
+            if remaining and (not done or not in_flight):
+                # Deadline passed (or everything asked so far failed): hedge
+                self._bump('hedges')
+                launch(remaining.pop(0))
+                deadline = time.perf_counter() + self.hedge_delay()
+        
+        self._bump('failures')
+        if errors and all(isinstance(e, CircuitOpenError) for e in errors):
+            raise errors[0]
+        raise Exception("All price providers failed: " + "; ".join(str(e) for e in errors))
+    
+    def stats(self) -> Dict:
+        """Hedging counters and the current hedge deadline."""
+        with self._lock:
+            counters = dict(self.counters)
+        counters['hedge_delay_seconds'] = round(self.hedge_delay(), 4)
+        counters['divergences'] = len(self.divergences)
+        return counters
+
+
+_default_provider = None
+_default_provider_lock = threading.Lock()
+
+
+def get_price_provider() -> PriceProvider:
+    """Get the configured price provider.
+    
+    Plain CoinGecko unless ``PRICE_SECONDARY_BASE_URL`` names a second
+    CoinGecko-compatible endpoint to hedge against. The composite keeps
+    latency history, so it is shared for the life of the process.
+    """
+    global _default_provider
+    from app.services.coingecko import CoinGeckoService
+    
+    if not Config.PRICE_SECONDARY_BASE_URL:
+        return CoinGeckoService()
+    with _default_provider_lock:
+        if _default_provider is None:
+            from app.services.circuit_breaker import get_breaker
+            secondary = CoinGeckoService(
+                base_url=Config.PRICE_SECONDARY_BASE_URL,
+                breaker=get_breaker('coingecko-secondary',
+                                    failure_threshold=Config.COINGECKO_BREAKER_FAILURES,
+                                    recovery_timeout=Config.COINGECKO_BREAKER_RECOVERY_SECONDS),
+            )
+            secondary.name = 'coingecko-secondary'
+            _default_provider = CompositePriceProvider(
+                CoinGeckoService(), [secondary],
+                hedge_percentile=Config.PRICE_HEDGE_PERCENTILE,
+                max_divergence=Config.PRICE_MAX_DIVERGENCE or None,
+            )
+        return _default_provider
@@ -0,0 +1,196 @@
+"""Server-Sent Events fan-out of latest prices."""
+import json
+import queue
+import select
+import threading
+from typing import Dict, Optional, Tuple
+from datetime import datetime
+from app.config import Config
+
+HEARTBEAT = ": keepalive\n\n"
+# Reconnect delay EventSource uses after a dropped connection
+RETRY_MS = 3000
+
+
+class Subscriber:
+    """One connected client: a bounded queue of encoded events."""
+    
+    def __init__(self, queue_size: int):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class PriceStream:
+    """Fans one LISTEN subscription out to every connected client.
+    
+    A single listener thread holds a dedicated connection LISTENing on the
+    price_history channel. Each wake-up costs one latest-price query however
+    many notifications it drained, and the event is encoded once and queued
+    for every subscriber. Queues are bounded: a client that falls
+    ``queue_size`` events behind is disconnected rather than buffered
+    without limit, and EventSource reconnects it with a fresh snapshot.
+    """
+    
+    def __init__(self, loader=None, connect=None, heartbeat_seconds: float = None,
+                 queue_size: int = None, max_clients: int = None):
+        if loader is None:
+            from app.models.price_history import PriceHistory
+            loader = PriceHistory.get_latest_prices_with_timestamps
+        if connect is None:
+            from app.services.db import get_db_connection
+            # Held for the life of the listener, so kept out of the pool
+            connect = lambda: get_db_connection(pooled=False)
+        self._loader = loader
+        self._connect = connect
+        self.heartbeat_seconds = heartbeat_seconds or Config.PRICE_STREAM_HEARTBEAT_SECONDS
+        self.queue_size = queue_size or Config.PRICE_STREAM_QUEUE_SIZE
+        self.max_clients = max_clients or Config.PRICE_STREAM_MAX_CLIENTS
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._last = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.counters = {'events': 0, 'notifications': 0, 'dropped_clients': 0,
+                         'rejected_clients': 0, 'listen_errors': 0}
+    
+    @staticmethod
+    def encode(latest: Dict[str, Tuple[float, datetime]]) -> str:
+        """One ``prices`` event in the shape of GET /api/prices."""
+        data = json.dumps({
+            'prices': {symbol: price for symbol, (price, _) in latest.items()},
+            'timestamps': {symbol: ts.isoformat() for symbol, (_, ts) in latest.items()},
+        }, separators=(',', ':'))
+        return f"event: prices\ndata: {data}\n\n"
+    
+    def publish(self, latest: Dict[str, Tuple[float, datetime]]) -> int:
+        """Queue the latest prices for every subscriber, dropping those that are full.
+        
+        Returns:
+            Number of subscribers the event was queued for.
+        """
+        event = self.encode(latest)
+        with self._lock:
+            self._last = event
+            self.counters['events'] += 1
+            delivered = 0
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.queue.put_nowait(event)
+                    delivered += 1
+                except queue.Full:
+                    subscriber.dropped = True
+                    self._subscribers.discard(subscriber)
+                    self.counters['dropped_clients'] += 1
+            return delivered
+    
+    def refresh(self) -> int:
+        """Load the latest prices once and publish them."""
+        return self.publish(self._loader())
+    
+    def subscribe(self) -> Optional[Subscriber]:
+        """Register a client, primed with the last event; None when at capacity."""
+        subscriber = Subscriber(self.queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                self.counters['rejected_clients'] += 1
+                return None
+            if self._last is not None:
+                subscriber.queue.put_nowait(self._last)
+            self._subscribers.add(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+    
+    def events(self, subscriber: Subscriber):
+        """Encoded events for one client, with a heartbeat comment when idle.
+        
+        Ends when the client is dropped; the server closing the generator
+        on a disconnected client unsubscribes it.
+        """
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            while not subscriber.dropped and not self._stop.is_set():
+                try:
+                    event = subscriber.queue.get(timeout=self.heartbeat_seconds)
+                except queue.Empty:
+                    event = HEARTBEAT
+                if subscriber.dropped:
+                    break
+                yield event
+        finally:
+            self.unsubscribe(subscriber)
+    
+    def _listen(self):
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+        from app.models.price_history import PRICES_CHANNEL
+        
+        backoff = 1
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                cur = conn.cursor()
+                cur.execute(f"LISTEN {PRICES_CHANNEL}")
+                cur.close()
+                backoff = 1
+                # Catch up on anything written while not listening
+                self.refresh()
+                while not self._stop.is_set():
+                    # Wake up periodically to notice close()
+                    if not select.select([conn], [], [], 1.0)[0]:
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        with self._lock:
+                            self.counters['notifications'] += len(conn.notifies)
+                        conn.notifies.clear()
+                        self.refresh()
+            except Exception as e:
+                with self._lock:
+                    self.counters['listen_errors'] += 1
+                print(f"Price stream listener failed, retrying in {backoff}s: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if conn is not None:
+                    conn.close()
+    
+    def start(self):
+        """Start the shared listener thread if it is not running."""
+        with self._lock:
+            if self._thread is None and not self._stop.is_set():
+                self._thread = threading.Thread(target=self._listen, name='price-stream',
+                                                daemon=True)
+                self._thread.start()
+    
+    def close(self):
+        """Stop listening and end every client's stream."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def metrics(self) -> Dict:
+        """Connected clients and lifetime counters."""
+        with self._lock:
+            counters = dict(self.counters)
+            counters['clients'] = len(self._subscribers)
+            counters['listening'] = self._thread is not None
+        counters['max_clients'] = self.max_clients
+        return counters
+
+
+_stream: Optional[PriceStream] = None
+_stream_lock = threading.Lock()
+
+
+def get_price_stream() -> PriceStream:
+    """Get the process-wide price stream; its listener starts with the first client."""
+    global _stream
+    with _stream_lock:
+        if _stream is None:
+            _stream = PriceStream()
+        return _stream
@@ -0,0 +1,212 @@
+"""On-demand profiling of web requests and scripted jobs.
+
+Nothing here runs unless profiling is configured: create_app only wraps
+the WSGI app when PROFILE_PATHS or PROFILE_SECRET is set, and ``job()``
+returns immediately for jobs not named in PROFILE_JOBS. A profiled run is
+recorded either with cProfile (``.pstats``, for ``python -m pstats`` or
+snakeviz) or, with PROFILE_MODE=sample, by a thread sampling the stack
+every PROFILE_SAMPLE_INTERVAL_MS (``.collapsed``, one ``frame;frame count``
+line per stack for flamegraph.pl or speedscope). Only the newest
+PROFILE_KEEP files are kept in PROFILE_DIR.
+"""
+import cProfile
+import hashlib
+import hmac
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+from app.config import Config
+
+HEADER = 'X-Profile'
+# WSGI environ key of the header
+_ENVIRON_HEADER = 'HTTP_X_PROFILE'
+_UNSAFE = re.compile(r'[^A-Za-z0-9_.-]+')
+_SUFFIXES = ('.pstats', '.collapsed')
+_sequence = itertools.count()
+
+
+def _split(value: str):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _signature(path: str, expires: int) -> str:
+    return hmac.new(Config.PROFILE_SECRET.encode(), f"{expires}:{path}".encode(),
+                    hashlib.sha256).hexdigest()
+
+
+def sign(path: str, ttl_seconds: int = 300) -> str:
+    """X-Profile header value allowing ``path`` to be profiled for ``ttl_seconds``."""
+    if not Config.PROFILE_SECRET:
+        raise ValueError("PROFILE_SECRET is not set")
+    expires = int(time.time()) + ttl_seconds
+    return f"{expires}:{_signature(path, expires)}"
+
+
+def verify(path: str, value: Optional[str]) -> bool:
+    """Whether an X-Profile header value is a valid, unexpired signature for ``path``."""
+    if not value or not Config.PROFILE_SECRET:
+        return False
+    expires, _, signature = value.partition(':')
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(path, int(expires)))
+
+
+class StackSampler:
+    """Counts one thread's stacks, sampled from another thread at a fixed interval."""
+    
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+                             f"{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, name='profile-sampler',
+                                        daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+    
+    def dump(self, path: str):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profile:
+    """One profiled run, written to PROFILE_DIR when it stops."""
+    
+    def __init__(self, name: str, mode: str = None, directory: str = None):
+        self.name = name
+        self.mode = mode or Config.PROFILE_MODE
+        self.directory = directory or Config.PROFILE_DIR
+        self.path = None
+        self._recorder = None
+    
+    def start(self) -> bool:
+        """Start recording; False if another profiler is already running."""
+        if self.mode == 'sample':
+            self._recorder = StackSampler(threading.get_ident(),
+                                          Config.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+            self._recorder.start()
+            return True
+        recorder = cProfile.Profile()
+        try:
+            recorder.enable()
+        except ValueError as e:
+            # Only one cProfile may be active at a time on newer Pythons
+            print(f"Not profiling {self.name}: {e}")
+            return False
+        self._recorder = recorder
+        return True
+    
+    def stop(self) -> Optional[str]:
+        """Stop recording and write the profile; returns its path (None if writing failed)."""
+        if self._recorder is None:
+            return None
+        if self.mode == 'sample':
+            self._recorder.stop()
+        else:
+            self._recorder.disable()
+        suffix = '.collapsed' if self.mode == 'sample' else '.pstats'
+        filename = (f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(_sequence)}-"
+                    f"{_UNSAFE.sub('_', self.name).strip('_')[:80]}{suffix}")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, filename)
+            if self.mode == 'sample':
+                self._recorder.dump(path)
+            else:
+                self._recorder.dump_stats(path)
+            prune(self.directory, Config.PROFILE_KEEP)
+        except OSError as e:
+            print(f"Failed to write profile for {self.name}: {e}")
+            return None
+        self.path = path
+        print(f"Profile for {self.name} written to {path}")
+        return path
+
+
+def prune(directory: str, keep: int) -> int:
+    """Delete all but the newest ``keep`` profiles in ``directory``; returns how many went."""
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.endswith(_SUFFIXES):
+            profiles.append((entry.stat().st_mtime, entry.name, entry.path))
+    profiles.sort(reverse=True)
+    removed = 0
+    for _, _, path in profiles[max(keep, 0):]:
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def requests_enabled() -> bool:
+    """Whether any request could be profiled, i.e. create_app should install the middleware."""
+    return bool(_split(Config.PROFILE_PATHS) or Config.PROFILE_SECRET)
+
+
+class ProfilingMiddleware:
+    """Runs matching requests under a profiler.
+    
+    A request is profiled when its path starts with one of PROFILE_PATHS, or
+    when it carries an X-Profile header signed for its path with
+    PROFILE_SECRET (see ``sign``). Streaming response bodies are not covered.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+        self.prefixes = tuple(_split(Config.PROFILE_PATHS))
+    
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not ((self.prefixes and path.startswith(self.prefixes))
+                or verify(path, environ.get(_ENVIRON_HEADER))):
+            return self.app(environ, start_response)
+        profile = Profile(f"{environ.get('REQUEST_METHOD', 'GET')} {path}")
+        if not profile.start():
+            return self.app(environ, start_response)
+        try:
+            return self.app(environ, start_response)
+        finally:
+            profile.stop()
+
+
+@contextmanager
+def job(name: str):
+    """Profile a scripted job when PROFILE_JOBS names it (or is ``*``)."""
+    jobs = _split(Config.PROFILE_JOBS)
+    if name not in jobs and '*' not in jobs:
+        yield None
+        return
+    profile = Profile(name)
+    profile.start()
+    try:
+        yield profile
+    finally:
+        profile.stop()
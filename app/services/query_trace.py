@@ -0,0 +1,160 @@
+"""Per-request and per-job tracing of database statements.
+
+TimedCursor reports every statement here. Statements slower than
+SLOW_QUERY_MS are logged wherever they run; inside a trace (one per web
+request, or opened around a script's work with ``trace()``) statements
+are also tallied by normalized SQL, so one repeated QUERY_REPEAT_THRESHOLD
+times - typically a per-row lookup inside a loop - is reported as a
+likely N+1 when the trace ends.
+"""
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from app.config import Config
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_SPACE = re.compile(r"\s+")
+_PUNCTUATION = re.compile(r"(\() | (\))| ?(,) ?")
+# A parenthesized list of values, each optionally cast (e.g. ?::timestamptz)
+_LIST = re.compile(r"\(\?(?:::\w+)?(?:, \?(?:::\w+)?)+\)")
+_ROWS = re.compile(r"\((?:\?|\.\.\.)\)(?:, \((?:\?|\.\.\.)\))+")
+# Longer statements (e.g. bulk VALUES built by execute_values) are normalized uncached
+_CACHED_LENGTH = 2000
+
+
+@lru_cache(maxsize=512)
+def _normalize_cached(query: str) -> str:
+    return _normalize(query)
+
+
+def _normalize(query: str) -> str:
+    query = _STRING.sub('?', query)
+    query = _PLACEHOLDER.sub('?', query)
+    query = _NUMBER.sub('?', query)
+    query = _SPACE.sub(' ', query).strip()
+    query = _PUNCTUATION.sub(lambda m: m.group(1) or m.group(2) or ', ', query)
+    query = _LIST.sub('(...)', query)
+    return _ROWS.sub('(...), ...', query)
+
+
+def normalize(query) -> str:
+    """SQL with literals and placeholders as ``?`` and value lists collapsed.
+    
+    Statements that differ only in their parameters normalize to the same
+    text, e.g. ``SELECT ... WHERE id = ?`` for every user ID.
+    """
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    elif not isinstance(query, str):
+        return str(query)
+    if len(query) <= _CACHED_LENGTH:
+        return _normalize_cached(query)
+    return _normalize(query)
+
+
+class QueryTrace:
+    """Statements run during one request or job, tallied by normalized SQL."""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.seconds = 0.0
+        self.slow = 0
+        # Normalized SQL -> [executions, seconds, rows]
+        self.statements: Dict[str, List] = {}
+        self._lock = threading.Lock()
+        self._parent: Optional['QueryTrace'] = None
+    
+    def record(self, sql: str, seconds: float, rowcount: int, slow: bool = False):
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            self.slow += slow
+            stats = self.statements.get(sql)
+            if stats is None:
+                stats = self.statements[sql] = [0, 0.0, 0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] += max(rowcount, 0)
+    
+    def repeated(self, threshold: int = None) -> List[Tuple[str, int, float]]:
+        """Statements run at least ``threshold`` times, most frequent first.
+        
+        Returns:
+            List of (normalized SQL, executions, total seconds).
+        """
+        threshold = threshold or Config.QUERY_REPEAT_THRESHOLD
+        with self._lock:
+            found = [(sql, stats[0], stats[1]) for sql, stats in self.statements.items()
+                     if stats[0] >= threshold]
+        return sorted(found, key=lambda item: -item[1])
+    
+    def summary(self) -> str:
+        """One-line summary, as sent in the X-Query-Summary header."""
+        return (f"count={self.count}; time_ms={self.seconds * 1000:.1f}; "
+                f"distinct={len(self.statements)}; repeated={len(self.repeated())}; "
+                f"slow={self.slow}")
+    
+    def report(self) -> Optional[str]:
+        """Log text describing likely N+1 statements and slow queries, or None."""
+        repeated = self.repeated()
+        if not repeated and not self.slow:
+            return None
+        lines = [f"Queries in {self.name}: {self.summary()}"]
+        for sql, executions, seconds in repeated:
+            lines.append(f"  possible N+1, {executions}x in {seconds * 1000:.1f} ms: {sql}")
+        return '\n'.join(lines)
+
+
+_current: ContextVar[Optional[QueryTrace]] = ContextVar('query_trace', default=None)
+
+
+def current() -> Optional[QueryTrace]:
+    """The trace statements are being recorded in, if any."""
+    return _current.get()
+
+
+def start(name: str) -> QueryTrace:
+    """Begin tracing statements in the current context."""
+    trace_ = QueryTrace(name)
+    trace_._parent = _current.get()
+    _current.set(trace_)
+    return trace_
+
+
+def finish(trace_: QueryTrace) -> QueryTrace:
+    """Stop tracing, logging likely N+1 statements and slow queries."""
+    _current.set(trace_._parent)
+    report = trace_.report()
+    if report:
+        print(report)
+    return trace_
+
+
+@contextmanager
+def trace(name: str):
+    """Trace the statements run in the ``with`` block, e.g. a script's job."""
+    trace_ = start(name)
+    try:
+        yield trace_
+    finally:
+        finish(trace_)
+
+
+def record(query, seconds: float, rowcount: int):
+    """Account for one statement: log it if slow, and add it to the current trace."""
+    trace_ = _current.get()
+    slow = Config.SLOW_QUERY_MS > 0 and seconds * 1000 >= Config.SLOW_QUERY_MS
+    if trace_ is None and not slow:
+        return
+    sql = normalize(query)
+    if slow:
+        where = f" in {trace_.name}" if trace_ is not None else ''
+        print(f"Slow query{where} ({seconds * 1000:.1f} ms, {rowcount} rows): {sql}")
+    if trace_ is not None:
+        trace_.record(sql, seconds, rowcount, slow)
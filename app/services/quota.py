@@ -0,0 +1,198 @@
+"""Quota-aware scheduling of CoinGecko API calls."""
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from app.config import Config
+from app.models.api_quota import ApiQuota
+from app.services.price_provider import PriceProvider
+
+SCHEDULED = 'scheduled'
+ADHOC = 'adhoc'
+
+WINDOW_SECONDS = 60
+
+
+class QuotaExceededError(Exception):
+    """Raised when a call would exceed the API budget for its priority."""
+    
+    def __init__(self, priority: str, retry_in: float):
+        super().__init__(f"CoinGecko call budget exhausted for {priority} requests; "
+                         f"retry in {retry_in:.0f}s")
+        self.priority = priority
+        self.retry_in = retry_in
+
+
+class MemoryQuotaStore:
+    """In-process stand-in for ``ApiQuota`` when the database is unreachable."""
+    
+    def __init__(self):
+        self._windows = {}
+        self._lock = threading.Lock()
+    
+    def consume(self, name: str, window_start: int, allowed: int, cost: int = 1) -> Optional[int]:
+        with self._lock:
+            start, used = self._windows.get(name, (window_start, 0))
+            if start < window_start:
+                start, used = window_start, 0
+            if start != window_start or used + cost > allowed:
+                return None
+            self._windows[name] = (start, used + cost)
+            return used + cost
+    
+    def refund(self, name: str, window_start: int, cost: int = 1):
+        with self._lock:
+            start, used = self._windows.get(name, (window_start, 0))
+            if start == window_start:
+                self._windows[name] = (start, max(used - cost, 0))
+    
+    def exhaust(self, name: str, window_start: int, limit: int):
+        with self._lock:
+            start, used = self._windows.get(name, (window_start, 0))
+            if start <= window_start:
+                self._windows[name] = (window_start, max(used, limit) if start == window_start
+                                       else limit)
+    
+    def usage(self, name: str) -> Tuple[int, int]:
+        with self._lock:
+            return self._windows.get(name, (0, 0))
+
+
+_memory_store = MemoryQuotaStore()
+
+
+class QuotaScheduler(PriceProvider):
+    """Spends the shared per-minute CoinGecko budget on behalf of callers.
+    
+    Scheduled collection may use the whole budget; ad-hoc requests (manual
+    refreshes, single-coin lookups) are refused once only ``reserve`` calls
+    are left, so they cannot starve the cron job. Budget is tracked in the
+    ``api_quota`` table so every process and serverless instance draws from
+    the same counter. Calls an open circuit breaker refuses never reach the
+    API, so their budget is refunded.
+    """
+    
+    name = 'quota'
+    
+    def __init__(self, provider: PriceProvider = None, service=None,
+                 calls_per_minute: int = None, reserve: int = None, store=None,
+                 api_name: str = 'coingecko', clock=time.time):
+        if service is None:
+            from app.services.coingecko import CoinGeckoService
+            service = CoinGeckoService()
+        # CoinGecko itself, for calls other than get_prices (e.g. historical backfill)
+        self.service = service
+        self.provider = provider or service
+        self.limit = calls_per_minute or Config.COINGECKO_CALLS_PER_MINUTE
+        self.reserve = Config.COINGECKO_SCHEDULED_RESERVE if reserve is None else reserve
+        self.store = store
+        self.api_name = api_name
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.counters = {
+            'granted_scheduled': 0, 'granted_adhoc': 0,
+            'denied_scheduled': 0, 'denied_adhoc': 0,
+            'rate_limited': 0, 'circuit_open': 0,
+        }
+    
+    def _bump(self, counter: str, amount: int = 1):
+        with self._lock:
+            self.counters[counter] += amount
+    
+    def _with_store(self, action):
+        """Run ``action(store)`` on the shared DB counter, falling back to memory."""
+        if self.store is not None:
+            return action(self.store)
+        try:
+            return action(ApiQuota)
+        except Exception as e:
+            print(f"API quota table unavailable, tracking in-process: {e}")
+            return action(_memory_store)
+    
+    def _window(self) -> Tuple[int, float]:
+        now = self._clock()
+        start = int(now // WINDOW_SECONDS * WINDOW_SECONDS)
+        return start, start + WINDOW_SECONDS - now
+    
+    def acquire(self, priority: str = ADHOC, cost: int = 1) -> int:
+        """Spend budget for one API call.
+        
+        Returns:
+            The window the budget was spent in.
+        
+        Raises:
+            QuotaExceededError: If the budget available to ``priority`` is spent.
+        """
+        window, retry_in = self._window()
+        allowed = self.limit if priority == SCHEDULED else self.limit - self.reserve
+        used = self._with_store(lambda store: store.consume(self.api_name, window, allowed, cost))
+        if used is None:
+            self._bump(f'denied_{priority}')
+            raise QuotaExceededError(priority, retry_in)
+        self._bump(f'granted_{priority}')
+        return window
+    
+    def call(self, func, *args, priority: str = ADHOC):
+        """Spend one call of budget and make it.
+        
+        Raises:
+            QuotaExceededError: If the budget available to ``priority`` is spent.
+            CircuitOpenError: If the breaker refused the call (its budget is refunded).
+            RateLimitedError: If the API rejected the call anyway.
+        """
+        from app.services.circuit_breaker import CircuitOpenError
+        from app.services.coingecko import RateLimitedError
+        window = self.acquire(priority)
+        try:
+            return func(*args)
+        except CircuitOpenError:
+            # Refused before any request was sent; keep the budget for the recovery probe
+            self._bump('circuit_open')
+            self._with_store(lambda store: store.refund(self.api_name, window))
+            raise
+        except RateLimitedError:
+            # Our count drifted from the provider's; stop spending this window
+            self._bump('rate_limited')
+            window, _ = self._window()
+            self._with_store(lambda store: store.exhaust(self.api_name, window, self.limit))
+            raise
+    
+    def get_prices(self, priority: str = ADHOC) -> Dict[str, float]:
+        """Fetch all supported prices, spending one call of budget."""
+        return self.call(self.provider.get_prices, priority=priority)
+    
+    def metrics(self) -> Dict:
+        """Quota utilization for the current window plus lifetime counters."""
+        window, retry_in = self._window()
+        try:
+            stored_window, used = self._with_store(lambda store: store.usage(self.api_name))
+        except Exception:
+            stored_window, used = window, None
+        if stored_window != window:
+            used = 0
+        with self._lock:
+            counters = dict(self.counters)
+        counters.update({
+            'limit_per_minute': self.limit,
+            'scheduled_reserve': self.reserve,
+            'used': used,
+            'remaining': None if used is None else max(0, self.limit - used),
+            'utilization': None if used is None else round(used / self.limit, 3),
+            'window_resets_in_seconds': round(retry_in, 1),
+        })
+        return counters
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_quota_scheduler() -> QuotaScheduler:
+    """Get the process-wide scheduler in front of the configured price provider."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            from app.services.price_provider import get_price_provider
+            provider = get_price_provider()
+            service = provider if provider.name == 'coingecko' else None
+            _scheduler = QuotaScheduler(provider=provider, service=service)
+        return _scheduler
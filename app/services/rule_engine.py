@@ -0,0 +1,130 @@
+"""Rolling price windows and signals for percent-change and SMA rules."""
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+from app.models.alert_rule import PCT_CHANGE, SMA_CROSS
+
+MINUTE_US = 60_000_000
+
+
+class CurrencySignals:
+    """Indicators for one currency at its latest tick.
+    
+    Each (indicator, window) is computed on first use and memoized, so a run
+    costs one computation per distinct window however many rules share it.
+    """
+    
+    def __init__(self, timestamps: np.ndarray, prices: np.ndarray):
+        self.timestamps = timestamps
+        self.prices = prices
+        self._memo = {}
+    
+    def pct_change(self, minutes: int) -> Optional[float]:
+        """Percent change from the last price at or before ``minutes`` ago."""
+        key = (PCT_CHANGE, minutes)
+        if key not in self._memo:
+            value = None
+            if len(self.prices):
+                since = self.timestamps[-1] - minutes * MINUTE_US
+                i = int(np.searchsorted(self.timestamps, since, side='right')) - 1
+                if i >= 0 and self.prices[i]:
+                    value = float((self.prices[-1] - self.prices[i]) / self.prices[i] * 100)
+            self._memo[key] = value
+        return self._memo[key]
+    
+    def sma_gap(self, periods: int) -> Optional[Tuple[float, float]]:
+        """(previous, current) price minus its ``periods``-period SMA."""
+        key = (SMA_CROSS, periods)
+        if key not in self._memo:
+            value = None
+            if len(self.prices) > periods:
+                tail = self.prices[-(periods + 1):]
+                value = (float(tail[-2] - tail[:-1].mean()), float(tail[-1] - tail[1:].mean()))
+            self._memo[key] = value
+        return self._memo[key]
+
+
+class PriceWindows:
+    """Recent ticks per currency, topped up incrementally between runs.
+    
+    A currency's window is loaded once to cover the longest lookback any
+    rule needs; later runs only fetch ticks newer than the last one held
+    and trim what no rule needs any more.
+    """
+    
+    def __init__(self, loader=None):
+        if loader is None:
+            from app.models.price_history import PriceHistory
+            loader = PriceHistory
+        self._loader = loader
+        self._windows = {}
+        self._lock = threading.Lock()
+    
+    def _load(self, symbol: str, minutes: int, points: int, now: datetime):
+        timestamps, prices = self._loader.get_range(symbol, now - timedelta(minutes=minutes + 1),
+                                                    now)
+        if len(prices) < points:
+            timestamps, prices = self._loader.get_recent(symbol, points)
+        return timestamps, prices
+    
+    def get(self, symbol: str, minutes: int = 0, points: int = 0,
+            now: Optional[datetime] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Ticks covering at least ``minutes`` of history and ``points`` ticks."""
+        from app.services.tick_store import from_micros
+        
+        now = now or datetime.now(timezone.utc)
+        with self._lock:
+            entry = self._windows.get(symbol)
+            if entry is None or entry['minutes'] < minutes or entry['points'] < points:
+                if entry is not None:
+                    minutes = max(minutes, entry['minutes'])
+                    points = max(points, entry['points'])
+                timestamps, prices = self._load(symbol, minutes, points, now)
+            else:
+                timestamps, prices = entry['timestamps'], entry['prices']
+                if len(timestamps):
+                    new_ts, new_prices = self._loader.get_range(
+                        symbol, from_micros(int(timestamps[-1]) + 1), now)
+                    if len(new_ts):
+                        timestamps = np.concatenate([timestamps, new_ts])
+                        prices = np.concatenate([prices, new_prices])
+                minutes, points = entry['minutes'], entry['points']
+            if len(timestamps):
+                # Keep one tick before the lookback so the reference price survives
+                since = timestamps[-1] - (minutes + 1) * MINUTE_US
+                start = min(max(0, int(np.searchsorted(timestamps, since)) - 1),
+                            max(0, len(timestamps) - points))
+                timestamps, prices = timestamps[start:], prices[start:]
+            self._windows[symbol] = {'timestamps': timestamps, 'prices': prices,
+                                     'minutes': minutes, 'points': points}
+            return timestamps, prices
+    
+    def signals_for(self, rules: Iterable, now: Optional[datetime] = None) -> Dict[str, CurrencySignals]:
+        """Signals for every currency that has percent-change or SMA rules."""
+        needs = {}
+        for rule in rules:
+            rule_type = getattr(rule, 'rule_type', None)
+            if rule_type not in (PCT_CHANGE, SMA_CROSS) or not rule.window_size:
+                continue
+            minutes, points = needs.get(rule.currency_symbol, (0, 0))
+            if rule_type == PCT_CHANGE:
+                minutes = max(minutes, rule.window_size)
+            else:
+                points = max(points, rule.window_size + 1)
+            needs[rule.currency_symbol] = (minutes, points)
+        return {symbol: CurrencySignals(*self.get(symbol, minutes, points, now))
+                for symbol, (minutes, points) in needs.items()}
+
+
+_windows: Optional[PriceWindows] = None
+_windows_lock = threading.Lock()
+
+
+def get_price_windows() -> PriceWindows:
+    """Get the process-wide rolling windows shared by alert runs."""
+    global _windows
+    with _windows_lock:
+        if _windows is None:
+            _windows = PriceWindows()
+        return _windows
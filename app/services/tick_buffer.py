@@ -0,0 +1,183 @@
+"""Write-behind buffer for collected price ticks."""
+import atexit
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from app.config import Config
+
+
+def _as_utc(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts
+
+
+class TickBuffer:
+    """Accumulates ticks in memory and writes them to price_history in bulk.
+    
+    A flush happens once ``flush_size`` ticks are buffered or the oldest is
+    ``flush_seconds`` old (0 writes every tick through immediately). The
+    buffer never holds more than ``max_size`` ticks: past that the oldest
+    are dropped and counted. Latest values are readable before they are
+    written, so alerts never wait on a flush.
+    """
+    
+    def __init__(self, flush_size: int = None, flush_seconds: float = None,
+                 max_size: int = None, writer=None, clock=time.monotonic):
+        if writer is None:
+            from app.models.price_history import PriceHistory
+            writer = PriceHistory.bulk_insert
+        self.flush_size = flush_size or Config.TICK_FLUSH_SIZE
+        self.flush_seconds = Config.TICK_FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        self.max_size = max_size or Config.TICK_BUFFER_MAX
+        self._writer = writer
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._ticks = deque()
+        self._first_at = None
+        self._latest: Dict[str, Tuple[float, datetime]] = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self.counters = {'ticks': 0, 'flushes': 0, 'flushed_ticks': 0,
+                         'flush_failures': 0, 'dropped_ticks': 0, 'lost_on_shutdown': 0}
+    
+    def _trim(self):
+        """Drop the oldest ticks beyond ``max_size``; caller holds the lock."""
+        overflow = len(self._ticks) - self.max_size
+        if overflow > 0:
+            for _ in range(overflow):
+                self._ticks.popleft()
+            self.counters['dropped_ticks'] += overflow
+            print(f"Tick buffer full, dropped {overflow} oldest ticks")
+    
+    def add(self, prices: Dict[str, float], timestamp: datetime = None) -> bool:
+        """Buffer one collection's prices, flushing if a threshold is reached.
+        
+        Returns:
+            True if the buffer was flushed.
+        """
+        if timestamp is None:
+            timestamp = datetime.utcnow()
+        with self._lock:
+            for symbol, price in prices.items():
+                symbol = symbol.upper()
+                self._ticks.append((symbol, price, timestamp))
+                self._latest[symbol] = (price, timestamp)
+            self.counters['ticks'] += len(prices)
+            if self._first_at is None:
+                self._first_at = self._clock()
+            self._trim()
+            due = self._due()
+        if due:
+            self.flush()
+        return due
+    
+    def _due(self) -> bool:
+        return bool(self._ticks) and (len(self._ticks) >= self.flush_size or
+                                      self._clock() - self._first_at >= self.flush_seconds)
+    
+    def flush(self) -> int:
+        """Write every buffered tick in one transaction.
+        
+        On failure the ticks go back to the front of the buffer (still
+        bounded by ``max_size``) and the error is re-raised.
+        
+        Returns:
+            Number of ticks written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._ticks)
+                self._ticks.clear()
+                self._first_at = None
+            if not batch:
+                return 0
+            try:
+                self._writer(batch)
+            except Exception:
+                with self._lock:
+                    self.counters['flush_failures'] += 1
+                    self._ticks.extendleft(reversed(batch))
+                    self._first_at = self._clock()
+                    self._trim()
+                raise
+            with self._lock:
+                self.counters['flushes'] += 1
+                self.counters['flushed_ticks'] += len(batch)
+            return len(batch)
+    
+    def latest_prices(self) -> Dict[str, Tuple[float, datetime]]:
+        """Latest buffered (price, timestamp) per symbol, flushed or not."""
+        with self._lock:
+            return dict(self._latest)
+    
+    def overlay(self, stored: Dict[str, Tuple[float, datetime]]) -> Dict[str, float]:
+        """Merge stored latest prices with newer buffered ones."""
+        merged = dict(stored)
+        for symbol, (price, ts) in self.latest_prices().items():
+            current = merged.get(symbol)
+            if current is None or _as_utc(ts) >= _as_utc(current[1]):
+                merged[symbol] = (price, ts)
+        return {symbol: price for symbol, (price, _) in merged.items()}
+    
+    def _run(self):
+        interval = max(0.05, self.flush_seconds / 2)
+        while not self._stop.wait(interval):
+            with self._lock:
+                due = self._due()
+            if due:
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"Failed to flush price ticks: {e}")
+    
+    def start(self):
+        """Flush by age in the background, even when no new ticks arrive."""
+        if self._thread is None and self.flush_seconds > 0:
+            self._thread = threading.Thread(target=self._run, name='tick-flush', daemon=True)
+            self._thread.start()
+    
+    def close(self):
+        """Stop the background flusher and write whatever is still buffered."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            with self._lock:
+                self.counters['lost_on_shutdown'] += len(self._ticks)
+            print(f"Failed to flush price ticks on shutdown, {self.pending()} lost: {e}")
+    
+    def pending(self) -> int:
+        """Ticks that would be lost if the process died now."""
+        with self._lock:
+            return len(self._ticks)
+    
+    def metrics(self) -> Dict:
+        """Buffer depth, data at risk and lifetime counters."""
+        with self._lock:
+            counters = dict(self.counters)
+            counters['buffered'] = len(self._ticks)
+            counters['oldest_age_seconds'] = (round(self._clock() - self._first_at, 1)
+                                              if self._first_at is not None else 0)
+        counters['max_size'] = self.max_size
+        counters['flush_seconds'] = self.flush_seconds
+        return counters
+
+
+_buffer: Optional[TickBuffer] = None
+_buffer_lock = threading.Lock()
+
+
+def get_tick_buffer() -> TickBuffer:
+    """Get the process-wide tick buffer, flushed on interpreter exit."""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = TickBuffer()
+            _buffer.start()
+            atexit.register(_buffer.close)
+        return _buffer
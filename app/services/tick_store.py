@@ -0,0 +1,172 @@
+"""Memory-mapped local store of price ticks for fast historical reads."""
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+from app.config import Config
+
+TICK_DTYPE = np.dtype([('ts', '<i8'), ('price', '<f8')])
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def to_micros(ts: datetime) -> int:
+    """UTC epoch microseconds for a datetime (naive means UTC)."""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return (ts - EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(micros: int) -> datetime:
+    return EPOCH + timedelta(microseconds=int(micros))
+
+
+class TickStore:
+    """Per-symbol append-only files of (int64 epoch microseconds, float64 price).
+    
+    Files are sorted by timestamp and read through ``numpy.memmap``, so a
+    range read is two binary searches and a slice of the mapped file with
+    no copying. Each ``<SYMBOL>.ticks`` file has a ``<SYMBOL>.meta.json``
+    recording the last exported price_history id and the row count; a file
+    that disagrees with its metadata (a crash mid-write) is rebuilt.
+    """
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._maps = {}
+        self._lock = threading.Lock()
+    
+    def _path(self, symbol: str, suffix: str = '.ticks') -> str:
+        return os.path.join(self.directory, symbol.upper() + suffix)
+    
+    def meta(self, symbol: str) -> Dict:
+        """Export progress for a symbol: ``last_id`` and ``rows``."""
+        try:
+            with open(self._path(symbol, '.meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'last_id': 0, 'rows': 0}
+    
+    def _write_meta(self, symbol: str, last_id: int, rows: int):
+        path = self._path(symbol, '.meta.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'last_id': int(last_id), 'rows': int(rows)}, f)
+        os.replace(path + '.tmp', path)
+    
+    def ticks(self, symbol: str) -> np.ndarray:
+        """All ticks for a symbol as a read-only structured array (memory-mapped)."""
+        path = self._path(symbol)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        with self._lock:
+            cached = self._maps.get(symbol.upper())
+            if cached is not None and cached[0] == size:
+                return cached[1]
+            if size == 0:
+                ticks = np.empty(0, dtype=TICK_DTYPE)
+            else:
+                ticks = np.memmap(path, dtype=TICK_DTYPE, mode='r',
+                                  shape=(size // TICK_DTYPE.itemsize,))
+            self._maps[symbol.upper()] = (size, ticks)
+            return ticks
+    
+    def last_timestamp(self, symbol: str) -> Optional[int]:
+        """Newest stored timestamp in epoch microseconds, or None if empty."""
+        ticks = self.ticks(symbol)
+        return int(ticks['ts'][-1]) if len(ticks) else None
+    
+    def range(self, symbol: str, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Timestamps and prices with ``start <= ts <= end`` (epoch microseconds).
+        
+        Both arrays are views into the mapped file.
+        """
+        ticks = self.ticks(symbol)
+        timestamps = ticks['ts']
+        lo = np.searchsorted(timestamps, start, side='left')
+        hi = np.searchsorted(timestamps, end, side='right')
+        return timestamps[lo:hi], ticks['price'][lo:hi]
+    
+    def write(self, symbol: str, timestamps: np.ndarray, prices: np.ndarray, last_id: int) -> int:
+        """Add ticks and record ``last_id`` as exported.
+        
+        Ticks newer than everything stored are appended; older ones (e.g.
+        from a backfill) force a sorted rewrite of the file.
+        
+        Returns:
+            Number of ticks written.
+        """
+        batch = np.empty(len(timestamps), dtype=TICK_DTYPE)
+        batch['ts'] = timestamps
+        batch['price'] = prices
+        batch = batch[np.argsort(batch['ts'], kind='stable')]
+        
+        path = self._path(symbol)
+        existing = self.ticks(symbol)
+        if len(existing) == 0 or len(batch) == 0 or batch['ts'][0] >= existing['ts'][-1]:
+            with open(path, 'ab') as f:
+                f.write(batch.tobytes())
+        else:
+            merged = np.concatenate([existing, batch])
+            merged = merged[np.argsort(merged['ts'], kind='stable')]
+            with open(path + '.tmp', 'wb') as f:
+                f.write(merged.tobytes())
+            os.replace(path + '.tmp', path)
+        self._write_meta(symbol, last_id, len(existing) + len(batch))
+        return len(batch)
+    
+    def verify(self, symbol: str) -> bool:
+        """Check a symbol's file against its metadata, resetting both on mismatch."""
+        path = self._path(symbol)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size == self.meta(symbol)['rows'] * TICK_DTYPE.itemsize:
+            return True
+        print(f"Tick store for {symbol} is inconsistent, rebuilding from price_history")
+        for p in (path, self._path(symbol, '.meta.json')):
+            if os.path.exists(p):
+                os.remove(p)
+        return False
+
+
+def sync_from_db(store: TickStore, symbols: Iterable[str] = None, batch_size: int = 50000,
+                 source=None) -> Dict[str, int]:
+    """Export price_history rows added since the last sync into the tick store.
+    
+    Args:
+        store: Store to update.
+        symbols: Symbols to export (default: all supported).
+        batch_size: Rows fetched and written per batch.
+        source: ``fn(symbol, after_id, batch_size)`` yielding batches of
+            (id, epoch microseconds, price); defaults to price_history.
+    
+    Returns:
+        Dict mapping symbol to ticks exported.
+    """
+    if source is None:
+        from app.models.price_history import PriceHistory
+        source = PriceHistory.iter_ticks_after
+    exported = {}
+    for symbol in symbols or Config.SUPPORTED_CURRENCIES.values():
+        store.verify(symbol)
+        exported[symbol] = 0
+        for rows in source(symbol, store.meta(symbol)['last_id'], batch_size):
+            ids, timestamps, prices = (np.asarray(column) for column in zip(*rows))
+            exported[symbol] += store.write(symbol, timestamps.astype(np.int64),
+                                            prices.astype(np.float64), int(ids.max()))
+    return exported
+
+
+_store: Optional[TickStore] = None
+_store_lock = threading.Lock()
+
+
+def get_tick_store() -> Optional[TickStore]:
+    """Get the configured tick store, or None when ``TICK_STORE_DIR`` is unset."""
+    global _store
+    if not Config.TICK_STORE_DIR:
+        return None
+    with _store_lock:
+        if _store is None or _store.directory != Config.TICK_STORE_DIR:
+            _store = TickStore(Config.TICK_STORE_DIR)
+        return _store
@@ -1,20 +1,228 @@
 """Alert management views."""
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+import base64
+import csv
+import io
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, jsonify
 from app.views.auth import login_required, get_current_user
-from app.models.alert_rule import AlertRule
+from app.config import Config
+from app.models.alert_rule import (AlertRule, MAX_WINDOW, PCT_CHANGE, PRICE, RULE_TYPES,
+                                   SMA_CROSS)
 from app.services.coingecko import CoinGeckoService
 
 alerts_bp = Blueprint('alerts', __name__, url_prefix='/alerts')
 
+# Rules per page in the alert list, and the most an API client may ask for
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Rules accepted in one import
+MAX_IMPORT_RULES = 10000
+# Validation errors listed when an import is rejected
+MAX_REPORTED_ERRORS = 20
+
+# Columns of CSV exports and imports, named as in the alert form and API
+CSV_FIELDS = ('currency', 'rule_type', 'condition', 'threshold', 'window_size',
+              'rearm_pct', 'cooldown_minutes', 'is_active')
+
+
+def _encode_cursor(key: Optional[Tuple[datetime, int]]) -> Optional[str]:
+    """Opaque page cursor for an AlertRule.find_page key."""
+    if key is None:
+        return None
+    raw = f"{key[0].isoformat()}|{key[1]}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """Key for a page cursor; None for the first page.
+    
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, rule_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(rule_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _rule_json(rule: AlertRule) -> dict:
+    """API representation of a rule, with field names as in the alert form."""
+    return {
+        'id': rule.id,
+        'currency': rule.currency_symbol,
+        'rule_type': rule.rule_type,
+        'condition': rule.condition,
+        'threshold': rule.threshold_price,
+        'window_size': rule.window_size,
+        'rearm_pct': rule.rearm_pct,
+        'cooldown_minutes': rule.cooldown_minutes,
+        'is_active': rule.is_active,
+        'fired_at': rule.fired_at.isoformat() if rule.fired_at else None,
+        'created_at': rule.created_at.isoformat() if rule.created_at else None,
+        'description': rule.description,
+    }
+
+
+def _parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('true', '1', 'yes', 'on')
+
+
+def _spec_to_form(spec: dict) -> dict:
+    """Form fields for a rule given as JSON or a CSV row (empty values are absent)."""
+    form = {key: str(value) for key, value in spec.items()
+            if value is not None and str(value) != ''}
+    if 'rearm_pct' in form:
+        form['rearm'] = 'on'
+    return form
+
+
+def _parse_selection(body: dict):
+    """Rule selection for bulk toggle and delete.
+    
+    The body selects by ``ids`` and/or ``filter`` (``currency``,
+    ``rule_type``, ``is_active``); ``all: true`` selects every rule, so an
+    empty body never does.
+    
+    Returns:
+        Tuple of (ids or None, filter keyword arguments, error message or None).
+    """
+    ids = body.get('ids')
+    spec = body.get('filter') or {}
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool)
+                                                for i in ids):
+            return None, None, 'ids must be a list of integers'
+    if not isinstance(spec, dict) or set(spec) - {'currency', 'rule_type', 'is_active'}:
+        return None, None, 'filter may only contain currency, rule_type and is_active'
+    filters = {}
+    if spec.get('currency') is not None:
+        filters['currency_symbol'] = str(spec['currency'])
+    if spec.get('rule_type') is not None:
+        if spec['rule_type'] not in RULE_TYPES:
+            return None, None, 'Invalid rule type'
+        filters['rule_type'] = spec['rule_type']
+    if spec.get('is_active') is not None:
+        filters['is_active'] = _parse_bool(spec['is_active'])
+    if ids is None and not filters and body.get('all') is not True:
+        return None, None, 'Select rules with ids, filter or all: true'
+    return ids, filters, None
+
+
+def _parse_rule_form(form, currencies):
+    """Validate the alert form.
+    
+    Returns:
+        Tuple of (fields for AlertRule.create/update, error message or None).
+    """
+    currency = form.get('currency', '').upper()
+    rule_type = form.get('rule_type', PRICE)
+    condition = form.get('condition', '')
+    threshold = form.get('threshold', '')
+    window = form.get('window_size', '')
+    
+    if not currency or not condition or (rule_type != SMA_CROSS and not threshold):
+        return None, 'Please fill in all fields'
+    
+    if currency not in [s for s in currencies.values()]:
+        return None, 'Unsupported cryptocurrency'
+    
+    if rule_type not in RULE_TYPES:
+        return None, 'Invalid rule type'
+    
+    allowed = ['>', '<', '~'] if rule_type == PCT_CHANGE else ['>', '<']
+    if condition not in allowed:
+        return None, 'Invalid condition type'
+    
+    threshold_price = 0.0
+    if rule_type != SMA_CROSS:
+        try:
+            threshold_price = float(threshold)
+            if threshold_price <= 0:
+                raise ValueError("Threshold must be positive")
+        except ValueError:
+            return None, ('Please enter a valid percentage' if rule_type == PCT_CHANGE
+                          else 'Please enter a valid price')
+    
+    window_size = None
+    if rule_type != PRICE:
+        lowest = 1 if rule_type == PCT_CHANGE else 2
+        try:
+            window_size = int(window)
+            if not lowest <= window_size <= MAX_WINDOW:
+                raise ValueError("Window out of range")
+        except ValueError:
+            return None, f'Please enter a window between {lowest} and {MAX_WINDOW}'
+    
+    rearm_pct = cooldown_minutes = None
+    if form.get('rearm') == 'on':
+        try:
+            rearm_pct = float(form.get('rearm_pct') or Config.ALERT_REARM_BAND_PCT)
+            cooldown_minutes = int(form.get('cooldown_minutes') or Config.ALERT_COOLDOWN_MINUTES)
+            if not 0 <= rearm_pct < 100 or cooldown_minutes < 0:
+                raise ValueError("Re-arm settings out of range")
+        except ValueError:
+            return None, 'Please enter a valid re-arm band and cooldown'
+    
+    return {
+        'currency_symbol': currency,
+        'condition': condition,
+        'threshold_price': threshold_price,
+        'rule_type': rule_type,
+        'window_size': window_size,
+        'rearm_pct': rearm_pct,
+        'cooldown_minutes': cooldown_minutes,
+    }, None
+
 
 @alerts_bp.route('/')
 @login_required
 def list_alerts():
-    """List all alerts for current user."""
+    """List the current user's alerts a page at a time, newest first."""
     user = get_current_user()
-    alerts = AlertRule.find_by_user(user.id)
+    try:
+        after = _decode_cursor(request.args.get('cursor'))
+    except ValueError:
+        after = None
+    alerts, next_key = AlertRule.find_page(user.id, PAGE_SIZE, after)
+    counts = AlertRule.count_by_user(user.id)
     currencies = CoinGeckoService.get_supported_currencies()
-    return render_template('alerts.html', alerts=alerts, currencies=currencies, user=user)
+    return render_template('alerts.html', alerts=alerts, counts=counts,
+                           next_cursor=_encode_cursor(next_key), paged=after is not None,
+                           currencies=currencies, user=user)
+
+
+@alerts_bp.route('/api/rules')
+@login_required
+def list_rules_api():
+    """The current user's rules as JSON, newest first.
+    
+    Query parameters:
+        limit: Rules per page (default 50, max 500).
+        cursor: ``next_cursor`` from the previous page.
+    """
+    user = get_current_user()
+    limit = request.args.get('limit', PAGE_SIZE, type=int)
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({'success': False,
+                        'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+    try:
+        after = _decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    rules, next_key = AlertRule.find_page(user.id, limit, after)
+    return jsonify({
+        'success': True,
+        'rules': [_rule_json(rule) for rule in rules],
+        'next_cursor': _encode_cursor(next_key),
+    }), 200
 
 
 @alerts_bp.route('/create', methods=['GET', 'POST'])
@@ -25,46 +233,21 @@ def create_alert():
     currencies = CoinGeckoService.get_supported_currencies()
     
     if request.method == 'POST':
-        currency = request.form.get('currency', '').upper()
-        condition = request.form.get('condition', '')
-        threshold = request.form.get('threshold', '')
-        
-        # Validation
-        if not currency or not condition or not threshold:
-            flash('Please fill in all fields', 'error')
-            return render_template('alert_form.html', currencies=currencies, user=user)
-        
-        if currency not in [s for s in currencies.values()]:
-            flash('Unsupported cryptocurrency', 'error')
-            return render_template('alert_form.html', currencies=currencies, user=user)
-        
-        if condition not in ['>', '<']:
-            flash('Invalid condition type', 'error')
-            return render_template('alert_form.html', currencies=currencies, user=user)
-        
-        try:
-            threshold_price = float(threshold)
-            if threshold_price <= 0:
-                raise ValueError("Price must be positive")
-        except ValueError:
-            flash('Please enter a valid price', 'error')
-            return render_template('alert_form.html', currencies=currencies, user=user)
+        fields, error = _parse_rule_form(request.form, currencies)
+        if error:
+            flash(error, 'error')
+            return render_template('alert_form.html', currencies=currencies, user=user, defaults=Config)
         
         # Create alert
         try:
-            AlertRule.create(
-                user_id=user.id,
-                currency_symbol=currency,
-                condition=condition,
-                threshold_price=threshold_price
-            )
+            AlertRule.create(user_id=user.id, **fields)
             flash('Alert rule created successfully!', 'success')
             return redirect(url_for('alerts.list_alerts'))
         except Exception as e:
             flash(f'Failed to create alert: {str(e)}', 'error')
-            return render_template('alert_form.html', currencies=currencies, user=user)
+            return render_template('alert_form.html', currencies=currencies, user=user, defaults=Config)
     
-    return render_template('alert_form.html', currencies=currencies, user=user)
+    return render_template('alert_form.html', currencies=currencies, user=user, defaults=Config)
 
 
 @alerts_bp.route('/edit/<int:alert_id>', methods=['GET', 'POST'])
@@ -81,39 +264,25 @@ def edit_alert(alert_id):
     currencies = CoinGeckoService.get_supported_currencies()
     
     if request.method == 'POST':
-        currency = request.form.get('currency', '').upper()
-        condition = request.form.get('condition', '')
-        threshold = request.form.get('threshold', '')
+        fields, error = _parse_rule_form(request.form, currencies)
         is_active = request.form.get('is_active') == 'on'
-        
-        # Validation
-        if not currency or not condition or not threshold:
-            flash('Please fill in all fields', 'error')
-            return render_template('alert_form.html', alert=alert, currencies=currencies, user=user)
-        
-        try:
-            threshold_price = float(threshold)
-            if threshold_price <= 0:
-                raise ValueError("Price must be positive")
-        except ValueError:
-            flash('Please enter a valid price', 'error')
-            return render_template('alert_form.html', alert=alert, currencies=currencies, user=user)
+        if error:
+            flash(error, 'error')
+            return render_template('alert_form.html', alert=alert, currencies=currencies, user=user,
+                           defaults=Config)
         
         # Update alert
         try:
-            alert.update(
-                currency_symbol=currency,
-                condition=condition,
-                threshold_price=threshold_price,
-                is_active=is_active
-            )
+            alert.update(is_active=is_active, **fields)
             flash('Alert rule updated successfully!', 'success')
             return redirect(url_for('alerts.list_alerts'))
         except Exception as e:
             flash(f'Failed to update alert: {str(e)}', 'error')
-            return render_template('alert_form.html', alert=alert, currencies=currencies, user=user)
+            return render_template('alert_form.html', alert=alert, currencies=currencies, user=user,
+                           defaults=Config)
     
-    return render_template('alert_form.html', alert=alert, currencies=currencies, user=user)
+    return render_template('alert_form.html', alert=alert, currencies=currencies, user=user,
+                           defaults=Config)
 
 
 @alerts_bp.route('/delete/<int:alert_id>', methods=['POST'])
@@ -121,15 +290,12 @@ def edit_alert(alert_id):
 def delete_alert(alert_id):
     """Delete an alert rule."""
     user = get_current_user()
-    alert = AlertRule.find_by_id(alert_id)
-    
-    if not alert or alert.user_id != user.id:
-        flash('Alert rule not found', 'error')
-        return redirect(url_for('alerts.list_alerts'))
-    
     try:
-        alert.delete()
-        flash('Alert rule deleted', 'success')
+        # Scoped to the user's rules, so another user's id matches nothing
+        if AlertRule.bulk_delete(user.id, ids=[alert_id]):
+            flash('Alert rule deleted', 'success')
+        else:
+            flash('Alert rule not found', 'error')
     except Exception as e:
         flash(f'Failed to delete alert: {str(e)}', 'error')
     
@@ -141,17 +307,175 @@ def delete_alert(alert_id):
 def toggle_alert(alert_id):
     """Toggle alert active status."""
     user = get_current_user()
-    alert = AlertRule.find_by_id(alert_id)
-    
-    if not alert or alert.user_id != user.id:
-        flash('Alert rule not found', 'error')
-        return redirect(url_for('alerts.list_alerts'))
-    
     try:
-        alert.update(is_active=not alert.is_active)
-        status = 'enabled' if alert.is_active else 'disabled'
-        flash(f'Alert rule {status}', 'success')
+        changed = AlertRule.bulk_set_active(user.id, None, ids=[alert_id])
+        if changed:
+            status = 'enabled' if changed[0][1] else 'disabled'
+            flash(f'Alert rule {status}', 'success')
+        else:
+            flash('Alert rule not found', 'error')
     except Exception as e:
         flash(f'Operation failed: {str(e)}', 'error')
     
     return redirect(url_for('alerts.list_alerts'))
+
+
+@alerts_bp.route('/api/rules/export')
+@login_required
+def export_rules():
+    """Export all of the current user's rules.
+    
+    Query parameters:
+        format: ``json`` (default) or ``csv``.
+    """
+    user = get_current_user()
+    rules = AlertRule.find_by_user(user.id)
+    if request.args.get('format', 'json') != 'csv':
+        return jsonify({'success': True, 'rules': [_rule_json(rule) for rule in rules]}), 200
+    
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=('id',) + CSV_FIELDS + ('created_at',),
+                            extrasaction='ignore')
+    writer.writeheader()
+    for rule in rules:
+        writer.writerow(_rule_json(rule))
+    return Response(out.getvalue(), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=alert_rules.csv'})
+
+
+@alerts_bp.route('/api/rules/import', methods=['POST'])
+@login_required
+def import_rules():
+    """Create many rules at once from JSON or CSV.
+    
+    Accepts ``{"rules": [...]}`` or a ``text/csv`` body with the columns of
+    a CSV export (``id`` and ``created_at`` are ignored). Every rule is
+    validated first; if any is invalid nothing is created and the first
+    errors are reported by row. Valid batches are inserted with multi-row
+    INSERTs in one transaction.
+    """
+    user = get_current_user()
+    if request.mimetype == 'text/csv':
+        specs = list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+    else:
+        specs = (request.get_json(silent=True) or {}).get('rules')
+        if not isinstance(specs, list):
+            return jsonify({'success': False,
+                            'error': 'Expected {"rules": [...]} or a text/csv body'}), 400
+    if not specs:
+        return jsonify({'success': False, 'error': 'No rules to import'}), 400
+    if len(specs) > MAX_IMPORT_RULES:
+        return jsonify({'success': False,
+                        'error': f'At most {MAX_IMPORT_RULES} rules per import'}), 400
+    
+    currencies = CoinGeckoService.get_supported_currencies()
+    rules, errors = [], []
+    for i, spec in enumerate(specs):
+        if not isinstance(spec, dict):
+            errors.append({'row': i + 1, 'error': 'Rule must be an object'})
+            continue
+        fields, error = _parse_rule_form(_spec_to_form(spec), currencies)
+        if error:
+            errors.append({'row': i + 1, 'error': error})
+            continue
+        if spec.get('is_active') not in (None, ''):
+            fields['is_active'] = _parse_bool(spec['is_active'])
+        rules.append(fields)
+    if errors:
+        return jsonify({'success': False, 'error': f'{len(errors)} invalid rules',
+                        'errors': errors[:MAX_REPORTED_ERRORS]}), 400
+    
+    ids = AlertRule.bulk_create(user.id, rules)
+    return jsonify({'success': True, 'created': len(ids), 'ids': ids}), 201
+
+
+@alerts_bp.route('/api/rules/bulk-toggle', methods=['POST'])
+@login_required
+def bulk_toggle_rules():
+    """Enable, disable or flip many rules in one statement.
+    
+    The body selects rules as in ``_parse_selection`` and sets
+    ``is_active`` to true or false; without it each rule is flipped.
+    """
+    user = get_current_user()
+    body = request.get_json(silent=True) or {}
+    ids, filters, error = _parse_selection(body)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    is_active = body.get('is_active')
+    if is_active is not None:
+        is_active = _parse_bool(is_active)
+    
+    changed = AlertRule.bulk_set_active(user.id, is_active, ids=ids, **filters)
+    return jsonify({
+        'success': True,
+        'updated': len(changed),
+        'enabled': [rule_id for rule_id, active in changed if active],
+        'disabled': [rule_id for rule_id, active in changed if not active],
+    }), 200
+
+
+@alerts_bp.route('/api/rules/bulk-delete', methods=['POST'])
+@login_required
+def bulk_delete_rules():
+    """Delete many rules in one statement, selected as in ``_parse_selection``."""
+    user = get_current_user()
+    ids, filters, error = _parse_selection(request.get_json(silent=True) or {})
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    
+    deleted = AlertRule.bulk_delete(user.id, ids=ids, **filters)
+    return jsonify({'success': True, 'deleted': len(deleted), 'ids': deleted}), 200
+
+
+@alerts_bp.route('/api/backtest', methods=['GET', 'POST'])
+@login_required
+def backtest_alerts():
+    """Replay alert rules over stored price history.
+    
+    Replays all of the user's rules, or with a JSON body ``{"rules": [...]}``
+    the given rules (fields as in the alert form, e.g. ``currency``,
+    ``rule_type``, ``condition``, ``threshold``, ``window_size``,
+    ``rearm_pct``, ``cooldown_minutes``).
+    
+    Query parameters:
+        days: Days of history to replay, ending now (default 30, max 365).
+        limit: Trigger times listed per rule (default 100).
+    """
+    # numpy-backed; loaded on first use to keep cold starts fast
+    from app.services.backtest import Backtester, summarize
+    
+    user = get_current_user()
+    days = request.args.get('days', 30, type=int)
+    limit = request.args.get('limit', 100, type=int)
+    if not 1 <= days <= 365:
+        return jsonify({'success': False, 'error': 'days must be between 1 and 365'}), 400
+    
+    body = request.get_json(silent=True) or {}
+    specs = body.get('rules') if isinstance(body, dict) else body
+    well_formed = isinstance(body, dict) and (specs is None or (
+        isinstance(specs, list) and all(isinstance(spec, dict) for spec in specs)))
+    if not well_formed:
+        return jsonify({'success': False,
+                        'error': 'Expected {"rules": [...]} with one object per rule'}), 400
+    if specs:
+        currencies = CoinGeckoService.get_supported_currencies()
+        rules = []
+        for i, spec in enumerate(specs):
+            fields, error = _parse_rule_form(_spec_to_form(spec), currencies)
+            if error:
+                return jsonify({'success': False, 'error': f'Rule {i + 1}: {error}'}), 400
+            rules.append(AlertRule(user_id=user.id, **fields))
+    else:
+        rules = AlertRule.find_by_user(user.id)
+    
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=days)
+    triggers = Backtester().run(rules, start, end)
+    return jsonify({
+        'success': True,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'total_triggers': int(sum(len(t) for t in triggers)),
+        'rules': summarize(rules, triggers, limit),
+    }), 200
@@ -0,0 +1,35 @@
+"""Price analytics API endpoints."""
+from flask import Blueprint, jsonify, request
+from app.config import Config
+from app.models.price_history import PriceHistory
+from app.views.conditional import not_modified, tag
+
+analytics_bp = Blueprint('analytics', __name__, url_prefix='/api/analytics')
+
+
+@analytics_bp.route('/<symbol>')
+def rolling_stats(symbol):
+    """Rolling SMA, EMA, standard deviation and percent change for a currency.
+    
+    Query parameters:
+        window: Number of ticks in the rolling window (default 20).
+    """
+    symbol = symbol.upper()
+    if symbol not in Config.SUPPORTED_CURRENCIES.values():
+        return jsonify({'success': False, 'error': f'Unsupported currency: {symbol}'}), 404
+    
+    window = request.args.get('window', 20, type=int)
+    version, _ = PriceHistory.get_version()
+    etag = f"analytics-{version}-{symbol}-{window}"
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    
+    # numpy-backed; loaded on first use to keep cold starts fast
+    from app.services.analytics import get_analytics_service
+    try:
+        stats = get_analytics_service().get_stats(symbol, window)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return tag(jsonify({'success': True, **stats}), etag), 200
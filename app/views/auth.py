@@ -1,7 +1,11 @@
 """Authentication views."""
+import time
+from datetime import datetime
 from functools import wraps
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, g
+from app.config import Config
 from app.models.user import User
+from app.services.db import primary_until, set_primary_until
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -17,11 +21,79 @@ def login_required(f):
     return decorated_function
 
 
-def get_current_user():
-    """Get the currently logged in user."""
-    if 'user_id' in session:
-        return User.find_by_id(session['user_id'])
-    return None
+def _cache_user(user: User):
+    """Keep the user's non-sensitive fields in the signed session for a short while."""
+    if Config.USER_SESSION_CACHE_SECONDS > 0:
+        session['user_cache'] = {
+            'id': user.id,
+            'email': user.email,
+            'created_at': user.created_at.isoformat() if user.created_at else None,
+            'expires': time.time() + Config.USER_SESSION_CACHE_SECONDS,
+        }
+
+
+def _cached_user():
+    """The session-cached user, if fresh and for the logged-in user."""
+    cached = session.get('user_cache')
+    if (not cached or cached.get('id') != session.get('user_id')
+            or cached.get('expires', 0) < time.time()):
+        return None
+    created_at = cached.get('created_at')
+    return User(id=cached['id'], email=cached['email'],
+                created_at=datetime.fromisoformat(created_at) if created_at else None)
+
+
+def get_current_user(fresh: bool = False):
+    """Get the currently logged in user, loaded at most once per request.
+    
+    With ``USER_SESSION_CACHE_SECONDS`` set, the user may come from the
+    session cache without a query; such a user has no ``password_hash``.
+    
+    Args:
+        fresh: Load the full user from the database (e.g. to check the
+            password) unless this request already did.
+    """
+    if 'user_id' not in session:
+        return None
+    if 'current_user' in g:
+        user = g.current_user
+        if user is None or user.password_hash is not None or not fresh:
+            return user
+    elif not fresh:
+        user = _cached_user()
+        if user is not None:
+            g.current_user = user
+            return user
+    user = User.find_by_id(session['user_id'])
+    if user is not None:
+        _cache_user(user)
+    g.current_user = user
+    return user
+
+
+@auth_bp.before_app_request
+def _restore_read_your_writes():
+    """Keep this session's reads on the primary while its rule changes may not have replicated."""
+    set_primary_until(session.get('primary_until', 0.0) if Config.DATABASE_REPLICA_URLS else 0.0)
+
+
+@auth_bp.after_app_request
+def _carry_read_your_writes(response):
+    if Config.DATABASE_REPLICA_URLS:
+        until = primary_until()
+        if until > time.time():
+            if session.get('primary_until') != until:
+                session['primary_until'] = until
+        elif 'primary_until' in session:
+            session.pop('primary_until')
+    return response
+
+
+def _log_in(user: User):
+    session['user_id'] = user.id
+    session.pop('user_cache', None)
+    _cache_user(user)
+    g.current_user = user
 
 
 @auth_bp.route('/register', methods=['GET', 'POST'])
@@ -54,7 +126,7 @@ def register():
         # Create user
         try:
             user = User.create(email, password)
-            session['user_id'] = user.id
+            _log_in(user)
             flash('Registration successful!', 'success')
             return redirect(url_for('dashboard.index'))
         except Exception as e:
@@ -77,7 +149,7 @@ def login():
         
         user = User.find_by_email(email)
         if user and user.check_password(password):
-            session['user_id'] = user.id
+            _log_in(user)
             flash('Login successful!', 'success')
             return redirect(url_for('dashboard.index'))
         else:
@@ -91,6 +163,7 @@ def login():
 def logout():
     """User logout."""
     session.pop('user_id', None)
+    session.pop('user_cache', None)
     flash('You have been logged out', 'info')
     return redirect(url_for('auth.login'))
 
@@ -110,6 +183,7 @@ def profile():
             flash('Please fill in all password fields', 'error')
             return render_template('profile.html', user=user)
         
+        user = get_current_user(fresh=True)
         if not user.check_password(old_password):
             flash('Current password is incorrect', 'error')
             return render_template('profile.html', user=user)
@@ -123,6 +197,7 @@ def profile():
             return render_template('profile.html', user=user)
         
         user.update_password(new_password)
+        session.pop('user_cache', None)
         flash('Password changed successfully!', 'success')
         return redirect(url_for('auth.profile'))
     
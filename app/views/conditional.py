@@ -0,0 +1,26 @@
+"""Conditional GET support for pages and endpoints built from prices."""
+from typing import Optional
+from flask import make_response, request, session
+
+
+def cacheable() -> bool:
+    """Whether this response may be revalidated or reused.
+    
+    Pages rendering pending flash messages are always built fresh.
+    """
+    return not session.get('_flashes')
+
+
+def tag(response, etag: str, private: bool = False):
+    """Attach ``etag`` and require revalidation before reuse."""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache' if private else 'no-cache'
+    response.vary.add('Cookie')
+    return response
+
+
+def not_modified(etag: str, private: bool = False) -> Optional[object]:
+    """A 304 response if the client already holds ``etag``, else None."""
+    if request.if_none_match.contains(etag):
+        return tag(make_response('', 304), etag, private)
+    return None
@@ -1,31 +1,63 @@
 """Cron job API endpoints."""
-from flask import Blueprint, jsonify
-from datetime import datetime
-from app.services.coingecko import CoinGeckoService
-from app.services.email import EmailService
-from app.services.alert import AlertService
+from flask import Blueprint, jsonify, request
+from datetime import datetime, timezone
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.quota import ADHOC, SCHEDULED, QuotaExceededError, get_quota_scheduler
+from app.services.admin_alerts import AdminAlertThrottle
+from app.services.tick_buffer import get_tick_buffer
 from app.models.price_history import PriceHistory
 
 cron_bp = Blueprint('cron', __name__, url_prefix='/api/cron')
 
 
+def _flush_admin_digest():
+    """Report throttled failures that stopped repeating; never fails the job."""
+    try:
+        AdminAlertThrottle().flush_digest()
+    except Exception as e:
+        print(f"Failed to flush admin alert digest: {e}")
+
+
+def _stale_price_response(error_msg: str) -> dict:
+    """Response body flagging last-known-good prices and their age."""
+    body = {
+        'success': False,
+        'error': error_msg,
+        'stale': True,
+        'prices': {},
+        'price_age_seconds': {}
+    }
+    try:
+        now = datetime.now(timezone.utc)
+        for symbol, (price, ts) in PriceHistory.get_latest_prices_with_timestamps().items():
+            if ts.tzinfo is None:
+                ts = ts.replace(tzinfo=timezone.utc)
+            body['prices'][symbol] = price
+            body['price_age_seconds'][symbol] = int((now - ts).total_seconds())
+    except Exception as e:
+        print(f"Failed to load last-known-good prices: {e}")
+    return body
+
+
 @cron_bp.route('/collect-data', methods=['GET', 'POST'])
 def collect_data():
     """Collect cryptocurrency prices from CoinGecko API.
     
-    This endpoint is triggered by Vercel Cron Job every minute.
+    This endpoint is triggered by Vercel Cron Job every minute (GET); manual
+    refreshes from the dashboard (POST) are served from the ad-hoc budget.
     """
+    priority = SCHEDULED if request.method == 'GET' else ADHOC
     try:
-        # Fetch prices from CoinGecko
-        coingecko = CoinGeckoService()
-        prices = coingecko.get_prices()
+        # Fetch prices from CoinGecko (hedged against a secondary if configured)
+        prices = get_quota_scheduler().get_prices(priority)
         
         if not prices:
             raise Exception("No prices returned from CoinGecko")
         
-        # Store prices in database
+        # Store prices (buffered and written in bulk when write-behind is enabled)
         timestamp = datetime.utcnow()
-        PriceHistory.bulk_create(prices, timestamp)
+        get_tick_buffer().add(prices, timestamp)
+        _flush_admin_digest()
         
         return jsonify({
             'success': True,
@@ -33,13 +65,22 @@ def collect_data():
             'prices': prices,
             'timestamp': timestamp.isoformat()
         }), 200
-        
+    
+    except CircuitOpenError as e:
+        # CoinGecko is known to be down: fail fast with last-known-good prices
+        return jsonify(_stale_price_response(str(e))), 503
+    
+    except QuotaExceededError as e:
+        # Out of API budget this minute: expected under load, not an incident
+        body = _stale_price_response(str(e))
+        body['retry_in_seconds'] = int(e.retry_in) + 1
+        return jsonify(body), 429
+    
     except Exception as e:
         error_msg = str(e)
         
-        # Send admin alert on failure
-        email_service = EmailService()
-        email_service.send_admin_alert(error_msg, "数据收集任务")
+        # Send admin alert on failure (repeats are throttled into digests)
+        AdminAlertThrottle().notify(error_msg, "数据收集任务")
         
         return jsonify({
             'success': False,
@@ -53,9 +94,12 @@ def analyze_data():
     
     This endpoint is triggered by Vercel Cron Job every minute.
     """
+    from app.services.alert import AlertService
+    
     try:
         alert_service = AlertService()
         checked, triggered = alert_service.process_alerts()
+        _flush_admin_digest()
         
         return jsonify({
             'success': True,
@@ -63,13 +107,12 @@ def analyze_data():
             'alerts_checked': checked,
             'alerts_triggered': triggered
         }), 200
-        
+    
     except Exception as e:
         error_msg = str(e)
         
-        # Send admin alert on failure
-        email_service = EmailService()
-        email_service.send_admin_alert(error_msg, "数据分析任务")
+        # Send admin alert on failure (repeats are throttled into digests)
+        AdminAlertThrottle().notify(error_msg, "数据分析任务")
         
         return jsonify({
             'success': False,
@@ -1,16 +1,22 @@
 """Dashboard views."""
-from flask import Blueprint, render_template, session, redirect, url_for
+from flask import Blueprint, render_template, session, redirect, url_for, make_response
 from app.views.auth import login_required, get_current_user
+from app.views.conditional import cacheable, not_modified, tag
 from app.models.price_history import PriceHistory
 from app.models.alert_rule import AlertRule
 from app.services.coingecko import CoinGeckoService
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+# Newest rules shown on the dashboard; the rest are on the alerts page
+DASHBOARD_ALERTS = 10
 
-@dashboard_bp.route('/')
-def index():
-    """Main dashboard page."""
+# (etag, html) of the last anonymous render, reused until prices change
+_anonymous_page = (None, None)
+
+
+def _render_dashboard(user):
+    """Render the dashboard from the database."""
     # Get latest prices from database
     prices = PriceHistory.get_latest_prices()
     
@@ -27,16 +33,46 @@ def index():
             'price': price
         })
     
-    # Check if user is logged in
-    user = None
-    user_alerts = []
-    if 'user_id' in session:
-        user = get_current_user()
-        if user:
-            user_alerts = AlertRule.find_by_user(user.id)
+    user_alerts, counts = [], None
+    if user:
+        user_alerts, _ = AlertRule.find_page(user.id, DASHBOARD_ALERTS)
+        counts = AlertRule.count_by_user(user.id)
     
     return render_template('dashboard.html', 
                          prices=price_data, 
                          user=user, 
-                         alerts=user_alerts)
+                         alerts=user_alerts,
+                         counts=counts)
+
 
+@dashboard_bp.route('/')
+def index():
+    """Main dashboard page.
+    
+    The ETag combines the newest price id with the user's rules_version,
+    so revalidating browsers get a 304 until a collection or a rule change.
+    The anonymous page is rendered once per collection and reused.
+    """
+    global _anonymous_page
+    
+    # Check if user is logged in
+    user = get_current_user() if 'user_id' in session else None
+    price_version, rules_version = PriceHistory.get_version(user.id if user else None)
+    etag = (f"dashboard-{price_version}-{user.id}-{rules_version}" if user
+            else f"dashboard-{price_version}")
+    
+    if not cacheable():
+        return _render_dashboard(user)
+    
+    cached = not_modified(etag, private=user is not None)
+    if cached is not None:
+        return cached
+    
+    if user is None:
+        cached_etag, html = _anonymous_page
+        if cached_etag != etag:
+            html = _render_dashboard(None)
+            _anonymous_page = (etag, html)
+        return tag(make_response(html), etag)
+    
+    return tag(make_response(_render_dashboard(user)), etag, private=True)
@@ -1,31 +1,184 @@
-"""Health check endpoint."""
+"""Health check endpoints.
+
+``/health/live`` touches nothing and ``/health/ready`` only pings the
+database through the pool, so orchestrator probes stay cheap; ``/health``
+reports every check. Checks that query the database are cached for
+HEALTH_CACHE_SECONDS and computed by one request at a time, so frequent
+or concurrent probes cost at most one round of queries per interval. No
+endpoint calls an external service: CoinGecko is reported from its
+circuit breaker.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict
 from flask import Blueprint, jsonify
-from app.services.db import get_db_connection
+from app.config import Config
+from app.services.db import get_db_connection, get_replicas, pool_stats
+from app.services.circuit_breaker import breaker_states
+from app.services.coingecko import coingecko_breaker
+from app.services.metrics import SMTP_QUEUE_DEPTH
+from app.services.quota import get_quota_scheduler
+from app.services.price_stream import get_price_stream
+from app.services.tick_buffer import get_tick_buffer
 
 health_bp = Blueprint('health', __name__)
 
 
+class _CachedCheck:
+    """A check result reused for ``ttl`` seconds; one caller recomputes it at a time."""
+    
+    def __init__(self, check: Callable[[], Dict]):
+        self._check = check
+        self._lock = threading.Lock()
+        self._result = None
+        self._expires = 0.0
+    
+    def get(self, ttl: float = None) -> Dict:
+        ttl = Config.HEALTH_CACHE_SECONDS if ttl is None else ttl
+        if self._result is not None and time.monotonic() < self._expires:
+            return self._result
+        with self._lock:
+            # Another request may have refreshed it while this one waited
+            if self._result is None or time.monotonic() >= self._expires:
+                self._result = self._check()
+                self._expires = time.monotonic() + ttl
+            return self._result
+    
+    def clear(self):
+        with self._lock:
+            self._result = None
+
+
+def _database_check() -> Dict:
+    start = time.perf_counter()
+    try:
+        conn = get_db_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute('SELECT 1')
+            cur.close()
+        finally:
+            conn.close()
+    except Exception as e:
+        return {'status': 'fail', 'error': str(e)}
+    return {'status': 'ok', 'latency_ms': round((time.perf_counter() - start) * 1000, 1)}
+
+
+def _freshness_check() -> Dict:
+    from app.models.price_history import PriceHistory
+    symbols = list(Config.SUPPORTED_CURRENCIES.values())
+    try:
+        latest = PriceHistory.get_latest_timestamps(symbols)
+    except Exception as e:
+        return {'status': 'fail', 'error': str(e)}
+    now = datetime.now(timezone.utc)
+    ages = {}
+    for symbol, ts in latest.items():
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        ages[symbol] = int((now - ts).total_seconds())
+    stale = sorted(symbol for symbol in symbols
+                   if ages.get(symbol, Config.HEALTH_MAX_PRICE_AGE_SECONDS + 1)
+                   > Config.HEALTH_MAX_PRICE_AGE_SECONDS)
+    return {
+        'status': 'warn' if stale else 'ok',
+        'max_age_seconds': Config.HEALTH_MAX_PRICE_AGE_SECONDS,
+        'price_age_seconds': ages,
+        'stale': stale
+    }
+
+
+def _api_quota_check() -> Dict:
+    # Reads the shared quota window from the database when the store is ApiQuota
+    return get_quota_scheduler().metrics()
+
+
+_database = _CachedCheck(_database_check)
+_freshness = _CachedCheck(_freshness_check)
+_api_quota = _CachedCheck(_api_quota_check)
+
+
+def _pool_check() -> Dict:
+    pools = pool_stats()
+    saturated = any(stats['in_use'] >= stats['max_size'] for stats in pools.values())
+    check = {'status': 'warn' if saturated else 'ok', 'pools': pools}
+    replicas = get_replicas()
+    if replicas is not None:
+        # Last lag measured by reads, not a new query; unusable replicas mean primary fallback
+        check['replicas'] = replicas.status()
+        if not all(replica['usable'] for replica in check['replicas'].values()):
+            check['status'] = 'warn'
+    return check
+
+
+def _outbox_check(tick_buffer: Dict) -> Dict:
+    emails_pending = int(sum(SMTP_QUEUE_DEPTH.collect().values()))
+    backlog = (tick_buffer['buffered'] >= tick_buffer['max_size']
+               or emails_pending >= Config.MAIL_MAX_PENDING)
+    return {
+        'status': 'warn' if backlog else 'ok',
+        'ticks_buffered': tick_buffer['buffered'],
+        'oldest_tick_age_seconds': tick_buffer['oldest_age_seconds'],
+        'emails_pending': emails_pending
+    }
+
+
+def _coingecko_check(breakers: Dict[str, Dict]) -> Dict:
+    breaker = breakers['coingecko']
+    return {'status': 'ok' if breaker['state'] == 'closed' else 'warn',
+            'breaker': breaker['state']}
+
+
+@health_bp.route('/health/live')
+def liveness():
+    """Liveness probe: the process is serving requests. Touches no dependency."""
+    return jsonify({'status': 'alive'}), 200
+
+
+@health_bp.route('/health/ready')
+def readiness():
+    """Readiness probe: HTTP 200 when the database answers, 503 otherwise."""
+    database = _database.get()
+    status = 200 if database['status'] == 'ok' else 503
+    return jsonify({'status': 'ready' if status == 200 else 'unready',
+                    'database': database}), status
+
+
 @health_bp.route('/health')
 def health_check():
     """Health check endpoint.
     
-    Returns HTTP 200 if application is healthy.
+    Returns HTTP 200 if the database is reachable, 500 otherwise. Each
+    check under ``checks`` has a status of ok, warn or fail; ``warnings``
+    lists the checks that are not ok.
     """
-    try:
-        # Test database connection
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute('SELECT 1')
-        cur.close()
-        conn.close()
-        
-        return jsonify({
-            'status': 'healthy',
-            'database': 'connected'
-        }), 200
-    except Exception as e:
+    # Registered even before the first CoinGecko call, so a fresh process reports it
+    coingecko_breaker()
+    breakers = breaker_states()
+    database = _database.get()
+    if database['status'] != 'ok':
         return jsonify({
             'status': 'unhealthy',
-            'error': str(e)
+            'error': database['error'],
+            'circuit_breakers': breakers
         }), 500
-
+    
+    tick_buffer = get_tick_buffer().metrics()
+    checks = {
+        'database': database,
+        'pool': _pool_check(),
+        'freshness': _freshness.get(),
+        'outbox': _outbox_check(tick_buffer),
+        'coingecko': _coingecko_check(breakers)
+    }
+    return jsonify({
+        'status': 'healthy',
+        'database': 'connected',
+        'checks': checks,
+        'warnings': sorted(name for name, check in checks.items() if check['status'] != 'ok'),
+        'circuit_breakers': breakers,
+        'api_quota': _api_quota.get(),
+        'tick_buffer': tick_buffer,
+        'price_stream': get_price_stream().metrics()
+    }), 200
@@ -0,0 +1,41 @@
+"""Prometheus metrics endpoint, request timing and query tracing."""
+import time
+from flask import Blueprint, Response, g, request
+from app.config import Config
+from app.services import query_trace
+from app.services.metrics import HTTP_REQUEST_DURATION, REGISTRY
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.before_app_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+    g.query_trace = query_trace.start(f"{request.method} {request.path}")
+
+
+@metrics_bp.after_app_request
+def _record_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Unmatched URLs share one label so 404 scans cannot blow up cardinality
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - started,
+                                      request.blueprint or '', request.endpoint or 'unmatched',
+                                      request.method, response.status_code)
+    trace = g.get('query_trace')
+    if trace is not None and Config.QUERY_TRACE_HEADER:
+        response.headers['X-Query-Summary'] = trace.summary()
+    return response
+
+
+@metrics_bp.teardown_app_request
+def _finish_trace(exc):
+    trace = g.pop('query_trace', None)
+    if trace is not None:
+        query_trace.finish(trace)
+
+
+@metrics_bp.route('/metrics')
+def metrics():
+    """Every metric in the Prometheus text format."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
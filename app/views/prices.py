@@ -0,0 +1,54 @@
+"""Latest price API endpoints."""
+from flask import Blueprint, Response, jsonify, stream_with_context
+from app.models.price_history import PriceHistory
+from app.services.price_stream import get_price_stream
+from app.views.conditional import not_modified, tag
+
+prices_bp = Blueprint('prices', __name__, url_prefix='/api/prices')
+
+
+@prices_bp.route('')
+def latest_prices():
+    """Latest stored price and its timestamp for each currency.
+    
+    Tagged with the newest price's id, so clients revalidating with
+    If-None-Match get a 304 until the next collection. The tag of a full
+    response is the id the prices were read at, never a newer one.
+    """
+    version, _ = PriceHistory.get_version()
+    etag = f"prices-{version}"
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    
+    # Tagged from the same read as the body, which may be another replica than the check above
+    version, latest = PriceHistory.get_latest_snapshot()
+    response = jsonify({
+        'success': True,
+        'prices': {symbol: price for symbol, (price, _) in latest.items()},
+        'timestamps': {symbol: ts.isoformat() for symbol, (_, ts) in latest.items()},
+    })
+    return tag(response, f"prices-{version}")
+
+
+@prices_bp.route('/stream')
+def stream_prices():
+    """Server-Sent Events stream of latest prices.
+    
+    Sends the current prices on connect and again whenever a collection is
+    stored, all clients fed from one shared LISTEN subscription. Idle
+    connections get a heartbeat comment; clients that cannot keep up are
+    disconnected and left to EventSource's automatic reconnect.
+    """
+    stream = get_price_stream()
+    stream.start()
+    subscriber = stream.subscribe()
+    if subscriber is None:
+        return jsonify({'success': False, 'error': 'Too many stream clients'}), 503
+    
+    response = Response(stream_with_context(stream.events(subscriber)),
+                        mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop reverse proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,21 @@
+"""Historical price backfill script.
+
+Usage: python backfill.py --days 30 [--coin bitcoin --coin ethereum]
+Safe to re-run: each coin resumes from its last committed window.
+"""
+import argparse
+from app.services.backfill import BackfillService
+from app.services import profiler
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backfill price_history from CoinGecko.")
+    parser.add_argument('--days', type=int, default=30, help="days of history to fetch")
+    parser.add_argument('--coin', action='append', dest='coins',
+                        help="CoinGecko coin ID (repeatable; default: all supported)")
+    parser.add_argument('--concurrency', type=int, help="windows fetched in parallel")
+    args = parser.parse_args()
+    
+    print(f"Backfilling {args.days} days of prices...")
+    with profiler.job('backfill'):
+        results = BackfillService(concurrency=args.concurrency).run(args.days, args.coins)
+    print(f"Done! {sum(results.values())} rows written.")
@@ -0,0 +1,35 @@
+"""Alert rule backtest script.
+
+Usage: python backtest.py --email user@example.com [--days 365] [--show 5]
+Replays a user's alert rules over stored price history and reports how
+often, and when, each would have fired.
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+from app.models.alert_rule import AlertRule
+from app.models.user import User
+from app.services.backtest import Backtester, summarize
+from app.services.query_trace import trace
+from app.services import profiler
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backtest a user's alert rules.")
+    parser.add_argument('--email', required=True, help="user whose rules to replay")
+    parser.add_argument('--days', type=int, default=30, help="days of history to replay")
+    parser.add_argument('--show', type=int, default=5, help="trigger times listed per rule")
+    args = parser.parse_args()
+    
+    user = User.find_by_email(args.email)
+    if user is None:
+        raise SystemExit(f"No user with email {args.email}")
+    rules = AlertRule.find_by_user(user.id)
+    end = datetime.now(timezone.utc)
+    print(f"Replaying {len(rules)} rules over {args.days} days...")
+    with profiler.job('backtest'), trace('backtest'):
+        triggers = Backtester().run(rules, end - timedelta(days=args.days), end)
+    for result in summarize(rules, triggers, args.show):
+        print(f"  #{result['rule_id']} {result['currency']} {result['description']}: "
+              f"{result['count']} triggers")
+        for ts in result['triggers']:
+            print(f"      {ts}")
+    print("Done!")
@@ -0,0 +1,110 @@
+"""Benchmark: listing a power user's alert rules, unpaginated vs. keyset pages.
+
+Creates scratch users in DATABASE_URL (one power user with many rules
+among many ordinary users), then times the old full listing
+(AlertRule.find_by_user), the first and a deep keyset page
+(AlertRule.find_page) and the dashboard counts (AlertRule.count_by_user),
+and prints the plan of a deep page. Scratch users are deleted afterwards.
+
+Usage:
+    DATABASE_URL=... python benchmarks/bench_alert_pages.py [--rules 20000] [--users 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+EMAIL = 'bench_pages_%s@example.com'
+
+
+def setup(conn, rules, users, per_user):
+    cur = conn.cursor()
+    cur.execute("""INSERT INTO users (email, password_hash)
+                   SELECT format(%s, g), 'x' FROM generate_series(0, %s) g""",
+                (EMAIL, users))
+    cur.execute("SELECT id FROM users WHERE email = %s", (EMAIL % 0,))
+    power_user = cur.fetchone()[0]
+    # Spread created_at so rules from all users interleave, as they would over time
+    cur.execute("""INSERT INTO alert_rules (user_id, currency_symbol, condition, threshold_price,
+                                            is_active, created_at)
+                   SELECT u.id, 'BTC', '>', 1000 + g, g %% 3 > 0,
+                          now() - (g * interval '1 minute') - (u.id %% 997) * interval '1 second'
+                   FROM users u, generate_series(1, %s) g
+                   WHERE u.email LIKE %s AND u.id <> %s""",
+                (per_user, EMAIL % '%', power_user))
+    cur.execute("""INSERT INTO alert_rules (user_id, currency_symbol, condition, threshold_price,
+                                            is_active, created_at)
+                   SELECT %s, 'ETH', '<', 100 + g, g %% 3 > 0, now() - g * interval '1 minute'
+                   FROM generate_series(1, %s) g""", (power_user, rules))
+    cur.execute("ANALYZE alert_rules")
+    conn.commit()
+    cur.close()
+    return power_user
+
+
+def teardown(conn):
+    cur = conn.cursor()
+    cur.execute("DELETE FROM users WHERE email LIKE %s", (EMAIL % '%',))
+    conn.commit()
+    cur.close()
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - begin)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rules', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--per-user', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    if not os.getenv('DATABASE_URL'):
+        sys.exit("DATABASE_URL must point at an initialized database")
+    
+    from app.models.alert_rule import AlertRule
+    from app.services.db import get_db_connection, init_db
+    
+    init_db()
+    conn = get_db_connection()
+    teardown(conn)
+    try:
+        user_id = setup(conn, args.rules, args.users, args.per_user)
+        _, deep = AlertRule.find_page(user_id, args.rules // 2)
+        
+        cases = (
+            (f'find_by_user ({args.rules} rules)', lambda: AlertRule.find_by_user(user_id)),
+            ('find_page, first 50', lambda: AlertRule.find_page(user_id, 50)),
+            (f'find_page, 50 after {args.rules // 2}', lambda: AlertRule.find_page(user_id, 50, deep)),
+            ('count_by_user', lambda: AlertRule.count_by_user(user_id)),
+        )
+        print(f"{'query':<32} {'ms':>9}")
+        for label, fn in cases:
+            print(f"{label:<32} {timed(fn, args.repeat) * 1000:>9.2f}")
+        
+        cur = conn.cursor()
+        cur.execute(f"""EXPLAIN SELECT {AlertRule.COLUMNS} FROM alert_rules
+                        WHERE user_id = %s AND (created_at, id) < (%s, %s)
+                        ORDER BY created_at DESC, id DESC LIMIT 51""",
+                    (user_id, deep[0], deep[1]))
+        print("\nDeep page plan:")
+        for (line,) in cur.fetchall():
+            print(f"  {line}")
+        cur.close()
+    finally:
+        teardown(conn)
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Benchmark: creating, toggling and deleting many rules one by one vs. in bulk.
+
+Times AlertRule.create / update / delete per rule (one connection and
+round trip each, as the form views did) against bulk_create,
+bulk_set_active and bulk_delete for the same batch, using a scratch user
+in DATABASE_URL that is deleted afterwards.
+
+Usage:
+    DATABASE_URL=... python benchmarks/bench_bulk_rules.py [--rules 5000]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+EMAIL = 'bench_bulk@example.com'
+
+
+def timed(fn):
+    begin = time.perf_counter()
+    fn()
+    return time.perf_counter() - begin
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rules', type=int, default=5000)
+    args = parser.parse_args()
+    
+    if not os.getenv('DATABASE_URL'):
+        sys.exit("DATABASE_URL must point at an initialized database")
+    
+    from app.models.alert_rule import AlertRule
+    from app.models.user import User
+    from app.services.db import get_db_connection, init_db
+    
+    def drop_user():
+        conn = get_db_connection()
+        cur = conn.cursor()
+        cur.execute("DELETE FROM users WHERE email = %s", (EMAIL,))
+        conn.commit()
+        cur.close()
+        conn.close()
+    
+    init_db()
+    drop_user()
+    user = User.create(EMAIL, 'password123')
+    specs = [{'currency_symbol': ('BTC', 'ETH', 'SOL')[i % 3], 'condition': '>',
+              'threshold_price': 1000.0 + i} for i in range(args.rules)]
+    try:
+        rules = []
+        one_by_one = {
+            'create': timed(lambda: rules.extend(AlertRule.create(user_id=user.id, **spec)
+                                                 for spec in specs)),
+            'toggle': timed(lambda: [rule.update(is_active=not rule.is_active) for rule in rules]),
+            'delete': timed(lambda: [rule.delete() for rule in rules]),
+        }
+        ids = []
+        bulk = {
+            'create': timed(lambda: ids.extend(AlertRule.bulk_create(user.id, specs))),
+            'toggle': timed(lambda: AlertRule.bulk_set_active(user.id, None, ids=ids)),
+            'delete': timed(lambda: AlertRule.bulk_delete(user.id, ids=ids)),
+        }
+    finally:
+        drop_user()
+    
+    print(f"{args.rules} rules")
+    print(f"{'operation':<10} {'per rule s':>11} {'bulk s':>9} {'speedup':>8}")
+    for op in ('create', 'toggle', 'delete'):
+        print(f"{op:<10} {one_by_one[op]:>11.2f} {bulk[op]:>9.3f} {one_by_one[op] / bulk[op]:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
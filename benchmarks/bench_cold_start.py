@@ -0,0 +1,59 @@
+"""Benchmark: cold start of the serverless entry point.
+
+Imports the entry module (api/index.py, which builds the app) in fresh
+interpreters under ``python -X importtime`` and reports the median total,
+the slowest modules by cumulative import time, and whether any of the
+dependencies that should load lazily were imported at startup.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules only needed once a request actually uses them
+LAZY = ('numpy', 'requests', 'smtplib', 'email.mime.multipart', 'psycopg2.extras')
+_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def import_times(module):
+    """{module: (self us, cumulative us)} for importing ``module`` in a fresh interpreter."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, stdin=subprocess.DEVNULL,
+                            check=True)
+    times = {}
+    for match in _LINE.finditer(result.stderr):
+        self_us, cumulative_us, _, name = match.groups()
+        times[name] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='api.index')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+    
+    runs = [import_times(args.module) for _ in range(args.runs)]
+    totals = [times[args.module][1] / 1000 for times in runs]
+    print(f"import {args.module}: median {statistics.median(totals):.1f} ms "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}) over {args.runs} runs\n")
+    
+    fastest = runs[totals.index(min(totals))]
+    print(f"{'module':<40} {'self ms':>8} {'cumulative ms':>14}")
+    ranked = sorted(fastest.items(), key=lambda item: -item[1][1])
+    for name, (self_us, cumulative_us) in ranked[:args.top]:
+        print(f"{name:<40} {self_us / 1000:>8.1f} {cumulative_us / 1000:>14.1f}")
+    
+    loaded = [name for name in LAZY if name in fastest]
+    print(f"\nLazy dependencies imported at startup: {', '.join(loaded) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark: dashboard and price API throughput with and without revalidation.
+
+Drives the app through Flask's test client against DATABASE_URL, timing
+requests per second for a full anonymous render (the page cache is cleared
+before every request, as before ETags), the cached anonymous page, a
+revalidating browser that gets 304s, and the JSON price endpoint with and
+without If-None-Match.
+
+Usage:
+    DATABASE_URL=... python benchmarks/bench_dashboard.py [--requests 500]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def rate(fn, requests):
+    fn()
+    begin = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    return requests / (time.perf_counter() - begin)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+    
+    if not os.getenv('DATABASE_URL'):
+        sys.exit("DATABASE_URL must point at a database with price_history")
+    
+    from app import create_app
+    from app.views import dashboard
+    
+    app = create_app()
+    client = app.test_client()
+    page_etag = client.get('/').headers['ETag']
+    prices_etag = client.get('/api/prices').headers['ETag']
+    
+    def full_render():
+        dashboard._anonymous_page = (None, None)
+        assert client.get('/').status_code == 200
+    
+    def cached_render():
+        assert client.get('/').status_code == 200
+    
+    def revalidate():
+        assert client.get('/', headers={'If-None-Match': page_etag}).status_code == 304
+    
+    def prices():
+        assert client.get('/api/prices').status_code == 200
+    
+    def prices_revalidate():
+        assert client.get('/api/prices',
+                          headers={'If-None-Match': prices_etag}).status_code == 304
+    
+    cases = (('dashboard, full render', full_render),
+             ('dashboard, cached page', cached_render),
+             ('dashboard, 304', revalidate),
+             ('/api/prices, 200', prices),
+             ('/api/prices, 304', prices_revalidate))
+    print(f"{'case':<24} {'req/s':>8}")
+    for label, fn in cases:
+        print(f"{label:<24} {rate(fn, args.requests):>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark: email dispatch throughput vs. worker count.
+
+Runs against a local fake SMTP server that delays every reply, so each
+message costs several simulated round trips. Throughput should scale with
+the number of workers until the sends-per-minute limit caps it.
+
+Usage:
+    python benchmarks/bench_email_dispatch.py [--messages 60] [--latency 0.02]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.email import EmailService
+from tests.fake_smtp import FakeSMTPServer
+
+
+def run(workers, messages, latency, sends_per_minute):
+    with FakeSMTPServer(latency=latency) as server:
+        service = EmailService(smtp_server='127.0.0.1', smtp_port=server.port, use_ssl=False,
+                               max_workers=workers, sends_per_minute=sends_per_minute)
+        service.username = 'bench@example.com'
+        service.password = 'secret'
+        
+        start = time.perf_counter()
+        futures = [
+            service.dispatch_alert_email(f'user{i}@example.com', 'BTC', '>', 50000.0, 51000.0)
+            for i in range(messages)
+        ]
+        sent = sum(1 for f in futures if f.result())
+        elapsed = time.perf_counter() - start
+        service.close()
+    return sent, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=60)
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='seconds added to every SMTP reply')
+    parser.add_argument('--rate-limit', type=float, default=1200,
+                        help='sends per minute for the rate-limited run')
+    args = parser.parse_args()
+    
+    print(f"{args.messages} messages, {args.latency * 1000:.0f} ms per SMTP reply")
+    print(f"{'workers':>8} {'limit/min':>10} {'seconds':>8} {'msg/s':>8}")
+    for workers in (1, 2, 4, 8, 16):
+        for limit in (1_000_000, args.rate_limit):
+            sent, elapsed = run(workers, args.messages, args.latency, limit)
+            label = 'none' if limit == 1_000_000 else f'{limit:.0f}'
+            print(f"{workers:>8} {label:>10} {elapsed:>8.2f} {sent / elapsed:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
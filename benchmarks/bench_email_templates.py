@@ -0,0 +1,75 @@
+"""Benchmark: alert email messages built per second.
+
+Compares the previous per-recipient MIMEMultipart construction with the
+precompiled template path (plain and with an HTML alternative).
+
+Usage:
+    python benchmarks/bench_email_templates.py [--messages 20000]
+"""
+import argparse
+import os
+import sys
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.email_templates import get_alert_template
+
+
+def legacy_message(sender, to_email, currency, condition, threshold, current_price):
+    """Message construction as done before templates were introduced."""
+    condition_text = "above" if condition == '>' else "below"
+    body = f"""
+Hello!
+
+Your cryptocurrency price alert has been triggered:
+
+Currency: {currency}
+Condition: Price {condition_text} ${threshold:,.2f}
+Current Price: ${current_price:,.2f}
+
+This is an automated notification. Please do not reply directly.
+
+---
+CryptoAlert Price Monitoring System
+    """.strip()
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = to_email
+    msg['Subject'] = f"[CryptoAlert] {currency} Price Alert"
+    msg.attach(MIMEText(body, 'plain', 'utf-8'))
+    return msg.as_string()
+
+
+def template_message(sender, to_email, currency, condition, threshold, current_price, html=False):
+    return get_alert_template(currency, condition).render(
+        sender, to_email, threshold, current_price, html=html)
+
+
+def measure(build, messages, **kwargs):
+    start = time.perf_counter()
+    for i in range(messages):
+        build('alerts@example.com', f'user{i}@example.com', 'BTC', '>', 50000.0, 50000.0 + i, **kwargs)
+    return messages / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20000)
+    args = parser.parse_args()
+    
+    legacy = measure(legacy_message, args.messages)
+    plain = measure(template_message, args.messages)
+    html = measure(template_message, args.messages, html=True)
+    
+    print(f"{'builder':<24} {'msg/s':>10} {'speedup':>8}")
+    print(f"{'legacy MIMEMultipart':<24} {legacy:>10,.0f} {1:>7.1f}x")
+    print(f"{'template (plain)':<24} {plain:>10,.0f} {plain / legacy:>7.1f}x")
+    print(f"{'template (+html)':<24} {html:>10,.0f} {html / legacy:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark: cost of recording metrics, sharded per thread vs. a shared lock.
+
+Times Histogram.observe and Counter.inc from app.services.metrics against
+a baseline that guards one shared dict with a lock, from one thread and
+from several threads at once, and the cost of rendering a scrape. No
+database is needed.
+
+Usage:
+    python benchmarks/bench_metrics.py [--ops 200000] [--threads 8]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.metrics import DEFAULT_BUCKETS, Registry
+
+
+class LockedHistogram:
+    """Baseline: every observation takes one process-wide lock."""
+    
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.values = {}
+        self.lock = threading.Lock()
+    
+    def observe(self, value, *labels):
+        with self.lock:
+            values = self.values.get(labels)
+            if values is None:
+                values = self.values[labels] = [0] * (len(self.buckets) + 3)
+            values[bisect_left(self.buckets, value)] += 1
+            values[-2] += value
+            values[-1] += 1
+
+
+def run(record, ops, threads):
+    """Seconds per operation with ``threads`` threads each recording ``ops`` times."""
+    barrier = threading.Barrier(threads + 1)
+    
+    def work():
+        barrier.wait()
+        for i in range(ops):
+            record(i)
+    
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    begin = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - begin) / (ops * threads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ops', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+    
+    registry = Registry()
+    histogram = registry.histogram('bench_seconds', 'Bench.', ('operation',))
+    counter = registry.counter('bench_total', 'Bench.', ('operation',))
+    locked = LockedHistogram()
+    cases = (
+        ('Histogram.observe', lambda i: histogram.observe(0.004, 'SELECT')),
+        ('locked observe', lambda i: locked.observe(0.004, 'SELECT')),
+        ('Counter.inc', lambda i: counter.inc('SELECT')),
+    )
+    
+    print(f"{'operation':<20} {'1 thread ns':>12} {f'{args.threads} threads ns':>13}")
+    for label, record in cases:
+        single = run(record, args.ops, 1)
+        multi = run(record, args.ops // args.threads, args.threads)
+        print(f"{label:<20} {single * 1e9:>12.0f} {multi * 1e9:>13.0f}")
+    
+    expected = args.ops + (args.ops // args.threads) * args.threads
+    assert counter.collect()[('SELECT',)] == expected
+    begin = time.perf_counter()
+    registry.render()
+    print(f"\nrender: {(time.perf_counter() - begin) * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Benchmark: price stream fan-out latency to many concurrent clients.
+
+Connects simulated SSE clients (one consumer thread each, as under a
+threaded WSGI server) to an in-process PriceStream, publishes updates and
+reports the cost of a publish and the delay until each client has the
+event. No database is needed; the listener is not started.
+
+Usage:
+    python benchmarks/bench_price_stream.py [--clients 100,500,1000] [--updates 20]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from app.services.price_stream import PriceStream
+
+SYMBOLS = ('BTC', 'ETH', 'BNB', 'XRP', 'ADA', 'SOL', 'DOGE')
+
+
+def run(clients, updates):
+    stream = PriceStream(loader=dict, connect=None, heartbeat_seconds=5,
+                         queue_size=updates + 1, max_clients=clients)
+    published = {}
+    delays = []
+    lock = threading.Lock()
+    
+    def consume(subscriber):
+        local = []
+        for event in stream.events(subscriber):
+            if event.startswith('event: prices'):
+                local.append(time.perf_counter() - published[len(local)])
+                if len(local) == updates:
+                    break
+        with lock:
+            delays.extend(local)
+    
+    threads = [threading.Thread(target=consume, args=(stream.subscribe(),))
+               for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    
+    now = datetime.now(timezone.utc)
+    publish_costs = []
+    for n in range(updates):
+        latest = {symbol: (30000.0 + n, now) for symbol in SYMBOLS}
+        published[n] = time.perf_counter()
+        stream.publish(latest)
+        publish_costs.append(time.perf_counter() - published[n])
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+    return np.array(publish_costs), np.array(delays), stream.metrics()['dropped_clients']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', default='100,500,1000')
+    parser.add_argument('--updates', type=int, default=20)
+    args = parser.parse_args()
+    
+    print(f"{'clients':>8} {'publish ms':>11} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'dropped':>8}")
+    for clients in (int(c) for c in args.clients.split(',')):
+        costs, delays, dropped = run(clients, args.updates)
+        print(f"{clients:>8} {np.median(costs) * 1000:>11.2f} "
+              f"{np.percentile(delays, 50) * 1000:>8.2f} {np.percentile(delays, 99) * 1000:>8.2f} "
+              f"{delays.max() * 1000:>8.2f} {dropped:>8}")
+
+
+if __name__ == '__main__':
+    main()
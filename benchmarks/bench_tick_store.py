@@ -0,0 +1,138 @@
+"""Benchmark: historical range reads from the tick store vs. PostgreSQL.
+
+Writes a minute-spaced synthetic series to a temporary tick store and, when
+DATABASE_URL is set, to a scratch table shaped and indexed like
+price_history. It then times range reads of one day, thirty days and the
+whole series, each followed by a mean over the prices so both sides
+actually touch the data.
+
+Usage:
+    python benchmarks/bench_tick_store.py [--points 1000000,100000000] [--repeat 5]
+
+100M points need ~1.6 GB of disk for the store and several GB for Postgres.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from app.services.tick_store import TickStore, from_micros
+
+MINUTE = 60_000_000
+START = 1_600_000_000 * 1_000_000
+CHUNK = 5_000_000
+RANGES = (('1 day', 1440), ('30 days', 43200), ('all', None))
+
+
+def chunks(points):
+    rng = np.random.default_rng(0)
+    price = 30000.0
+    for offset in range(0, points, CHUNK):
+        n = min(CHUNK, points - offset)
+        timestamps = START + (np.arange(offset, offset + n, dtype=np.int64) * MINUTE)
+        prices = price * np.exp(np.cumsum(rng.normal(0, 0.0005, n)))
+        price = prices[-1]
+        yield timestamps, prices
+
+
+def load_store(directory, points):
+    store = TickStore(directory)
+    for i, (timestamps, prices) in enumerate(chunks(points)):
+        store.write('BNCH', timestamps, prices, last_id=i)
+    return store
+
+
+def load_postgres(conn, points):
+    cur = conn.cursor()
+    cur.execute("DROP TABLE IF EXISTS bench_price_history")
+    cur.execute("""CREATE UNLOGGED TABLE bench_price_history (
+                       id BIGSERIAL PRIMARY KEY,
+                       currency_symbol VARCHAR(10) NOT NULL,
+                       price_usd NUMERIC(20, 8) NOT NULL,
+                       timestamp TIMESTAMP WITH TIME ZONE NOT NULL)""")
+    for timestamps, prices in chunks(points):
+        buffer = io.StringIO()
+        for ts, price in zip(timestamps.tolist(), prices.tolist()):
+            buffer.write(f"BNCH\t{price:.8f}\t{from_micros(ts).isoformat()}\n")
+        buffer.seek(0)
+        cur.copy_expert("COPY bench_price_history (currency_symbol, price_usd, timestamp) "
+                        "FROM STDIN", buffer)
+    cur.execute("""CREATE INDEX ON bench_price_history (currency_symbol, timestamp DESC)""")
+    cur.execute("ANALYZE bench_price_history")
+    conn.commit()
+    cur.close()
+
+
+def query_postgres(conn, start, end):
+    cur = conn.cursor()
+    cur.execute("""SELECT (EXTRACT(EPOCH FROM timestamp) * 1000000)::bigint, price_usd::float8
+                   FROM bench_price_history
+                   WHERE currency_symbol = 'BNCH' AND timestamp >= %s AND timestamp <= %s
+                   ORDER BY timestamp""", (from_micros(start), from_micros(end)))
+    rows = cur.fetchall()
+    cur.close()
+    prices = np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows))
+    return prices.mean() if len(prices) else 0.0
+
+
+def query_store(store, start, end):
+    _, prices = store.range('BNCH', start, end)
+    return prices.mean() if len(prices) else 0.0
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - begin)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--points', default='1000000',
+                        help="comma-separated series lengths, e.g. 1000000,100000000")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    conn = None
+    if os.getenv('DATABASE_URL'):
+        from app.services.db import get_db_connection
+        conn = get_db_connection()
+    else:
+        print("DATABASE_URL not set: timing the tick store only")
+    
+    print(f"{'points':>11} {'range':<8} {'rows':>10} {'store ms':>10} {'postgres ms':>12} {'speedup':>8}")
+    for points in (int(p) for p in args.points.split(',')):
+        with tempfile.TemporaryDirectory() as directory:
+            store = load_store(directory, points)
+            if conn is not None:
+                load_postgres(conn, points)
+            end_of_series = START + (points - 1) * MINUTE
+            for label, span in RANGES:
+                # Ranges end halfway through the series so they are not just the file tail
+                end = START + (points // 2) * MINUTE if span else end_of_series
+                start = end - span * MINUTE if span else START
+                rows = len(store.range('BNCH', start, end)[0])
+                store_s = timed(lambda: query_store(store, start, end), args.repeat)
+                line = f"{points:>11} {label:<8} {rows:>10} {store_s * 1000:>10.3f}"
+                if conn is not None:
+                    pg_s = timed(lambda: query_postgres(conn, start, end), max(1, args.repeat // 2))
+                    line += f" {pg_s * 1000:>12.1f} {pg_s / store_s:>7.0f}x"
+                print(line)
+    if conn is not None:
+        cur = conn.cursor()
+        cur.execute("DROP TABLE IF EXISTS bench_price_history")
+        conn.commit()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+"""Tick store export script.
+
+Usage: python export_ticks.py
+Copies price_history rows added since the last run into TICK_STORE_DIR.
+"""
+from app.services.tick_store import get_tick_store, sync_from_db
+from app.services import profiler
+
+if __name__ == '__main__':
+    store = get_tick_store()
+    if store is None:
+        raise SystemExit("TICK_STORE_DIR is not set")
+    print(f"Exporting price history to {store.directory}...")
+    with profiler.job('export_ticks'):
+        exported = sync_from_db(store)
+    for symbol, count in exported.items():
+        print(f"  {symbol}: {count} ticks")
+    print("Done!")
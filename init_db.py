@@ -1,8 +1,30 @@
-"""Database initialization script."""
-from app.services.db import init_db
+"""Database initialization script.
 
-if __name__ == '__main__':
-    print("Initializing database tables...")
-    init_db()
-    print("Done!")
+Usage: python init_db.py [--target VERSION] [--status]
+Applies pending schema migrations from app/migrations; safe to re-run.
+"""
+import argparse
+from app.services.db import get_db_connection
+from app.services.migrations import current_version, load_migrations, migrate
 
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations.")
+    parser.add_argument('--target', type=int, help="highest migration version to apply")
+    parser.add_argument('--status', action='store_true',
+                        help="list pending migrations without applying them")
+    args = parser.parse_args()
+    
+    if args.status:
+        conn = get_db_connection()
+        try:
+            current = current_version(conn)
+        finally:
+            conn.close()
+        pending = [m for m in load_migrations() if m.version > current]
+        print(f"Schema version {current}, {len(pending)} pending")
+        for migration in pending:
+            print(f"  {migration.version:04d}_{migration.name}")
+    else:
+        print("Initializing database tables...")
+        applied = migrate(target=args.target)
+        print(f"Done! Applied {len(applied)} migrations.")
@@ -0,0 +1,97 @@
+"""Local stand-in for the CoinGecko API with latency and error injection."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_PRICES = {
+    'bitcoin': 50000.0,
+    'ethereum': 3000.0,
+    'binancecoin': 400.0,
+    'ripple': 0.5,
+    'cardano': 0.4,
+    'solana': 100.0,
+    'dogecoin': 0.08,
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+    
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        with server.lock:
+            server.requests.append((url.path, query))
+        if server.latency:
+            time.sleep(server.latency)
+        if server.error_status:
+            self._send_json(server.error_status, {'error': 'injected failure'})
+            return
+        handler = server.routes.get(url.path)
+        if handler is None:
+            self._send_json(404, {'error': 'not found'})
+            return
+        status, payload = handler(query)
+        self._send_json(status, payload)
+
+
+class FakeCoinGeckoServer(ThreadingHTTPServer):
+    """Serves ``/simple/price`` from ``prices``.
+    
+    Set ``latency`` (seconds) to slow every response down and
+    ``error_status`` (e.g. 500 or 429) to fail every request. Extra paths
+    can be served by adding ``routes[path] = fn(query) -> (status, payload)``;
+    ``add_market_chart`` serves a recorded market_chart/range fixture.
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self, prices=None, latency=0.0, error_status=None):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.prices = dict(prices or DEFAULT_PRICES)
+        self.latency = latency
+        self.error_status = error_status
+        self.requests = []
+        self.lock = threading.Lock()
+        self.routes = {'/simple/price': self._simple_price}
+    
+    def _simple_price(self, query):
+        ids = [i for i in query.get('ids', '').split(',') if i]
+        return 200, {i: {'usd': self.prices[i]} for i in ids if i in self.prices}
+    
+    def add_market_chart(self, coin_id, fixture_path):
+        """Serve ``/coins/<coin_id>/market_chart/range`` from a recorded response."""
+        with open(fixture_path) as f:
+            recorded = json.load(f)
+        
+        def market_chart_range(query):
+            start, end = int(query['from']) * 1000, int(query['to']) * 1000
+            return 200, {key: [p for p in points if start <= p[0] <= end]
+                         for key, points in recorded.items()}
+        
+        self.routes[f'/coins/{coin_id}/market_chart/range'] = market_chart_range
+        return recorded
+    
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+    
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
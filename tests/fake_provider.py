@@ -0,0 +1,45 @@
+"""Local fake price provider with configurable latency for tests and benchmarks."""
+import random
+import threading
+import time
+from app.services.price_provider import PriceProvider
+
+DEFAULT_PRICES = {'BTC': 50000.0, 'ETH': 3000.0, 'SOL': 100.0}
+
+
+class FakePriceProvider(PriceProvider):
+    """Returns fixed prices after a simulated network delay.
+    
+    ``latency`` is either a number of seconds or a callable returning one,
+    e.g. a heavy-tailed distribution. ``error`` makes every call raise it.
+    """
+    
+    def __init__(self, name='fake', prices=None, latency=0.0, error=None):
+        self.name = name
+        self.prices = dict(prices or DEFAULT_PRICES)
+        self.latency = latency
+        self.error = error
+        self.calls = 0
+        self._lock = threading.Lock()
+    
+    def get_prices(self):
+        with self._lock:
+            self.calls += 1
+        delay = self.latency() if callable(self.latency) else self.latency
+        if delay:
+            time.sleep(delay)
+        if self.error is not None:
+            raise self.error
+        return dict(self.prices)
+
+
+def heavy_tail(fast, slow, slow_fraction, seed=0):
+    """Latency distribution: usually ``fast``, ``slow`` with probability ``slow_fraction``."""
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    
+    def sample():
+        with lock:
+            roll = rng.random()
+        return slow if roll < slow_fraction else fast * (0.8 + 0.4 * roll)
+    return sample
@@ -0,0 +1,133 @@
+"""Unit tests for admin alert throttling."""
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.services.admin_alerts import AdminAlertThrottle, MemoryAlertStore, fingerprint_error
+
+
+class MockEmailService:
+    """Mock email service recording admin notifications."""
+    def __init__(self):
+        self.alerts = []
+        self.digests = []
+        self.fail = False
+    
+    def send_admin_alert(self, error_message, task_name):
+        self.alerts.append((task_name, error_message))
+        return not self.fail
+    
+    def send_admin_digest(self, entries):
+        self.digests.append(entries)
+        return not self.fail
+
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def make_throttle(window_seconds=600):
+    email = MockEmailService()
+    throttle = AdminAlertThrottle(email_service=email, window_seconds=window_seconds,
+                                  store=MemoryAlertStore())
+    return throttle, email
+
+
+class TestFingerprint:
+    """Test cases for error fingerprinting."""
+    
+    def test_numbers_and_addresses_ignored(self):
+        """Test: errors differing only in volatile numbers share a fingerprint."""
+        a = fingerprint_error("Read timed out. (read timeout=30) at 0x7f3a2c")
+        b = fingerprint_error("Read timed out.  (read timeout=31) at 0x7f9900")
+        assert a == b
+    
+    def test_different_errors_differ(self):
+        """Test: unrelated errors get different fingerprints."""
+        assert fingerprint_error("429 Too Many Requests") != fingerprint_error("Connection refused")
+
+
+class TestAdminAlertThrottle:
+    """Test cases for deduplication and digests."""
+    
+    def test_first_failure_sent_immediately(self):
+        """Test: the first occurrence is mailed as a normal admin alert."""
+        throttle, email = make_throttle()
+        
+        assert throttle.notify("Connection refused", "collect", now=START) is True
+        assert email.alerts == [("collect", "Connection refused")]
+    
+    def test_repeats_within_window_suppressed(self):
+        """Test: repeats inside the window are counted, not mailed."""
+        throttle, email = make_throttle()
+        throttle.notify("Connection refused", "collect", now=START)
+        
+        for minute in range(1, 6):
+            assert throttle.notify("Connection refused", "collect",
+                                   now=START + timedelta(minutes=minute)) is False
+        
+        assert len(email.alerts) == 1
+        assert email.digests == []
+    
+    def test_different_tasks_not_deduplicated(self):
+        """Test: the same error from another task gets its own alert."""
+        throttle, email = make_throttle()
+        throttle.notify("Connection refused", "collect", now=START)
+        throttle.notify("Connection refused", "analyze", now=START)
+        
+        assert [task for task, _ in email.alerts] == ["collect", "analyze"]
+    
+    def test_repeat_after_window_sends_digest(self):
+        """Test: the first repeat after the window reports the suppressed count."""
+        throttle, email = make_throttle(window_seconds=600)
+        throttle.notify("Connection refused", "collect", now=START)
+        throttle.notify("Connection refused", "collect", now=START + timedelta(minutes=2))
+        throttle.notify("Connection refused", "collect", now=START + timedelta(minutes=11))
+        
+        assert len(email.digests) == 1
+        entry = email.digests[0][0]
+        assert entry.pending == 2
+        assert entry.occurrences == 3
+        assert entry.pending_since == START + timedelta(minutes=2)
+        assert entry.last_seen == START + timedelta(minutes=11)
+    
+    def test_flush_digest_summarizes_all_due_entries(self):
+        """Test: flush sends a single digest covering every due failure."""
+        throttle, email = make_throttle(window_seconds=600)
+        for task in ("collect", "analyze"):
+            throttle.notify("timeout", task, now=START)
+            throttle.notify("timeout", task, now=START + timedelta(minutes=1))
+            throttle.notify("timeout", task, now=START + timedelta(minutes=3))
+        
+        assert throttle.flush_digest(now=START + timedelta(minutes=5)) == 0
+        assert throttle.flush_digest(now=START + timedelta(minutes=10)) == 2
+        assert len(email.digests) == 1
+        assert sorted(e.pending for e in email.digests[0]) == [2, 2]
+        assert throttle.flush_digest(now=START + timedelta(minutes=30)) == 0
+    
+    def test_failed_alert_is_retried_with_its_count(self):
+        """Test: a failed send is not throttled and its occurrence is reported next time."""
+        throttle, email = make_throttle(window_seconds=600)
+        email.fail = True
+        assert throttle.notify("Connection refused", "collect", now=START) is False
+        
+        email.fail = False
+        assert throttle.notify("Connection refused", "collect",
+                               now=START + timedelta(minutes=1)) is True
+        assert len(email.digests) == 1
+        entry = email.digests[0][0]
+        assert entry.pending == 2
+        assert entry.pending_since == START
+    
+    def test_failed_digest_keeps_entries_due(self):
+        """Test: entries in a digest that failed to send stay due for the next flush."""
+        throttle, email = make_throttle(window_seconds=600)
+        throttle.notify("timeout", "collect", now=START)
+        throttle.notify("timeout", "collect", now=START + timedelta(minutes=1))
+        
+        email.fail = True
+        assert throttle.flush_digest(now=START + timedelta(minutes=10)) == 0
+        email.fail = False
+        assert throttle.flush_digest(now=START + timedelta(minutes=11)) == 1
+        assert email.digests[-1][0].pending == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -108,3 +108,37 @@ class TestAlertLogic:
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
 
+
+
+class MockRearmingRule(MockAlertRule):
+    """Mock re-arming price rule."""
+    def __init__(self, condition, threshold_price, rearm_pct):
+        super().__init__(condition, threshold_price)
+        self.rearm_pct = rearm_pct
+
+
+class TestRearmLogic:
+    """Test cases for the hysteresis band of re-arming rules."""
+    
+    @pytest.mark.parametrize('condition,price,expected', [
+        ('>', 49600.0, False),
+        ('>', 49000.0, True),
+        ('<', 50400.0, False),
+        ('<', 50500.0, True),
+    ])
+    def test_price_band(self, condition, price, expected):
+        """Test: a 1% band must be crossed back before re-arming."""
+        rule = MockRearmingRule(condition=condition, threshold_price=50000.0, rearm_pct=1.0)
+        
+        assert AlertService.check_rule_rearmed(rule, price) is expected
+    
+    def test_cooldown(self):
+        """Test: fired rules are cooled down only after cooldown_minutes."""
+        from datetime import datetime, timedelta, timezone
+        fired = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        rule = AlertRule(rearm_pct=1.0, cooldown_minutes=30, fired_at=fired)
+        
+        assert rule.rearms is True
+        assert rule.cooled_down(fired + timedelta(minutes=29)) is False
+        assert rule.cooled_down(fired + timedelta(minutes=30)) is True
+        assert AlertRule().rearms is False
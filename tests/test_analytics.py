@@ -0,0 +1,162 @@
+"""Tests for rolling price statistics."""
+import threading
+import numpy as np
+import pytest
+from app.services.analytics import (AnalyticsService, RollingStats, ema, pct_change,
+                                    rolling_std, sma)
+
+
+def random_walk(n, seed=0, start=50000.0):
+    rng = np.random.default_rng(seed)
+    return start * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+
+
+def naive_ema(prices, span):
+    alpha = 2 / (span + 1)
+    out = [prices[0]]
+    for p in prices[1:]:
+        out.append(alpha * p + (1 - alpha) * out[-1])
+    return np.array(out)
+
+
+class TestVectorized:
+    """Test cases for the vectorized series functions."""
+    
+    def test_sma_and_std_match_naive(self):
+        """Test: rolling SMA/std equal per-window mean/std."""
+        prices = random_walk(50)
+        window = 7
+        expected_sma = [prices[i - window + 1:i + 1].mean() for i in range(window - 1, 50)]
+        expected_std = [prices[i - window + 1:i + 1].std() for i in range(window - 1, 50)]
+        assert np.isnan(sma(prices, window)[:window - 1]).all()
+        np.testing.assert_allclose(sma(prices, window)[window - 1:], expected_sma)
+        np.testing.assert_allclose(rolling_std(prices, window)[window - 1:], expected_std)
+    
+    def test_ema_matches_recursive_definition(self):
+        """Test: block-wise EMA equals the recursive EMA across block boundaries."""
+        prices = random_walk(1000)
+        np.testing.assert_allclose(ema(prices, 20), naive_ema(prices, 20), rtol=1e-10)
+    
+    def test_pct_change(self):
+        """Test: percent change over N periods."""
+        result = pct_change([100.0, 110.0, 121.0, 60.5], 2)
+        assert np.isnan(result[:2]).all()
+        np.testing.assert_allclose(result[2:], [21.0, -45.0])
+    
+    def test_short_series(self):
+        """Test: series shorter than the window are all NaN."""
+        assert np.isnan(sma([1.0, 2.0], 5)).all()
+        assert np.isnan(pct_change([1.0], 1)).all()
+        assert len(ema([], 5)) == 0
+
+
+class TestRollingStats:
+    """Test cases for incremental updates."""
+    
+    def test_incremental_matches_vectorized(self):
+        """Test: seeding then updating tick by tick agrees with full recomputation."""
+        prices = random_walk(500, seed=1)
+        window = 20
+        stats = RollingStats(window)
+        stats.seed(prices[:100])
+        for p in prices[100:]:
+            stats.update(p)
+        
+        snapshot = stats.snapshot()
+        assert snapshot['price'] == prices[-1]
+        assert snapshot['count'] == 500
+        assert snapshot['sma'] == pytest.approx(sma(prices, window)[-1], rel=1e-12)
+        assert snapshot['std'] == pytest.approx(rolling_std(prices, window)[-1], rel=1e-6)
+        assert snapshot['ema'] == pytest.approx(ema(prices, window)[-1], rel=1e-10)
+        assert snapshot['pct_change'] == pytest.approx(pct_change(prices, window)[-1], rel=1e-9)
+    
+    def test_not_ready_until_window_filled(self):
+        """Test: statistics are None until enough ticks arrived."""
+        stats = RollingStats(3)
+        stats.update(10.0)
+        stats.update(11.0)
+        assert stats.snapshot()['sma'] is None
+        assert stats.snapshot()['ema'] is not None
+        stats.update(12.0)
+        assert stats.snapshot()['sma'] == pytest.approx(11.0)
+        assert stats.snapshot()['pct_change'] is None
+        stats.update(13.0)
+        assert stats.snapshot()['pct_change'] == pytest.approx(30.0)
+
+
+class FakeHistory:
+    """PriceHistory stand-in serving a growing synthetic series."""
+    def __init__(self, prices):
+        self.prices = list(prices)
+        self.recent_calls = 0
+        self.range_calls = 0
+    
+    def timestamps(self):
+        return np.arange(len(self.prices), dtype=np.int64) * 60_000_000
+    
+    def get_recent(self, symbol, limit):
+        self.recent_calls += 1
+        return self.timestamps()[-limit:], np.array(self.prices[-limit:])
+    
+    def get_range(self, symbol, start, end):
+        from app.services.tick_store import to_micros
+        self.range_calls += 1
+        ts = self.timestamps()
+        mask = ts >= to_micros(start)
+        return ts[mask], np.array(self.prices)[mask]
+
+
+class TestAnalyticsService:
+    """Test cases for cached, incrementally refreshed statistics."""
+    
+    def test_seeds_once_then_folds_in_new_ticks(self, monkeypatch):
+        """Test: the cache is seeded once and later reads only fetch new ticks."""
+        from app.models.price_history import PriceHistory
+        history = FakeHistory(random_walk(100, seed=2))
+        monkeypatch.setattr(PriceHistory, 'get_recent', history.get_recent)
+        monkeypatch.setattr(PriceHistory, 'get_range', history.get_range)
+        service = AnalyticsService()
+        
+        first = service.get_stats('btc', 10)
+        assert first['symbol'] == 'BTC'
+        assert first['sma'] == pytest.approx(np.mean(history.prices[-10:]))
+        
+        history.prices.extend(random_walk(5, seed=3))
+        second = service.get_stats('BTC', 10)
+        assert history.recent_calls == 1
+        assert history.range_calls == 1
+        assert second['price'] == history.prices[-1]
+        assert second['sma'] == pytest.approx(np.mean(history.prices[-10:]))
+    
+    def test_slow_load_does_not_block_other_keys(self, monkeypatch):
+        """Test: a key waiting on its history query does not hold up other keys."""
+        from app.models.price_history import PriceHistory
+        history = FakeHistory(random_walk(100, seed=4))
+        started, release = threading.Event(), threading.Event()
+        
+        def get_recent(symbol, limit):
+            if symbol == 'ETH':
+                started.set()
+                release.wait(5)
+            return history.get_recent(symbol, limit)
+        
+        monkeypatch.setattr(PriceHistory, 'get_recent', get_recent)
+        service = AnalyticsService()
+        slow = threading.Thread(target=service.get_stats, args=('ETH', 10))
+        slow.start()
+        try:
+            assert started.wait(5)
+            assert service.get_stats('BTC', 10)['symbol'] == 'BTC'
+            assert not release.is_set()
+        finally:
+            release.set()
+            slow.join()
+    
+    def test_rejects_bad_window(self):
+        """Test: windows outside the supported range raise ValueError."""
+        with pytest.raises(ValueError):
+            AnalyticsService().get_stats('BTC', 1)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,149 @@
+"""Tests for the historical price backfill."""
+import os
+import threading
+import pytest
+from app.models.backfill_checkpoint import BackfillCheckpoint
+from app.services.backfill import BackfillService
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.coingecko import CoinGeckoService
+from app.services.quota import MemoryQuotaStore, QuotaScheduler
+from tests.fake_coingecko import FakeCoinGeckoServer
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'market_chart_bitcoin.json')
+START = 1_700_006_400
+HOUR = 3600
+
+
+class FakeClock:
+    """Clock advanced by the fake sleep."""
+    def __init__(self, now):
+        self.now = now
+        self.lock = threading.Lock()
+    
+    def __call__(self):
+        return self.now
+
+
+class MemoryCheckpointStore:
+    """Checkpoint store keeping rows in memory, with optional failure injection."""
+    
+    def __init__(self):
+        self.checkpoints = {}
+        self.rows = []
+        self.commits = []
+        self.lock = threading.Lock()
+    
+    def plan(self, coin_id, symbol, range_start, range_end):
+        with self.lock:
+            checkpoint = self.checkpoints.setdefault(
+                coin_id, BackfillCheckpoint(coin_id, symbol, range_start, range_end, range_start))
+            if range_start < checkpoint.range_start:
+                checkpoint.range_start = checkpoint.completed_until = range_start
+            checkpoint.range_end = max(checkpoint.range_end, range_end)
+            return checkpoint
+    
+    def commit_window(self, coin_id, symbol, rows, window_start, window_end):
+        with self.lock:
+            checkpoint = self.checkpoints[coin_id]
+            if checkpoint.completed_until != window_start:
+                return 0
+            stored = {(stored_symbol, ts) for stored_symbol, ts, _ in self.rows}
+            rows = [(ts, price) for ts, price in rows if (symbol, ts) not in stored]
+            self.rows.extend((symbol, ts, price) for ts, price in rows)
+            self.commits.append((window_start, window_end))
+            checkpoint.completed_until = window_end
+            return len(rows)
+
+
+def make_backfill(server, store, limit=100, concurrency=3, window=12 * HOUR, sleep=None):
+    service = CoinGeckoService(base_url=server.base_url, breaker=CircuitBreaker('test-backfill'))
+    scheduler = QuotaScheduler(service=service, calls_per_minute=limit, reserve=0,
+                               store=MemoryQuotaStore())
+    return BackfillService(scheduler=scheduler, store=store, window_seconds=window,
+                           concurrency=concurrency, sleep=sleep or (lambda s: None))
+
+
+class TestBackfill:
+    """Test cases for windowed, resumable backfills."""
+    
+    def test_backfills_all_windows_in_order(self):
+        """Test: every fixture point is written once, windows committed in order."""
+        with FakeCoinGeckoServer() as server:
+            recorded = server.add_market_chart('bitcoin', FIXTURE)
+            store = MemoryCheckpointStore()
+            written = make_backfill(server, store).backfill_coin(
+                'bitcoin', START, START + 72 * HOUR)
+            
+            assert written == 72
+            assert [(ts, p) for _, ts, p in store.rows] == [tuple(p) for p in recorded['prices']]
+            assert store.commits == [(START + i * 12 * HOUR, START + (i + 1) * 12 * HOUR)
+                                     for i in range(6)]
+            assert len(server.requests) == 6
+            assert {s for s, _, _ in store.rows} == {'BTC'}
+    
+    def test_resumes_after_interruption(self):
+        """Test: a failed window stops the run; re-running continues without duplicates."""
+        with FakeCoinGeckoServer() as server:
+            server.add_market_chart('bitcoin', FIXTURE)
+            route = '/coins/bitcoin/market_chart/range'
+            serve = server.routes[route]
+            broken = str(START + 36 * HOUR)
+            server.routes[route] = lambda q: (500, {}) if q['from'] == broken else serve(q)
+            store = MemoryCheckpointStore()
+            
+            with pytest.raises(Exception):
+                make_backfill(server, store).backfill_coin('bitcoin', START, START + 72 * HOUR)
+            assert store.checkpoints['bitcoin'].completed_until == START + 36 * HOUR
+            assert len(store.rows) == 36
+            
+            server.routes[route] = serve
+            server.requests.clear()
+            written = make_backfill(server, store).backfill_coin('bitcoin', START, START + 72 * HOUR)
+            assert written == 36
+            assert len(server.requests) == 3
+            assert len({ts for _, ts, _ in store.rows}) == len(store.rows) == 72
+            
+            assert make_backfill(server, store).backfill_coin(
+                'bitcoin', START, START + 72 * HOUR) == 0
+    
+    def test_widened_range_is_backfilled_without_duplicates(self):
+        """Test: a wider request extends the planned range and only adds missing rows."""
+        with FakeCoinGeckoServer() as server:
+            server.add_market_chart('bitcoin', FIXTURE)
+            store = MemoryCheckpointStore()
+            make_backfill(server, store).backfill_coin('bitcoin', START + 24 * HOUR,
+                                                       START + 48 * HOUR)
+            assert len(store.rows) == 24
+            
+            make_backfill(server, store).backfill_coin('bitcoin', START + 24 * HOUR,
+                                                       START + 72 * HOUR)
+            checkpoint = store.checkpoints['bitcoin']
+            assert (checkpoint.range_start, checkpoint.completed_until) == (
+                START + 24 * HOUR, START + 72 * HOUR)
+            assert len(store.rows) == 48
+            
+            make_backfill(server, store).backfill_coin('bitcoin', START, START + 48 * HOUR)
+            assert (checkpoint.range_start, checkpoint.range_end) == (START, START + 72 * HOUR)
+            assert checkpoint.is_complete
+            assert len({ts for _, ts, _ in store.rows}) == len(store.rows) == 72
+    
+    def test_waits_for_quota(self):
+        """Test: windows beyond the per-minute budget wait for the next window."""
+        clock = FakeClock(START)
+        
+        def sleep(seconds):
+            with clock.lock:
+                clock.now += seconds
+        
+        with FakeCoinGeckoServer() as server:
+            server.add_market_chart('bitcoin', FIXTURE)
+            backfill = make_backfill(server, MemoryCheckpointStore(), limit=2, sleep=sleep)
+            backfill.scheduler._clock = clock
+            
+            assert backfill.backfill_coin('bitcoin', START, START + 72 * HOUR) == 72
+            assert clock() >= START + 120
+            assert backfill.scheduler.metrics()['denied_adhoc'] > 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,143 @@
+"""Tests for vectorized alert rule backtesting."""
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+from app.models.alert_rule import AlertRule, PCT_CHANGE, SMA_CROSS
+from app.services.alert import AlertService
+from app.services.backtest import Backtester, crossings, summarize
+from app.services.rule_engine import CurrencySignals
+from app.services.tick_store import from_micros, to_micros
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+MINUTE_US = 60_000_000
+
+
+class FakeLoader:
+    """In-memory price_history keyed by symbol."""
+    
+    def __init__(self, series):
+        self.series = series
+    
+    def get_range(self, symbol, start, end):
+        timestamps, prices = self.series.get(symbol, (np.empty(0, np.int64), np.empty(0)))
+        mask = (timestamps >= to_micros(start)) & (timestamps <= to_micros(end))
+        return timestamps[mask], prices[mask]
+
+
+def random_walk(n, seed=0, start=100.0, step=0.004):
+    rng = np.random.default_rng(seed)
+    timestamps = to_micros(START) + np.arange(n, dtype=np.int64) * MINUTE_US
+    return timestamps, start * np.exp(np.cumsum(rng.normal(0, step, n)))
+
+
+def replay(rule, timestamps, prices):
+    """Reference: evaluate process_alerts' logic tick by tick."""
+    fired_at, fired = None, []
+    rearm_rule = rule if rule.rearms else AlertRule(
+        currency_symbol=rule.currency_symbol, condition=rule.condition,
+        threshold_price=rule.threshold_price, rule_type=rule.rule_type,
+        window_size=rule.window_size, rearm_pct=0.0, cooldown_minutes=0)
+    for i in range(len(prices)):
+        signals = CurrencySignals(timestamps[:i + 1], prices[:i + 1])
+        now = from_micros(timestamps[i])
+        if fired_at is not None:
+            rearm_rule.fired_at = fired_at
+            if rearm_rule.cooled_down(now) and AlertService.check_rule_rearmed(
+                    rearm_rule, prices[i], signals):
+                fired_at = None
+            continue
+        if AlertService.check_rule_triggered(rule, prices[i], signals):
+            fired.append(timestamps[i])
+            fired_at = now
+    return fired
+
+
+def make_rules(prices):
+    low, mid, high = np.percentile(prices, [20, 50, 80])
+    return [
+        AlertRule(currency_symbol='BTC', condition='>', threshold_price=float(mid)),
+        AlertRule(currency_symbol='BTC', condition='<', threshold_price=float(low)),
+        AlertRule(currency_symbol='BTC', condition='>', threshold_price=float(high),
+                  rearm_pct=1.0, cooldown_minutes=30),
+        AlertRule(currency_symbol='BTC', condition='>', threshold_price=0.8,
+                  rule_type=PCT_CHANGE, window_size=15),
+        AlertRule(currency_symbol='BTC', condition='<', threshold_price=0.8,
+                  rule_type=PCT_CHANGE, window_size=15, rearm_pct=25, cooldown_minutes=10),
+        AlertRule(currency_symbol='BTC', condition='~', threshold_price=1.0,
+                  rule_type=PCT_CHANGE, window_size=30),
+        AlertRule(currency_symbol='BTC', condition='>', threshold_price=0.0,
+                  rule_type=SMA_CROSS, window_size=20),
+        AlertRule(currency_symbol='BTC', condition='<', threshold_price=0.0,
+                  rule_type=SMA_CROSS, window_size=10, rearm_pct=0.2, cooldown_minutes=5),
+    ]
+
+
+class TestCrossings:
+    """Test cases for the threshold sweep."""
+    
+    def test_matches_pairwise_comparison(self):
+        """Test: pairs equal a brute-force check of every (tick, threshold)."""
+        values = np.array([1.0, 3.0, 2.0, 5.0, np.nan, 4.0])
+        previous = np.concatenate([[np.nan], values[:-1]])
+        thresholds = np.array([0.5, 2.0, 2.5, 4.0, 6.0])
+        
+        for condition in ('>', '<'):
+            ticks, indices = crossings(values, previous, thresholds, condition)
+            got = set(zip(ticks.tolist(), indices.tolist()))
+            fill = -np.inf if condition == '>' else np.inf
+            v, p = np.nan_to_num(values, nan=fill), np.nan_to_num(previous, nan=fill)
+            expected = {(i, k) for i in range(len(v)) for k, t in enumerate(thresholds)
+                        if (p[i] <= t < v[i] if condition == '>' else v[i] < t <= p[i])}
+            assert got == expected
+
+
+class TestBacktester:
+    """Test cases for rule replay."""
+    
+    @pytest.mark.parametrize('seed', [0, 1, 2])
+    def test_matches_tick_by_tick_evaluation(self, seed):
+        """Test: vectorized triggers equal check_rule_triggered/check_rule_rearmed per tick."""
+        timestamps, prices = random_walk(600, seed=seed)
+        rules = make_rules(prices)
+        
+        results = Backtester(FakeLoader({'BTC': (timestamps, prices)})).run(
+            rules, START, START + timedelta(minutes=600))
+        
+        for rule, fired in zip(rules, results):
+            assert fired.tolist() == replay(rule, timestamps, prices), rule.description
+    
+    def test_only_ticks_in_range_trigger(self):
+        """Test: history before start warms series up but never triggers."""
+        timestamps, prices = random_walk(300, seed=1)
+        rule = AlertRule(currency_symbol='BTC', condition='>', threshold_price=1.0)
+        start = from_micros(timestamps[100])
+        
+        fired, = Backtester(FakeLoader({'BTC': (timestamps, prices)})).run(
+            [rule], start, from_micros(timestamps[-1]))
+        
+        assert fired.tolist() == [timestamps[100]]
+    
+    def test_rules_without_data(self):
+        """Test: currencies with no stored history have no triggers."""
+        rule = AlertRule(currency_symbol='DOGE', condition='>', threshold_price=1.0)
+        
+        fired, = Backtester(FakeLoader({})).run([rule], START, START + timedelta(days=1))
+        
+        assert len(fired) == 0
+    
+    def test_summarize(self):
+        """Test: summary counts all triggers and lists at most ``limit``."""
+        timestamps, prices = random_walk(600)
+        rules = make_rules(prices)[:1]
+        triggers = Backtester(FakeLoader({'BTC': (timestamps, prices)})).run(
+            rules, START, START + timedelta(minutes=600))
+        
+        summary, = summarize(rules, triggers, limit=2)
+        
+        assert summary['count'] == len(triggers[0]) > 2
+        assert len(summary['triggers']) == 2
+        assert summary['first_trigger'] == from_micros(triggers[0][0]).isoformat()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,160 @@
+"""Tests for the CoinGecko circuit breaker."""
+import time
+import pytest
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.coingecko import CoinGeckoService
+from tests.fake_coingecko import FakeCoinGeckoServer
+
+
+class FakeClock:
+    """Manually advanced clock."""
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+def failing():
+    raise ValueError("boom")
+
+
+class TestCircuitBreaker:
+    """Test cases for breaker state transitions."""
+    
+    def test_opens_after_threshold_failures(self):
+        """Test: consecutive failures open the circuit."""
+        breaker = CircuitBreaker('test', failure_threshold=3, clock=FakeClock())
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                breaker.call(failing)
+        
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: 'never called')
+    
+    def test_success_resets_failure_count(self):
+        """Test: a success in between keeps the circuit closed."""
+        breaker = CircuitBreaker('test', failure_threshold=2, clock=FakeClock())
+        with pytest.raises(ValueError):
+            breaker.call(failing)
+        breaker.call(lambda: 'ok')
+        with pytest.raises(ValueError):
+            breaker.call(failing)
+        
+        assert breaker.state == CircuitBreaker.CLOSED
+    
+    def test_half_open_after_recovery_timeout(self):
+        """Test: the circuit half-opens after the timeout and closes on success."""
+        clock = FakeClock()
+        breaker = CircuitBreaker('test', failure_threshold=1, recovery_timeout=30, clock=clock)
+        with pytest.raises(ValueError):
+            breaker.call(failing)
+        
+        clock.now = 29
+        assert breaker.state == CircuitBreaker.OPEN
+        clock.now = 30
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.call(lambda: 'ok') == 'ok'
+        assert breaker.state == CircuitBreaker.CLOSED
+    
+    def test_half_open_failure_reopens(self):
+        """Test: a failed trial call re-opens the circuit for another timeout."""
+        clock = FakeClock()
+        breaker = CircuitBreaker('test', failure_threshold=1, recovery_timeout=30, clock=clock)
+        with pytest.raises(ValueError):
+            breaker.call(failing)
+        clock.now = 30
+        with pytest.raises(ValueError):
+            breaker.call(failing)
+        
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.snapshot()['retry_in_seconds'] == 30
+    
+    def test_half_open_limits_trial_calls(self):
+        """Test: only half_open_max_calls trial calls are let through."""
+        clock = FakeClock()
+        breaker = CircuitBreaker('test', failure_threshold=1, recovery_timeout=1, clock=clock)
+        with pytest.raises(ValueError):
+            breaker.call(failing)
+        clock.now = 1
+        
+        def second_call_while_first_in_flight():
+            with pytest.raises(CircuitOpenError):
+                breaker.call(lambda: 'rejected')
+            return 'first'
+        
+        assert breaker.call(second_call_while_first_in_flight) == 'first'
+    
+    def test_slow_calls_count_as_failures(self):
+        """Test: successful calls over the slow-call threshold trip the breaker."""
+        clock = FakeClock()
+        breaker = CircuitBreaker('test', failure_threshold=1, slow_call_threshold=5, clock=clock)
+        
+        def slow():
+            clock.now += 6
+            return 'late'
+        
+        assert breaker.call(slow) == 'late'
+        assert breaker.state == CircuitBreaker.OPEN
+
+
+class TestCoinGeckoBreaker:
+    """Test cases for CoinGeckoService against a local stand-in server."""
+    
+    def make_service(self, server, **breaker_kwargs):
+        breaker = CircuitBreaker('coingecko-test', **breaker_kwargs)
+        return CoinGeckoService(base_url=server.base_url, timeout=0.2, breaker=breaker)
+    
+    def test_prices_fetched_through_breaker(self):
+        """Test: a healthy server returns symbol prices and keeps the circuit closed."""
+        with FakeCoinGeckoServer() as server:
+            service = self.make_service(server)
+            prices = service.get_prices()
+        
+        assert prices['BTC'] == 50000.0
+        assert service.breaker.state == CircuitBreaker.CLOSED
+    
+    def test_errors_open_circuit_and_fail_fast(self):
+        """Test: server errors open the circuit; later calls skip the network."""
+        with FakeCoinGeckoServer(error_status=500) as server:
+            service = self.make_service(server, failure_threshold=2, recovery_timeout=60)
+            for _ in range(2):
+                with pytest.raises(Exception):
+                    service.get_prices()
+            requests_before = len(server.requests)
+            
+            with pytest.raises(CircuitOpenError):
+                service.get_prices()
+            
+            assert len(server.requests) == requests_before
+    
+    def test_timeouts_open_circuit_and_fail_fast(self):
+        """Test: once latency trips the breaker, calls return well under the timeout."""
+        with FakeCoinGeckoServer(latency=0.5) as server:
+            service = self.make_service(server, failure_threshold=2, recovery_timeout=60)
+            for _ in range(2):
+                with pytest.raises(Exception):
+                    service.get_prices()
+            
+            start = time.perf_counter()
+            with pytest.raises(CircuitOpenError):
+                service.get_prices()
+            assert time.perf_counter() - start < 0.05
+    
+    def test_recovers_when_server_heals(self):
+        """Test: after the recovery timeout a successful probe closes the circuit."""
+        with FakeCoinGeckoServer(error_status=503) as server:
+            service = self.make_service(server, failure_threshold=1, recovery_timeout=0.1)
+            with pytest.raises(Exception):
+                service.get_prices()
+            assert service.breaker.state == CircuitBreaker.OPEN
+            
+            server.error_status = None
+            time.sleep(0.15)
+            assert service.get_prices()['ETH'] == 3000.0
+            assert service.breaker.state == CircuitBreaker.CLOSED
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
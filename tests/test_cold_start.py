@@ -0,0 +1,42 @@
+"""Import-time budget for the serverless entry point."""
+import os
+import re
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| *(\S+)')
+
+# Dependencies that must load on first use, not at startup
+LAZY = ('numpy', 'requests', 'smtplib', 'email.mime.multipart', 'psycopg2.extras')
+# Cumulative milliseconds; app.views excludes Flask itself (imported first). The
+# budgets leave room for slow CI machines while still catching a heavy new import.
+VIEWS_BUDGET_MS = 100
+TOTAL_BUDGET_MS = 1000
+
+
+def import_times(module):
+    """{module: cumulative ms} for importing ``module`` in a fresh interpreter."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, stdin=subprocess.DEVNULL,
+                            check=True)
+    return {name: int(cumulative) / 1000
+            for _, cumulative, name in _LINE.findall(result.stderr)}
+
+
+class TestColdStart:
+    """Test cases for what the serverless entry point imports."""
+    
+    def test_entry_point_import_budget(self):
+        """Test: building the app stays within budget and skips lazy dependencies."""
+        # Best of three runs, so one slow run on a busy machine does not fail the test
+        runs = [import_times('api.index') for _ in range(3)]
+        times = min(runs, key=lambda run: run['api.index'])
+        assert [name for name in LAZY if name in times] == []
+        assert times['app.views'] < VIEWS_BUDGET_MS
+        assert times['api.index'] < TOTAL_BUDGET_MS
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,103 @@
+"""Tests for request-scoped current user loading and the session cache."""
+from datetime import datetime, timezone
+import pytest
+from flask import session
+from app import create_app
+from app.config import Config
+from app.models.user import User
+from app.views import auth
+from app.views.auth import get_current_user
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Count User.find_by_id queries, serving a fixed user."""
+    calls = []
+    
+    def find_by_id(user_id):
+        calls.append(user_id)
+        return User(id=user_id, email='cached@example.com', password_hash='hash',
+                    created_at=datetime(2024, 1, 1, tzinfo=timezone.utc))
+    
+    monkeypatch.setattr(User, 'find_by_id', staticmethod(find_by_id))
+    return calls
+
+
+class TestCurrentUser:
+    """Test cases for get_current_user."""
+    
+    def test_loaded_once_per_request(self, app, lookups, monkeypatch):
+        """Test: repeated calls in one request share one query."""
+        monkeypatch.setattr(Config, 'USER_SESSION_CACHE_SECONDS', 0)
+        with app.test_request_context():
+            session['user_id'] = 7
+            assert get_current_user() is get_current_user()
+        with app.test_request_context():
+            session['user_id'] = 7
+            get_current_user()
+        
+        assert lookups == [7, 7]
+    
+    def test_anonymous(self, app, lookups):
+        """Test: no session user means no query."""
+        with app.test_request_context():
+            assert get_current_user() is None
+        assert lookups == []
+    
+    def test_session_cache_skips_query(self, app, lookups, monkeypatch):
+        """Test: a fresh cache entry serves later requests without a query."""
+        monkeypatch.setattr(Config, 'USER_SESSION_CACHE_SECONDS', 60)
+        with app.test_request_context():
+            session['user_id'] = 7
+            get_current_user()
+            cached = dict(session)
+        with app.test_request_context():
+            session.update(cached)
+            user = get_current_user()
+        
+        assert lookups == [7]
+        assert user.email == 'cached@example.com'
+        assert user.created_at == datetime(2024, 1, 1, tzinfo=timezone.utc)
+        assert user.password_hash is None
+    
+    def test_fresh_loads_full_user(self, app, lookups, monkeypatch):
+        """Test: fresh=True bypasses the cache to get the password hash."""
+        monkeypatch.setattr(Config, 'USER_SESSION_CACHE_SECONDS', 60)
+        with app.test_request_context():
+            session['user_id'] = 7
+            get_current_user()
+            cached = dict(session)
+        with app.test_request_context():
+            session.update(cached)
+            get_current_user()
+            assert get_current_user(fresh=True).password_hash == 'hash'
+            get_current_user(fresh=True)
+        
+        assert lookups == [7, 7]
+    
+    def test_expired_or_foreign_cache_ignored(self, app, lookups, monkeypatch):
+        """Test: expired entries and entries for another user are not used."""
+        monkeypatch.setattr(Config, 'USER_SESSION_CACHE_SECONDS', 60)
+        with app.test_request_context():
+            session['user_id'] = 7
+            session['user_cache'] = {'id': 8, 'email': 'other@example.com',
+                                     'created_at': None, 'expires': 2 ** 40}
+            assert get_current_user().email == 'cached@example.com'
+        with app.test_request_context():
+            session['user_id'] = 7
+            session['user_cache'] = {'id': 7, 'email': 'old@example.com',
+                                     'created_at': None, 'expires': 0}
+            assert get_current_user().email == 'cached@example.com'
+        
+        assert lookups == [7, 7]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
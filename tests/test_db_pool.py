@@ -0,0 +1,191 @@
+"""Tests for the connection pool's checkout, waiting and discard logic."""
+import threading
+import time
+import psycopg2
+import psycopg2.extensions
+import pytest
+from app.services import db
+from app.services.db import ConnectionPool, PoolExhaustedError
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+    
+    def execute(self, query, vars=None):
+        self.conn.statements.append(query)
+    
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Stand-in for TimedConnection: ``close()`` returns it to its pool."""
+    
+    def __init__(self):
+        self.closed = False
+        self.autocommit = False
+        self.in_transaction = False
+        self.rollbacks = 0
+        self.statements = []
+        self._dirty = False
+        self._pool = None
+    
+    def get_transaction_status(self):
+        if self.in_transaction:
+            return psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+    
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self)
+    
+    def set_session(self, autocommit=None, **kwargs):
+        self.autocommit = autocommit
+    
+    def close(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.putconn(self)
+            return
+        self.closed = True
+
+
+@pytest.fixture
+def connects(monkeypatch):
+    """Connections opened through the patched psycopg2.connect."""
+    opened = []
+    
+    def connect(dsn, connection_factory=None):
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+    
+    monkeypatch.setattr(db.psycopg2, 'connect', connect)
+    return opened
+
+
+def make_pool(**kwargs):
+    return ConnectionPool('postgresql://fake', 'test', **kwargs)
+
+
+class TestConnectionPool:
+    """Test cases for the pool without a database."""
+    
+    def test_close_returns_connection_for_reuse(self, connects):
+        """Test: a closed checkout is handed to the next caller instead of reconnecting."""
+        pool = make_pool(max_size=2)
+        conn = pool.getconn()
+        conn.close()
+        assert not conn.closed
+        assert pool.getconn() is conn
+        assert len(connects) == 1
+        stats = pool.stats()
+        assert (stats['created'], stats['reused'], stats['idle'], stats['in_use']) == (1, 1, 0, 1)
+    
+    def test_exhausted_pool_times_out(self, connects):
+        """Test: a checkout gives up after the timeout when every connection is in use."""
+        pool = make_pool(max_size=1, timeout=0.05)
+        pool.getconn()
+        start = time.monotonic()
+        with pytest.raises(PoolExhaustedError):
+            pool.getconn()
+        assert time.monotonic() - start >= 0.05
+        stats = pool.stats()
+        assert (stats['waits'], stats['timeouts']) == (1, 1)
+        assert len(connects) == 1
+    
+    def test_waiter_gets_returned_connection(self, connects):
+        """Test: a waiting checkout is handed the next connection returned."""
+        pool = make_pool(max_size=1, timeout=5)
+        held = pool.getconn()
+        releaser = threading.Timer(0.05, held.close)
+        releaser.start()
+        try:
+            assert pool.getconn() is held
+        finally:
+            releaser.join()
+        stats = pool.stats()
+        assert (stats['waits'], stats['timeouts'], stats['reused']) == (1, 0, 1)
+        assert len(connects) == 1
+    
+    def test_waiter_connects_after_broken_return(self, connects):
+        """Test: a broken connection frees its slot and wakes a waiter, which reconnects."""
+        pool = make_pool(max_size=1, timeout=5)
+        held = pool.getconn()
+        
+        def break_and_return():
+            held.closed = True
+            held.close()
+        
+        releaser = threading.Timer(0.05, break_and_return)
+        releaser.start()
+        try:
+            conn = pool.getconn()
+        finally:
+            releaser.join()
+        assert conn is not held
+        assert len(connects) == 2
+        assert pool.stats()['discarded'] == 1
+    
+    def test_returned_connection_is_reset(self, connects):
+        """Test: open transactions are rolled back and dirty sessions discarded."""
+        pool = make_pool(max_size=1)
+        conn = pool.getconn()
+        conn.in_transaction = True
+        conn._dirty = True
+        conn.autocommit = True
+        conn.close()
+        
+        assert conn.rollbacks == 1
+        assert conn.statements == ['DISCARD ALL']
+        assert (conn._dirty, conn.autocommit) == (False, False)
+        
+        conn = pool.getconn()
+        conn.close()
+        assert conn.statements == ['DISCARD ALL']
+    
+    def test_idle_connection_expires(self, connects):
+        """Test: a connection idle longer than max_idle_seconds is closed, not reused."""
+        pool = make_pool(max_size=1, max_idle_seconds=0.01)
+        stale = pool.getconn()
+        stale.close()
+        time.sleep(0.02)
+        
+        assert pool.getconn() is not stale
+        assert stale.closed
+        assert pool.stats()['discarded'] == 1
+    
+    def test_failed_connect_frees_slot(self, connects, monkeypatch):
+        """Test: a connect error is raised and does not use up the pool's capacity."""
+        pool = make_pool(max_size=1, timeout=0.05)
+        fake_connect = db.psycopg2.connect
+        
+        def refuse(dsn, connection_factory=None):
+            raise psycopg2.OperationalError('connection refused')
+        
+        monkeypatch.setattr(db.psycopg2, 'connect', refuse)
+        with pytest.raises(psycopg2.OperationalError):
+            pool.getconn()
+        
+        monkeypatch.setattr(db.psycopg2, 'connect', fake_connect)
+        assert pool.getconn() is connects[0]
+        assert pool.stats()['in_use'] == 1
+    
+    def test_closeall_closes_idle_connections(self, connects):
+        """Test: closeall closes idle connections and leaves checked-out ones alone."""
+        pool = make_pool(max_size=2)
+        idle, busy = pool.getconn(), pool.getconn()
+        idle.close()
+        pool.closeall()
+        
+        assert idle.closed and not busy.closed
+        busy.close()
+        assert pool.stats()['idle'] == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,137 @@
+"""Tests for pooled, rate-limited email dispatch."""
+import pytest
+from app.services.email import EmailService
+from app.services.rate_limit import TokenBucket
+from tests.fake_smtp import FakeSMTPServer
+
+
+class FakeClock:
+    """Manually advanced clock for deterministic token-bucket tests."""
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_service(server, **kwargs):
+    service = EmailService(smtp_server='127.0.0.1', smtp_port=server.port, use_ssl=False, **kwargs)
+    service.username = 'sender@example.com'
+    service.password = 'secret'
+    return service
+
+
+class TestTokenBucket:
+    """Test cases for the token bucket limiter."""
+    
+    def test_burst_up_to_capacity(self):
+        """Test: a full bucket allows exactly `capacity` immediate takes."""
+        clock = FakeClock()
+        bucket = TokenBucket(60, capacity=3, clock=clock, sleep=clock.sleep)
+        
+        assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    
+    def test_refills_at_configured_rate(self):
+        """Test: 120/min refills one token every half second."""
+        clock = FakeClock()
+        bucket = TokenBucket(120, capacity=1, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        
+        clock.now += 0.25
+        assert bucket.try_acquire() is False
+        clock.now += 0.25
+        assert bucket.try_acquire() is True
+    
+    def test_acquire_waits_for_refill(self):
+        """Test: acquire sleeps until the next token is due."""
+        clock = FakeClock()
+        bucket = TokenBucket(60, capacity=1, clock=clock, sleep=clock.sleep)
+        
+        for _ in range(5):
+            bucket.acquire()
+        
+        assert clock.now == pytest.approx(4.0)
+    
+    def test_acquire_timeout(self):
+        """Test: acquire gives up once the timeout is spent."""
+        clock = FakeClock()
+        bucket = TokenBucket(6, capacity=1, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        
+        assert bucket.acquire(timeout=1.0) is False
+
+
+class TestEmailDispatch:
+    """Test cases for concurrent email dispatch against a local SMTP server."""
+    
+    def test_dispatch_delivers_all_messages(self):
+        """Test: every queued alert is delivered and futures resolve True."""
+        with FakeSMTPServer() as server:
+            service = make_service(server, max_workers=3, sends_per_minute=60000)
+            futures = [
+                service.dispatch_alert_email(f'user{i}@example.com', 'BTC', '>', 50000.0, 51000.0)
+                for i in range(12)
+            ]
+            results = [f.result(timeout=10) for f in futures]
+            service.close()
+        
+        assert results == [True] * 12
+        assert len(server.messages) == 12
+    
+    def test_workers_reuse_smtp_sessions(self):
+        """Test: each worker keeps one session instead of reconnecting per message."""
+        with FakeSMTPServer() as server:
+            service = make_service(server, max_workers=2, sends_per_minute=60000)
+            futures = [
+                service.dispatch_alert_email('user@example.com', 'ETH', '<', 2000.0, 1900.0)
+                for _ in range(10)
+            ]
+            for f in futures:
+                f.result(timeout=10)
+            service.close()
+        
+        assert server.connections <= 2
+    
+    def test_backpressure_when_queue_full(self):
+        """Test: submitting beyond max_pending fails once the timeout expires."""
+        with FakeSMTPServer(latency=0.05) as server:
+            service = make_service(server, max_workers=1, max_pending=2, sends_per_minute=60000)
+            service.dispatch_alert_email('a@example.com', 'BTC', '>', 1.0, 2.0)
+            service.dispatch_alert_email('b@example.com', 'BTC', '>', 1.0, 2.0)
+            
+            with pytest.raises(RuntimeError):
+                service.dispatch_alert_email('c@example.com', 'BTC', '>', 1.0, 2.0, timeout=0.01)
+            service.close()
+    
+    def test_rejected_recipient_keeps_session(self):
+        """Test: a permanent rejection fails that message without resending or reconnecting."""
+        with FakeSMTPServer(rejected=['bounce@example.com']) as server:
+            service = make_service(server, max_workers=1, sends_per_minute=60000)
+            rejected = service.dispatch_alert_email('bounce@example.com', 'BTC', '>', 1.0, 2.0)
+            delivered = service.dispatch_alert_email('user@example.com', 'BTC', '>', 1.0, 2.0)
+            results = [rejected.result(timeout=10), delivered.result(timeout=10)]
+            service.close()
+        
+        assert results == [False, True]
+        assert len(server.messages) == 1
+        assert server.connections == 1
+    
+    def test_failed_delivery_resolves_false(self):
+        """Test: an unreachable server resolves the future to False."""
+        with FakeSMTPServer() as server:
+            port = server.port
+        service = EmailService(smtp_server='127.0.0.1', smtp_port=port, use_ssl=False,
+                               max_workers=1, sends_per_minute=60000)
+        
+        future = service.dispatch_alert_email('a@example.com', 'BTC', '>', 1.0, 2.0)
+        
+        assert future.result(timeout=10) is False
+        service.close()
+        assert service.pending_count == 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,79 @@
+"""Tests for precompiled alert email templates."""
+import email
+import pytest
+from app.services.email_templates import get_alert_template
+
+
+LEGACY_BODY = """Hello!
+
+Your cryptocurrency price alert has been triggered:
+
+Currency: BTC
+Condition: Price above $50,000.00
+Current Price: $51,234.57
+
+This is an automated notification. Please do not reply directly.
+
+---
+CryptoAlert Price Monitoring System"""
+
+
+class TestAlertEmailTemplate:
+    """Test cases for alert template rendering."""
+    
+    def test_template_is_cached_per_currency_and_condition(self):
+        """Test: the same (currency, condition) pair reuses one compiled template."""
+        assert get_alert_template('BTC', '>') is get_alert_template('BTC', '>')
+        assert get_alert_template('BTC', '>') is not get_alert_template('BTC', '<')
+    
+    def test_plain_message_is_single_part(self):
+        """Test: without HTML the message is a single text/plain part."""
+        raw = get_alert_template('BTC', '>').render(
+            'sender@example.com', 'user@example.com', 50000.0, 51234.567)
+        msg = email.message_from_bytes(raw)
+        
+        assert not msg.is_multipart()
+        assert msg.get_content_type() == 'text/plain'
+        assert msg['From'] == 'sender@example.com'
+        assert msg['To'] == 'user@example.com'
+        assert msg['Subject'] == '[CryptoAlert] BTC Price Alert'
+        assert msg.get_payload(decode=True).decode('utf-8').replace('\r\n', '\n') == LEGACY_BODY
+    
+    def test_below_condition_text(self):
+        """Test: '<' rules render as 'below'."""
+        text = get_alert_template('ETH', '<').render_text(2000.0, 1999.5)
+        
+        assert 'Condition: Price below $2,000.00' in text
+        assert 'Current Price: $1,999.50' in text
+    
+    def test_description_replaces_threshold(self):
+        """Test: non-price rules describe their condition instead of a threshold."""
+        text = get_alert_template('BTC', '~', 'Moves ±5% within 60 min').render_text(0.0, 52000.0)
+        
+        assert 'Condition: Moves ±5% within 60 min' in text
+        assert 'Current Price: $52,000.00' in text
+    
+    def test_html_alternative(self):
+        """Test: HTML mode adds a text/html alternative to the text part."""
+        raw = get_alert_template('SOL', '>').render(
+            'sender@example.com', 'user@example.com', 100.0, 123.45, html=True)
+        msg = email.message_from_bytes(raw)
+        
+        assert msg.get_content_type() == 'multipart/alternative'
+        types = [part.get_content_type() for part in msg.get_payload()]
+        assert types == ['text/plain', 'text/html']
+        html = msg.get_payload()[1].get_payload(decode=True).decode('utf-8')
+        assert '$123.45' in html and 'SOL' in html
+    
+    def test_non_ascii_recipient_falls_back_to_mime(self):
+        """Test: non-ASCII addresses are encoded through the email package."""
+        raw = get_alert_template('BTC', '>').render(
+            'sender@example.com', 'usér@example.com', 1.0, 2.0)
+        msg = email.message_from_bytes(raw)
+        
+        assert msg.get_content_type() == 'text/plain'
+        assert raw.isascii()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
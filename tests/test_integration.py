@@ -10,6 +10,7 @@ from app import create_app
 from app.services.db import get_db_connection, init_db
 from app.models.user import User
 from app.models.alert_rule import AlertRule
+from app.models.admin_alert import AdminAlertLog
 
 
 @pytest.fixture(scope='module')
@@ -154,6 +155,1079 @@ class TestAlertRuleCreation:
         assert btc_alert.condition == '>'
         assert btc_alert.threshold_price == 50000.00
         assert btc_alert.is_active is True
+        
+        # Percent-change rule
+        client.post('/alerts/create', data={
+            'currency': 'ETH',
+            'rule_type': 'pct_change',
+            'condition': '~',
+            'threshold': '5',
+            'window_size': '60'
+        }, follow_redirects=True)
+        
+        eth_alert = next((a for a in AlertRule.find_by_user(user.id)
+                          if a.currency_symbol == 'ETH'), None)
+        assert eth_alert is not None
+        assert eth_alert.rule_type == 'pct_change'
+        assert eth_alert.window_size == 60
+        assert eth_alert.description == 'Moves ±5% within 60 min'
+
+
+class TestRearmingRules:
+    """Integration tests for re-arming rules in process_alerts."""
+    
+    def test_rearms_only_after_leaving_band(self, init_database):
+        """Test: an oscillating price notifies once until it leaves the hysteresis band."""
+        from concurrent.futures import Future
+        from datetime import datetime, timedelta, timezone
+        from app.models.price_history import PriceHistory
+        from app.services.alert import AlertService
+        
+        class FakeEmail:
+            def __init__(self):
+                self.sent = []
+            
+            def dispatch_alert_email(self, to_email, **kwargs):
+                self.sent.append(to_email)
+                future = Future()
+                future.set_result(True)
+                return future
+            
+            def close(self):
+                pass
+        
+        email_addr = 'test_rearm@example.com'
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("DELETE FROM users WHERE email = %s", (email_addr,))
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+        user = User.create(email_addr, 'password123')
+        rule = AlertRule.create(user.id, 'DOGE', '>', 0.5, rearm_pct=10, cooldown_minutes=0)
+        
+        service = AlertService()
+        service.email_service = FakeEmail()
+        # Future timestamps so these ticks are the latest whatever else is stored
+        start = datetime.now(timezone.utc) + timedelta(days=1)
+        try:
+            states = []
+            for i, price in enumerate([0.6, 0.48, 0.6, 0.44, 0.6]):
+                PriceHistory.bulk_insert([('DOGE', price, start + timedelta(minutes=i))])
+                service.process_alerts()
+                states.append(AlertRule.find_by_id(rule.id).fired_at is not None)
+            
+            assert service.email_service.sent.count(email_addr) == 2
+            assert states == [True, True, True, False, True]
+            assert AlertRule.find_by_id(rule.id).is_active is True
+        finally:
+            conn = get_db_connection()
+            cur = conn.cursor()
+            try:
+                cur.execute("DELETE FROM price_history WHERE currency_symbol = 'DOGE' "
+                            "AND timestamp >= %s", (start,))
+                conn.commit()
+            finally:
+                cur.close()
+                conn.close()
+    
+    
+    def test_update_rearms_only_on_relevant_change(self, init_database):
+        """Test: one update writes re-arm settings, clearing fired_at only when they change."""
+        from datetime import datetime, timezone
+        email_addr = 'test_rearm_update@example.com'
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("DELETE FROM users WHERE email = %s", (email_addr,))
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+        user = User.create(email_addr, 'password123')
+        rule = AlertRule.create(user.id, 'BTC', '>', 50000.1, rearm_pct=2.5, cooldown_minutes=30)
+        
+        def version():
+            conn = get_db_connection()
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT rules_version FROM users WHERE id = %s", (user.id,))
+                return cur.fetchone()[0]
+            finally:
+                cur.close()
+                conn.close()
+        
+        AlertRule.record_run(fired=[rule.id], fired_at=datetime.now(timezone.utc))
+        rule = AlertRule.find_by_id(rule.id)
+        before = version()
+        rule.update(currency_symbol='BTC', condition='>', threshold_price=50000.1,
+                    is_active=True, rearm_pct=2.5, cooldown_minutes=30)
+        assert version() == before + 1
+        assert AlertRule.find_by_id(rule.id).fired_at is not None
+        
+        rule.update(rearm_pct=None, cooldown_minutes=None)
+        stored = AlertRule.find_by_id(rule.id)
+        assert (stored.rearm_pct, stored.cooldown_minutes, stored.fired_at) == (None, None, None)
+        assert version() == before + 2
+
+class TestBacktestEndpoint:
+    """Integration tests for the backtest API."""
+    
+    def test_backtest_posted_rules(self, client, init_database):
+        """Test: posted rules are replayed over stored history and invalid ones rejected."""
+        from datetime import datetime, timedelta, timezone
+        from app.models.price_history import PriceHistory
+        
+        client.post('/register', data={
+            'email': 'test_backtest@example.com',
+            'password': 'testpassword123',
+            'confirm_password': 'testpassword123'
+        })
+        start = datetime.now(timezone.utc) - timedelta(hours=2)
+        PriceHistory.bulk_insert([('XRP', price, start + timedelta(minutes=i))
+                                  for i, price in enumerate([1.0, 2.0, 1.0, 2.0])])
+        try:
+            response = client.post('/alerts/api/backtest?days=1', json={'rules': [
+                {'currency': 'XRP', 'condition': '>', 'threshold': 1.5},
+                {'currency': 'XRP', 'condition': '>', 'threshold': 1.5, 'rearm_pct': 50},
+            ]})
+            assert response.status_code == 200
+            data = response.get_json()
+            assert [r['count'] for r in data['rules']] == [2, 1]
+            assert data['total_triggers'] == 3
+            
+            response = client.post('/alerts/api/backtest', json={'rules': [
+                {'currency': 'XRP', 'condition': '=', 'threshold': 1}]})
+            assert response.status_code == 400
+            assert 'Rule 1' in response.get_json()['error']
+            
+            for body in ({'rules': {'currency': 'XRP'}}, {'rules': ['XRP']}, [{'currency': 'XRP'}]):
+                response = client.post('/alerts/api/backtest', json=body)
+                assert response.status_code == 400
+        finally:
+            conn = get_db_connection()
+            cur = conn.cursor()
+            try:
+                cur.execute("DELETE FROM price_history WHERE currency_symbol = 'XRP' "
+                            "AND timestamp >= %s", (start,))
+                conn.commit()
+            finally:
+                cur.close()
+                conn.close()
+
+
+class TestUserSessionCache:
+    """Integration tests for the session-cached current user."""
+    
+    def test_password_change_invalidates_cache(self, app, init_database, monkeypatch):
+        """Test: pages skip the user query until the password changes."""
+        from app.config import Config
+        monkeypatch.setattr(Config, 'USER_SESSION_CACHE_SECONDS', 60)
+        client = app.test_client()
+        client.post('/register', data={
+            'email': 'test_session_cache@example.com',
+            'password': 'testpassword123',
+            'confirm_password': 'testpassword123'
+        })
+        
+        calls = []
+        find_by_id = User.find_by_id
+        monkeypatch.setattr(User, 'find_by_id',
+                            staticmethod(lambda user_id: calls.append(user_id) or
+                                         find_by_id(user_id)))
+        
+        assert client.get('/alerts/').status_code == 200
+        assert client.get('/').status_code == 200
+        assert calls == []
+        
+        client.post('/profile', data={
+            'old_password': 'testpassword123',
+            'new_password': 'newpassword123',
+            'confirm_password': 'newpassword123'
+        })
+        assert len(calls) == 1
+        with client.session_transaction() as sess:
+            assert 'user_cache' not in sess
+        
+        client.get('/alerts/')
+        client.get('/alerts/')
+        assert len(calls) == 2
+
+
+class TestConditionalGet:
+    """Integration tests for dashboard and price ETags."""
+    
+    def test_anonymous_dashboard_revalidates(self, app, init_database):
+        """Test: 304 on a matching ETag until a new price is stored."""
+        from datetime import datetime, timezone
+        from app.models.price_history import PriceHistory
+        client = app.test_client()
+        
+        first = client.get('/')
+        assert first.status_code == 200
+        etag = first.headers['ETag']
+        assert client.get('/').data == first.data
+        
+        revalidated = client.get('/', headers={'If-None-Match': etag})
+        assert revalidated.status_code == 304
+        assert revalidated.data == b''
+        
+        PriceHistory.bulk_insert([('BTC', 12345.0, datetime.now(timezone.utc))])
+        changed = client.get('/', headers={'If-None-Match': etag})
+        assert changed.status_code == 200
+        assert changed.headers['ETag'] != etag
+        assert b'12,345.00' in changed.data
+    
+    def test_user_dashboard_etag_follows_rules(self, app, init_database):
+        """Test: a logged-in user's ETag changes when their rules do."""
+        client = app.test_client()
+        client.post('/register', data={
+            'email': 'test_etag@example.com',
+            'password': 'testpassword123',
+            'confirm_password': 'testpassword123'
+        })
+        client.get('/')  # consume the registration flash message
+        
+        etag = client.get('/').headers['ETag']
+        assert client.get('/', headers={'If-None-Match': etag}).status_code == 304
+        
+        client.post('/alerts/create', data={
+            'currency': 'BTC', 'condition': '>', 'threshold': '50000.00'})
+        client.get('/alerts/')  # consume the flash message
+        response = client.get('/', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert 'private' in response.headers['Cache-Control']
+    
+    def test_prices_endpoint(self, client, init_database):
+        """Test: latest prices are served with an ETag and revalidated with 304."""
+        from app.models.price_history import PriceHistory
+        response = client.get('/api/prices')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['success'] is True
+        assert 'BTC' in data['prices']
+        
+        etag = response.headers['ETag']
+        assert client.get('/api/prices', headers={'If-None-Match': etag}).status_code == 304
+        
+        version, latest = PriceHistory.get_latest_snapshot()
+        assert etag.strip('"') == f"prices-{version}"
+        assert version == PriceHistory.get_version()[0]
+        assert {symbol: price for symbol, (price, _) in latest.items()} == data['prices']
+
+
+class TestPriceStream:
+    """Integration tests for the LISTEN/NOTIFY price stream."""
+    
+    def test_stored_prices_are_pushed(self, app, init_database):
+        """Test: a price write reaches a subscriber through NOTIFY."""
+        import time
+        from datetime import datetime, timezone
+        from app.models.price_history import PriceHistory
+        from app.services.price_stream import PriceStream
+        
+        stream = PriceStream(heartbeat_seconds=0.1)
+        subscriber = stream.subscribe()
+        stream.start()
+        events = stream.events(subscriber)
+        try:
+            # The listener publishes a snapshot once it is listening
+            assert next(events).startswith('retry:')
+            assert next(e for e in events if e.startswith('event: prices'))
+            
+            PriceHistory.bulk_insert([('ETH', 4321.5, datetime.now(timezone.utc))])
+            deadline = time.monotonic() + 5
+            for event in events:
+                if '4321.5' in event or time.monotonic() > deadline:
+                    break
+            assert '"ETH":4321.5' in event
+            assert stream.metrics()['notifications'] >= 1
+        finally:
+            events.close()
+            stream.close()
+    
+    def test_stream_endpoint(self, client, init_database):
+        """Test: the endpoint serves text/event-stream starting with the retry delay."""
+        response = client.get('/api/prices/stream', buffered=False)
+        try:
+            assert response.status_code == 200
+            assert response.mimetype == 'text/event-stream'
+            assert response.headers['Cache-Control'] == 'no-cache'
+            assert next(iter(response.response)).startswith(b'retry:')
+        finally:
+            response.close()
+
+
+class TestRulePagination:
+    """Integration tests for keyset pagination and rule counts."""
+    
+    @pytest.fixture
+    def paged_user(self, app, init_database):
+        """A logged-in client whose user has ten rules, three sharing created_at."""
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("DELETE FROM users WHERE email = 'test_pages@example.com'")
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+        client = app.test_client()
+        client.post('/register', data={
+            'email': 'test_pages@example.com',
+            'password': 'testpassword123',
+            'confirm_password': 'testpassword123'
+        })
+        user = User.find_by_email('test_pages@example.com')
+        for i in range(7):
+            AlertRule.create(user_id=user.id, currency_symbol='BTC', condition='>',
+                             threshold_price=1000.0 + i)
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("""INSERT INTO alert_rules (user_id, currency_symbol, condition,
+                                                    threshold_price, created_at)
+                           SELECT %s, 'ETH', '<', 100 + g, '2024-01-01 00:00+00'
+                           FROM generate_series(1, 3) g""", (user.id,))
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+        return client, user
+    
+    def test_api_pages_cover_every_rule_once(self, paged_user):
+        """Test: following next_cursor visits all rules newest first, ties broken by id."""
+        client, user = paged_user
+        seen, cursor, pages = [], None, 0
+        while True:
+            query = '/alerts/api/rules?limit=4' + (f'&cursor={cursor}' if cursor else '')
+            data = client.get(query).get_json()
+            assert data['success'] is True
+            assert len(data['rules']) <= 4
+            seen.extend(data['rules'])
+            pages += 1
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        
+        assert pages == 3
+        expected = sorted(AlertRule.find_by_user(user.id),
+                          key=lambda r: (r.created_at, r.id), reverse=True)
+        assert [r['id'] for r in seen] == [r.id for r in expected]
+        assert seen[-1]['currency'] == 'ETH'
+    
+    def test_api_rejects_bad_parameters(self, paged_user):
+        """Test: malformed cursors and out-of-range limits are 400s."""
+        client, _ = paged_user
+        assert client.get('/alerts/api/rules?cursor=bogus').status_code == 400
+        assert client.get('/alerts/api/rules?limit=0').status_code == 400
+        assert client.get('/alerts/api/rules?limit=501').status_code == 400
+    
+    def test_alert_list_links_older_page(self, paged_user, monkeypatch):
+        """Test: the alerts page shows one page and links to the next."""
+        from app.views import alerts
+        client, _ = paged_user
+        monkeypatch.setattr(alerts, 'PAGE_SIZE', 6)
+        response = client.get('/alerts/')
+        assert response.status_code == 200
+        assert response.data.count(b'/alerts/edit/') == 6
+        assert b'10 total' in response.data
+        assert b'Older' in response.data
+        
+        older = response.data.split(b'/alerts/?cursor=')[1].split(b'"')[0].decode()
+        response = client.get(f'/alerts/?cursor={older}')
+        assert response.data.count(b'/alerts/edit/') == 4
+        assert b'Older' not in response.data
+        assert b'Newest' in response.data
+    
+    def test_counts_and_dashboard_summary(self, paged_user, monkeypatch):
+        """Test: counts come from one aggregate and the dashboard shows only the newest rules."""
+        from app.views import dashboard
+        client, user = paged_user
+        rule = AlertRule.find_page(user.id, 1)[0][0]
+        rule.update(is_active=False)
+        assert AlertRule.count_by_user(user.id) == {'total': 10, 'active': 9, 'rearming': 0}
+        
+        monkeypatch.setattr(dashboard, 'DASHBOARD_ALERTS', 3)
+        client.get('/alerts/')  # consume the registration flash message
+        response = client.get('/')
+        assert b'10 total' in response.data
+        assert b'9 active' in response.data
+        assert response.data.count(b'/alerts/edit/') == 3
+        assert b'View all 10 alerts' in response.data
+
+
+class TestBulkRules:
+    """Integration tests for bulk import, export, toggle and delete."""
+    
+    RULES = [
+        {'currency': 'BTC', 'condition': '>', 'threshold': 70000},
+        {'currency': 'eth', 'rule_type': 'pct_change', 'condition': '~', 'threshold': 5,
+         'window_size': 60, 'rearm_pct': 1, 'cooldown_minutes': 30},
+        {'currency': 'SOL', 'rule_type': 'sma_cross', 'condition': '<', 'window_size': 20,
+         'is_active': False},
+    ]
+    
+    @pytest.fixture
+    def bulk_client(self, app, init_database):
+        """A logged-in client for a fresh user with no rules."""
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("DELETE FROM users WHERE email = 'test_bulk@example.com'")
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+        client = app.test_client()
+        client.post('/register', data={
+            'email': 'test_bulk@example.com',
+            'password': 'testpassword123',
+            'confirm_password': 'testpassword123'
+        })
+        return client, User.find_by_email('test_bulk@example.com')
+    
+    def test_json_import_and_export(self, bulk_client):
+        """Test: a JSON batch is created in one call and exported back."""
+        client, user = bulk_client
+        response = client.post('/alerts/api/rules/import', json={'rules': self.RULES})
+        assert response.status_code == 201
+        assert response.get_json()['created'] == 3
+        
+        exported = client.get('/alerts/api/rules/export').get_json()['rules']
+        by_currency = {r['currency']: r for r in exported}
+        assert set(by_currency) == {'BTC', 'ETH', 'SOL'}
+        assert by_currency['ETH']['rearm_pct'] == 1.0
+        assert by_currency['ETH']['condition'] == '~'
+        assert by_currency['SOL']['is_active'] is False
+        assert by_currency['SOL']['description'] == 'Crosses below 20-period SMA'
+    
+    def test_invalid_batch_creates_nothing(self, bulk_client):
+        """Test: one invalid rule rejects the whole batch, reporting it by row."""
+        client, user = bulk_client
+        rules = self.RULES + [{'currency': 'FAKE', 'condition': '>', 'threshold': 1},
+                              {'currency': 'BTC', 'condition': '>', 'threshold': -5}]
+        response = client.post('/alerts/api/rules/import', json={'rules': rules})
+        assert response.status_code == 400
+        errors = response.get_json()['errors']
+        assert [e['row'] for e in errors] == [4, 5]
+        assert errors[0]['error'] == 'Unsupported cryptocurrency'
+        assert AlertRule.count_by_user(user.id)['total'] == 0
+    
+    def test_csv_round_trip(self, bulk_client):
+        """Test: a CSV export re-imports to the same rules."""
+        client, user = bulk_client
+        client.post('/alerts/api/rules/import', json={'rules': self.RULES})
+        response = client.get('/alerts/api/rules/export?format=csv')
+        assert response.mimetype == 'text/csv'
+        exported = response.get_data(as_text=True)
+        assert exported.splitlines()[0].startswith('id,currency,rule_type,condition')
+        before = sorted(r.description for r in AlertRule.find_by_user(user.id))
+        
+        client.post('/alerts/api/rules/bulk-delete', json={'all': True})
+        response = client.post('/alerts/api/rules/import', data=exported,
+                               content_type='text/csv')
+        assert response.status_code == 201
+        rules = AlertRule.find_by_user(user.id)
+        assert sorted(r.description for r in rules) == before
+        assert {r.currency_symbol: r.is_active for r in rules}['SOL'] is False
+    
+    def test_bulk_toggle_by_filter_and_ids(self, bulk_client):
+        """Test: bulk toggle sets or flips exactly the selected rules."""
+        client, user = bulk_client
+        ids = client.post('/alerts/api/rules/import', json={'rules': self.RULES * 2}).get_json()['ids']
+        
+        data = client.post('/alerts/api/rules/bulk-toggle',
+                           json={'filter': {'currency': 'btc'}, 'is_active': False}).get_json()
+        assert data['updated'] == 2
+        assert sorted(data['disabled']) == sorted([ids[0], ids[3]])
+        
+        data = client.post('/alerts/api/rules/bulk-toggle', json={'ids': ids[:3]}).get_json()
+        assert sorted(data['enabled']) == sorted([ids[0], ids[2]])
+        assert data['disabled'] == [ids[1]]
+        assert AlertRule.count_by_user(user.id)['active'] == 3
+    
+    def test_bulk_delete_is_scoped_to_user(self, bulk_client):
+        """Test: another user's ids are never touched and an empty selection is refused."""
+        client, user = bulk_client
+        other = User.find_by_email('test_integration@example.com') or User.create(
+            'test_bulk_other@example.com', 'password123')
+        foreign = AlertRule.create(user_id=other.id, currency_symbol='BTC', condition='>',
+                                   threshold_price=1.0)
+        ids = client.post('/alerts/api/rules/import', json={'rules': self.RULES}).get_json()['ids']
+        
+        assert client.post('/alerts/api/rules/bulk-delete', json={}).status_code == 400
+        data = client.post('/alerts/api/rules/bulk-delete',
+                           json={'ids': ids[:2] + [foreign.id]}).get_json()
+        assert sorted(data['ids']) == sorted(ids[:2])
+        assert AlertRule.find_by_id(foreign.id) is not None
+        
+        # The single-rule routes share the scoping
+        client.post(f'/alerts/delete/{foreign.id}')
+        client.post(f'/alerts/toggle/{foreign.id}')
+        assert AlertRule.find_by_id(foreign.id).is_active is True
+        foreign.delete()
+
+
+class TestMetricsEndpoint:
+    """Integration tests for the Prometheus /metrics endpoint."""
+    
+    def test_reports_routes_queries_and_alert_stages(self, app, init_database):
+        """Test: request, database and process_alerts metrics are exposed."""
+        from concurrent.futures import Future
+        from app.services.alert import AlertService
+        
+        class FakeEmail:
+            def dispatch_alert_email(self, to_email, **kwargs):
+                future = Future()
+                future.set_result(True)
+                return future
+            
+            def close(self):
+                pass
+        
+        client = app.test_client()
+        client.get('/')
+        client.get('/no-such-page')
+        service = AlertService()
+        service.email_service = FakeEmail()
+        service.process_alerts()
+        
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        text = response.get_data(as_text=True)
+        assert ('http_request_duration_seconds_count{blueprint="dashboard",'
+                'endpoint="dashboard.index",method="GET",status="200"}') in text
+        assert 'endpoint="unmatched",method="GET",status="404"' in text
+        assert 'db_query_duration_seconds_count{operation="SELECT"}' in text
+        assert 'db_connections_opened_total ' in text
+        for stage in ('load_rules', 'load_prices', 'evaluate', 'record', 'notify'):
+            assert f'alert_run_stage_duration_seconds_count{{stage="{stage}"}}' in text
+
+
+def delete_users(*emails):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM users WHERE email = ANY(%s)", (list(emails),))
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+
+class TestQueryTracing:
+    """Integration tests for per-request query tracing."""
+    
+    def test_summary_header_and_n_plus_one_report(self, app, init_database, monkeypatch):
+        """Test: requests report their queries and per-row lookups are flagged."""
+        from app.config import Config
+        from app.services import query_trace
+        monkeypatch.setattr(Config, 'QUERY_TRACE_HEADER', True)
+        monkeypatch.setattr(Config, 'QUERY_REPEAT_THRESHOLD', 3)
+        
+        response = app.test_client().get('/api/prices')
+        assert response.headers['X-Query-Summary'].startswith('count=')
+        assert 'repeated=0' in response.headers['X-Query-Summary']
+        
+        delete_users('test_query_trace@example.com')
+        user = User.create('test_query_trace@example.com', 'password123')
+        with query_trace.trace('lookups') as job:
+            for _ in range(3):
+                User.find_by_id(user.id)
+            assert User.find_emails([user.id, user.id]) == {user.id: user.email}
+        [(sql, executions, _)] = job.repeated()
+        assert executions == 3
+        assert sql == "SELECT id, email, password_hash, created_at FROM users WHERE id = ?"
+    
+    def test_alert_run_looks_up_recipients_once(self, app, init_database, monkeypatch):
+        """Test: process_alerts fetches emails in one query however many rules fire."""
+        from concurrent.futures import Future
+        from app.config import Config
+        from app.models.price_history import PriceHistory
+        from app.services import query_trace
+        from app.services.alert import AlertService
+        monkeypatch.setattr(Config, 'QUERY_REPEAT_THRESHOLD', 3)
+        PriceHistory.create('BTC', 50000.0)
+        
+        class FakeEmail:
+            def __init__(self):
+                self.sent = []
+            
+            def dispatch_alert_email(self, to_email, **kwargs):
+                self.sent.append(to_email)
+                future = Future()
+                future.set_result(True)
+                return future
+            
+            def close(self):
+                pass
+        
+        emails = [f'test_trace_{i}@example.com' for i in range(4)]
+        delete_users(*emails)
+        users = [User.create(email, 'password123') for email in emails]
+        for user in users:
+            AlertRule.create(user_id=user.id, currency_symbol='BTC', condition='>',
+                             threshold_price=0.01)
+        service = AlertService()
+        service.email_service = FakeEmail()
+        with query_trace.trace('process_alerts') as job:
+            service.process_alerts()
+        
+        assert {user.email for user in users} <= set(service.email_service.sent)
+        assert job.repeated() == []
+
+
+SCRATCH_SCHEMA = 'migration_test'
+
+
+def scratch_connect():
+    """Connection whose tables resolve to a scratch schema."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(f"SET search_path TO {SCRATCH_SCHEMA}")
+    conn.commit()
+    cur.close()
+    return conn
+
+
+class TestMigrations:
+    """Integration tests for the schema migration runner."""
+    
+    @pytest.fixture
+    def scratch(self):
+        conn = get_db_connection()
+        conn.autocommit = True
+        cur = conn.cursor()
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCRATCH_SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {SCRATCH_SCHEMA}")
+        yield cur
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCRATCH_SCHEMA} CASCADE")
+        cur.close()
+        conn.close()
+    
+    def test_fresh_database_gets_full_schema(self, scratch):
+        """Test: every table, column and index is created and versions are recorded."""
+        from app.services.migrations import load_migrations, migrate
+        versions = [m.version for m in load_migrations()]
+        assert migrate(scratch_connect) == versions
+        
+        scratch.execute("""SELECT table_name, column_name FROM information_schema.columns
+                           WHERE table_schema = %s""", (SCRATCH_SCHEMA,))
+        columns = set(scratch.fetchall())
+        for column in ('rule_type', 'window_size', 'rearm_pct', 'cooldown_minutes', 'fired_at'):
+            assert ('alert_rules', column) in columns
+        assert ('users', 'rules_version') in columns
+        tables = {table for table, _ in columns}
+        assert {'api_quota', 'backfill_checkpoint', 'admin_alert_log', 'price_history',
+                'schema_version'} <= tables
+        
+        scratch.execute("""SELECT c.relname, i.indisvalid FROM pg_index i
+                           JOIN pg_class c ON c.oid = i.indexrelid
+                           JOIN pg_namespace n ON n.oid = c.relnamespace
+                           WHERE n.nspname = %s""", (SCRATCH_SCHEMA,))
+        indexes = dict(scratch.fetchall())
+        assert indexes['idx_alert_rules_user_created'] is True
+        assert indexes['idx_alert_rules_active'] is True
+        assert indexes['idx_price_history_symbol_timestamp'] is True
+        scratch.execute(f"SELECT array_agg(version ORDER BY version) "
+                        f"FROM {SCRATCH_SCHEMA}.schema_version")
+        assert scratch.fetchone()[0] == versions
+    
+    def test_current_database_costs_one_query(self, scratch):
+        """Test: a second run only reads schema_version."""
+        from app.services import query_trace
+        from app.services.migrations import migrate
+        migrate(scratch_connect)
+        with query_trace.trace('migrate') as job:
+            assert migrate(scratch_connect) == []
+        statements = [sql for sql in job.statements if not sql.startswith('SET search_path')]
+        assert statements == ["SELECT COALESCE(MAX(version), ?) FROM schema_version"]
+    
+    def test_adopts_database_created_before_migrations(self, scratch):
+        """Test: an existing schema without schema_version is migrated in place."""
+        from app.services.migrations import migrate
+        migrate(scratch_connect, target=4)
+        scratch.execute(f"INSERT INTO {SCRATCH_SCHEMA}.users (email, password_hash) "
+                        f"VALUES ('legacy@example.com', 'x')")
+        scratch.execute(f"DROP TABLE {SCRATCH_SCHEMA}.schema_version")
+        
+        assert migrate(scratch_connect)[0] == 1
+        scratch.execute(f"SELECT email, rules_version FROM {SCRATCH_SCHEMA}.users")
+        assert scratch.fetchall() == [('legacy@example.com', 0)]
+    
+    def test_failed_concurrent_index_is_retried(self, scratch, tmp_path):
+        """Test: a failed online index build is not recorded and is rebuilt on the next run."""
+        from app.services.migrations import current_version, migrate
+        (tmp_path / '0001_table.sql').write_text(
+            "CREATE TABLE t (x INTEGER);\nINSERT INTO t VALUES (1), (1);\n")
+        (tmp_path / '0002_index.sql').write_text(
+            "-- migrate: no-transaction\n"
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS t_x ON t (x);\n")
+        
+        with pytest.raises(Exception):
+            migrate(scratch_connect, str(tmp_path))
+        conn = scratch_connect()
+        try:
+            assert current_version(conn) == 1
+        finally:
+            conn.close()
+        valid = f"SELECT indisvalid FROM pg_index WHERE indexrelid = '{SCRATCH_SCHEMA}.t_x'::regclass"
+        scratch.execute(valid)
+        assert scratch.fetchone()[0] is False
+        
+        scratch.execute(f"DELETE FROM {SCRATCH_SCHEMA}.t WHERE ctid <> "
+                        f"(SELECT min(ctid) FROM {SCRATCH_SCHEMA}.t)")
+        assert migrate(scratch_connect, str(tmp_path)) == [2]
+        scratch.execute(valid)
+        assert scratch.fetchone()[0] is True
+
+
+class TestConnectionPool:
+    """Integration tests for the pooled connection layer."""
+    
+    @staticmethod
+    def make_pool(**kwargs):
+        from app.config import Config
+        from app.services.db import ConnectionPool
+        return ConnectionPool(Config.DATABASE_URL, 'test', **kwargs)
+    
+    @staticmethod
+    def backend_pid(conn):
+        cur = conn.cursor()
+        cur.execute("SELECT pg_backend_pid()")
+        pid = cur.fetchone()[0]
+        cur.close()
+        return pid
+    
+    def test_close_returns_connection_for_reuse(self, init_database):
+        """Test: closing a pooled connection keeps the session for the next caller."""
+        pool = self.make_pool(max_size=2)
+        try:
+            conn = pool.getconn()
+            pid = self.backend_pid(conn)
+            conn.close()
+            assert not conn.closed
+            
+            again = pool.getconn()
+            assert again is conn
+            assert self.backend_pid(again) == pid
+            again.close()
+            stats = pool.stats()
+            assert (stats['created'], stats['reused'], stats['idle'], stats['in_use']) == (1, 1, 1, 0)
+        finally:
+            pool.closeall()
+    
+    def test_returned_connection_is_reset(self, init_database):
+        """Test: open transactions, session settings and autocommit do not leak."""
+        pool = self.make_pool(max_size=1)
+        try:
+            conn = pool.getconn()
+            cur = conn.cursor()
+            cur.execute("SET application_name = 'pool_test'")
+            cur.execute("CREATE TEMP TABLE pool_scratch (id INTEGER)")
+            cur.close()
+            conn.commit()
+            conn.autocommit = True
+            conn.close()
+            
+            conn = pool.getconn()
+            assert conn.autocommit is False
+            cur = conn.cursor()
+            cur.execute("SHOW application_name")
+            assert cur.fetchone()[0] != 'pool_test'
+            cur.execute("SELECT to_regclass('pool_scratch')")
+            assert cur.fetchone()[0] is None
+            cur.close()
+            conn.close()
+        finally:
+            pool.closeall()
+    
+    def test_exhausted_pool_times_out(self, init_database):
+        """Test: a checkout waits at most the timeout when every connection is in use."""
+        from app.services.db import PoolExhaustedError
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        held = pool.getconn()
+        try:
+            with pytest.raises(PoolExhaustedError):
+                pool.getconn()
+            assert pool.stats()['timeouts'] == 1
+        finally:
+            held.close()
+            pool.closeall()
+    
+    def test_waiter_gets_returned_connection(self, init_database):
+        """Test: a waiting checkout is handed the next connection returned."""
+        import threading
+        pool = self.make_pool(max_size=1, timeout=5)
+        held = pool.getconn()
+        releaser = threading.Timer(0.05, held.close)
+        releaser.start()
+        try:
+            conn = pool.getconn()
+            assert conn is held
+            assert pool.stats()['waits'] == 1
+            conn.close()
+        finally:
+            releaser.join()
+            pool.closeall()
+    
+    def test_broken_connection_is_discarded(self, init_database):
+        """Test: a connection whose session died is dropped, not reused."""
+        import psycopg2
+        pool = self.make_pool(max_size=1)
+        try:
+            conn = pool.getconn()
+            cur = conn.cursor()
+            with pytest.raises(psycopg2.OperationalError):
+                cur.execute("SELECT pg_terminate_backend(pg_backend_pid())")
+            conn.close()
+            assert conn.closed
+            assert pool.stats()['discarded'] == 1
+            
+            fresh = pool.getconn()
+            assert fresh is not conn
+            assert self.backend_pid(fresh) > 0
+            fresh.close()
+        finally:
+            pool.closeall()
+    
+    def test_get_db_connection_is_pooled(self, init_database):
+        """Test: model connections come from the shared pool and go back to it."""
+        from app.services.db import get_pool
+        conn = get_db_connection()
+        assert conn._pool is get_pool()
+        conn.close()
+        assert not conn.closed
+        unpooled = get_db_connection(pooled=False)
+        assert unpooled._pool is None
+        unpooled.close()
+        assert unpooled.closed
+
+
+class TestReadReplicas:
+    """Integration tests for read-replica routing, using the test database as its own replica."""
+    
+    @pytest.fixture
+    def replicas(self, monkeypatch):
+        """Route reads to a ReplicaSet whose only replica is DATABASE_URL."""
+        from app.config import Config
+        from app.services import db
+        monkeypatch.setattr(Config, 'DATABASE_REPLICA_URLS', Config.DATABASE_URL)
+        monkeypatch.setattr(db, '_replicas', None)
+        db.set_primary_until(0)
+        replica_set = db.get_replicas()
+        yield replica_set
+        db.set_primary_until(0)
+        for pool in replica_set.pools:
+            pool.closeall()
+            db._pools.pop(pool.name, None)
+    
+    @pytest.fixture
+    def replica_client(self, app, init_database, replicas):
+        """A logged-in client for a fresh user with no rules."""
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("DELETE FROM users WHERE email = 'test_replica@example.com'")
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+        client = app.test_client()
+        client.post('/register', data={
+            'email': 'test_replica@example.com',
+            'password': 'testpassword123',
+            'confirm_password': 'testpassword123'
+        })
+        return client, User.find_by_email('test_replica@example.com')
+    
+    def test_reads_go_to_replica(self, init_database, replicas):
+        """Test: read-only model queries use the replica pool, writes the primary."""
+        from app.services.db import get_read_connection
+        conn = get_read_connection()
+        assert conn._pool.name == 'replica1'
+        conn.close()
+        assert get_db_connection()._pool.name == 'primary'
+        assert replicas.status()['replica1'] == {'lag_seconds': 0.0, 'error': None,
+                                                 'usable': True}
+        
+        AlertRule.find_by_user(0)
+        assert replicas.pools[0].stats()['reused'] >= 1
+        
+        # Credential lookups stay on the primary, so a lagging replica cannot fail a login
+        before = replicas.pools[0].stats()
+        User.find_by_email('nobody@example.com')
+        assert replicas.pools[0].stats() == before
+    
+    def test_lagging_replica_falls_back_to_primary(self, init_database, replicas):
+        """Test: a replica lagging past the threshold is skipped until re-checked."""
+        from app.services.db import get_read_connection
+        replicas.max_lag_seconds = -1
+        conn = get_read_connection()
+        assert conn._pool.name == 'primary'
+        conn.close()
+        assert replicas.status()['replica1']['usable'] is False
+        
+        # Not re-measured within the check interval
+        checked = replicas.pools[0].stats()
+        get_read_connection().close()
+        assert replicas.pools[0].stats() == checked
+        
+        replicas.max_lag_seconds = 5
+        replicas.check_seconds = 0
+        conn = get_read_connection()
+        assert conn._pool.name == 'replica1'
+        conn.close()
+    
+    def test_unreachable_replica_falls_back_to_primary(self, init_database, monkeypatch):
+        """Test: reads keep working when the replica cannot be reached."""
+        from app.config import Config
+        from app.services import db
+        monkeypatch.setattr(Config, 'DATABASE_REPLICA_URLS',
+                            'postgresql://postgres:@/postgres?host=/nonexistent')
+        monkeypatch.setattr(db, '_replicas', None)
+        try:
+            conn = db.get_read_connection()
+            assert conn._pool.name == 'primary'
+            conn.close()
+            assert db.get_replicas().status()['replica1']['error']
+        finally:
+            db._pools.pop('replica1', None)
+    
+    def test_rule_change_sticks_session_to_primary(self, replica_client):
+        """Test: after changing rules, the session's reads go to the primary for a while."""
+        import time
+        from app.services.metrics import DB_READS
+        client, user = replica_client
+        response = client.post('/alerts/create', data={
+            'currency': 'BTC',
+            'condition': '>',
+            'threshold': '50000.00'
+        })
+        assert response.status_code == 302
+        with client.session_transaction() as sess:
+            assert sess['primary_until'] > time.time()
+        
+        sticky = DB_READS.collect().get(('sticky',), 0)
+        response = client.get('/alerts/api/rules')
+        assert [rule['currency'] for rule in response.get_json()['rules']] == ['BTC']
+        assert DB_READS.collect().get(('sticky',), 0) > sticky
+        
+        with client.session_transaction() as sess:
+            sess['primary_until'] = time.time() - 1
+        replica_reads = DB_READS.collect().get(('replica',), 0)
+        client.get('/alerts/api/rules')
+        assert DB_READS.collect().get(('replica',), 0) > replica_reads
+        with client.session_transaction() as sess:
+            assert 'primary_until' not in sess
+
+
+class TestHealthProbes:
+    """Integration tests for the liveness, readiness and detailed health checks."""
+    
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self):
+        from app.views import health
+        health._database.clear()
+        health._freshness.clear()
+        health._api_quota.clear()
+        yield
+        health._database.clear()
+        health._freshness.clear()
+        health._api_quota.clear()
+    
+    @pytest.fixture
+    def connects(self, monkeypatch):
+        """Count the database connections health checks take."""
+        from app.views import health
+        calls = []
+        
+        def counting():
+            calls.append(1)
+            return get_db_connection()
+        
+        monkeypatch.setattr(health, 'get_db_connection', counting)
+        return calls
+    
+    def test_liveness_touches_nothing(self, client, monkeypatch):
+        """Test: /health/live answers even when the database is down."""
+        from app.views import health
+        
+        def down():
+            raise RuntimeError('database down')
+        
+        monkeypatch.setattr(health, 'get_db_connection', down)
+        response = client.get('/health/live')
+        assert response.status_code == 200
+        assert response.get_json() == {'status': 'alive'}
+    
+    def test_readiness_is_cached(self, client, init_database, connects):
+        """Test: repeated readiness probes within the TTL ping the database once."""
+        for _ in range(3):
+            response = client.get('/health/ready')
+            assert response.status_code == 200
+            assert response.get_json()['database']['status'] == 'ok'
+        assert len(connects) == 1
+    
+    def test_readiness_fails_without_database(self, client, monkeypatch):
+        """Test: /health/ready returns 503 when the database cannot be reached."""
+        from app.views import health
+        
+        def down():
+            raise RuntimeError('database down')
+        
+        monkeypatch.setattr(health, 'get_db_connection', down)
+        response = client.get('/health/ready')
+        assert response.status_code == 503
+        assert response.get_json()['database'] == {'status': 'fail', 'error': 'database down'}
+    
+    def test_health_reports_breaker_before_first_call(self, client, init_database,
+                                                      monkeypatch):
+        """Test: a fresh process reports the CoinGecko breaker as closed, not missing."""
+        from app.services import circuit_breaker
+        from app.services.quota import get_quota_scheduler
+        # The shared scheduler's provider must keep the breaker restored afterwards
+        get_quota_scheduler()
+        monkeypatch.delitem(circuit_breaker._breakers, 'coingecko', raising=False)
+        data = client.get('/health').get_json()
+        assert data['checks']['coingecko'] == {'status': 'ok', 'breaker': 'closed'}
+        assert data['circuit_breakers']['coingecko']['state'] == 'closed'
+    
+    def test_health_reports_separate_checks(self, client, init_database, connects, monkeypatch):
+        """Test: /health reports pool, freshness, outbox and breaker checks."""
+        from datetime import datetime
+        from app.models.price_history import PriceHistory
+        from app.services.quota import get_quota_scheduler
+        from app.views import health
+        PriceHistory.bulk_create({'BTC': 42000.0}, datetime.utcnow())
+        quota_reads = []
+        
+        def counting_scheduler():
+            quota_reads.append(1)
+            return get_quota_scheduler()
+        
+        monkeypatch.setattr(health, 'get_quota_scheduler', counting_scheduler)
+        data = client.get('/health').get_json()
+        checks = data['checks']
+        assert set(checks) == {'database', 'pool', 'freshness', 'outbox', 'coingecko'}
+        assert checks['database']['status'] == 'ok'
+        assert checks['pool']['pools']['primary']['max_size'] >= 1
+        assert 0 <= checks['freshness']['price_age_seconds']['BTC'] < 60
+        assert 'BTC' not in checks['freshness']['stale']
+        assert set(checks['outbox']) >= {'ticks_buffered', 'emails_pending'}
+        assert data['warnings'] == sorted(name for name, check in checks.items()
+                                          if check['status'] != 'ok')
+        
+        client.get('/health')
+        # The ping, the freshness query and the API quota, once each within the TTL
+        assert len(connects) == 1
+        assert len(quota_reads) == 1
+        assert 'used' in data['api_quota']
 
 
 class TestHealthCheck:
@@ -169,6 +1243,223 @@ class TestHealthCheck:
         assert data['database'] == 'connected'
 
 
+class TestCollectCircuitOpen:
+    """Integration tests for collection while the CoinGecko circuit is open."""
+    
+    def test_collect_fails_fast_with_stale_prices(self, client, init_database):
+        """Test: an open circuit returns flagged last-known-good prices."""
+        from datetime import datetime
+        from app.models.price_history import PriceHistory
+        from app.services.coingecko import CoinGeckoService
+        
+        PriceHistory.bulk_create({'BTC': 42000.0}, datetime.utcnow())
+        breaker = CoinGeckoService().breaker
+        
+        def failing():
+            raise RuntimeError('injected')
+        
+        try:
+            for _ in range(breaker.failure_threshold):
+                with pytest.raises(RuntimeError):
+                    breaker.call(failing)
+            
+            response = client.post('/api/cron/collect-data')
+            assert response.status_code == 503
+            data = response.get_json()
+            assert data['stale'] is True
+            assert 'BTC' in data['prices']
+            assert data['price_age_seconds']['BTC'] >= 0
+            
+            health = client.get('/health').get_json()
+            assert health['circuit_breakers']['coingecko']['state'] == 'open'
+        finally:
+            breaker.reset()
+
+
+class TestAdminAlertLog:
+    """Integration tests for the persisted admin alert throttle."""
+    
+    def test_record_and_claim_across_invocations(self, init_database):
+        """Test: the throttle window is enforced through the database."""
+        from datetime import datetime, timedelta, timezone
+        task = 'test_task_throttle'
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("DELETE FROM admin_alert_log WHERE task_name = %s", (task,))
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+        
+        now = datetime.now(timezone.utc)
+        window = timedelta(minutes=10)
+        entry = AdminAlertLog.record(task, 'fp', 'boom', now)
+        assert AdminAlertLog.claim(entry.id, now, window).pending == 1
+        
+        AdminAlertLog.record(task, 'fp', 'boom', now + timedelta(minutes=1))
+        AdminAlertLog.record(task, 'fp', 'boom', now + timedelta(minutes=2))
+        assert AdminAlertLog.claim(entry.id, now + timedelta(minutes=3), window) is None
+        
+        claimed = AdminAlertLog.claim(entry.id, now + timedelta(minutes=11), window)
+        assert claimed.pending == 2
+        assert claimed.occurrences == 3
+        assert claimed.pending_since == now + timedelta(minutes=1)
+        
+        # A failed send gives the occurrences back and lifts the throttle
+        AdminAlertLog.release([claimed], now + timedelta(minutes=11))
+        reclaimed = AdminAlertLog.claim(entry.id, now + timedelta(minutes=12), window)
+        assert reclaimed.pending == 2
+        assert reclaimed.last_sent_at == now
+
+
+class TestApiQuota:
+    """Integration tests for the shared API call budget."""
+    
+    def test_consume_within_window(self, init_database):
+        """Test: calls are counted per window and denied past the allowance."""
+        from app.models.api_quota import ApiQuota
+        name = 'test_api'
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("DELETE FROM api_quota WHERE name = %s", (name,))
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+        
+        assert ApiQuota.consume(name, 60, allowed=2) == 1
+        assert ApiQuota.consume(name, 60, allowed=2) == 2
+        assert ApiQuota.consume(name, 60, allowed=2) is None
+        assert ApiQuota.usage(name) == (60, 2)
+        
+        # A new window starts from zero; a stale window never overwrites it
+        assert ApiQuota.consume(name, 120, allowed=2) == 1
+        assert ApiQuota.consume(name, 60, allowed=2) is None
+        ApiQuota.exhaust(name, 120, limit=5)
+        assert ApiQuota.consume(name, 120, allowed=5) is None
+        assert ApiQuota.usage(name) == (120, 5)
+        
+        # Refunds only apply to the window they were spent in
+        ApiQuota.refund(name, 60)
+        ApiQuota.refund(name, 120)
+        assert ApiQuota.usage(name) == (120, 4)
+
+
+class TestBackfillCheckpoint:
+    """Integration tests for COPY-based backfill commits."""
+    
+    def test_commit_window_advances_checkpoint_once(self, init_database):
+        """Test: a window's rows and checkpoint commit together, exactly once."""
+        from app.models.backfill_checkpoint import BackfillCheckpoint
+        coin, symbol, start = 'test-coin', 'TSTC', 1_700_006_400
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("DELETE FROM backfill_checkpoint WHERE coin_id = %s", (coin,))
+            cur.execute("DELETE FROM price_history WHERE currency_symbol = %s", (symbol,))
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+        
+        checkpoint = BackfillCheckpoint.plan(coin, symbol, start, start + 7200)
+        assert checkpoint.completed_until == start
+        assert BackfillCheckpoint.plan(coin, symbol, start, start + 3600).range_end == start + 7200
+        
+        rows = [((start + 60 * i) * 1000 + 417, 100.0 + i) for i in range(60)]
+        assert BackfillCheckpoint.commit_window(coin, symbol, rows, start, start + 3600) == 60
+        assert BackfillCheckpoint.commit_window(coin, symbol, rows, start, start + 3600) == 0
+        assert BackfillCheckpoint.get(coin).completed_until == start + 3600
+        
+        # A later end keeps the progress; an earlier start restarts there
+        widened = BackfillCheckpoint.plan(coin, symbol, start, start + 10800)
+        assert (widened.range_end, widened.completed_until) == (start + 10800, start + 3600)
+        widened = BackfillCheckpoint.plan(coin, symbol, start - 3600, start)
+        assert (widened.range_start, widened.range_end) == (start - 3600, start + 10800)
+        assert widened.completed_until == start - 3600
+        assert BackfillCheckpoint.commit_window(coin, symbol, [], start - 3600, start) == 0
+        # Re-fetched windows only add rows that are missing; stored rows keep their ids
+        more = rows + [((start + 60 * i) * 1000 + 500, 200.0) for i in range(3)]
+        assert BackfillCheckpoint.commit_window(coin, symbol, more, start, start + 3600) == 3
+        
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT COUNT(*), MIN(price_usd) FROM price_history "
+                        "WHERE currency_symbol = %s", (symbol,))
+            assert cur.fetchone() == (63, 100)
+        finally:
+            cur.close()
+            conn.close()
+
+
+class TestTickStoreSync:
+    """Integration tests for exporting price_history into the tick store."""
+    
+    def test_range_reads_store_and_newer_rows(self, init_database, tmp_path, monkeypatch):
+        """Test: range reads combine exported ticks with rows added since."""
+        from datetime import datetime, timedelta
+        from app.config import Config
+        from app.models.price_history import PriceHistory
+        from app.services.tick_store import get_tick_store, sync_from_db
+        symbol = 'TSTK'
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("DELETE FROM price_history WHERE currency_symbol = %s", (symbol,))
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+        
+        base = datetime(2024, 1, 1)
+        for i in range(5):
+            PriceHistory.create(symbol, 100.0 + i, base + timedelta(minutes=i))
+        monkeypatch.setattr(Config, 'TICK_STORE_DIR', str(tmp_path))
+        store = get_tick_store()
+        assert sync_from_db(store, [symbol], batch_size=2) == {symbol: 5}
+        
+        ts, prices = PriceHistory.get_range(symbol, base + timedelta(minutes=1),
+                                            base + timedelta(minutes=3))
+        assert list(prices) == [101.0, 102.0, 103.0]
+        
+        PriceHistory.create(symbol, 105.0, base + timedelta(minutes=5))
+        ts, prices = PriceHistory.get_range(symbol, base, base + timedelta(minutes=10))
+        assert list(prices) == [100.0, 101.0, 102.0, 103.0, 104.0, 105.0]
+        assert list(ts[:2]) == [1704067200000000, 1704067260000000]
+        
+        # Backfilled rows older than the last exported tick are read too
+        PriceHistory.create(symbol, 99.0, base - timedelta(minutes=1))
+        PriceHistory.create(symbol, 102.5, base + timedelta(minutes=2, seconds=30))
+        ts, prices = PriceHistory.get_range(symbol, base - timedelta(minutes=5),
+                                            base + timedelta(minutes=3))
+        assert list(prices) == [99.0, 100.0, 101.0, 102.0, 102.5, 103.0]
+        assert list(ts) == sorted(ts)
+
+
+class TestAnalyticsEndpoint:
+    """Integration tests for the rolling statistics endpoint."""
+    
+    def test_rolling_stats(self, client, init_database):
+        """Test: stats are served for supported currencies only."""
+        from datetime import datetime
+        from app.models.price_history import PriceHistory
+        PriceHistory.bulk_create({'ETH': 3000.0}, datetime.utcnow())
+        PriceHistory.bulk_create({'ETH': 3030.0}, datetime.utcnow())
+        
+        response = client.get('/api/analytics/eth?window=2')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['symbol'] == 'ETH'
+        assert data['price'] == 3030.0
+        assert data['sma'] == 3015.0
+        
+        assert client.get('/api/analytics/ETH?window=1').status_code == 400
+        assert client.get('/api/analytics/NOPE').status_code == 404
+
+
 class TestLoginLogout:
     """Integration tests for login/logout flow."""
     
@@ -0,0 +1,108 @@
+"""Tests for the sharded metrics registry and its text format."""
+import threading
+import pytest
+from app.services.db import _operation
+from app.services.metrics import Registry
+
+
+def render_lines(registry):
+    return [line for line in registry.render().splitlines() if not line.startswith('#')]
+
+
+class TestMetrics:
+    """Test cases for recording, collection and rendering."""
+    
+    def test_counts_are_exact_across_threads(self):
+        """Test: concurrent increments from many threads are never lost."""
+        registry = Registry()
+        counter = registry.counter('hits_total', 'Hits.', ('route',))
+        histogram = registry.histogram('latency_seconds', 'Latency.', buckets=(0.5,))
+        barrier = threading.Barrier(8)
+        
+        def work():
+            barrier.wait()
+            for _ in range(10000):
+                counter.inc('a')
+                histogram.observe(0.25)
+        
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert counter.collect() == {('a',): 80000}
+        assert 'latency_seconds_count 80000' in render_lines(registry)
+        assert 'latency_seconds_sum 20000' in render_lines(registry)
+    
+    def test_finished_threads_are_folded_in(self):
+        """Test: shards of finished threads are retired without losing their counts."""
+        registry = Registry()
+        counter = registry.counter('jobs_total', 'Jobs.')
+        for _ in range(20):
+            thread = threading.Thread(target=counter.inc)
+            thread.start()
+            thread.join()
+        assert counter.collect() == {(): 20}
+        assert counter._shards == []
+        counter.inc()
+        assert counter.collect() == {(): 21}
+    
+    def test_gauge_moves_both_ways_across_threads(self):
+        """Test: a gauge raised in one thread and lowered in another nets out."""
+        registry = Registry()
+        gauge = registry.gauge('in_use', 'In use.')
+        gauge.inc(amount=3)
+        thread = threading.Thread(target=gauge.dec)
+        thread.start()
+        thread.join()
+        assert render_lines(registry) == ['in_use 2']
+    
+    def test_histogram_text_format(self):
+        """Test: buckets are cumulative and end with +Inf, sum and count."""
+        registry = Registry()
+        histogram = registry.histogram('query_seconds', 'Query time.', ('operation',),
+                                       buckets=(0.01, 0.1))
+        for value in (0.005, 0.05, 0.05, 3.0):
+            histogram.observe(value, 'SELECT')
+        text = registry.render()
+        assert '# TYPE query_seconds histogram' in text
+        assert render_lines(registry) == [
+            'query_seconds_bucket{operation="SELECT",le="0.01"} 1',
+            'query_seconds_bucket{operation="SELECT",le="0.1"} 3',
+            'query_seconds_bucket{operation="SELECT",le="+Inf"} 4',
+            'query_seconds_sum{operation="SELECT"} 3.105',
+            'query_seconds_count{operation="SELECT"} 4',
+        ]
+    
+    def test_time_records_failures(self):
+        """Test: the timing context manager observes blocks that raise."""
+        registry = Registry()
+        histogram = registry.histogram('stage_seconds', 'Stage time.', ('stage',))
+        try:
+            with histogram.time('evaluate'):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+        assert histogram.collect()[('evaluate',)][-1] == 1
+    
+    def test_label_escaping_and_callback_gauges(self):
+        """Test: label values are escaped and failing callbacks are skipped."""
+        registry = Registry()
+        registry.counter('errors_total', 'Errors.', ('reason',)).inc('say "hi"\n')
+        registry.callback_gauge('queue_depth', 'Depth.', lambda: 7)
+        registry.callback_gauge('broken', 'Broken.', lambda: 1 / 0)
+        assert render_lines(registry) == ['errors_total{reason="say \\"hi\\"\\n"} 1',
+                                          'queue_depth 7']
+    
+    def test_sql_operation_labels(self):
+        """Test: statements are labelled by their leading command."""
+        assert _operation("  select 1") == 'SELECT'
+        assert _operation(b"INSERT INTO t VALUES (1)") == 'INSERT'
+        assert _operation("WITH x AS (SELECT 1) SELECT * FROM x") == 'WITH'
+        assert _operation("VACUUM") == 'OTHER'
+        assert _operation(None) == 'OTHER'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,45 @@
+"""Tests for loading and splitting schema migrations."""
+import pytest
+from app.services.migrations import Migration, load_migrations
+
+
+class TestLoadMigrations:
+    """Test cases for migration files."""
+    
+    def test_shipped_migrations_are_ordered_and_numbered(self):
+        """Test: app/migrations versions run 1..N without gaps."""
+        versions = [m.version for m in load_migrations()]
+        assert versions == list(range(1, len(versions) + 1))
+    
+    def test_files_sorted_by_version(self, tmp_path):
+        """Test: versions sort numerically and other files are ignored."""
+        (tmp_path / '10_later.sql').write_text("SELECT 10;")
+        (tmp_path / '2_earlier.sql').write_text("SELECT 2;")
+        (tmp_path / 'README.md').write_text("notes")
+        assert [(m.version, m.name) for m in load_migrations(str(tmp_path))] == \
+            [(2, 'earlier'), (10, 'later')]
+    
+    def test_duplicate_versions_rejected(self, tmp_path):
+        """Test: two files with the same version are an error."""
+        (tmp_path / '0003_one.sql').write_text("SELECT 1;")
+        (tmp_path / '3_two.sql').write_text("SELECT 2;")
+        with pytest.raises(ValueError):
+            load_migrations(str(tmp_path))
+    
+    def test_statements_and_transaction_mode(self):
+        """Test: statements split on trailing semicolons; the header disables the transaction."""
+        migration = Migration(1, 'indexes', "-- migrate: no-transaction\n"
+                                            "-- Build online\n"
+                                            "CREATE INDEX CONCURRENTLY a ON t (x);\n\n"
+                                            "CREATE INDEX CONCURRENTLY b\nON t (y);\n"
+                                            "-- trailing note\n")
+        assert not migration.transactional
+        assert migration.statements() == [
+            "-- migrate: no-transaction\n-- Build online\nCREATE INDEX CONCURRENTLY a ON t (x)",
+            "CREATE INDEX CONCURRENTLY b\nON t (y)",
+        ]
+        assert Migration(2, 'table', "CREATE TABLE t (x INT);").transactional
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
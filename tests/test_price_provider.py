@@ -0,0 +1,98 @@
+"""Tests for hedged multi-provider price fetching."""
+import time
+import pytest
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.price_provider import CompositePriceProvider
+from tests.fake_provider import FakePriceProvider
+
+
+class TestCompositePriceProvider:
+    """Test cases for hedging, failover and cross-checking."""
+    
+    def test_fast_primary_is_not_hedged(self):
+        """Test: a primary answering before the deadline is the only call."""
+        primary = FakePriceProvider('primary')
+        secondary = FakePriceProvider('secondary')
+        composite = CompositePriceProvider(primary, [secondary], initial_hedge_delay=0.5)
+        
+        assert composite.get_prices()['BTC'] == 50000.0
+        assert secondary.calls == 0
+        assert composite.stats()['hedges'] == 0
+    
+    def test_slow_primary_is_hedged(self):
+        """Test: the secondary's answer wins when the primary misses the deadline."""
+        primary = FakePriceProvider('primary', prices={'BTC': 1.0}, latency=0.5)
+        secondary = FakePriceProvider('secondary', prices={'BTC': 2.0}, latency=0.01)
+        composite = CompositePriceProvider(primary, [secondary], initial_hedge_delay=0.05)
+        
+        start = time.perf_counter()
+        prices = composite.get_prices()
+        
+        assert prices == {'BTC': 2.0}
+        assert time.perf_counter() - start < 0.3
+        assert composite.stats()['hedge_wins'] == 1
+    
+    def test_failed_primary_hedges_immediately(self):
+        """Test: a primary failure triggers the secondary without waiting for the deadline."""
+        primary = FakePriceProvider('primary', error=RuntimeError('down'))
+        secondary = FakePriceProvider('secondary')
+        composite = CompositePriceProvider(primary, [secondary], initial_hedge_delay=5)
+        
+        start = time.perf_counter()
+        assert composite.get_prices()['ETH'] == 3000.0
+        assert time.perf_counter() - start < 1
+    
+    def test_invalid_answer_is_skipped(self):
+        """Test: empty or non-positive prices are not accepted as an answer."""
+        primary = FakePriceProvider('primary', prices={'BTC': 0.0})
+        secondary = FakePriceProvider('secondary', prices={'BTC': 50000.0})
+        composite = CompositePriceProvider(primary, [secondary])
+        
+        assert composite.get_prices() == {'BTC': 50000.0}
+    
+    def test_all_failed_raises(self):
+        """Test: an error is raised when no provider answers."""
+        composite = CompositePriceProvider(
+            FakePriceProvider('primary', error=RuntimeError('a')),
+            [FakePriceProvider('secondary', error=RuntimeError('b'))])
+        
+        with pytest.raises(Exception, match='All price providers failed'):
+            composite.get_prices()
+    
+    def test_all_circuits_open_raises_circuit_error(self):
+        """Test: open circuits everywhere surface as CircuitOpenError for the stale fallback."""
+        composite = CompositePriceProvider(
+            FakePriceProvider('primary', error=CircuitOpenError('primary', 10)),
+            [FakePriceProvider('secondary', error=CircuitOpenError('secondary', 10))])
+        
+        with pytest.raises(CircuitOpenError):
+            composite.get_prices()
+    
+    def test_hedge_delay_tracks_latency_percentile(self):
+        """Test: the deadline follows the primary's recent latency percentile."""
+        primary = FakePriceProvider('primary', latency=0.02)
+        composite = CompositePriceProvider(primary, [FakePriceProvider('secondary')],
+                                           hedge_percentile=90, initial_hedge_delay=1.0)
+        assert composite.hedge_delay() == 1.0
+        
+        for _ in range(12):
+            composite.get_prices()
+        
+        assert 0.02 <= composite.hedge_delay() < 0.2
+    
+    def test_divergence_recorded(self):
+        """Test: a late answer that disagrees with the winner is recorded."""
+        primary = FakePriceProvider('primary', prices={'BTC': 50000.0}, latency=0.2)
+        secondary = FakePriceProvider('secondary', prices={'BTC': 55000.0})
+        composite = CompositePriceProvider(primary, [secondary], initial_hedge_delay=0.01,
+                                           max_divergence=0.02)
+        
+        assert composite.get_prices() == {'BTC': 55000.0}
+        time.sleep(0.4)
+        
+        assert list(composite.divergences) == [{'symbol': 'BTC', 'secondary': 55000.0,
+                                                'primary': 50000.0}]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,108 @@
+"""Tests for the Server-Sent Events price fan-out."""
+import json
+import threading
+import time
+from datetime import datetime, timezone
+import pytest
+from app.services.price_stream import HEARTBEAT, PriceStream
+
+T0 = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def make_stream(**kwargs):
+    kwargs.setdefault('heartbeat_seconds', 5)
+    kwargs.setdefault('queue_size', 4)
+    kwargs.setdefault('max_clients', 1000)
+    return PriceStream(loader=lambda: {'BTC': (50000.0, T0)}, connect=None, **kwargs)
+
+
+def parse(event):
+    """Decode a ``prices`` event's JSON data."""
+    lines = event.strip().split('\n')
+    assert lines[0] == 'event: prices'
+    return json.loads(lines[1][len('data: '):])
+
+
+class TestPriceStream:
+    """Test cases for fan-out, heartbeats and slow-consumer drops."""
+    
+    def test_event_shape(self):
+        """Test: events carry prices and timestamps like GET /api/prices."""
+        data = parse(PriceStream.encode({'BTC': (50000.0, T0)}))
+        assert data == {'prices': {'BTC': 50000.0}, 'timestamps': {'BTC': T0.isoformat()}}
+    
+    def test_new_subscriber_gets_last_event(self):
+        """Test: a client connecting after an update starts from the latest prices."""
+        stream = make_stream()
+        stream.refresh()
+        events = stream.events(stream.subscribe())
+        assert next(events).startswith('retry:')
+        assert parse(next(events))['prices'] == {'BTC': 50000.0}
+    
+    def test_heartbeat_when_idle(self):
+        """Test: an idle stream sends a comment line to keep the connection open."""
+        stream = make_stream(heartbeat_seconds=0.01)
+        events = stream.events(stream.subscribe())
+        next(events)
+        assert next(events) == HEARTBEAT
+    
+    def test_rejects_beyond_capacity(self):
+        """Test: subscribe returns None once max_clients are connected."""
+        stream = make_stream(max_clients=2)
+        assert stream.subscribe() is not None
+        assert stream.subscribe() is not None
+        assert stream.subscribe() is None
+        assert stream.metrics()['rejected_clients'] == 1
+    
+    def test_closing_client_unsubscribes(self):
+        """Test: closing a client's generator removes it from the fan-out."""
+        stream = make_stream()
+        events = stream.events(stream.subscribe())
+        next(events)
+        assert stream.metrics()['clients'] == 1
+        events.close()
+        assert stream.metrics()['clients'] == 0
+    
+    def test_fan_out_to_hundreds_of_clients(self):
+        """Test: 500 concurrent clients all receive every update; a stalled one is dropped."""
+        clients, updates = 500, 6
+        stream = make_stream(queue_size=4)
+        subscribers = [stream.subscribe() for _ in range(clients)]
+        stalled = stream.subscribe()
+        received = [[] for _ in range(clients)]
+        
+        def consume(subscriber, out):
+            events = stream.events(subscriber)
+            for event in events:
+                if event.startswith('event: prices'):
+                    out.append(parse(event)['prices']['BTC'])
+                    if len(out) == updates:
+                        break
+            events.close()
+        
+        threads = [threading.Thread(target=consume, args=(s, out))
+                   for s, out in zip(subscribers, received)]
+        for thread in threads:
+            thread.start()
+        
+        for n in range(updates):
+            delivered = stream.publish({'BTC': (float(n), T0)})
+            # The stalled client holds queue_size events, then is dropped
+            assert delivered == clients + (1 if n < 4 else 0)
+            # Pace updates so live clients never fall queue_size behind
+            deadline = time.monotonic() + 10
+            while any(s.queue.qsize() for s in subscribers) and time.monotonic() < deadline:
+                time.sleep(0.001)
+        for thread in threads:
+            thread.join(timeout=10)
+        
+        assert all(out == [float(n) for n in range(updates)] for out in received)
+        assert stalled.dropped
+        assert list(stream.events(stalled)) == ["retry: 3000\n\n"]
+        metrics = stream.metrics()
+        assert metrics['dropped_clients'] == 1
+        assert metrics['clients'] == 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
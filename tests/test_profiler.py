@@ -0,0 +1,105 @@
+"""Tests for on-demand request and job profiling."""
+import os
+import pstats
+import time
+import pytest
+from flask import Flask
+from app.config import Config
+from app.services import profiler
+
+
+def busy(seconds=0.05):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def make_app():
+    app = Flask(__name__)
+    
+    @app.route('/api/cron/analyze-data')
+    def analyze():
+        busy()
+        return 'ok'
+    
+    @app.route('/other')
+    def other():
+        return 'ok'
+    
+    app.wsgi_app = profiler.ProfilingMiddleware(app.wsgi_app)
+    return app
+
+
+class TestProfiler:
+    """Test cases for profile selection, output and retention."""
+    
+    def test_disabled_by_default(self, monkeypatch, tmp_path):
+        """Test: nothing is installed or recorded unless configured."""
+        monkeypatch.setattr(Config, 'PROFILE_DIR', str(tmp_path))
+        assert not profiler.requests_enabled()
+        with profiler.job('backfill') as profile:
+            busy(0.01)
+        assert profile is None
+        assert os.listdir(tmp_path) == []
+    
+    def test_configured_paths_are_profiled(self, monkeypatch, tmp_path):
+        """Test: requests under PROFILE_PATHS leave a pstats file; others do not."""
+        monkeypatch.setattr(Config, 'PROFILE_DIR', str(tmp_path))
+        monkeypatch.setattr(Config, 'PROFILE_PATHS', '/api/cron/analyze-data')
+        assert profiler.requests_enabled()
+        client = make_app().test_client()
+        assert client.get('/other').status_code == 200
+        assert os.listdir(tmp_path) == []
+        assert client.get('/api/cron/analyze-data').status_code == 200
+        [name] = os.listdir(tmp_path)
+        assert name.endswith('GET_api_cron_analyze-data.pstats')
+        stats = pstats.Stats(str(tmp_path / name))
+        assert any(func[2] == 'busy' for func in stats.stats)
+    
+    def test_signed_header_opts_in(self, monkeypatch, tmp_path):
+        """Test: only a valid, unexpired signature for the path enables profiling."""
+        monkeypatch.setattr(Config, 'PROFILE_DIR', str(tmp_path))
+        monkeypatch.setattr(Config, 'PROFILE_SECRET', 'secret')
+        client = make_app().test_client()
+        
+        client.get('/other', headers={profiler.HEADER: profiler.sign('/api/cron/analyze-data')})
+        client.get('/other', headers={profiler.HEADER: profiler.sign('/other', -1)})
+        client.get('/other', headers={profiler.HEADER: '9999999999:forged'})
+        assert os.listdir(tmp_path) == []
+        
+        client.get('/other', headers={profiler.HEADER: profiler.sign('/other')})
+        assert len(os.listdir(tmp_path)) == 1
+    
+    def test_sampled_job_writes_collapsed_stacks(self, monkeypatch, tmp_path):
+        """Test: sample mode writes folded stacks naming the hot function."""
+        monkeypatch.setattr(Config, 'PROFILE_DIR', str(tmp_path))
+        monkeypatch.setattr(Config, 'PROFILE_JOBS', 'backfill,backtest')
+        monkeypatch.setattr(Config, 'PROFILE_MODE', 'sample')
+        monkeypatch.setattr(Config, 'PROFILE_SAMPLE_INTERVAL_MS', 1)
+        with profiler.job('backfill') as profile:
+            busy(0.1)
+        assert profile.path.endswith('-backfill.collapsed')
+        with open(profile.path) as f:
+            lines = f.read().splitlines()
+        stack, count = lines[0].rsplit(' ', 1)
+        assert 'busy (test_profiler.py:' in stack.split(';')[-1]
+        assert int(count) > 10
+    
+    def test_only_newest_profiles_are_kept(self, monkeypatch, tmp_path):
+        """Test: profiles beyond PROFILE_KEEP are deleted oldest first."""
+        monkeypatch.setattr(Config, 'PROFILE_DIR', str(tmp_path))
+        monkeypatch.setattr(Config, 'PROFILE_JOBS', '*')
+        monkeypatch.setattr(Config, 'PROFILE_KEEP', 3)
+        (tmp_path / 'notes.txt').write_text('kept')
+        paths = []
+        for i in range(5):
+            with profiler.job(f'job{i}') as profile:
+                pass
+            os.utime(profile.path, (i, i))
+            paths.append(profile.path)
+        assert sorted(os.listdir(tmp_path)) == sorted(
+            ['notes.txt'] + [os.path.basename(p) for p in paths[-3:]])
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
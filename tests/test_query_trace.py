@@ -0,0 +1,74 @@
+"""Tests for SQL normalization and per-request query tracing."""
+import pytest
+from app.config import Config
+from app.services import query_trace
+from app.services.query_trace import QueryTrace, normalize, trace
+
+
+class TestNormalize:
+    """Test cases for statement normalization."""
+    
+    def test_parameters_and_literals_become_placeholders(self):
+        """Test: statements differing only in values normalize alike."""
+        assert normalize("SELECT id, email FROM users WHERE id = %s") == \
+            "SELECT id, email FROM users WHERE id = ?"
+        assert normalize("select *\n  from x where a = 'it''s' and b = -4.5 limit 10") == \
+            "select * from x where a = ? and b = ? limit ?"
+        assert normalize("UPDATE t SET a = %(a)s WHERE id = ANY(%s)") == \
+            "UPDATE t SET a = ? WHERE id = ANY(?)"
+    
+    def test_identifiers_keep_their_digits(self):
+        """Test: numbers inside names are not replaced."""
+        assert normalize("SELECT col1 FROM t2 WHERE x = 3") == "SELECT col1 FROM t2 WHERE x = ?"
+    
+    def test_value_lists_collapse(self):
+        """Test: IN lists and multi-row VALUES collapse regardless of length."""
+        assert normalize("SELECT 1 FROM t WHERE id IN (1, 2, 3)") == \
+            normalize("SELECT 1 FROM t WHERE id IN (4,5)")
+        bulk = (b"INSERT INTO price_history (currency_symbol, price) VALUES "
+                b"('BTC',1.5),('ETH',2),('SOL',3)")
+        assert normalize(bulk) == "INSERT INTO price_history (currency_symbol, price) VALUES (...), ..."
+
+
+class TestQueryTrace:
+    """Test cases for tallying statements within a trace."""
+    
+    def test_repeated_statements_are_reported(self, monkeypatch):
+        """Test: a statement repeated past the threshold is flagged as N+1."""
+        monkeypatch.setattr(Config, 'QUERY_REPEAT_THRESHOLD', 3)
+        monkeypatch.setattr(Config, 'SLOW_QUERY_MS', 0)
+        with trace('job') as job:
+            for user_id in range(4):
+                query_trace.record("SELECT email FROM users WHERE id = %s", 0.001, 1)
+            query_trace.record("SELECT * FROM alert_rules WHERE is_active", 0.002, 40)
+        assert job.count == 5
+        assert job.repeated() == [("SELECT email FROM users WHERE id = ?", 4, 0.004)]
+        assert job.summary() == "count=5; time_ms=6.0; distinct=2; repeated=1; slow=0"
+        assert "possible N+1, 4x" in job.report()
+        assert query_trace.current() is None
+    
+    def test_quiet_trace_has_no_report(self):
+        """Test: nothing is logged for a trace without repeats or slow queries."""
+        job = QueryTrace('job')
+        job.record("SELECT 1", 0.001, 1)
+        assert job.report() is None
+    
+    def test_slow_queries_logged_outside_traces(self, monkeypatch, capsys):
+        """Test: slow statements are logged even when no trace is active."""
+        monkeypatch.setattr(Config, 'SLOW_QUERY_MS', 100)
+        query_trace.record("SELECT pg_sleep(%s)", 0.05, 1)
+        assert capsys.readouterr().out == ''
+        query_trace.record("SELECT pg_sleep(%s)", 0.25, 1)
+        assert "Slow query (250.0 ms, 1 rows): SELECT pg_sleep(?)" in capsys.readouterr().out
+    
+    def test_nested_traces_restore_the_outer_one(self):
+        """Test: ending an inner trace resumes recording into the outer one."""
+        with trace('outer') as outer:
+            with trace('inner') as inner:
+                query_trace.record("SELECT 1", 0.001, 1)
+            query_trace.record("SELECT 2", 0.001, 1)
+        assert (outer.count, inner.count) == (1, 1)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
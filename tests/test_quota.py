@@ -0,0 +1,108 @@
+"""Tests for the CoinGecko API quota scheduler."""
+import pytest
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.coingecko import CoinGeckoService, RateLimitedError
+from app.services.quota import (ADHOC, SCHEDULED, MemoryQuotaStore, QuotaExceededError,
+                                QuotaScheduler)
+from tests.fake_coingecko import FakeCoinGeckoServer
+from tests.fake_provider import FakePriceProvider
+
+
+class FakeClock:
+    """Manually advanced clock."""
+    def __init__(self, now=1_000_020.0):
+        self.now = now
+    
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler(limit=5, reserve=2, clock=None, **kwargs):
+    kwargs.setdefault('provider', FakePriceProvider('fake', {'BTC': 50000.0}))
+    kwargs.setdefault('service', CoinGeckoService(base_url='http://127.0.0.1:9'))
+    return QuotaScheduler(calls_per_minute=limit, reserve=reserve, store=MemoryQuotaStore(),
+                          clock=clock or FakeClock(), **kwargs)
+
+
+class TestQuotaScheduler:
+    """Test cases for budget accounting and priorities."""
+    
+    def test_adhoc_stops_at_reserve(self):
+        """Test: ad-hoc calls leave the reserve for scheduled collection."""
+        scheduler = make_scheduler(limit=5, reserve=2)
+        for _ in range(3):
+            scheduler.get_prices(ADHOC)
+        with pytest.raises(QuotaExceededError) as exc:
+            scheduler.get_prices(ADHOC)
+        assert exc.value.priority == ADHOC
+        
+        scheduler.get_prices(SCHEDULED)
+        scheduler.get_prices(SCHEDULED)
+        with pytest.raises(QuotaExceededError):
+            scheduler.get_prices(SCHEDULED)
+        
+        metrics = scheduler.metrics()
+        assert metrics['used'] == 5
+        assert metrics['remaining'] == 0
+        assert metrics['utilization'] == 1.0
+        assert metrics['denied_adhoc'] == 1
+        assert metrics['denied_scheduled'] == 1
+    
+    def test_budget_resets_each_minute(self):
+        """Test: a new window restores the full budget."""
+        clock = FakeClock()
+        scheduler = make_scheduler(limit=1, reserve=0, clock=clock)
+        scheduler.get_prices(SCHEDULED)
+        with pytest.raises(QuotaExceededError) as exc:
+            scheduler.get_prices(SCHEDULED)
+        assert 0 < exc.value.retry_in <= 60
+        
+        clock.now += 60
+        assert scheduler.metrics()['used'] == 0
+        assert scheduler.get_prices(SCHEDULED) == {'BTC': 50000.0}
+    
+    def test_shared_store_spans_schedulers(self):
+        """Test: instances drawing on one store share the budget."""
+        store = MemoryQuotaStore()
+        clock = FakeClock()
+        first = QuotaScheduler(provider=FakePriceProvider('a', {'BTC': 1.0}), service=object(),
+                               calls_per_minute=2, reserve=0, store=store, clock=clock)
+        second = QuotaScheduler(provider=FakePriceProvider('b', {'BTC': 1.0}), service=object(),
+                                calls_per_minute=2, reserve=0, store=store, clock=clock)
+        first.get_prices(SCHEDULED)
+        second.get_prices(SCHEDULED)
+        with pytest.raises(QuotaExceededError):
+            first.get_prices(SCHEDULED)
+    
+    def test_rate_limited_exhausts_window(self):
+        """Test: a 429 from the API spends the rest of the window."""
+        with FakeCoinGeckoServer(error_status=429) as server:
+            service = CoinGeckoService(base_url=server.base_url,
+                                       breaker=CircuitBreaker('test-quota', failure_threshold=100))
+            scheduler = make_scheduler(limit=10, reserve=0, provider=service, service=service)
+            with pytest.raises(RateLimitedError):
+                scheduler.get_prices(SCHEDULED)
+            with pytest.raises(QuotaExceededError):
+                scheduler.get_prices(SCHEDULED)
+            assert len(server.requests) == 1
+            assert scheduler.metrics()['rate_limited'] == 1
+    
+    
+    def test_open_circuit_does_not_spend_budget(self):
+        """Test: calls the open breaker refuses are refunded, leaving budget for recovery."""
+        breaker = CircuitBreaker('test-quota-open', failure_threshold=1)
+        with pytest.raises(RuntimeError):
+            breaker.call(lambda: (_ for _ in ()).throw(RuntimeError('down')))
+        service = CoinGeckoService(base_url='http://127.0.0.1:9', breaker=breaker)
+        scheduler = make_scheduler(limit=2, reserve=0, provider=service, service=service)
+        for _ in range(5):
+            with pytest.raises(CircuitOpenError):
+                scheduler.get_prices(SCHEDULED)
+        
+        metrics = scheduler.metrics()
+        assert metrics['used'] == 0
+        assert metrics['circuit_open'] == 5
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
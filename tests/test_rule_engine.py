@@ -0,0 +1,170 @@
+"""Tests for percent-change and moving-average rules."""
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+from app.models.alert_rule import PCT_CHANGE, PRICE, SMA_CROSS
+from app.services.alert import AlertService
+from app.services.rule_engine import CurrencySignals, MINUTE_US, PriceWindows
+from app.services.tick_store import to_micros
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class Rule:
+    """Minimal alert rule for signal tests."""
+    def __init__(self, rule_type, condition, threshold_price=0.0, window_size=None,
+                 currency_symbol='BTC'):
+        self.rule_type = rule_type
+        self.condition = condition
+        self.threshold_price = threshold_price
+        self.window_size = window_size
+        self.currency_symbol = currency_symbol
+
+
+def minute_series(prices, start=START):
+    timestamps = to_micros(start) + np.arange(len(prices), dtype=np.int64) * MINUTE_US
+    return timestamps, np.asarray(prices, dtype=np.float64)
+
+
+class FakeLoader:
+    """PriceHistory stand-in over in-memory minute series, counting reads."""
+    
+    def __init__(self, series):
+        self.series = series
+        self.calls = []
+    
+    def get_range(self, symbol, start, end):
+        self.calls.append(('range', symbol))
+        timestamps, prices = self.series[symbol]
+        mask = (timestamps >= to_micros(start)) & (timestamps <= to_micros(end))
+        return timestamps[mask], prices[mask]
+    
+    def get_recent(self, symbol, limit):
+        self.calls.append(('recent', symbol))
+        timestamps, prices = self.series[symbol]
+        return timestamps[-limit:], prices[-limit:]
+
+
+class TestCurrencySignals:
+    """Test cases for per-currency indicators."""
+    
+    def test_pct_change_uses_price_at_window_start(self):
+        """Test: change is measured against the last tick at or before the window start."""
+        signals = CurrencySignals(*minute_series([100.0, 120.0, 90.0, 99.0]))
+        
+        assert signals.pct_change(2) == pytest.approx(-17.5)
+        assert signals.pct_change(3) == pytest.approx(-1.0)
+        assert signals.pct_change(60) is None
+    
+    def test_sma_gap_detects_cross(self):
+        """Test: gap goes from below to above the SMA on the crossing tick."""
+        signals = CurrencySignals(*minute_series([10.0, 10.0, 10.0, 9.0, 12.0]))
+        
+        prev, cur = signals.sma_gap(3)
+        assert prev == pytest.approx(9.0 - 29.0 / 3)
+        assert cur == pytest.approx(12.0 - 31.0 / 3)
+        assert signals.sma_gap(5) is None
+    
+    def test_values_are_memoized(self):
+        """Test: one computation per (indicator, window)."""
+        signals = CurrencySignals(*minute_series([1.0, 2.0, 3.0]))
+        signals.pct_change(1)
+        signals.prices = np.array([5.0, 5.0, 5.0])
+        
+        assert signals.pct_change(1) == pytest.approx(50.0)
+
+
+class TestRuleTriggers:
+    """Test cases for check_rule_triggered with the new rule types."""
+    
+    @pytest.mark.parametrize('condition,threshold,change,expected', [
+        ('>', 5.0, 6.0, True),
+        ('>', 5.0, -6.0, False),
+        ('<', 5.0, -6.0, True),
+        ('<', 5.0, 4.0, False),
+        ('~', 5.0, -6.0, True),
+        ('~', 5.0, 4.9, False),
+    ])
+    def test_pct_change(self, condition, threshold, change, expected):
+        """Test: rises, falls and either-way moves against the percent threshold."""
+        rule = Rule(PCT_CHANGE, condition, threshold, 30)
+        signals = CurrencySignals(*minute_series([100.0] * 30 + [100.0 + change]))
+        
+        assert AlertService.check_rule_triggered(rule, 100.0 + change, signals) is expected
+    
+    def test_sma_cross_fires_only_on_crossing_tick(self):
+        """Test: a cross above triggers once, staying above does not."""
+        rule = Rule(SMA_CROSS, '>', window_size=3)
+        series = [10.0, 10.0, 10.0, 9.0, 12.0, 13.0]
+        
+        fired = [AlertService.check_rule_triggered(
+                     rule, series[i - 1], CurrencySignals(*minute_series(series[:i])))
+                 for i in range(4, len(series) + 1)]
+        
+        assert fired == [False, True, False]
+    
+    def test_sma_cross_below(self):
+        """Test: a cross below triggers '<' rules."""
+        rule = Rule(SMA_CROSS, '<', window_size=3)
+        signals = CurrencySignals(*minute_series([10.0, 10.0, 10.0, 11.0, 8.0]))
+        
+        assert AlertService.check_rule_triggered(rule, 8.0, signals) is True
+    
+    def test_missing_signals_do_not_trigger(self):
+        """Test: without enough history the rule stays quiet."""
+        rule = Rule(PCT_CHANGE, '~', 1.0, 60)
+        
+        assert AlertService.check_rule_triggered(rule, 100.0) is False
+        assert AlertService.check_rule_triggered(
+            rule, 100.0, CurrencySignals(*minute_series([100.0]))) is False
+    
+    def test_price_rules_ignore_signals(self):
+        """Test: price rules keep their threshold semantics."""
+        rule = Rule(PRICE, '>', 50000.0)
+        
+        assert AlertService.check_rule_triggered(rule, 50001.0, None) is True
+
+
+class TestPriceWindows:
+    """Test cases for the incremental per-currency windows."""
+    
+    def test_signals_computed_once_per_currency(self):
+        """Test: many rules on one currency share a single window read."""
+        series = {'BTC': minute_series(np.linspace(100, 200, 300)),
+                  'ETH': minute_series(np.linspace(10, 5, 300))}
+        loader = FakeLoader(series)
+        windows = PriceWindows(loader)
+        now = START + timedelta(minutes=299)
+        rules = ([Rule(PCT_CHANGE, '>', 1.0, w) for w in (5, 30, 60)] +
+                 [Rule(SMA_CROSS, '<', window_size=20, currency_symbol='ETH'),
+                  Rule(PRICE, '>', 1.0, currency_symbol='DOGE')])
+        
+        signals = windows.signals_for(rules, now)
+        
+        assert set(signals) == {'BTC', 'ETH'}
+        assert loader.calls.count(('range', 'BTC')) == 1
+        assert len(signals['BTC'].prices) >= 61
+        assert signals['BTC'].pct_change(60) == pytest.approx(
+            (200 - series['BTC'][1][-61]) / series['BTC'][1][-61] * 100)
+        assert len(signals['ETH'].prices) >= 21
+    
+    def test_later_runs_fetch_only_new_ticks(self):
+        """Test: a second run reads from the last held tick and trims old ones."""
+        timestamps, prices = minute_series(np.arange(1.0, 201.0))
+        loader = FakeLoader({'BTC': (timestamps[:100], prices[:100])})
+        windows = PriceWindows(loader)
+        rules = [Rule(PCT_CHANGE, '>', 1.0, 10)]
+        windows.signals_for(rules, START + timedelta(minutes=99))
+        
+        loader.series['BTC'] = (timestamps, prices)
+        loader.calls.clear()
+        signals = windows.signals_for(rules, START + timedelta(minutes=199))
+        
+        assert loader.calls == [('range', 'BTC')]
+        assert signals['BTC'].prices[-1] == 200.0
+        assert len(signals['BTC'].prices) <= 13
+        assert signals['BTC'].pct_change(10) == pytest.approx((200 - 190) / 190 * 100)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
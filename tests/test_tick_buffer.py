@@ -0,0 +1,138 @@
+"""Tests for the write-behind tick buffer."""
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.services.tick_buffer import TickBuffer
+
+
+class FakeClock:
+    """Manually advanced clock."""
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class RecordingWriter:
+    """Collects written batches; fails while ``error`` is set."""
+    def __init__(self):
+        self.batches = []
+        self.error = None
+    
+    def __call__(self, rows):
+        if self.error is not None:
+            raise self.error
+        self.batches.append(list(rows))
+
+
+T0 = datetime(2024, 1, 1, 12, 0)
+
+
+def make_buffer(**kwargs):
+    kwargs.setdefault('flush_size', 10)
+    kwargs.setdefault('flush_seconds', 30)
+    kwargs.setdefault('max_size', 100)
+    writer = RecordingWriter()
+    clock = FakeClock()
+    return TickBuffer(writer=writer, clock=clock, **kwargs), writer, clock
+
+
+class TestTickBuffer:
+    """Test cases for buffering, flushing and overflow."""
+    
+    def test_flushes_by_size(self):
+        """Test: reaching flush_size writes every buffered tick in one batch."""
+        buffer, writer, _ = make_buffer(flush_size=6)
+        assert buffer.add({'BTC': 1.0, 'ETH': 2.0, 'SOL': 3.0}, T0) is False
+        assert writer.batches == []
+        assert buffer.add({'BTC': 1.1, 'ETH': 2.1, 'SOL': 3.1}, T0 + timedelta(seconds=5)) is True
+        assert len(writer.batches) == 1
+        assert len(writer.batches[0]) == 6
+        assert buffer.pending() == 0
+    
+    def test_flushes_by_age(self):
+        """Test: a tick older than flush_seconds triggers a flush on the next add."""
+        buffer, writer, clock = make_buffer()
+        buffer.add({'BTC': 1.0}, T0)
+        clock.now = 31
+        assert buffer.add({'BTC': 1.1}, T0 + timedelta(seconds=31)) is True
+        assert [r[1] for r in writer.batches[0]] == [1.0, 1.1]
+    
+    def test_zero_age_writes_through(self):
+        """Test: flush_seconds=0 writes every collection immediately."""
+        buffer, writer, _ = make_buffer(flush_seconds=0)
+        buffer.add({'BTC': 1.0}, T0)
+        buffer.add({'BTC': 1.1}, T0)
+        assert len(writer.batches) == 2
+    
+    def test_latest_prices_visible_before_flush(self):
+        """Test: the evaluator sees buffered prices newer than stored ones."""
+        buffer, writer, _ = make_buffer()
+        buffer.add({'BTC': 51000.0}, T0)
+        stored = {
+            'BTC': (50000.0, datetime(2024, 1, 1, 11, 59, tzinfo=timezone.utc)),
+            'ETH': (3000.0, datetime(2024, 1, 1, 11, 59, tzinfo=timezone.utc)),
+        }
+        assert writer.batches == []
+        assert buffer.overlay(stored) == {'BTC': 51000.0, 'ETH': 3000.0}
+        
+        newer = {'BTC': (52000.0, datetime(2024, 1, 1, 12, 1, tzinfo=timezone.utc))}
+        assert buffer.overlay(newer) == {'BTC': 52000.0}
+    
+    def test_bounded_size_drops_oldest(self):
+        """Test: overflow drops the oldest ticks and counts them."""
+        buffer, writer, _ = make_buffer(flush_size=1000, max_size=5)
+        for i in range(8):
+            buffer.add({'BTC': float(i)}, T0 + timedelta(seconds=i))
+        assert buffer.pending() == 5
+        assert buffer.metrics()['dropped_ticks'] == 3
+        buffer.flush()
+        assert [r[1] for r in writer.batches[0]] == [3.0, 4.0, 5.0, 6.0, 7.0]
+    
+    def test_failed_flush_keeps_ticks(self):
+        """Test: ticks survive a failed write and go out with the next flush."""
+        buffer, writer, _ = make_buffer(flush_size=2)
+        writer.error = RuntimeError('db down')
+        buffer.add({'BTC': 1.0}, T0)
+        with pytest.raises(RuntimeError):
+            buffer.add({'ETH': 2.0}, T0)
+        metrics = buffer.metrics()
+        assert metrics['buffered'] == 2
+        assert metrics['flush_failures'] == 1
+        
+        writer.error = None
+        buffer.add({'SOL': 3.0}, T0 + timedelta(seconds=1))
+        assert [r[0] for r in writer.batches[0]] == ['BTC', 'ETH', 'SOL']
+    
+    def test_close_flushes_and_counts_loss(self):
+        """Test: shutdown flushes; ticks it cannot write are reported as lost."""
+        buffer, writer, _ = make_buffer()
+        buffer.add({'BTC': 1.0}, T0)
+        buffer.close()
+        assert len(writer.batches) == 1
+        
+        buffer, writer, _ = make_buffer()
+        buffer.add({'BTC': 1.0, 'ETH': 2.0}, T0)
+        writer.error = RuntimeError('db down')
+        buffer.close()
+        assert buffer.metrics()['lost_on_shutdown'] == 2
+    
+    def test_background_flusher(self):
+        """Test: the flusher thread writes aged ticks without new adds."""
+        buffer = TickBuffer(flush_size=100, flush_seconds=0.1, max_size=100,
+                            writer=RecordingWriter())
+        buffer.start()
+        try:
+            buffer.add({'BTC': 1.0}, T0)
+            deadline = time.time() + 2
+            while buffer.pending() and time.time() < deadline:
+                time.sleep(0.02)
+            assert buffer.pending() == 0
+            assert len(buffer._writer.batches) == 1
+        finally:
+            buffer.close()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
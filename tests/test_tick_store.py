@@ -0,0 +1,92 @@
+"""Tests for the memory-mapped tick store."""
+import os
+from datetime import datetime, timezone
+import numpy as np
+import pytest
+from app.services.tick_store import TickStore, sync_from_db, to_micros
+
+MINUTE = 60_000_000
+
+
+def minutes(*values):
+    return np.array(values, dtype=np.int64) * MINUTE
+
+
+class FakeSource:
+    """price_history stand-in yielding (id, ts, price) rows after an id."""
+    def __init__(self):
+        self.rows = {}
+    
+    def add(self, symbol, ts, price):
+        rows = self.rows.setdefault(symbol, [])
+        rows.append((len(rows) + 1, ts, price))
+    
+    def __call__(self, symbol, after_id, batch_size):
+        rows = [r for r in self.rows.get(symbol, []) if r[0] > after_id]
+        for i in range(0, len(rows), batch_size):
+            yield rows[i:i + batch_size]
+
+
+class TestTickStore:
+    """Test cases for writing and slicing tick files."""
+    
+    def test_range_is_zero_copy_slice(self, tmp_path):
+        """Test: range reads binary-search the mapped file and return views."""
+        store = TickStore(str(tmp_path))
+        store.write('BTC', minutes(0, 1, 2, 3, 4), np.arange(5, dtype=float), last_id=5)
+        
+        ts, prices = store.range('BTC', 1 * MINUTE, 3 * MINUTE)
+        assert list(ts) == list(minutes(1, 2, 3))
+        assert list(prices) == [1.0, 2.0, 3.0]
+        assert np.shares_memory(prices, store.ticks('BTC'))
+        assert isinstance(store.ticks('BTC'), np.memmap)
+        assert store.range('BTC', 10 * MINUTE, 20 * MINUTE)[0].size == 0
+    
+    def test_append_and_out_of_order_merge(self, tmp_path):
+        """Test: newer ticks append; older ticks are merged in timestamp order."""
+        store = TickStore(str(tmp_path))
+        store.write('ETH', minutes(10, 11), np.array([10.0, 11.0]), last_id=2)
+        store.write('ETH', minutes(12), np.array([12.0]), last_id=3)
+        assert store.meta('ETH') == {'last_id': 3, 'rows': 3}
+        
+        store.write('ETH', minutes(5, 1), np.array([5.0, 1.0]), last_id=5)
+        ts, prices = store.range('ETH', 0, 100 * MINUTE)
+        assert list(prices) == [1.0, 5.0, 10.0, 11.0, 12.0]
+        assert store.last_timestamp('ETH') == 12 * MINUTE
+        assert os.path.getsize(tmp_path / 'ETH.ticks') == 5 * 16
+    
+    def test_sync_is_incremental(self, tmp_path):
+        """Test: each sync exports only rows added since the previous one."""
+        store = TickStore(str(tmp_path))
+        source = FakeSource()
+        for i in range(5):
+            source.add('BTC', i * MINUTE, float(i))
+        assert sync_from_db(store, ['BTC'], batch_size=2, source=source) == {'BTC': 5}
+        assert sync_from_db(store, ['BTC'], source=source) == {'BTC': 0}
+        
+        source.add('BTC', 5 * MINUTE, 5.0)
+        assert sync_from_db(store, ['BTC'], source=source) == {'BTC': 1}
+        assert list(store.range('BTC', 0, 10 * MINUTE)[1]) == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    
+    def test_inconsistent_file_is_rebuilt(self, tmp_path):
+        """Test: a file longer than its metadata (crash mid-export) is re-exported."""
+        store = TickStore(str(tmp_path))
+        source = FakeSource()
+        for i in range(3):
+            source.add('SOL', i * MINUTE, float(i))
+        sync_from_db(store, ['SOL'], source=source)
+        with open(tmp_path / 'SOL.ticks', 'ab') as f:
+            f.write(b'\0' * 16)
+        
+        assert sync_from_db(store, ['SOL'], source=source) == {'SOL': 3}
+        assert list(store.range('SOL', 0, 10 * MINUTE)[1]) == [0.0, 1.0, 2.0]
+    
+    def test_to_micros_treats_naive_as_utc(self):
+        """Test: naive and UTC-aware datetimes map to the same timestamp."""
+        naive = datetime(2024, 1, 1, 12, 0, 0, 123456)
+        assert to_micros(naive) == to_micros(naive.replace(tzinfo=timezone.utc))
+        assert to_micros(naive) % 1_000_000 == 123456
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])